@@ -1,12 +1,15 @@
-from pathlib import Path
-from uuid import uuid4
-
 from fastapi import APIRouter, Depends, HTTPException, status, File, UploadFile
 from sqlalchemy.orm import Session
 
+from app.core import user_cache
 from app.core.dependencies import get_current_user, get_db
-from app.core.security import create_access_token, hash_password, verify_password
-from app.core.config import settings
+from app.core.security import (
+    create_access_token,
+    dummy_verify_async,
+    hash_password_async,
+    verify_and_update_password_async,
+)
+from app.models.creator_recommendation import CreatorRecommendation
 from app.models.like_record import LikeRecord
 from app.models.user import User
 from app.models.work import Work, WorkStatus, WorkVisibility
@@ -20,9 +23,8 @@ from app.schemas.auth import (
     TokenResponse,
     UserPublic,
 )
-from app.services import email_service, verification_code_service
+from app.services import email_service, image_renditions, verification_code_service
 from app.services.url_resolver import resolve_cover_url
-from app.services.oss_storage import OSSStorage, build_oss_key, encode_oss_path
 
 router = APIRouter()
 
@@ -110,7 +112,7 @@ async def register(payload: RegisterRequest, db: Session = Depends(get_db)) -> T
       username=payload.username,
       email=payload.email,
       personal_profile=payload.personal_profile,
-      password_hash=hash_password(payload.password),
+      password_hash=await hash_password_async(payload.password),
   )
   db.add(user)
   db.commit()
@@ -138,8 +140,16 @@ async def register(payload: RegisterRequest, db: Session = Depends(get_db)) -> T
 @router.post("/login", response_model=TokenResponse, summary="login user")
 async def login(payload: LoginRequest, db: Session = Depends(get_db)) -> TokenResponse:
   user = db.query(User).filter(User.username == payload.username).first()
-  if not user or not verify_password(payload.password, user.password_hash):
+  if not user:
+    await dummy_verify_async()
     raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="账户或密码错误")
+  ok, new_hash = await verify_and_update_password_async(payload.password, user.password_hash)
+  if not ok:
+    raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="账户或密码错误")
+  if new_hash:
+    # 哈希参数已变化（或旧明文 / bcrypt）：登录成功时透明重算
+    user.password_hash = new_hash
+    db.commit()
 
   token = create_access_token(user.id)
   return TokenResponse(
@@ -208,6 +218,7 @@ async def update_profile(
 
   db.add(current_user)
   db.commit()
+  user_cache.invalidate(current_user.id)
   db.refresh(current_user)
 
   liked_visible_count = _count_visible_liked_works(db, user_id=current_user.id)
@@ -237,37 +248,9 @@ async def upload_avatar(
     file: UploadFile = File(...),
     current_user: User = Depends(get_current_user),
 ) -> dict:
-  if not file.content_type or not file.content_type.startswith("image/"):
-    raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="请上传图片文件")
-
-  suffix = Path(file.filename or "").suffix or ".png"
-  content = await file.read()
-
-  # 优先 OSS
-  if settings.OSS_ENABLED:
-    try:
-      key = build_oss_key(
-          category="avatar",
-          source="upload",
-          user_id=current_user.id,
-          original_filename=file.filename,
-          ext=suffix,
-      )
-      OSSStorage().put_bytes(key, content, content_type=file.content_type)
-      avatar_path = encode_oss_path(key)
-      avatar_url = OSSStorage().get_url(key)
-      return {"avatar_url": avatar_url, "avatar_path": avatar_path}
-    except Exception as exc:
-      print(f"[upload_avatar] Upload to OSS failed, fallback local: {exc}")
-
-  # 本地兜底
-  avatars_dir = Path(settings.STATIC_ROOT) / "avatars"
-  avatars_dir.mkdir(parents=True, exist_ok=True)
-  filename = f"{uuid4()}{suffix}"
-  dest = avatars_dir / filename
-  dest.write_bytes(content)
-  avatar_rel = f"/static/avatars/{filename}"
-  return {"avatar_url": avatar_rel, "avatar_path": avatar_rel}
+  # 按块落盘 + 大小上限，线程池中纠正方向、缩放、去元数据并重新压缩，附带缩略图
+  avatar_path = await image_renditions.ingest_upload_image(file)
+  return {"avatar_url": resolve_cover_url(avatar_path), "avatar_path": avatar_path}
 
 
 @router.delete("/account", status_code=status.HTTP_204_NO_CONTENT, summary="delete current user")
@@ -275,8 +258,12 @@ async def delete_profile(
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db),
 ) -> None:
+  user_id = current_user.id
+  # 创作者推荐快照行外键引用用户（无 ON DELETE CASCADE），先删掉
+  db.query(CreatorRecommendation).filter(CreatorRecommendation.user_id == user_id).delete(synchronize_session=False)
   db.delete(current_user)
   db.commit()
+  user_cache.invalidate(user_id)
   
 
 @router.put("/account/password", summary="change current user password")
@@ -286,7 +273,8 @@ async def change_password(
     db: Session = Depends(get_db),
 ) -> dict:
   # 校验当前密码
-  if not verify_password(payload.current_password, current_user.password_hash):
+  ok, _ = await verify_and_update_password_async(payload.current_password, current_user.password_hash)
+  if not ok:
     raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="当前密码错误")
 
   # 新旧密码不能相同
@@ -294,8 +282,9 @@ async def change_password(
     raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="新密码不能与原密码相同")
 
   # 保存哈希
-  current_user.password_hash = hash_password(payload.new_password)
+  current_user.password_hash = await hash_password_async(payload.new_password)
   db.add(current_user)
   db.commit()
+  user_cache.invalidate(current_user.id)
 
   return {"message": "已修改成功"}
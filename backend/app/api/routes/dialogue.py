@@ -1,24 +1,27 @@
 ﻿from datetime import datetime
 import asyncio
+import functools
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
 from pathlib import Path
 
 from fastapi import APIRouter, Depends, HTTPException, status, BackgroundTasks
-from sqlalchemy import text
-from sqlalchemy.exc import IntegrityError, OperationalError, PendingRollbackError
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
 
 from app.core.config import settings
 from app.core.dependencies import get_current_user, get_db
-from app.db.session import SessionLocal
+from app.db.session import session_scope
 from app.models.dialogue import Dialogue
 from app.models.dialogue_message import DialogueMessage
 from app.models.music_file import MusicFile
 from app.models.user import User
 from app.schemas.dialogue import DialogueMessageRequest, DialogueMessageResponse, DialogueMusicResponse, CoverGenerateResponse, DialogueTaskCreateResponse
 from app.schemas.tasks import TaskType, TaskStatus
-from app.services import generation_service
+from app.services import generation_planner, generation_service
 from app.services import llm as llm_service
 from app.services import image_service
+from app.services import llm_client
 from app.services import tasks as task_service
 from app.services.oss_storage import OSSStorage, build_oss_key, encode_oss_path, normalize_oss_like_url
 from app.services.url_resolver import resolve_music_url, resolve_cover_url
@@ -27,18 +30,6 @@ from app.services.file_cleanup import delete_file_best_effort
 router = APIRouter()
 
 
-def _ensure_db_connection(db: Session) -> None:
-  """
-  Ping the database before doing writes; if the connection was dropped during
-  the long music generation step, this will force SQLAlchemy to reconnect.
-  """
-  try:
-    db.execute(text("SELECT 1"))
-  except (OperationalError, PendingRollbackError):
-    db.rollback()
-    db.execute(text("SELECT 1"))
-
-
 @router.post(
     "/chat-generate",
     response_model=DialogueMessageResponse,
@@ -121,6 +112,141 @@ async def generate_cover(
         raise HTTPException(status_code=500, detail=f"生成封面失败: {exc}")
 
 
+# 生成与上传是阻塞调用（远程推理轮询可达数分钟），放在独立线程池里，
+# 不占用 runner 事件循环的默认线程池（llm_cache 的数据库查询等也用它）
+_GENERATION_EXECUTOR = ThreadPoolExecutor(max_workers=32, thread_name_prefix="dialogue-generate")
+
+
+@dataclass
+class _GeneratedAssets:
+    title: str
+    gen_result: generation_service.GenerateResult
+    stored_path: str
+    size_bytes: int | None
+    cover_rel_path: str | None
+
+
+def _store_generated_audio(gen_result: generation_service.GenerateResult, user_id: int) -> tuple[str, int | None]:
+    """Upload the generated file to OSS when enabled; returns (storage_path, size_bytes)."""
+    audio_abs = Path(gen_result.rel_path)
+    if not audio_abs.is_absolute():
+        audio_abs = Path.cwd() / audio_abs
+    stored_path = str(audio_abs)
+    size_bytes = audio_abs.stat().st_size if audio_abs.exists() else None
+    if settings.OSS_ENABLED:
+        try:
+            key = build_oss_key(
+                category="music",
+                source="generated",
+                user_id=user_id,
+                original_filename=gen_result.filename,
+                ext=Path(gen_result.filename).suffix,
+            )
+            OSSStorage().put_file(key, str(audio_abs), content_type="audio/wav")
+            stored_path = encode_oss_path(key)
+            # 可选：上传成功后清理本地缓存文件
+            if getattr(settings, "DELETE_LOCAL_AUDIO_AFTER_OSS_UPLOAD", False):
+                ok = delete_file_best_effort(audio_abs)
+                if ok:
+                    print(f"[dialogue/background] Deleted local audio cache: {audio_abs}")
+        except Exception as exc:
+            print(f"[dialogue/background] Upload failed: {exc}")
+    return stored_path, size_bytes
+
+
+async def _generate_assets(payload: DialogueMessageRequest, user_id: int, duration: float) -> _GeneratedAssets:
+    """
+    Everything the background job produces before saving, as one pipeline on llm_client's
+    runner loop.
+
+    Title, cover (prompt -> image) and generation (SongGen submission / MusicGen -> OSS
+    upload) don't depend on each other and run concurrently in one TaskGroup, so the cover
+    is usually ready before the audio. Generation waits for the planner only when the
+    SongGen submission needs its descriptions / lyrics. Title and cover are best effort
+    (failures fall back and are logged); a generation failure cancels them and is
+    re-raised. The blocking generation / upload steps run in _GENERATION_EXECUTOR and
+    cannot be interrupted: when cancelled they finish in the background and are discarded.
+    """
+    instrumental = bool(getattr(payload, "instrumental", True))
+    songgen = bool(settings.SONGGEN_REMOTE_URL)
+    loop = asyncio.get_running_loop()
+    plan_task: asyncio.Task | None = None
+
+    async def title() -> str:
+        try:
+            if plan_task is not None:
+                return (await plan_task).title
+            return await llm_service.build_music_title(payload.message)
+        except Exception as exc:
+            print(f"[dialogue/background] Title failed: {exc}")
+            return llm_service.fallback_title(payload.message)
+
+    async def cover() -> str | None:
+        if payload.cover_url:
+            return normalize_oss_like_url(payload.cover_url)
+        try:
+            if plan_task is not None:
+                cover_prompt = (await plan_task).cover_prompt
+            else:
+                cover_prompt = await llm_service.build_album_cover_prompt(payload.message)
+            return await image_service.generate_album_cover_image(cover_prompt, user_id=user_id)
+        except Exception as exc:
+            print(f"[dialogue/background] Cover failed: {exc}")
+            return None
+
+    async def music() -> tuple[generation_service.GenerateResult, str, int | None]:
+        plan = None
+        if plan_task is not None and songgen and settings.SONGGEN_LLM_ENABLED:
+            plan = await plan_task
+        gen_result = await loop.run_in_executor(
+            _GENERATION_EXECUTOR,
+            functools.partial(
+                generation_service.generate_music_file,
+                prompt_zh=payload.message,
+                duration_sec=duration,
+                model_name="songgen_full_new" if songgen else "musicgen_pretrained",
+                instrumental=instrumental,
+                lyrics=getattr(payload, "lyrics", None),
+                style=getattr(payload, "style", None),
+                plan=plan,
+            ),
+        )
+        stored_path, size_bytes = await loop.run_in_executor(
+            _GENERATION_EXECUTOR, _store_generated_audio, gen_result, user_id
+        )
+        return gen_result, stored_path, size_bytes
+
+    try:
+        async with asyncio.TaskGroup() as tg:
+            if generation_planner.enabled():
+                plan_task = tg.create_task(
+                    generation_planner.plan_generation(
+                        payload.message,
+                        instrumental=instrumental,
+                        duration_sec=int(duration),
+                        style=getattr(payload, "style", None),
+                        lyrics=getattr(payload, "lyrics", None),
+                        songgen=songgen,
+                        want_cover=not payload.cover_url,
+                    )
+                )
+            title_task = tg.create_task(title())
+            cover_task = tg.create_task(cover())
+            music_task = tg.create_task(music())
+    except ExceptionGroup as group:
+        # 只有生成步骤会抛错（标题/封面已兜底）；还原为原始异常，任务失败信息保持可读
+        raise group.exceptions[0] from None
+
+    gen_result, stored_path, size_bytes = music_task.result()
+    return _GeneratedAssets(
+        title=title_task.result(),
+        gen_result=gen_result,
+        stored_path=stored_path,
+        size_bytes=size_bytes,
+        cover_rel_path=cover_task.result(),
+    )
+
+
 def _background_chat_and_generate(
     task_id: str,
     payload: DialogueMessageRequest,
@@ -128,223 +254,144 @@ def _background_chat_and_generate(
     dialogue_id: int,
     message_id: int | None,
 ):
-    """Background task to handle long-running music generation."""
-    db = SessionLocal()
+    """
+    Background task to handle long-running music generation.
+
+    Sessions are opened only around the DB phases (validate / save / record failure): the
+    LLM, generation, OSS upload and cover steps (run concurrently by _generate_assets)
+    hold no pooled connection, and each phase checks out a fresh (pre-pinged) one.
+    """
     try:
         print(f"[dialogue/background] start task_id={task_id} dialogue_id={dialogue_id} user_id={user_id}")
-        # Mark processing (best-effort)
-        try:
-            task_service.set_status(db, task_id, TaskStatus.processing)
-        except Exception:
-            pass
-
-        # Re-fetch objects in this session
-        current_user = db.query(User).filter(User.id == user_id).first()
-        dialogue = db.query(Dialogue).filter(Dialogue.id == dialogue_id).first()
-        placeholder_message = None
-        if message_id:
-            placeholder_message = (
-                db.query(DialogueMessage)
+        with session_scope() as db:
+            # Mark processing (best-effort)
+            try:
+                task_service.set_status(db, task_id, TaskStatus.processing)
+            except Exception:
+                pass
+
+            user_found = db.query(User.id).filter(User.id == user_id).first() is not None
+            dialogue_found = db.query(Dialogue.id).filter(Dialogue.id == dialogue_id).first() is not None
+            if not user_found or not dialogue_found:
+                task_service.fail_task(db, task_id, "User or Dialogue not found")
+                return
+            if message_id and (
+                db.query(DialogueMessage.id)
                 .filter(DialogueMessage.id == message_id, DialogueMessage.dialogue_id == dialogue_id)
                 .first()
-            )
-        
-        if not current_user or not dialogue:
-            task_service.fail_task(db, task_id, "User or Dialogue not found")
-            return
-        if message_id and not placeholder_message:
-            task_service.fail_task(db, task_id, "DialogueMessage not found")
-            return
+                is None
+            ):
+                task_service.fail_task(db, task_id, "DialogueMessage not found")
+                return
 
         reply_text = f"收到你的描述：{payload.message}。我为你生成了一段对应氛围的音乐，请试听。"
         # 默认时长改为更“完整”的段落长度（用户侧不再强依赖手动选择时长）
         duration = float(payload.duration_seconds) if payload.duration_seconds else 120.0
 
-        # Generate a nicer title (Suno-like) and persist to dialogue title if missing.
-        try:
-            generated_title = asyncio.run(llm_service.build_music_title(payload.message))
-        except Exception:
-            generated_title = (payload.message or "").strip()[:12] or "AI 生成作品"
-
-        if generated_title:
-            try:
-                # Only overwrite when empty / generic
-                if not dialogue.title or dialogue.title.strip() in {"新的对话", "音乐创作对话"}:
-                    dialogue.title = generated_title
-                    db.add(dialogue)
-            except Exception:
-                pass
-
-        # 1. Generate music
-        gen_result = generation_service.generate_music_file(
-            prompt_zh=payload.message,
-            duration_sec=duration,
-            model_name="songgen_full_new" if settings.SONGGEN_REMOTE_URL else "musicgen_pretrained",
-            instrumental=bool(getattr(payload, "instrumental", True)),
-            lyrics=getattr(payload, "lyrics", None),
-            style=getattr(payload, "style", None),
-        )
-
-        # 2. Upload to OSS
-        audio_abs = Path(gen_result.rel_path)
-        if not audio_abs.is_absolute():
-            audio_abs = Path.cwd() / audio_abs
-        stored_path = str(audio_abs)
-        if settings.OSS_ENABLED:
-            try:
-                key = build_oss_key(
-                    category="music",
-                    source="generated",
-                    user_id=current_user.id,
-                    original_filename=gen_result.filename,
-                    ext=Path(gen_result.filename).suffix,
+        # 1-3. Title, cover and generation + upload run concurrently (see _generate_assets)
+        assets = llm_client.run_sync(_generate_assets(payload, user_id, duration))
+        generated_title = assets.title
+        gen_result = assets.gen_result
+        stored_path = assets.stored_path
+        size_bytes = assets.size_bytes
+        cover_rel_path = assets.cover_rel_path
+
+        # 4. Save to DB and complete the task in one short transaction
+        with session_scope() as db:
+            # 生成期间对话可能被删除：重新加载，找不到则走失败分支
+            current_user = db.query(User).filter(User.id == user_id).first()
+            dialogue = db.query(Dialogue).filter(Dialogue.id == dialogue_id).first()
+            if not current_user or not dialogue:
+                raise RuntimeError("User or Dialogue not found")
+            placeholder_message = None
+            if message_id:
+                placeholder_message = (
+                    db.query(DialogueMessage)
+                    .filter(DialogueMessage.id == message_id, DialogueMessage.dialogue_id == dialogue_id)
+                    .first()
                 )
-                OSSStorage().put_file(key, str(audio_abs), content_type="audio/wav")
-                stored_path = encode_oss_path(key)
-                # 可选：上传成功后清理本地缓存文件
-                if getattr(settings, "DELETE_LOCAL_AUDIO_AFTER_OSS_UPLOAD", False):
-                    ok = delete_file_best_effort(audio_abs)
-                    if ok:
-                        print(f"[dialogue/background] Deleted local audio cache: {audio_abs}")
-            except Exception as exc:
-                print(f"[dialogue/background] Upload failed: {exc}")
-
-        # 3. Cover handling
-        cover_rel_path = None
-        if payload.cover_url:
-            cover_rel_path = normalize_oss_like_url(payload.cover_url)
-        else:
-            try:
-                cover_prompt = asyncio.run(llm_service.build_album_cover_prompt(payload.message))
-                cover_path = asyncio.run(image_service.generate_album_cover_image(cover_prompt, user_id=current_user.id))
-                cover_rel_path = cover_path
-            except Exception as exc:
-                print(f"[dialogue/background] Cover failed: {exc}")
-
-        # 4. Save to DB
-        # 生成/上传/封面阶段耗时很久，DB 连接可能被 MySQL 断开，这里先 ping 一下以便自动重连
-        try:
-            _ensure_db_connection(db)
-        except Exception:
-            # best-effort; if still broken, we'll handle on commit/fail below
-            pass
-
-        music_file = MusicFile(
-            user_id=current_user.id,
-            dialogue=dialogue,
-            file_name=gen_result.filename,
-            storage_path=stored_path,
-            size_bytes=audio_abs.stat().st_size if audio_abs.exists() else None,
-            file_type="audio/wav",
-            source_type="generated",
-            duration_seconds=int(gen_result.duration_sec),
-            cover_image_path=cover_rel_path,
-        )
-        db.add(music_file)
 
-        # Prefer updating the placeholder message created at task submission time.
-        # This ensures History can show "生成中..." immediately instead of being empty.
-        if placeholder_message is None:
-            existing_count = db.query(DialogueMessage).filter(DialogueMessage.dialogue_id == dialogue.id).count()
-            message = DialogueMessage(
+            # Only overwrite when empty / generic
+            if generated_title and (not dialogue.title or dialogue.title.strip() in {"新的对话", "音乐创作对话"}):
+                dialogue.title = generated_title
+
+            music_file = MusicFile(
+                user_id=current_user.id,
                 dialogue=dialogue,
-                user_input_text=payload.message,
-                system_reply_text=reply_text,
-                message_order=existing_count + 1,
+                file_name=gen_result.filename,
+                storage_path=stored_path,
+                size_bytes=size_bytes,
+                file_type="audio/wav",
+                source_type="generated",
+                duration_seconds=int(gen_result.duration_sec),
+                cover_image_path=cover_rel_path,
             )
-        else:
-            message = placeholder_message
-            message.user_input_text = payload.message
-            message.system_reply_text = reply_text
+            db.add(music_file)
+
+            # Prefer updating the placeholder message created at task submission time.
+            # This ensures History can show "生成中..." immediately instead of being empty.
+            if placeholder_message is None:
+                existing_count = db.query(DialogueMessage).filter(DialogueMessage.dialogue_id == dialogue.id).count()
+                message = DialogueMessage(
+                    dialogue=dialogue,
+                    user_input_text=payload.message,
+                    system_reply_text=reply_text,
+                    message_order=existing_count + 1,
+                )
+            else:
+                message = placeholder_message
+                message.user_input_text = payload.message
+                message.system_reply_text = reply_text
 
-        message.music_file = music_file
-        db.add(message)
+            message.music_file = music_file
+            db.add(message)
 
-        dialogue.updated_at = datetime.utcnow()
-        current_user.total_generations = (current_user.total_generations or 0) + 1
-        # Ensure message_count not decreased
-        try:
-            dialogue.message_count = max(int(dialogue.message_count or 0), int(message.message_order or 0))
-        except Exception:
-            pass
-        
-        try:
-            db.commit()
-        except (OperationalError, PendingRollbackError) as exc:
-            # Retry once after forcing reconnect.
+            dialogue.updated_at = datetime.utcnow()
+            current_user.total_generations = (current_user.total_generations or 0) + 1
+            # Ensure message_count not decreased
             try:
-                db.rollback()
+                dialogue.message_count = max(int(dialogue.message_count or 0), int(message.message_order or 0))
             except Exception:
                 pass
-            try:
-                _ensure_db_connection(db)
-                db.commit()
-            except Exception:
-                raise exc
-        
-        # 5. Complete task with result for frontend to poll
-        result = {
-            "id": music_file.id,
-            "music_file_id": music_file.id,
-            "title": generated_title or dialogue.title or (payload.message or "")[:12] or "AI 生成作品",
-            "artist": "AI Composer",
-            "url": resolve_music_url(music_file),
-            "duration": music_file.duration_seconds,
-            "cover": resolve_cover_url(music_file.cover_image_path),
-            "dialogue_id": dialogue.id,
-            "message_id": message.id,
-            "reply": reply_text
-        }
-        try:
-            # Best-effort reconnect before updating task row too
-            _ensure_db_connection(db)
-        except Exception:
-            pass
-        task_service.complete_task(db, task_id, result=result)
-        print(f"[dialogue/background] completed task_id={task_id} music_file_id={music_file.id}")
+            db.flush()
+
+            # 5. Complete task with result for frontend to poll (commits together with the rows above)
+            result = {
+                "id": music_file.id,
+                "music_file_id": music_file.id,
+                "title": generated_title or dialogue.title or (payload.message or "")[:12] or "AI 生成作品",
+                "artist": "AI Composer",
+                "url": resolve_music_url(music_file),
+                "duration": music_file.duration_seconds,
+                "cover": resolve_cover_url(music_file.cover_image_path),
+                "dialogue_id": dialogue.id,
+                "message_id": message.id,
+                "reply": reply_text
+            }
+            task_service.complete_task(db, task_id, result=result)
+        print(f"[dialogue/background] completed task_id={task_id} music_file_id={result['music_file_id']}")
 
     except Exception as exc:
         print(f"[dialogue/background] Critical error: {exc}")
         # Best-effort: update placeholder message so History doesn't look empty.
-        try:
-            if message_id:
-                try:
-                    _ensure_db_connection(db)
-                except Exception:
-                    pass
-                msg = (
-                    db.query(DialogueMessage)
-                    .filter(DialogueMessage.id == message_id, DialogueMessage.dialogue_id == dialogue_id)
-                    .first()
-                )
-                if msg:
-                    msg.system_reply_text = f"生成失败：{exc}"
-                    db.add(msg)
-                    db.commit()
-        except Exception:
+        if message_id:
             try:
-                db.rollback()
-            except Exception:
-                pass
-        # Best-effort: task 标记失败（即使当前连接已断开，也尝试用新连接写回）
+                with session_scope() as db:
+                    msg = (
+                        db.query(DialogueMessage)
+                        .filter(DialogueMessage.id == message_id, DialogueMessage.dialogue_id == dialogue_id)
+                        .first()
+                    )
+                    if msg:
+                        msg.system_reply_text = f"生成失败：{exc}"
+            except Exception as msg_exc:
+                print(f"[dialogue/background] Failed to update placeholder message: {msg_exc}")
+        # Best-effort: task 标记失败（新会话、新连接）
         try:
-            try:
-                _ensure_db_connection(db)
-            except Exception:
-                pass
-            task_service.fail_task(db, task_id, str(exc))
-        except Exception:
-            try:
-                db.close()
-            except Exception:
-                pass
-            db2 = SessionLocal()
-            try:
-                task_service.fail_task(db2, task_id, str(exc))
-            finally:
-                db2.close()
-    finally:
-        db.close()
+            with session_scope() as db:
+                task_service.fail_task(db, task_id, str(exc))
+        except Exception as fail_exc:
+            print(f"[dialogue/background] Failed to mark task failed: {fail_exc}")
 
 
 @router.post("/chat-task", response_model=DialogueTaskCreateResponse)
@@ -446,12 +493,28 @@ async def chat_and_generate(
       db.query(DialogueMessage).filter(DialogueMessage.dialogue_id == dialogue.id).count()
   )
 
+  # 生成耗时很长：先结束事务，把连接还给连接池；之后的读写会重新取一个（经 pre-ping 的）连接
+  db.commit()
+
   # 简单回复逻辑，可后续替换为真实 LLM
   reply_text = f"收到你的描述：{payload.message}。我为你生成了一段对应氛围的音乐，请试听。"
 
   # 默认时长改为更“完整”的段落长度（用户侧不再强依赖手动选择时长）
   duration = float(payload.duration_seconds) if payload.duration_seconds else 120.0
 
+  # 封面 prompt 与 SongGen 描述/歌词合并为一次规划调用
+  plan = None
+  if generation_planner.enabled():
+    plan = await generation_planner.plan_generation(
+        payload.message,
+        instrumental=bool(getattr(payload, "instrumental", True)),
+        duration_sec=int(duration),
+        style=getattr(payload, "style", None),
+        lyrics=getattr(payload, "lyrics", None),
+        songgen=bool(settings.SONGGEN_REMOTE_URL),
+        want_cover=not payload.cover_url,
+    )
+
   # 1. 先生成音乐
   try:
     gen_result = generation_service.generate_music_file(
@@ -461,6 +524,7 @@ async def chat_and_generate(
         instrumental=bool(getattr(payload, "instrumental", True)),
         lyrics=getattr(payload, "lyrics", None),
         style=getattr(payload, "style", None),
+        plan=plan,
     )
   except Exception as exc:
     raise HTTPException(status_code=500, detail=f"生成音乐失败: {exc}") from exc
@@ -496,7 +560,10 @@ async def chat_and_generate(
       cover_rel_path = normalize_oss_like_url(payload.cover_url)
   else:
       try:
-        cover_prompt = await llm_service.build_album_cover_prompt(payload.message)
+        if plan is not None:
+          cover_prompt = plan.cover_prompt
+        else:
+          cover_prompt = await llm_service.build_album_cover_prompt(payload.message)
         cover_path = await image_service.generate_album_cover_image(
             cover_prompt, user_id=current_user.id
         )
@@ -507,9 +574,6 @@ async def chat_and_generate(
         print(f"[dialogue/chat] cover generation failed: {exc}\n{traceback.format_exc()}")
         cover_rel_path = None
 
-  # 生成步骤耗时较长，MySQL 连接可能被远端关闭，这里先 ping 一下以便自动重连
-  _ensure_db_connection(db)
-
   try:
     # 生成耗时较长：对话可能被其它请求删除/关闭；这里重新校验一次，避免外键失败
     dialogue_id = int(dialogue.id)
@@ -1,7 +1,6 @@
 ﻿from pathlib import Path
 from uuid import uuid4
 
-import asyncio
 from concurrent.futures import ThreadPoolExecutor
 
 from fastapi import APIRouter, BackgroundTasks, Body, Depends, File, HTTPException, UploadFile, status
@@ -9,14 +8,15 @@ from sqlalchemy.orm import Session
 
 from app.core.config import settings
 from app.core.dependencies import get_current_user, get_db
-from app.db.session import SessionLocal
+from app.db.session import session_scope
 from app.models.emotion_analysis import EmotionAnalysis
 from app.models.music_file import MusicFile
 from app.models.user import User
 from app.schemas.emotion import EmotionAnalysisResponse, EmotionSummaryResponse, EmotionTaskCreateResponse
 from app.schemas.tasks import TaskCreateResponse, TaskDetail, TaskStatus, TaskType
-from app.services import emotion_service, llm, tasks
-from app.services.oss_storage import OSSStorage, build_oss_key, encode_oss_path
+from app.services import blob_store, emotion_service, llm, llm_client, tasks
+from app.services.oss_storage import get_local_path
+from app.services.upload_ingest import ingest_upload
 from app.services.url_resolver import resolve_music_url
 
 router = APIRouter()
@@ -38,45 +38,36 @@ async def analyze_emotion(
 ) -> EmotionAnalysisResponse:
   print(f"[emotion/analyze] Received file: {file.filename}, content_type: {file.content_type}")
   
-  # Save file to disk
   upload_root = Path(settings.MEDIA_ROOT)
   upload_root.mkdir(parents=True, exist_ok=True)
-  ext = Path(file.filename).suffix
-  filename = f"{uuid4()}{ext}"
-  filepath = upload_root / filename
   try:
-    content = await file.read()
-    print(f"[emotion/analyze] File size: {len(content)} bytes")
+    upload = await ingest_upload(file)
+    print(f"[emotion/analyze] File size: {upload.size_bytes} bytes")
+  except HTTPException:
+    raise
   except Exception as exc:  # pragma: no cover - simple IO guard
     print(f"[emotion/analyze] File read failed: {exc}")
     raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="File read failed") from exc
 
-  with open(filepath, "wb") as f:
-    f.write(content)
-  print(f"[emotion/analyze] File saved to: {filepath}")
-
-  # 上传到 OSS（存档），并记录存储路径
-  stored_path = str(filepath)
-  if settings.OSS_ENABLED:
-    try:
-      key = build_oss_key(
-          category="music",
-          source="upload",
-          user_id=current_user.id,
-          original_filename=file.filename,
-      )
-      OSSStorage().put_bytes(key, content, content_type=file.content_type)
-      stored_path = encode_oss_path(key)
-      print(f"[emotion/analyze] Uploaded to OSS key={key}")
-    except Exception as exc:
-      print(f"[emotion/analyze] Upload to OSS failed, keep local path: {exc}")
+  # 按内容哈希存储（本地 + OSS），相同内容复用同一对象
+  blob, filepath = blob_store.acquire_blob(
+      db,
+      src_path=upload.path,
+      digest=upload.sha256,
+      size_bytes=upload.size_bytes,
+      ext=upload.ext,
+      content_type=file.content_type,
+  )
+  filename = filepath.name
+  print(f"[emotion/analyze] Stored blob sha256={blob.sha256} path={blob.storage_path}")
 
   # Create music file record
   music_file = MusicFile(
       user_id=current_user.id,
+      blob_id=blob.id,
       file_name=file.filename or filename,
-      storage_path=stored_path,
-      size_bytes=len(content),
+      storage_path=blob.storage_path,
+      size_bytes=upload.size_bytes,
       file_type=file.content_type,
   )
   db.add(music_file)
@@ -130,7 +121,7 @@ async def analyze_emotion(
   try:
     report_dir = upload_root / "reports"
     report_dir.mkdir(parents=True, exist_ok=True)
-    report_filename = f"{Path(filename).stem}_summary.txt"
+    report_filename = f"{Path(filename).stem[:16]}_{uuid4().hex}_summary.txt"
     report_path = report_dir / report_filename
     report_path.write_text(summary, encoding="utf-8")
     report_path_str = str(report_path)
@@ -169,10 +160,11 @@ async def analyze_emotion(
 
 def _background_analyze_emotion(task_id: str, user_id: int, music_file_id: int, local_path: str) -> None:
   """Run emotion analysis in background and complete TaskRecord."""
-  db = SessionLocal()
+  # 会话只包住读写阶段：模型推理 / LLM 摘要期间不占用连接池
   try:
     try:
-      tasks.set_status(db, task_id, TaskStatus.processing)
+      with session_scope() as db:
+        tasks.set_status(db, task_id, TaskStatus.processing)
     except Exception:
       pass
 
@@ -184,7 +176,17 @@ def _background_analyze_emotion(task_id: str, user_id: int, music_file_id: int,
     except Exception:
       pass
 
-    analysis_result = emotion_service.analyze_music(local_path)
+    analysis_path = local_path
+    if not Path(analysis_path).is_file():
+      # 本地副本已清理：从 OSS 取回（经本地 LRU 缓存）
+      with session_scope() as db:
+        storage_path = db.query(MusicFile.storage_path).filter(MusicFile.id == music_file_id).scalar()
+      cached = get_local_path(storage_path) if storage_path else None
+      if cached is None:
+        raise FileNotFoundError(local_path)
+      analysis_path = str(cached)
+
+    analysis_result = emotion_service.analyze_music(analysis_path)
     raw_result = analysis_result if isinstance(analysis_result, dict) else {"result": analysis_result}
 
     overall_dist = raw_result.get("overall_distribution") or {}
@@ -194,7 +196,7 @@ def _background_analyze_emotion(task_id: str, user_id: int, music_file_id: int,
 
     # 生成摘要（若未配置 LLM 则返回占位）
     try:
-      summary = asyncio.run(llm.summarize_emotion(raw_result))
+      summary = llm_client.run_sync(llm.summarize_emotion(raw_result))
     except Exception:
       summary = "（占位）整体情绪分析已完成"
     if not summary:
@@ -214,40 +216,39 @@ def _background_analyze_emotion(task_id: str, user_id: int, music_file_id: int,
       upload_root = Path(settings.MEDIA_ROOT)
       report_dir = upload_root / "reports"
       report_dir.mkdir(parents=True, exist_ok=True)
-      report_filename = f"{Path(local_path).stem}_summary.txt"
+      report_filename = f"{Path(local_path).stem[:16]}_{uuid4().hex}_summary.txt"
       report_path = report_dir / report_filename
       report_path.write_text(summary, encoding="utf-8")
       report_path_str = str(report_path)
     except Exception:
       report_path_str = None
 
-    analysis = EmotionAnalysis(
-        music_file_id=music_file_id,
-        user_id=user_id,
-        main_emotion=main_emotion,
-        emotion_intensity=confidence,
-        arousal_level=float(overall_arousal) if overall_arousal is not None else None,
-        raw_result=raw_result,
-        report_path=report_path_str,
-    )
-    db.add(analysis)
-    db.commit()
-    db.refresh(analysis)
-
-    # 任务结果：尽量与 /emotion/analyze 的返回字段对齐（注意 JSON 不能存 datetime）
-    result = {
-        "analysis_id": analysis.id,
-        "music_file_id": music_file_id,
-        "emotion": analysis.main_emotion or "",
-        "confidence": float(analysis.emotion_intensity) if analysis.emotion_intensity is not None else 0.0,
-        "extra": raw_result,
-        "summary": summary,
-    }
-    tasks.complete_task(db, task_id, result=result)
+    with session_scope() as db:
+      analysis = EmotionAnalysis(
+          music_file_id=music_file_id,
+          user_id=user_id,
+          main_emotion=main_emotion,
+          emotion_intensity=confidence,
+          arousal_level=float(overall_arousal) if overall_arousal is not None else None,
+          raw_result=raw_result,
+          report_path=report_path_str,
+      )
+      db.add(analysis)
+      db.flush()
+
+      # 任务结果：尽量与 /emotion/analyze 的返回字段对齐（注意 JSON 不能存 datetime）
+      result = {
+          "analysis_id": analysis.id,
+          "music_file_id": music_file_id,
+          "emotion": analysis.main_emotion or "",
+          "confidence": float(analysis.emotion_intensity) if analysis.emotion_intensity is not None else 0.0,
+          "extra": raw_result,
+          "summary": summary,
+      }
+      tasks.complete_task(db, task_id, result=result)
   except Exception as exc:
-    tasks.fail_task(db, task_id, str(exc))
-  finally:
-    db.close()
+    with session_scope() as db:
+      tasks.fail_task(db, task_id, str(exc))
 
 
 def _submit_emotion_job(task_id: str, user_id: int, music_file_id: int, local_path: str) -> None:
@@ -272,36 +273,27 @@ async def analyze_emotion_task(
   if not file.content_type or not file.content_type.startswith("audio/"):
     raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="请选择音频文件")
 
-  # Save file to disk
-  upload_root = Path(settings.MEDIA_ROOT)
-  upload_root.mkdir(parents=True, exist_ok=True)
-  ext = Path(file.filename).suffix
-  filename = f"{uuid4()}{ext}"
-  filepath = upload_root / filename
-  content = await file.read()
-  filepath.write_bytes(content)
-
-  # 上传到 OSS（存档），并记录存储路径
-  stored_path = str(filepath)
-  if settings.OSS_ENABLED:
-    try:
-      key = build_oss_key(
-          category="music",
-          source="upload",
-          user_id=current_user.id,
-          original_filename=file.filename,
-      )
-      OSSStorage().put_bytes(key, content, content_type=file.content_type)
-      stored_path = encode_oss_path(key)
-    except Exception as exc:
-      print(f"[emotion/analyze-task] Upload to OSS failed, keep local path: {exc}")
+  upload = await ingest_upload(file)
+
+  # 按内容哈希存储（本地 + OSS），相同内容复用同一对象
+  blob, filepath = blob_store.acquire_blob(
+      db,
+      src_path=upload.path,
+      digest=upload.sha256,
+      size_bytes=upload.size_bytes,
+      ext=upload.ext,
+      content_type=file.content_type,
+  )
+  filename = filepath.name
+  stored_path = blob.storage_path
 
   # Create music file record
   music_file = MusicFile(
       user_id=current_user.id,
+      blob_id=blob.id,
       file_name=file.filename or filename,
       storage_path=stored_path,
-      size_bytes=len(content),
+      size_bytes=upload.size_bytes,
       file_type=file.content_type,
   )
   db.add(music_file)
@@ -1,7 +1,13 @@
-from fastapi import APIRouter
+from dataclasses import asdict
+
+from fastapi import APIRouter, Response, status
+from fastapi.responses import PlainTextResponse
 
 from app.core.config import settings
-from app.schemas.health import HealthCheckResponse
+from app.db import pool_stats
+from app.schemas.health import DbPoolStats, HealthCheckResponse, ModelReadiness, OssCacheStats, ReadinessResponse
+from app.services import llm_client, model_lifecycle
+from app.services.oss_cache import get_cache
 
 router = APIRouter()
 
@@ -13,5 +19,37 @@ async def health_check() -> HealthCheckResponse:
         remote_inference_url=settings.REMOTE_INFERENCE_URL,
         songgen_remote_url=settings.SONGGEN_REMOTE_URL,
         oss_enabled=bool(settings.OSS_ENABLED),
+        ready=model_lifecycle.ready(),
+    )
+
+
+@router.get("/ready", response_model=ReadinessResponse, summary="Readiness: 503 until preloaded models are warm")
+async def readiness(response: Response) -> ReadinessResponse:
+    ready = model_lifecycle.ready()
+    if not ready:
+        response.status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    return ReadinessResponse(
+        ready=ready,
+        models=[ModelReadiness(**asdict(item)) for item in model_lifecycle.snapshot()],
+    )
+
+
+@router.get("/oss-cache", response_model=OssCacheStats, summary="OSS local disk cache metrics")
+async def oss_cache_stats() -> OssCacheStats:
+    return OssCacheStats(**get_cache().stats())
+
+
+@router.get("/db-pool", response_model=DbPoolStats, summary="DB connection pool and slow-query metrics")
+async def db_pool_stats() -> DbPoolStats:
+    return DbPoolStats(
+        pool_size=settings.DB_POOL_SIZE,
+        max_overflow=settings.DB_MAX_OVERFLOW,
+        pool_timeout_seconds=settings.DB_POOL_TIMEOUT_SECONDS,
+        slow_query_ms=settings.DB_SLOW_QUERY_MS,
+        engines=pool_stats.snapshot(),
     )
 
+
+@router.get("/llm-metrics", response_class=PlainTextResponse, summary="LLM call latency / error metrics (Prometheus text)")
+async def llm_metrics() -> PlainTextResponse:
+    return PlainTextResponse(llm_client.metrics_text(), media_type="text/plain; version=0.0.4")
@@ -1,85 +1,136 @@
+from datetime import datetime
 from pathlib import Path
+from typing import Optional
 
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
+from sqlalchemy import Boolean, Integer, Numeric, String, and_, func, literal, null, or_, select, type_coerce, union_all
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import joinedload, undefer
 
-from app.core.dependencies import get_current_user, get_db
+from app.core.config import settings
+from app.core.dependencies import Principal, get_async_db, get_current_principal_async
+from app.core.pagination import decode_cursor, encode_cursor, set_next_cursor
 from app.models.dialogue import Dialogue
 from app.models.dialogue_message import DialogueMessage
 from app.models.emotion_analysis import EmotionAnalysis
-from app.models.user import User
 from app.schemas.history import DialogueHistoryResponse, DialogueMessageItem, EmotionDetailResponse, HistoryItem, HistoryListResponse
 from app.services.url_resolver import resolve_music_url, resolve_cover_url
 
 router = APIRouter()
 
 
+def _history_branch(kind: str, model, sort_col, columns: list, user_id: int, after: Optional[tuple], limit: int):
+  """One side of the UNION ALL: a lightweight projection read in (user_id, sort_col, id) index order."""
+  stmt = select(
+      literal(kind, String(20)).label("kind"),
+      model.id.label("id"),
+      *columns,
+      model.created_at.label("created_at"),
+      sort_col.label("sort_at"),
+  ).where(model.user_id == user_id)
+  if after is not None:
+    # 全局顺序 (sort_at, kind, id) 倒序；kind 在分支内为常量，条件可化简为单列范围
+    after_at, after_kind, after_id = after
+    if kind < after_kind:
+      stmt = stmt.where(sort_col <= after_at)
+    elif kind == after_kind:
+      stmt = stmt.where(or_(sort_col < after_at, and_(sort_col == after_at, model.id < after_id)))
+    else:
+      stmt = stmt.where(sort_col < after_at)
+  return stmt.order_by(sort_col.desc(), model.id.desc()).limit(limit).subquery()
+
+
 @router.get(
     "",
     response_model=HistoryListResponse,
     summary="List dialogues and emotion analyses for current user",
 )
 async def list_history(
+    response: Response,
     limit: int = 50,
     offset: int = 0,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user),
+    cursor: Optional[str] = Query(None, description="上一页返回的 next_cursor；传入时忽略 offset"),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: Principal = Depends(get_current_principal_async),
 ) -> HistoryListResponse:
   if limit < 1 or limit > 200:
     raise HTTPException(status_code=400, detail="limit 需在 1-200 之间")
   if offset < 0:
     raise HTTPException(status_code=400, detail="offset 不能为负数")
-
-  # 对话列表
-  dialogues = (
-      db.query(Dialogue)
-      .filter(Dialogue.user_id == current_user.id)
-      .order_by(Dialogue.updated_at.desc())
-      .all()
+  after = decode_cursor(cursor, (datetime, str, int))
+  if after is not None:
+    offset = 0
+  # 每个分支最多只需取 offset + limit + 1 行（多取一行判断是否还有下一页）
+  branch_limit = offset + limit + 1
+
+  dialogues = _history_branch(
+      "dialogue",
+      Dialogue,
+      Dialogue.updated_at,
+      [
+          Dialogue.title.label("title"),
+          Dialogue.message_count.label("message_count"),
+          Dialogue.active.label("active"),
+          type_coerce(null(), String(50)).label("emotion"),
+          type_coerce(null(), Numeric(5, 2)).label("confidence"),
+      ],
+      current_user.id,
+      after,
+      branch_limit,
   )
-
-  # 情绪分析列表
-  emotions = (
-      db.query(EmotionAnalysis)
-      .filter(EmotionAnalysis.user_id == current_user.id)
-      .order_by(EmotionAnalysis.created_at.desc())
-      .all()
+  emotions = _history_branch(
+      "emotion",
+      EmotionAnalysis,
+      EmotionAnalysis.created_at,
+      [
+          func.coalesce(EmotionAnalysis.main_emotion, "emotion").label("title"),
+          type_coerce(null(), Integer).label("message_count"),
+          type_coerce(null(), Boolean).label("active"),
+          EmotionAnalysis.main_emotion.label("emotion"),
+          EmotionAnalysis.emotion_intensity.label("confidence"),
+      ],
+      current_user.id,
+      after,
+      branch_limit,
+  )
+  merged = union_all(select(dialogues), select(emotions)).subquery()
+  rows = (await db.execute(
+      select(merged)
+      .order_by(merged.c.sort_at.desc(), merged.c.kind.desc(), merged.c.id.desc())
+      .offset(offset)
+      .limit(limit + 1)
+  )).all()
+
+  next_cursor = None
+  if len(rows) > limit:
+    rows = rows[:limit]
+    last = rows[-1]
+    next_cursor = encode_cursor(last.sort_at, last.kind, last.id)
+  set_next_cursor(response, next_cursor)
+
+  total = (
+      await db.scalar(select(func.count(Dialogue.id)).where(Dialogue.user_id == current_user.id))
+  ) + (
+      await db.scalar(select(func.count(EmotionAnalysis.id)).where(EmotionAnalysis.user_id == current_user.id))
   )
-
-  merged = []
-  for d in dialogues:
-    merged.append(
-        {
-            "type": "dialogue",
-            "id": d.id,
-            "title": d.title,
-            "message_count": d.message_count,
-            "active": d.active,
-            "created_at": d.created_at,
-            "updated_at": d.updated_at,
-        }
-    )
-
-  for e in emotions:
-    merged.append(
-        {
-            "type": "emotion",
-            "id": e.id,
-            "title": e.main_emotion or "emotion",
-            "emotion": e.main_emotion,
-            "confidence": float(e.emotion_intensity) if e.emotion_intensity is not None else None,
-            "created_at": e.created_at,
-            "updated_at": e.created_at,
-        }
-    )
-
-  merged_sorted = sorted(merged, key=lambda x: x["updated_at"], reverse=True)
-  total = len(merged_sorted)
-  sliced = merged_sorted[offset : offset + limit]
 
   return HistoryListResponse(
       total=total,
-      items=[HistoryItem(**item) for item in sliced],
+      items=[
+          HistoryItem(
+              type=row.kind,
+              id=row.id,
+              title=row.title,
+              message_count=row.message_count,
+              active=row.active,
+              emotion=row.emotion,
+              confidence=float(row.confidence) if row.confidence is not None else None,
+              created_at=row.created_at,
+              updated_at=row.sort_at,
+          )
+          for row in rows
+      ],
+      next_cursor=next_cursor,
   )
 
 
@@ -92,29 +143,33 @@ async def get_dialogue_history(
     dialogue_id: int,
     limit: int = 50,
     offset: int = 0,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: Principal = Depends(get_current_principal_async),
 ) -> DialogueHistoryResponse:
   if limit < 1 or limit > 200:
     raise HTTPException(status_code=400, detail="limit 需在 1-200 之间")
   if offset < 0:
     raise HTTPException(status_code=400, detail="offset 不能为负数")
 
-  dialogue = (
-      db.query(Dialogue)
-      .filter(Dialogue.id == dialogue_id, Dialogue.user_id == current_user.id)
-      .first()
+  dialogue = await db.scalar(
+      select(Dialogue).where(Dialogue.id == dialogue_id, Dialogue.user_id == current_user.id)
   )
   if not dialogue:
     raise HTTPException(status_code=404, detail="未找到对话")
 
-  messages_query = (
-      db.query(DialogueMessage)
-      .filter(DialogueMessage.dialogue_id == dialogue.id)
-      .order_by(DialogueMessage.message_order.asc())
+  total = await db.scalar(
+      select(func.count(DialogueMessage.id)).where(DialogueMessage.dialogue_id == dialogue.id)
   )
-  total = messages_query.count()
-  messages = messages_query.offset(offset).limit(limit).all()
+  messages = (
+      await db.scalars(
+          select(DialogueMessage)
+          .options(joinedload(DialogueMessage.music_file))
+          .where(DialogueMessage.dialogue_id == dialogue.id)
+          .order_by(DialogueMessage.message_order.asc())
+          .offset(offset)
+          .limit(limit)
+      )
+  ).all()
 
   return DialogueHistoryResponse(
       dialogue_id=dialogue.id,
@@ -138,6 +193,11 @@ async def get_dialogue_history(
                   if m.music_file and getattr(m.music_file, "cover_image_path", None)
                   else None
               ),
+              cover_thumb_url=(
+                  resolve_cover_url(m.music_file.cover_image_path, size=settings.COVER_LIST_SIZE)
+                  if m.music_file and getattr(m.music_file, "cover_image_path", None)
+                  else None
+              ),
           )
           for m in messages
       ],
@@ -151,13 +211,13 @@ async def get_dialogue_history(
 )
 async def get_emotion_detail(
     analysis_id: int,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: Principal = Depends(get_current_principal_async),
 ) -> EmotionDetailResponse:
-  analysis = (
-      db.query(EmotionAnalysis)
-      .filter(EmotionAnalysis.id == analysis_id, EmotionAnalysis.user_id == current_user.id)
-      .first()
+  analysis = await db.scalar(
+      select(EmotionAnalysis)
+      .options(undefer(EmotionAnalysis.raw_result), joinedload(EmotionAnalysis.music_file))
+      .where(EmotionAnalysis.id == analysis_id, EmotionAnalysis.user_id == current_user.id)
   )
   if not analysis:
     raise HTTPException(status_code=404, detail="未找到情绪分析记录")
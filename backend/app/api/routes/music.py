@@ -1,21 +1,21 @@
 from pathlib import Path
-from uuid import uuid4
 from datetime import datetime
 
-import asyncio
-from fastapi import APIRouter, Depends, File, HTTPException, UploadFile, BackgroundTasks, Form
+from fastapi import APIRouter, Depends, File, HTTPException, Query, Response, UploadFile, BackgroundTasks, Form
 from sqlalchemy.orm import Session
 
 from app.core.config import settings
-from app.core.dependencies import get_current_user, get_db
+from app.core.dependencies import Principal, get_current_principal, get_current_user, get_db
+from app.core.pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, set_next_cursor
 from app.models.music_file import MusicFile
 from app.models.user import User
 from app.models.work import Work, WorkStatus, WorkVisibility
 from app.schemas.music import EmotionAnalysisResult, MusicGenerateRequest, MusicGenerateResult
 from app.schemas.tasks import TaskCreateResponse, TaskDetail, TaskStatus, TaskType
 from app.schemas.work import WorkCreateRequest, WorkResponse
-from app.services import generation_service, tasks
+from app.services import blob_store, generation_planner, generation_service, tasks
 from app.services import image_service
+from app.services import llm_client
 from app.services import llm as llm_service
 from app.services.oss_storage import (
     OSSStorage,
@@ -24,9 +24,10 @@ from app.services.oss_storage import (
     normalize_oss_like_url,
     resolve_storage_path_to_url,
 )
+from app.services.upload_ingest import ingest_upload
 from app.services.url_resolver import resolve_music_url, resolve_cover_url
 from app.services.file_cleanup import delete_file_best_effort
-from app.db.session import SessionLocal
+from app.db.session import session_scope
 from app.services.storage_service import save_audio_bytes
 from app.songgen.songgen_remote import get_songgen_prompt_audio_client
 
@@ -55,6 +56,17 @@ async def generate_music_file(
 
   # 默认时长改为更“完整”的段落长度（用户侧不再强依赖手动选择时长）
   duration = payload.duration_seconds or 120
+  # 封面 prompt 与 SongGen 描述/歌词合并为一次规划调用
+  plan = None
+  if generation_planner.enabled():
+    plan = await generation_planner.plan_generation(
+        payload.prompt,
+        instrumental=bool(getattr(payload, "instrumental", True)),
+        duration_sec=int(duration),
+        style=payload.style,
+        lyrics=getattr(payload, "lyrics", None),
+        songgen=model_name == "songgen_full_new" or bool(settings.SONGGEN_REMOTE_URL),
+    )
   try:
     gen_result = generation_service.generate_music_file(
         prompt_zh=payload.prompt,
@@ -63,6 +75,7 @@ async def generate_music_file(
         instrumental=bool(getattr(payload, "instrumental", True)),
         lyrics=getattr(payload, "lyrics", None),
         style=payload.style,
+        plan=plan,
     )
   except Exception as exc:
     raise HTTPException(status_code=500, detail=f"生成失败: {exc}") from exc
@@ -96,7 +109,10 @@ async def generate_music_file(
   # 自动生成封面（并按配置上传到 OSS），失败不影响音乐生成
   cover_url: str | None = None
   try:
-    cover_prompt = await llm_service.build_album_cover_prompt(payload.prompt)
+    if plan is not None:
+      cover_prompt = plan.cover_prompt
+    else:
+      cover_prompt = await llm_service.build_album_cover_prompt(payload.prompt)
     cover_path = await image_service.generate_album_cover_image(
         cover_prompt, user_id=current_user.id
     )
@@ -132,7 +148,7 @@ def _background_imitate_with_prompt_audio(
     lyrics: str | None,
     style: str | None,
     prompt_audio_filename: str,
-    prompt_audio_bytes: bytes,
+    prompt_audio_path: str,
     prompt_audio_content_type: str | None,
 ) -> None:
   """
@@ -140,10 +156,11 @@ def _background_imitate_with_prompt_audio(
   - 不写入 music_files（用户说“不需要像情绪识别一样需要保存”）
   - 生成完成后返回一个可播放 URL（本地 static/audio 或 OSS URL）
   """
-  db = SessionLocal()
+  # 会话只在写任务状态时短暂打开：生成 / 轮询可能持续十几分钟，不占用连接池
   try:
     try:
-      tasks.set_status(db, task_id, TaskStatus.processing)
+      with session_scope() as db:
+        tasks.set_status(db, task_id, TaskStatus.processing)
     except Exception:
       pass
 
@@ -159,7 +176,7 @@ def _background_imitate_with_prompt_audio(
         vocal_only=False,
         lyrics=lyrics,
         prompt_audio_filename=prompt_audio_filename,
-        prompt_audio_bytes=prompt_audio_bytes,
+        prompt_audio_path=prompt_audio_path,
         prompt_audio_content_type=prompt_audio_content_type,
         auto_prompt_audio_type=None,
         timeout_seconds=int(settings.SONGGEN_REQUEST_TIMEOUT_SECONDS),
@@ -201,32 +218,34 @@ def _background_imitate_with_prompt_audio(
 
     # best-effort title
     try:
-      title = asyncio.run(llm_service.build_music_title(prompt or "音乐仿写"))
+      title = llm_client.run_sync(llm_service.build_music_title(prompt or "音乐仿写"))
     except Exception:
       title = (prompt or "").strip()[:12] or "音乐仿写"
 
-    tasks.complete_task(
-        db,
-        task_id,
-        result={
-            "id": f"imitate-{task_id}",
-            "music_file_id": None,
-            "title": title,
-            "artist": "AI Imitator",
-            "url": audio_url,
-            "duration": int(duration_sec),
-            "cover": None,
-            "reply": "音乐仿写已完成，请试听。",
-            "can_save": False,
-        },
-    )
+    with session_scope() as db:
+      tasks.complete_task(
+          db,
+          task_id,
+          result={
+              "id": f"imitate-{task_id}",
+              "music_file_id": None,
+              "title": title,
+              "artist": "AI Imitator",
+              "url": audio_url,
+              "duration": int(duration_sec),
+              "cover": None,
+              "reply": "音乐仿写已完成，请试听。",
+              "can_save": False,
+          },
+      )
   except Exception as exc:
     try:
-      tasks.fail_task(db, task_id, str(exc))
+      with session_scope() as db:
+        tasks.fail_task(db, task_id, str(exc))
     except Exception:
       pass
   finally:
-    db.close()
+    delete_file_best_effort(Path(prompt_audio_path))
 
 
 @router.post(
@@ -245,30 +264,37 @@ async def imitate_music_task(
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user),
 ) -> TaskCreateResponse:
-  # 读取文件到内存（prompt audio 通常较小；如需更大文件支持可改为落盘临时文件再转发）
+  # 参考音频按块落盘到临时文件，后台任务从文件流式转发给 SongGen，结束后删除
   try:
-    prompt_audio_bytes = await file.read()
+    upload = await ingest_upload(file)
+  except HTTPException:
+    raise
   except Exception as exc:
     raise HTTPException(status_code=400, detail=f"读取上传文件失败: {exc}") from exc
 
   # Create async task record (reuse TaskType.generate_music to avoid DB enum migration)
-  record = tasks.create_task(
-      db,
-      user_id=current_user.id,
-      task_type=TaskType.generate_music,
-      input_payload={
-          "mode": "imitate",
-          "prompt": prompt,
-          "duration_seconds": int(duration_seconds),
-          "instrumental": bool(instrumental),
-          "lyrics": lyrics,
-          "style": style,
-          "ref_filename": file.filename,
-          "ref_content_type": file.content_type,
-          "ref_size": len(prompt_audio_bytes),
-      },
-      auto_complete=False,
-  )
+  try:
+    record = tasks.create_task(
+        db,
+        user_id=current_user.id,
+        task_type=TaskType.generate_music,
+        input_payload={
+            "mode": "imitate",
+            "prompt": prompt,
+            "duration_seconds": int(duration_seconds),
+            "instrumental": bool(instrumental),
+            "lyrics": lyrics,
+            "style": style,
+            "ref_filename": file.filename,
+            "ref_content_type": file.content_type,
+            "ref_size": upload.size_bytes,
+        },
+        auto_complete=False,
+    )
+  except Exception:
+    # 后台任务不会启动，临时文件只能在这里删除
+    upload.discard()
+    raise
   try:
     tasks.set_status(db, record.id, TaskStatus.processing)
   except Exception:
@@ -284,7 +310,7 @@ async def imitate_music_task(
       lyrics=(lyrics or "").strip() or None,
       style=(style or "").strip() or None,
       prompt_audio_filename=file.filename or "prompt_audio.wav",
-      prompt_audio_bytes=prompt_audio_bytes,
+      prompt_audio_path=str(upload.path),
       prompt_audio_content_type=file.content_type,
   )
 
@@ -379,15 +405,9 @@ async def request_emotion_analysis(
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user),
 ) -> TaskCreateResponse:
-  # 保存文件到本地
-  upload_root = Path(settings.MEDIA_ROOT)
-  upload_root.mkdir(parents=True, exist_ok=True)
-  ext = Path(file.filename).suffix
-  filename = f"{uuid4()}{ext}"
-  filepath = upload_root / filename
-  with open(filepath, "wb") as f:
-    content = await file.read()
-    f.write(content)
+  # 保存文件到本地（按内容哈希命名，重复上传不再产生新文件）
+  upload = await ingest_upload(file)
+  filepath = blob_store.place_untracked_upload(upload.path, upload.sha256, upload.ext)
 
   # 情绪分析计数
   current_user.emotion_detection_count = (current_user.emotion_detection_count or 0) + 1
@@ -426,11 +446,15 @@ async def get_emotion_analysis(task_id: str, db: Session = Depends(get_db)) -> T
     summary="List recent tasks",
 )
 async def list_tasks(
+    response: Response,
     status: TaskStatus | None = None,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: str | None = Query(None, description="上一页响应头 X-Next-Cursor 的值"),
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_principal),
 ) -> list[TaskDetail]:
-  records = tasks.list_tasks(db, user_id=current_user.id, status=status)
+  records, next_cursor = tasks.list_tasks(db, user_id=current_user.id, status=status, limit=limit, cursor=cursor)
+  set_next_cursor(response, next_cursor)
   return [tasks.to_task_detail(r) for r in records]
 
 
@@ -1,8 +1,11 @@
 from fastapi import APIRouter, Depends, Query
-from sqlalchemy import func, or_
-from sqlalchemy.orm import Session, joinedload
+from sqlalchemy import Float, func, or_, select, type_coerce
+from sqlalchemy.dialects.mysql import match
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import joinedload
 
-from app.core.dependencies import get_current_user_optional, get_db
+from app.core.config import settings
+from app.core.dependencies import Principal, get_async_db, get_current_principal_optional_async
 from app.models import LikeRecord, User, UserFollower
 from app.models.work import Work, WorkStatus, WorkVisibility
 from app.schemas.search import SearchResponse, SongSearchResult, UserSearchResult
@@ -11,20 +14,44 @@ from app.services.url_resolver import resolve_cover_url, resolve_music_url
 router = APIRouter()
 
 
+# MySQL ngram_token_size 默认值：短于它的词无法命中全文索引，回退 LIKE
+_NGRAM_TOKEN_SIZE = 2
+
+
 def _ilike(column, keyword: str):
   """Case-insensitive contains; works on MySQL by lowering both sides."""
   lowered = keyword.lower()
   return func.lower(column).like(f"%{lowered}%")
 
 
+def _fulltext_query(db: AsyncSession, keyword: str) -> str | None:
+  """
+  Boolean-mode query for the ngram FULLTEXT indexes: every whitespace-separated term is a
+  required phrase (+"term"), i.e. the same "contains all" semantics as the LIKE fallback.
+  None when the index can't serve it (non-MySQL bind, or a term shorter than one ngram).
+  """
+  if db.get_bind().dialect.name != "mysql":
+    return None
+  terms = [t.replace('"', " ").strip() for t in keyword.split()]
+  terms = [t for t in terms if t]
+  if not terms or any(len(t) < _NGRAM_TOKEN_SIZE for t in terms):
+    return None
+  return " ".join(f'+"{t}"' for t in terms)
+
+
+def _relevance(*columns, against: str):
+  """MATCH ... AGAINST relevance (InnoDB TF-IDF score) usable both as filter and in arithmetic."""
+  return type_coerce(match(*columns, against=against).in_boolean_mode(), Float)
+
+
 @router.get("", response_model=SearchResponse, summary="Search songs and users")
 async def search(
     query: str = Query(..., min_length=1),
     type: str = Query("all", description="all|song|user"),
     limit: int = 20,
     offset: int = 0,
-    db: Session = Depends(get_db),
-    current_user: User | None = Depends(get_current_user_optional),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: Principal | None = Depends(get_current_principal_optional_async),
 ) -> SearchResponse:
   keyword = query.strip()
   if not keyword:
@@ -34,35 +61,41 @@ async def search(
   songs: list[SongSearchResult] = []
   users: list[UserSearchResult] = []
 
+  fulltext = _fulltext_query(db, keyword)
+
   if type in {"all", "song", "songs"}:
     works_query = (
-        db.query(Work)
+        select(Work)
         .options(joinedload(Work.user), joinedload(Work.music_file))
-        .filter(
+        .where(
             Work.status == WorkStatus.published,
             Work.visibility == WorkVisibility.public,
-            or_(
-                _ilike(Work.title, keyword),
-                _ilike(Work.tags, keyword),
-                _ilike(Work.description, keyword),
-            ),
         )
-        .order_by(Work.like_count.desc(), Work.play_count.desc(), Work.created_at.desc())
-        .offset(offset)
-        .limit(safe_limit)
     )
-    works = works_query.all()
+    if fulltext:
+      # 全文索引召回 + 相关度与热度混合排序
+      relevance = _relevance(Work.title, Work.tags, Work.description, against=fulltext)
+      popularity = 1 + 0.15 * func.ln(1 + Work.like_count) + 0.05 * func.ln(1 + Work.play_count)
+      works_query = works_query.where(relevance > 0).order_by((relevance * popularity).desc(), Work.id.desc())
+    else:
+      works_query = works_query.where(
+          or_(
+              _ilike(Work.title, keyword),
+              _ilike(Work.tags, keyword),
+              _ilike(Work.description, keyword),
+          ),
+      ).order_by(Work.like_count.desc(), Work.play_count.desc(), Work.created_at.desc())
+    works_query = works_query.offset(offset).limit(safe_limit)
+    works = (await db.scalars(works_query)).all()
     liked_ids: set[int] = set()
     if current_user and works:
-      liked_rows = (
-          db.query(LikeRecord.work_id)
-          .filter(
+      liked_rows = await db.scalars(
+          select(LikeRecord.work_id).where(
               LikeRecord.user_id == current_user.id,
               LikeRecord.work_id.in_([w.id for w in works]),
           )
-          .all()
       )
-      liked_ids = {row[0] for row in liked_rows}
+      liked_ids = set(liked_rows)
 
     for w in works:
       author = w.user
@@ -71,6 +104,7 @@ async def search(
               id=w.id,
               title=w.title,
               cover_url=resolve_cover_url(w.cover_url),
+              cover_thumb_url=resolve_cover_url(w.cover_url, size=settings.COVER_LIST_SIZE),
               audio_url=resolve_music_url(w.music_file),
               like_count=w.like_count,
               play_count=w.play_count,
@@ -82,37 +116,43 @@ async def search(
       )
 
   if type in {"all", "user", "users"}:
-    user_query = (
-        db.query(User)
-        .filter(
-            or_(
-                _ilike(User.username, keyword),
-                _ilike(User.personal_profile, keyword),
-            )
-        )
-        .order_by(User.followers_count.desc(), User.total_likes.desc())
-        .offset(offset)
-        .limit(safe_limit)
-    )
-    found_users = user_query.all()
+    if fulltext:
+      relevance = _relevance(User.username, User.personal_profile, against=fulltext)
+      popularity = 1 + 0.15 * func.ln(1 + User.followers_count) + 0.05 * func.ln(1 + User.total_likes)
+      user_query = (
+          select(User)
+          .where(relevance > 0)
+          .order_by((relevance * popularity).desc(), User.id.desc())
+      )
+    else:
+      user_query = (
+          select(User)
+          .where(
+              or_(
+                  _ilike(User.username, keyword),
+                  _ilike(User.personal_profile, keyword),
+              )
+          )
+          .order_by(User.followers_count.desc(), User.total_likes.desc())
+      )
+    user_query = user_query.offset(offset).limit(safe_limit)
+    found_users = (await db.scalars(user_query)).all()
     followed_ids: set[int] = set()
     if current_user and found_users:
-      follow_rows = (
-          db.query(UserFollower.following_id)
-          .filter(
+      follow_rows = await db.scalars(
+          select(UserFollower.following_id).where(
               UserFollower.follower_id == current_user.id,
               UserFollower.following_id.in_([u.id for u in found_users]),
           )
-          .all()
       )
-      followed_ids = {row[0] for row in follow_rows}
+      followed_ids = set(follow_rows)
 
     for u in found_users:
       users.append(
           UserSearchResult(
               id=u.id,
               username=u.username,
-              avatar=resolve_cover_url(u.avatar),
+              avatar=resolve_cover_url(u.avatar, size=settings.AVATAR_LIST_SIZE),
               bio=u.personal_profile,
               followers=u.followers_count,
               following=u.following_count,
@@ -1,21 +1,36 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
+from typing import Optional
 
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
+from sqlalchemy.orm import Session, joinedload
+
+from app.core.config import settings
 from app.core.dependencies import (
     get_current_user,
     get_current_user_optional,
     get_db,
 )
+from app.core.pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, keyset_page, set_next_cursor
 from app.models import LikeRecord, User, UserFollower
 from app.models.work import Work, WorkStatus, WorkVisibility
 from app.schemas.search import UserSearchResult
-from app.schemas.social import SimpleMessage, ToggleResponse
+from app.schemas.social import (
+    BulkFollowRequest,
+    BulkLikeRequest,
+    BulkToggleItem,
+    BulkToggleResponse,
+    SimpleMessage,
+    ToggleResponse,
+)
 from app.schemas.user_public import PublicUser, PublicUserProfile
 from app.schemas.work import WorkAuthor, WorkPublicResponse
+from app.services import social_counters
 from app.services.url_resolver import resolve_music_url, resolve_cover_url
 
 router = APIRouter()
 
+# _to_public_work 会访问 music_file / user：列表查询统一预加载，避免逐行懒加载（N+1）
+_PUBLIC_WORK_OPTIONS = (joinedload(Work.music_file), joinedload(Work.user))
+
 
 def _ensure_public_work(db: Session, work_id: int) -> Work:
   work = db.query(Work).filter(Work.id == work_id).first()
@@ -50,6 +65,7 @@ def _to_public_work(work: Work, liked: bool = False) -> WorkPublicResponse:
       visibility=work.visibility.value if hasattr(work.visibility, "value") else str(work.visibility),
       mood=work.mood,
       cover_url=resolve_cover_url(work.cover_url),
+      cover_thumb_url=resolve_cover_url(work.cover_url, size=settings.COVER_LIST_SIZE),
       like_count=work.like_count,
       play_count=work.play_count,
       audio_url=audio_url,
@@ -68,26 +84,8 @@ async def like_work(
     current_user: User = Depends(get_current_user),
 ) -> ToggleResponse:
   work = _ensure_public_work(db, work_id)
-  existing = (
-      db.query(LikeRecord)
-      .filter(LikeRecord.user_id == current_user.id, LikeRecord.work_id == work_id)
-      .first()
-  )
-  if existing:
-    return ToggleResponse(liked=True)
-
-  record = LikeRecord(user_id=current_user.id, work_id=work_id)
-  db.add(record)
-  work.like_count = (work.like_count or 0) + 1
-
-  author = work.user
-  author.total_likes = (author.total_likes or 0) + 1
-  current_user.liked_works_count = (current_user.liked_works_count or 0) + 1
-
-  db.add(author)
-  db.add(work)
-  db.add(current_user)
-  db.commit()
+  if social_counters.like_works(db, current_user.id, [(work.id, work.user_id)]):
+    db.commit()
   return ToggleResponse(liked=True)
 
 
@@ -97,57 +95,69 @@ async def unlike_work(
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user),
 ) -> ToggleResponse:
-  record = (
-      db.query(LikeRecord)
-      .filter(LikeRecord.user_id == current_user.id, LikeRecord.work_id == work_id)
-      .first()
-  )
-  if not record:
-    return ToggleResponse(liked=False)
-
-  work = db.query(Work).filter(Work.id == work_id).first()
-  author = work.user if work else None
-
-  db.delete(record)
-  if work:
-    work.like_count = max((work.like_count or 0) - 1, 0)
-    db.add(work)
-  if author:
-    author.total_likes = max((author.total_likes or 0) - 1, 0)
-    db.add(author)
-
-  current_user.liked_works_count = max((current_user.liked_works_count or 0) - 1, 0)
-  db.add(current_user)
-  db.commit()
+  if social_counters.unlike_works(db, current_user.id, [work_id]):
+    db.commit()
   return ToggleResponse(liked=False)
 
 
+@router.post("/works/likes/bulk", response_model=BulkToggleResponse, summary="Like or unlike many works")
+async def bulk_like_works(
+    payload: BulkLikeRequest,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+) -> BulkToggleResponse:
+  work_ids = list(dict.fromkeys(payload.work_ids))
+  errors: dict[int, str] = {}
+  if payload.liked:
+    rows = db.query(Work.id, Work.user_id, Work.status, Work.visibility).filter(Work.id.in_(work_ids)).all()
+    found = {row.id: row for row in rows}
+    targets: list[tuple[int, int]] = []
+    for work_id in work_ids:
+      row = found.get(work_id)
+      if row is None:
+        errors[work_id] = "作品不存在"
+      elif row.status != WorkStatus.published or row.visibility != WorkVisibility.public:
+        errors[work_id] = "作品未公开，无法点赞"
+      else:
+        targets.append((row.id, row.user_id))
+    changed = social_counters.like_works(db, current_user.id, targets)
+  else:
+    changed = social_counters.unlike_works(db, current_user.id, work_ids)
+  if changed:
+    db.commit()
+
+  items = [
+      BulkToggleItem(id=work_id, error=errors[work_id])
+      if work_id in errors
+      else BulkToggleItem(id=work_id, liked=payload.liked, changed=work_id in changed)
+      for work_id in work_ids
+  ]
+  return BulkToggleResponse(items=items, changed=len(changed))
+
+
 @router.get("/likes/works", response_model=list[WorkPublicResponse], summary="List liked works")
 async def list_liked_works(
+    response: Response,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = Query(None, description="上一页响应头 X-Next-Cursor 的值"),
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user),
 ) -> list[WorkPublicResponse]:
-  likes = (
-      db.query(LikeRecord)
-      .filter(LikeRecord.user_id == current_user.id)
-      .order_by(LikeRecord.created_at.desc())
-      .all()
-  )
-  work_ids = [l.work_id for l in likes]
-  if not work_ids:
-    return []
-
-  works = (
-      db.query(Work)
+  query = (
+      db.query(Work, LikeRecord.created_at, LikeRecord.id)
+      .join(LikeRecord, LikeRecord.work_id == Work.id)
+      .options(*_PUBLIC_WORK_OPTIONS)
       .filter(
-          Work.id.in_(work_ids),
+          LikeRecord.user_id == current_user.id,
           Work.status == WorkStatus.published,
           Work.visibility == WorkVisibility.public,
       )
-      .all()
   )
-  work_map = {w.id: w for w in works}
-  return [_to_public_work(work_map[wid], liked=True) for wid in work_ids if wid in work_map]
+  rows, next_cursor = keyset_page(
+      query, LikeRecord.created_at, LikeRecord.id, cursor=cursor, limit=limit, key=lambda row: (row[1], row[2])
+  )
+  set_next_cursor(response, next_cursor)
+  return [_to_public_work(row[0], liked=True) for row in rows]
 
 
 @router.post("/users/{user_id}/follow", response_model=ToggleResponse, summary="Follow a user")
@@ -159,28 +169,12 @@ async def follow_user(
   if current_user.id == user_id:
     raise HTTPException(status_code=400, detail="无法关注自己")
 
-  target = db.query(User).filter(User.id == user_id).first()
-  if not target:
+  exists = db.query(User.id).filter(User.id == user_id).first()
+  if not exists:
     raise HTTPException(status_code=404, detail="用户不存在")
 
-  existing = (
-      db.query(UserFollower)
-      .filter(
-          UserFollower.follower_id == current_user.id,
-          UserFollower.following_id == user_id,
-      )
-      .first()
-  )
-  if existing:
-    return ToggleResponse(followed=True)
-
-  link = UserFollower(follower_id=current_user.id, following_id=user_id)
-  db.add(link)
-  current_user.following_count = (current_user.following_count or 0) + 1
-  target.followers_count = (target.followers_count or 0) + 1
-  db.add(current_user)
-  db.add(target)
-  db.commit()
+  if social_counters.follow_users(db, current_user.id, [user_id]):
+    db.commit()
   return ToggleResponse(followed=True)
 
 
@@ -190,47 +184,49 @@ async def unfollow_user(
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user),
 ) -> ToggleResponse:
-  link = (
-      db.query(UserFollower)
-      .filter(
-          UserFollower.follower_id == current_user.id,
-          UserFollower.following_id == user_id,
-      )
-      .first()
-  )
-  if not link:
-    return ToggleResponse(followed=False)
-
-  target = db.query(User).filter(User.id == user_id).first()
-  db.delete(link)
-
-  current_user.following_count = max((current_user.following_count or 0) - 1, 0)
-  db.add(current_user)
-  if target:
-    target.followers_count = max((target.followers_count or 0) - 1, 0)
-    db.add(target)
-  db.commit()
+  if social_counters.unfollow_users(db, current_user.id, [user_id]):
+    db.commit()
   return ToggleResponse(followed=False)
 
 
-@router.get("/users/{user_id}/followers", response_model=list[UserSearchResult], summary="List followers")
-async def list_followers(
-    user_id: int,
+@router.post("/users/follow/bulk", response_model=BulkToggleResponse, summary="Follow or unfollow many users")
+async def bulk_follow_users(
+    payload: BulkFollowRequest,
     db: Session = Depends(get_db),
-    current_user: User | None = Depends(get_current_user_optional),
-) -> list[UserSearchResult]:
-  links = db.query(UserFollower).filter(UserFollower.following_id == user_id).all()
-  follower_ids = [l.follower_id for l in links]
-  if not follower_ids:
-    return []
-  users = db.query(User).filter(User.id.in_(follower_ids)).all()
+    current_user: User = Depends(get_current_user),
+) -> BulkToggleResponse:
+  user_ids = list(dict.fromkeys(payload.user_ids))
+  errors: dict[int, str] = {}
+  if payload.followed:
+    existing = {row[0] for row in db.query(User.id).filter(User.id.in_(user_ids)).all()}
+    for user_id in user_ids:
+      if user_id == current_user.id:
+        errors[user_id] = "无法关注自己"
+      elif user_id not in existing:
+        errors[user_id] = "用户不存在"
+    changed = social_counters.follow_users(db, current_user.id, [u for u in user_ids if u not in errors])
+  else:
+    changed = social_counters.unfollow_users(db, current_user.id, user_ids)
+  if changed:
+    db.commit()
+
+  items = [
+      BulkToggleItem(id=user_id, error=errors[user_id])
+      if user_id in errors
+      else BulkToggleItem(id=user_id, followed=payload.followed, changed=user_id in changed)
+      for user_id in user_ids
+  ]
+  return BulkToggleResponse(items=items, changed=len(changed))
+
+
+def _to_user_results(db: Session, users: list[User], current_user: User | None) -> list[UserSearchResult]:
   followed_ids: set[int] = set()
-  if current_user:
+  if current_user and users:
     followed_rows = (
         db.query(UserFollower.following_id)
         .filter(
             UserFollower.follower_id == current_user.id,
-            UserFollower.following_id.in_(follower_ids),
+            UserFollower.following_id.in_([u.id for u in users]),
         )
         .all()
     )
@@ -239,7 +235,7 @@ async def list_followers(
       UserSearchResult(
           id=u.id,
           username=u.username,
-          avatar=resolve_cover_url(u.avatar),
+          avatar=resolve_cover_url(u.avatar, size=settings.AVATAR_LIST_SIZE),
           bio=u.personal_profile,
           followers=u.followers_count,
           following=u.following_count,
@@ -249,40 +245,47 @@ async def list_followers(
   ]
 
 
+@router.get("/users/{user_id}/followers", response_model=list[UserSearchResult], summary="List followers")
+async def list_followers(
+    user_id: int,
+    response: Response,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = Query(None, description="上一页响应头 X-Next-Cursor 的值"),
+    db: Session = Depends(get_db),
+    current_user: User | None = Depends(get_current_user_optional),
+) -> list[UserSearchResult]:
+  # 按关注时间倒序
+  query = (
+      db.query(User, UserFollower.created_at, UserFollower.id)
+      .join(UserFollower, UserFollower.follower_id == User.id)
+      .filter(UserFollower.following_id == user_id)
+  )
+  rows, next_cursor = keyset_page(
+      query, UserFollower.created_at, UserFollower.id, cursor=cursor, limit=limit, key=lambda row: (row[1], row[2])
+  )
+  set_next_cursor(response, next_cursor)
+  return _to_user_results(db, [row[0] for row in rows], current_user)
+
+
 @router.get("/users/{user_id}/following", response_model=list[UserSearchResult], summary="List following")
 async def list_following(
     user_id: int,
+    response: Response,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = Query(None, description="上一页响应头 X-Next-Cursor 的值"),
     db: Session = Depends(get_db),
     current_user: User | None = Depends(get_current_user_optional),
 ) -> list[UserSearchResult]:
-  links = db.query(UserFollower).filter(UserFollower.follower_id == user_id).all()
-  following_ids = [l.following_id for l in links]
-  if not following_ids:
-    return []
-  users = db.query(User).filter(User.id.in_(following_ids)).all()
-  followed_ids: set[int] = set()
-  if current_user:
-    followed_rows = (
-        db.query(UserFollower.following_id)
-        .filter(
-            UserFollower.follower_id == current_user.id,
-            UserFollower.following_id.in_(following_ids),
-        )
-        .all()
-    )
-    followed_ids = {row[0] for row in followed_rows}
-  return [
-      UserSearchResult(
-          id=u.id,
-          username=u.username,
-          avatar=resolve_cover_url(u.avatar),
-          bio=u.personal_profile,
-          followers=u.followers_count,
-          following=u.following_count,
-          is_followed=u.id in followed_ids,
-      )
-      for u in users
-  ]
+  query = (
+      db.query(User, UserFollower.created_at, UserFollower.id)
+      .join(UserFollower, UserFollower.following_id == User.id)
+      .filter(UserFollower.follower_id == user_id)
+  )
+  rows, next_cursor = keyset_page(
+      query, UserFollower.created_at, UserFollower.id, cursor=cursor, limit=limit, key=lambda row: (row[1], row[2])
+  )
+  set_next_cursor(response, next_cursor)
+  return _to_user_results(db, [row[0] for row in rows], current_user)
 
 
 @router.get("/users/{user_id}", response_model=PublicUserProfile, summary="Public user profile")
@@ -309,6 +312,7 @@ async def get_public_user(
 
   works = (
       db.query(Work)
+      .options(*_PUBLIC_WORK_OPTIONS)
       .filter(
           Work.user_id == user.id,
           Work.status == WorkStatus.published,
@@ -335,26 +339,20 @@ async def get_public_user(
 
   liked_songs: list[WorkPublicResponse] = []
   if current_user and current_user.id == user.id:
-    liked = (
-        db.query(LikeRecord)
-        .filter(LikeRecord.user_id == user.id)
-        .order_by(LikeRecord.created_at.desc())
+    liked_works = (
+        db.query(Work)
+        .join(LikeRecord, LikeRecord.work_id == Work.id)
+        .options(*_PUBLIC_WORK_OPTIONS)
+        .filter(
+            LikeRecord.user_id == user.id,
+            Work.status == WorkStatus.published,
+            Work.visibility == WorkVisibility.public,
+        )
+        .order_by(LikeRecord.created_at.desc(), LikeRecord.id.desc())
         .limit(20)
         .all()
     )
-    work_ids = [l.work_id for l in liked]
-    if work_ids:
-      liked_works = (
-          db.query(Work)
-          .filter(
-              Work.id.in_(work_ids),
-              Work.status == WorkStatus.published,
-              Work.visibility == WorkVisibility.public,
-          )
-          .all()
-      )
-      liked_map = {w.id: w for w in liked_works}
-      liked_songs = [_to_public_work(liked_map[wid], liked=True) for wid in work_ids if wid in liked_map]
+    liked_songs = [_to_public_work(w, liked=True) for w in liked_works]
 
   profile = PublicUser(
       id=user.id,
@@ -1,23 +1,25 @@
 from __future__ import annotations
 
-import math
-from datetime import datetime, timedelta
+import time
 
 from fastapi import APIRouter, Depends, Query
-from sqlalchemy import func
-from sqlalchemy.orm import Session, joinedload
+from sqlalchemy import exists, literal, select
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.core.dependencies import get_current_user_optional, get_db
-from app.models.like_record import LikeRecord
+from app.core.config import settings
+from app.core.dependencies import Principal, get_async_db, get_current_principal_optional_async
+from app.models.creator_recommendation import CreatorRecommendation
 from app.models.user import User
 from app.models.user_follower import UserFollower
-from app.models.work import Work, WorkStatus, WorkVisibility
-from app.models.work_play_log import WorkPlayLog
 from app.schemas.ui import ClientConfig, HotSongItem, ModelOption, RecommendedCreatorItem, UploadPolicy
+from app.services import creator_recommendations, popularity
 from app.services.url_resolver import resolve_cover_url, resolve_music_url
 
 router = APIRouter()
 
+# (window_days, limit) -> (expires_at_monotonic, items)
+_hot_songs_cache: dict[tuple[int, int], tuple[float, list[HotSongItem]]] = {}
+
 
 @router.get("/config", response_model=ClientConfig, summary="Frontend config hints")
 async def get_client_config() -> ClientConfig:
@@ -31,9 +33,11 @@ async def get_client_config() -> ClientConfig:
             ModelOption(name="emo-classifier-v1", label="Emotion Classifier v1", type="emotion"),
         ],
         upload_policy=UploadPolicy(
-            max_size_mb=25,
+            max_size_mb=settings.UPLOAD_MAX_SIZE_MB,
             accepted_types=["audio/mpeg", "audio/wav", "audio/x-wav", "audio/flac"],
             max_duration_seconds=600,
+            max_image_size_mb=settings.IMAGE_UPLOAD_MAX_SIZE_MB,
+            accepted_image_types=["image/jpeg", "image/png", "image/webp", "image/gif"],
         ),
         features=[
             "generation",
@@ -46,17 +50,6 @@ async def get_client_config() -> ClientConfig:
     )
 
 
-def _minmax_normalize(values: list[float]) -> list[float]:
-    if not values:
-        return []
-    vmin = min(values)
-    vmax = max(values)
-    if math.isclose(vmin, vmax):
-        return [0.0 for _ in values]
-    span = vmax - vmin
-    return [(v - vmin) / span for v in values]
-
-
 def _format_followers(n: int | None) -> str:
     v = int(n or 0)
     if v >= 1000000:
@@ -74,65 +67,26 @@ def _format_followers(n: int | None) -> str:
 async def get_hot_songs(
     limit: int = Query(default=8, ge=1, le=50),
     window_days: int = Query(default=3, ge=1, le=30),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
 ) -> list[HotSongItem]:
     """
     Rank public & published works by recent activity within a time window.
 
-    Score (default):
+    Scores are precomputed into work_popularity_snapshots (see app.services.popularity):
     - likes weight: 0.7
     - plays weight: 0.3
-
-    We apply log1p to counts and then min-max normalize each metric in Python.
+    on log1p counts normalized to the window maximum. Responses are cached in-process
+    for HOT_SONGS_CACHE_SECONDS.
     """
-    since = datetime.utcnow() - timedelta(days=window_days)
-
-    likes_sub = (
-        db.query(LikeRecord.work_id, func.count(LikeRecord.id).label("recent_likes"))
-        .filter(LikeRecord.created_at >= since)
-        .group_by(LikeRecord.work_id)
-        .subquery()
-    )
-    plays_sub = (
-        db.query(WorkPlayLog.work_id, func.count(WorkPlayLog.id).label("recent_plays"))
-        .filter(WorkPlayLog.played_at >= since)
-        .group_by(WorkPlayLog.work_id)
-        .subquery()
-    )
-
-    # Pull a candidate pool larger than limit, then score in Python for flexibility.
-    rows = (
-        db.query(
-            Work,
-            func.coalesce(likes_sub.c.recent_likes, 0).label("recent_likes"),
-            func.coalesce(plays_sub.c.recent_plays, 0).label("recent_plays"),
-        )
-        .options(joinedload(Work.music_file), joinedload(Work.user))
-        .outerjoin(likes_sub, likes_sub.c.work_id == Work.id)
-        .outerjoin(plays_sub, plays_sub.c.work_id == Work.id)
-        .filter(Work.status == WorkStatus.published, Work.visibility == WorkVisibility.public)
-        .order_by(func.coalesce(likes_sub.c.recent_likes, 0).desc(), func.coalesce(plays_sub.c.recent_plays, 0).desc())
-        .limit(max(80, int(limit) * 20))
-        .all()
-    )
-
-    works: list[Work] = [w for (w, _, _) in rows]
-    recent_likes = [float(l or 0) for (_, l, _) in rows]
-    recent_plays = [float(p or 0) for (_, _, p) in rows]
-
-    likes_log = [math.log1p(v) for v in recent_likes]
-    plays_log = [math.log1p(v) for v in recent_plays]
-    likes_n = _minmax_normalize(likes_log)
-    plays_n = _minmax_normalize(plays_log)
+    cache_key = (int(window_days), int(limit))
+    cached = _hot_songs_cache.get(cache_key)
+    if cached and cached[0] > time.monotonic():
+        return cached[1]
 
-    scored = []
-    for i, w in enumerate(works):
-        score = 0.7 * likes_n[i] + 0.3 * plays_n[i]
-        scored.append((score, w, int(recent_likes[i]), int(recent_plays[i])))
-    scored.sort(key=lambda x: x[0], reverse=True)
+    works = await popularity.top_works(db, window_days, limit)
 
     items: list[HotSongItem] = []
-    for _, w, _, _ in scored[: int(limit)]:
+    for w in works:
         audio_url = resolve_music_url(w.music_file)
         items.append(
             HotSongItem(
@@ -141,6 +95,7 @@ async def get_hot_songs(
                 author_name=w.user.username if w.user else "AI Composer",
                 # 恢复使用 resolve_cover_url 以支持 OSS 解析，前端再做绝对化处理
                 cover_url=resolve_cover_url(w.cover_url),
+                cover_thumb_url=resolve_cover_url(w.cover_url, size=settings.COVER_LIST_SIZE),
                 audio_url=audio_url,
                 like_count=int(w.like_count or 0),
                 play_count=int(w.play_count or 0),
@@ -148,6 +103,9 @@ async def get_hot_songs(
                 mood=w.mood,
             )
         )
+    ttl = int(settings.HOT_SONGS_CACHE_SECONDS)
+    if ttl > 0:
+        _hot_songs_cache[cache_key] = (time.monotonic() + ttl, items)
     return items
 
 
@@ -158,8 +116,8 @@ async def get_hot_songs(
 )
 async def get_recommended_creators(
     limit: int = Query(default=6, ge=1, le=50),
-    db: Session = Depends(get_db),
-    current_user: User | None = Depends(get_current_user_optional),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: Principal | None = Depends(get_current_principal_optional_async),
 ) -> list[RecommendedCreatorItem]:
     """
     Recommend creators by long-term contribution signals (normalized + weighted):
@@ -167,76 +125,33 @@ async def get_recommended_creators(
     - total_works       (20%)
     - total_likes       (60%)
 
-    We apply log1p and min-max normalize each metric to reduce scale differences.
+    Scores are precomputed into creator_recommendations (see app.services.creator_recommendations);
+    this reads the top `limit` rows plus the viewer's follow flags in one query.
     """
-    # Candidate creators: anyone with some activity signal
-    users = (
-        db.query(User)
-        .filter(
-            (User.total_generations > 0)
-            | (User.total_works > 0)
-            | (User.total_likes > 0)
-        )
-        .order_by(User.total_likes.desc(), User.total_works.desc(), User.total_generations.desc())
-        .limit(2000)
-        .all()
-    )
-    if not users:
+    latest = await creator_recommendations.latest_snapshot_at(db)
+    if latest is None:
         return []
 
-    gens_log = [math.log1p(u.total_generations or 0) for u in users]
-    works_log = [math.log1p(u.total_works or 0) for u in users]
-    likes_log = [math.log1p(u.total_likes or 0) for u in users]
-
-    gens_n = _minmax_normalize(gens_log)
-    works_n = _minmax_normalize(works_log)
-    likes_n = _minmax_normalize(likes_log)
-
-    w_gen, w_works, w_likes = 0.1, 0.2, 0.6
-    w_sum = w_gen + w_works + w_likes
-    w_gen, w_works, w_likes = (w_gen / w_sum, w_works / w_sum, w_likes / w_sum)
-
-    scored: list[tuple[float, User]] = []
-    for i, u in enumerate(users):
-        score = w_gen * gens_n[i] + w_works * works_n[i] + w_likes * likes_n[i]
-        scored.append((score, u))
-
-    if all(math.isclose(s, 0.0) for s, _ in scored):
-        scored.sort(
-            key=lambda it: (
-                (it[1].total_likes or 0),
-                (it[1].total_works or 0),
-                (it[1].total_generations or 0),
-                (it[1].followers_count or 0),
-                (it[1].created_at or datetime.min),
-            ),
-            reverse=True,
-        )
-    else:
-        scored.sort(
-            key=lambda it: (
-                it[0],
-                (it[1].total_likes or 0),
-                (it[1].total_works or 0),
-                (it[1].total_generations or 0),
-                (it[1].followers_count or 0),
-            ),
-            reverse=True,
+    followed = (
+        exists().where(
+            UserFollower.follower_id == current_user.id,
+            UserFollower.following_id == CreatorRecommendation.user_id,
         )
-
-    top = [u for _, u in scored[: int(limit)]]
-
-    followed_ids: set[int] = set()
-    if current_user and top:
-        rows = (
-            db.query(UserFollower.following_id)
-            .filter(
-                UserFollower.follower_id == current_user.id,
-                UserFollower.following_id.in_([u.id for u in top]),
+        if current_user
+        else literal(False)
+    )
+    rows = (
+        await db.execute(
+            select(User, followed.label("is_followed"))
+            .join(CreatorRecommendation, CreatorRecommendation.user_id == User.id)
+            .where(
+                CreatorRecommendation.window_days == creator_recommendations.ALL_TIME_WINDOW,
+                CreatorRecommendation.snapshot_at == latest,
             )
-            .all()
+            .order_by(CreatorRecommendation.score.desc(), CreatorRecommendation.id.asc())
+            .limit(int(limit))
         )
-        followed_ids = {r[0] for r in rows}
+    ).all()
     return [
         RecommendedCreatorItem(
             id=u.id,
@@ -244,9 +159,8 @@ async def get_recommended_creators(
             handle=f"@{u.username}",
             followers=_format_followers(u.followers_count),
             # IMPORTANT: resolve oss:// and other storage paths to actual URL
-            avatar=resolve_cover_url(u.avatar),
-            is_followed=(u.id in followed_ids),
+            avatar=resolve_cover_url(u.avatar, size=settings.AVATAR_LIST_SIZE),
+            is_followed=bool(is_followed),
         )
-        for u in top
+        for u, is_followed in rows
     ]
-
@@ -1,17 +1,27 @@
+import ipaddress
 from pathlib import Path
-from uuid import uuid4
 from datetime import datetime
 
-from fastapi import APIRouter, Body, Depends, HTTPException, File, UploadFile, status
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Body, Depends, HTTPException, File, Query, Request, Response, UploadFile
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, joinedload
 
 from app.core.config import settings
-from app.core.dependencies import get_current_user, get_current_user_optional, get_db
+from app.core.dependencies import (
+    Principal,
+    get_async_db,
+    get_current_user,
+    get_current_principal_optional_async,
+    get_current_user_optional,
+    get_db,
+)
+from app.core.pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, keyset_page, keyset_page_async, set_next_cursor
 from app.models.like_record import LikeRecord
 from app.models.music_file import MusicFile
 from app.models.user import User
 from app.models.work import Work, WorkStatus, WorkVisibility
-from app.models.work_play_log import WorkPlayLog
+from app.models.work_popularity_snapshot import WorkPopularitySnapshot
 from app.schemas.social import SimpleMessage
 from app.schemas.work import (
     WorkAuthor,
@@ -22,11 +32,10 @@ from app.schemas.work import (
     WorkResponse,
     WorkUpdateRequest,
 )
+from app.services import blob_store, image_renditions, play_buffer
 from app.services.oss_storage import (
     OSSStorage,
-    build_oss_key,
     decode_oss_path,
-    encode_oss_path,
     normalize_oss_like_url,
 )
 from app.services.url_resolver import resolve_cover_url, resolve_music_url
@@ -51,6 +60,7 @@ def _to_response(work: Work, music_file: MusicFile | None = None) -> WorkRespons
       visibility=work.visibility.value if isinstance(work.visibility, WorkVisibility) else str(work.visibility),
       mood=work.mood,
       cover_url=resolve_cover_url(work.cover_url),
+      cover_thumb_url=resolve_cover_url(work.cover_url, size=settings.COVER_LIST_SIZE),
       like_count=work.like_count,
       play_count=work.play_count,
       audio_url=_resolve_audio_url(music_file),
@@ -79,23 +89,76 @@ def _to_public_work(
 
 @router.get("", response_model=list[WorkResponse], summary="List my works")
 async def list_works(
-    status: str | None = None,
+    response: Response,
+    work_status: str | None = Query(None, alias="status"),
     visibility: str | None = None,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: str | None = Query(None, description="上一页响应头 X-Next-Cursor 的值"),
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user),
 ) -> list[WorkResponse]:
-  query = db.query(Work).filter(Work.user_id == current_user.id)
-  if status in {WorkStatus.draft.value, WorkStatus.published.value}:
-    query = query.filter(Work.status == WorkStatus(status))
+  query = db.query(Work).options(joinedload(Work.music_file)).filter(Work.user_id == current_user.id)
+  if work_status in {WorkStatus.draft.value, WorkStatus.published.value}:
+    query = query.filter(Work.status == WorkStatus(work_status))
   if visibility in {WorkVisibility.public.value, WorkVisibility.unlisted.value, WorkVisibility.private.value}:
     query = query.filter(Work.visibility == WorkVisibility(visibility))
 
-  works = query.order_by(Work.created_at.desc()).all()
-  music_file_map = {
-      mf.id: mf
-      for mf in db.query(MusicFile).filter(MusicFile.id.in_([w.music_file_id for w in works])).all()
-  }
-  return [_to_response(w, music_file_map.get(w.music_file_id)) for w in works]
+  works, next_cursor = keyset_page(
+      query, Work.created_at, Work.id, cursor=cursor, limit=limit, key=lambda w: (w.created_at, w.id)
+  )
+  set_next_cursor(response, next_cursor)
+  return [_to_response(w) for w in works]
+
+
+def _is_storage_shared(db: Session, value: str | None, *, exclude_music_file_id: int | None) -> bool:
+  """
+  Whether another row still points at the same stored object.
+  Content-deduplicated migrations (scripts/migrate_local_to_oss.py) let several rows share one OSS key.
+  """
+  if not value:
+    return False
+  music_query = db.query(MusicFile.id).filter(
+      (MusicFile.storage_path == value) | (MusicFile.cover_image_path == value)
+  )
+  if exclude_music_file_id is not None:
+    music_query = music_query.filter(MusicFile.id != exclude_music_file_id)
+  if music_query.first() is not None:
+    return True
+  return db.query(Work.id).filter(Work.cover_url == value).first() is not None
+
+
+def _is_trusted_proxy(host: str | None) -> bool:
+  trusted = settings.forwarded_allow_ips_list
+  if "*" in trusted:
+    return True
+  if not host:
+    return False
+  try:
+    address = ipaddress.ip_address(host)
+  except ValueError:
+    return host in trusted
+  for item in trusted:
+    try:
+      if address in ipaddress.ip_network(item, strict=False):
+        return True
+    except ValueError:
+      continue
+  return False
+
+
+def _client_ip(request: Request) -> str:
+  # 只有直连方是受信代理（FORWARDED_ALLOW_IPS）时才采用 X-Forwarded-For，否则任何人都能伪造来源 IP 绕过播放去重
+  peer = request.client.host if request.client else None
+  forwarded = request.headers.get("x-forwarded-for")
+  if forwarded and _is_trusted_proxy(peer):
+    hops = [hop.strip() for hop in forwarded.split(",") if hop.strip()]
+    # 从右往左跳过受信代理，第一个非受信地址即真实客户端
+    for hop in reversed(hops):
+      if not _is_trusted_proxy(hop):
+        return hop
+    if hops:
+      return hops[0]
+  return peer or "unknown"
 
 
 def _is_public_published(work: Work) -> bool:
@@ -274,6 +337,9 @@ async def delete_work(
   audio_oss_key: str | None = None
   audio_local_path: Path | None = None
 
+  cover_value = work.cover_url
+  music_file_id = work.music_file_id
+
   # Capture cover deletion target
   if work.cover_url:
     try:
@@ -298,7 +364,14 @@ async def delete_work(
 
   # Capture audio deletion target (via music_file)
   music_file = db.query(MusicFile).filter(MusicFile.id == work.music_file_id).first()
-  if music_file:
+  blob_deletion: blob_store.BlobDeletion | None = None
+  if music_file and music_file.blob_id:
+    # 内容去重的上传音频：只释放引用，最后一个引用释放时才删除存储对象
+    blob_id = music_file.blob_id
+    music_file.blob = None
+    db.flush()
+    blob_deletion = blob_store.release_blob(db, blob_id)
+  elif music_file:
     try:
       audio_oss_key = decode_oss_path(music_file.storage_path) if settings.OSS_ENABLED else None
       if not audio_oss_key:
@@ -318,6 +391,10 @@ async def delete_work(
       audio_oss_key = None
       audio_local_path = None
 
+  # 热度快照行外键引用作品（无 ON DELETE CASCADE），先删掉，否则 MySQL 拒绝删除作品
+  db.query(WorkPopularitySnapshot).filter(WorkPopularitySnapshot.work_id == work.id).delete(
+      synchronize_session=False
+  )
   db.delete(work)
 
   if was_public_published:
@@ -331,7 +408,15 @@ async def delete_work(
     print(f"[delete_work] DB commit failed (work_id={work_id}): {exc}")
     raise HTTPException(status_code=500, detail="删除失败：数据库写入错误，请稍后重试") from exc
 
-  # Best-effort delete files AFTER commit
+  # Best-effort delete files AFTER commit (skip objects other rows still reference)
+  if cover_oss_key and _is_storage_shared(db, cover_value, exclude_music_file_id=music_file_id):
+    cover_oss_key = None
+  if cover_oss_key and image_renditions.is_managed(cover_value):
+    # 内容寻址的封面可能被 image_assets 去重给之后的作品复用，不删除
+    cover_oss_key = None
+  if audio_oss_key and music_file and _is_storage_shared(db, music_file.storage_path, exclude_music_file_id=music_file_id):
+    audio_oss_key = None
+
   if cover_oss_key and settings.OSS_ENABLED:
     try:
       OSSStorage().delete(cover_oss_key)
@@ -355,6 +440,7 @@ async def delete_work(
         os.remove(audio_local_path)
     except Exception as e:
       print(f"[delete_work] Failed to delete audio file: {e}")
+  blob_store.delete_blob_objects(blob_deletion)
 
 
 @router.get(
@@ -364,24 +450,25 @@ async def delete_work(
 )
 async def get_public_work(
     work_id: int,
-    db: Session = Depends(get_db),
-    current_user: User | None = Depends(get_current_user_optional),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: Principal | None = Depends(get_current_principal_optional_async),
 ) -> WorkPublicResponse:
-  work = db.query(Work).filter(Work.id == work_id).first()
+  work = await db.scalar(
+      select(Work).options(joinedload(Work.music_file), joinedload(Work.user)).where(Work.id == work_id)
+  )
   if not work or not _is_public_published(work):
     raise HTTPException(status_code=404, detail="作品不存在或未公开")
 
   liked = False
   if current_user:
     liked = (
-        db.query(LikeRecord)
-        .filter(LikeRecord.user_id == current_user.id, LikeRecord.work_id == work.id)
-        .first()
+        await db.scalar(
+            select(LikeRecord.id).where(LikeRecord.user_id == current_user.id, LikeRecord.work_id == work.id)
+        )
         is not None
     )
 
-  music_file = db.query(MusicFile).filter(MusicFile.id == work.music_file_id).first()
-  return _to_public_work(work, music_file, liked=liked)
+  return _to_public_work(work, liked=liked)
 
 
 @router.post(
@@ -391,6 +478,7 @@ async def get_public_work(
 )
 async def record_work_play(
     work_id: int,
+    request: Request,
     payload: WorkPlayRequest | None = Body(default=None),
     db: Session = Depends(get_db),
     current_user: User | None = Depends(get_current_user_optional),
@@ -408,25 +496,32 @@ async def record_work_play(
   if source and len(source) > 50:
     source = source[:50]
 
-  db.add(
-      WorkPlayLog(
-          user_id=current_user.id if current_user else None,
-          work_id=work_id,
-          played_at=datetime.utcnow(),
-          source=source,
-      )
+  buffer = play_buffer.get_buffer()
+  if buffer.running:
+    # 写合并：先落本地追加日志，由后台批量写 work_play_logs 并原子累加计数
+    buffer.record(
+        work_id=work.id,
+        author_id=work.user_id,
+        user_id=current_user.id if current_user else None,
+        client_key=f"u{current_user.id}" if current_user else f"ip:{_client_ip(request)}",
+        source=source,
+    )
+    return WorkPlayResponse(message="ok", play_count=(work.play_count or 0) + buffer.pending_for(work.id))
+
+  play_buffer.apply_plays(
+      db,
+      [
+          play_buffer.PlayEvent(
+              work_id=work.id,
+              author_id=work.user_id,
+              user_id=current_user.id if current_user else None,
+              source=source,
+              played_at=datetime.utcnow().isoformat(),
+          )
+      ],
   )
-
-  work.play_count = (work.play_count or 0) + 1
-  db.add(work)
-
-  # Update author's aggregate counters (best-effort)
-  author = work.user
-  if author:
-    author.plays_received = (author.plays_received or 0) + 1
-    db.add(author)
-
   db.commit()
+  db.refresh(work)
   return WorkPlayResponse(message="ok", play_count=work.play_count)
 
 
@@ -437,43 +532,47 @@ async def record_work_play(
 )
 async def list_public_works_by_user(
     user_id: int,
+    response: Response,
     limit: int = 20,
     offset: int = 0,
-    db: Session = Depends(get_db),
-    current_user: User | None = Depends(get_current_user_optional),
+    cursor: str | None = Query(None, description="上一页响应头 X-Next-Cursor 的值；传入时忽略 offset"),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: Principal | None = Depends(get_current_principal_optional_async),
 ) -> list[WorkPublicResponse]:
   safe_limit = min(max(limit, 1), 50)
-  works = (
-      db.query(Work)
-      .filter(
+  stmt = (
+      select(Work)
+      .options(joinedload(Work.music_file), joinedload(Work.user))
+      .where(
           Work.user_id == user_id,
           Work.status == WorkStatus.published,
           Work.visibility == WorkVisibility.public,
       )
-      .order_by(Work.created_at.desc())
-      .offset(offset)
-      .limit(safe_limit)
-      .all()
   )
-  music_file_map = {
-      mf.id: mf
-      for mf in db.query(MusicFile).filter(MusicFile.id.in_([w.music_file_id for w in works])).all()
-  }
+  works, next_cursor = await keyset_page_async(
+      db,
+      stmt,
+      Work.created_at,
+      Work.id,
+      cursor=cursor,
+      limit=safe_limit,
+      offset=max(offset, 0),
+      key=lambda w: (w.created_at, w.id),
+  )
+  set_next_cursor(response, next_cursor)
 
   liked_ids: set[int] = set()
   if current_user and works:
-    liked_rows = (
-        db.query(LikeRecord.work_id)
-        .filter(
+    liked_rows = await db.scalars(
+        select(LikeRecord.work_id).where(
             LikeRecord.user_id == current_user.id,
             LikeRecord.work_id.in_([w.id for w in works]),
         )
-        .all()
     )
-    liked_ids = {row[0] for row in liked_rows}
+    liked_ids = set(liked_rows)
 
   return [
-      _to_public_work(w, music_file_map.get(w.music_file_id), liked=w.id in liked_ids)
+      _to_public_work(w, liked=w.id in liked_ids)
       for w in works
   ]
 
@@ -486,33 +585,6 @@ async def upload_cover(
     file: UploadFile = File(...),
     current_user: User = Depends(get_current_user),
 ) -> dict:
-  if not file.content_type or not file.content_type.startswith("image/"):
-    raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="请上传图片文件")
-
-  suffix = Path(file.filename or "").suffix or ".png"
-  content = await file.read()
-
-  # 优先 OSS
-  if settings.OSS_ENABLED:
-    try:
-      key = build_oss_key(
-          category="picture",
-          source="upload",
-          user_id=current_user.id,
-          original_filename=file.filename,
-          ext=suffix,
-      )
-      OSSStorage().put_bytes(key, content, content_type=file.content_type)
-      cover_path = encode_oss_path(key)
-      cover_url = OSSStorage().get_url(key)
-      return {"cover_url": cover_url, "cover_path": cover_path}
-    except Exception as exc:
-      print(f"[upload_cover] Upload to OSS failed, fallback local: {exc}")
-
-  # 本地兜底
-  covers_dir = Path(settings.STATIC_ROOT) / "covers"
-  covers_dir.mkdir(parents=True, exist_ok=True)
-  filename = f"{uuid4()}{suffix}"
-  dest = covers_dir / filename
-  dest.write_bytes(content)
-  return {"cover_url": f"/static/covers/{filename}"}
+  # 按块落盘 + 大小上限，线程池中纠正方向、缩放、去元数据并重新压缩，附带缩略图
+  cover_path = await image_renditions.ingest_upload_image(file)
+  return {"cover_url": resolve_cover_url(cover_path), "cover_path": cover_path}
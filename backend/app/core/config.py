@@ -25,14 +25,36 @@ class Settings(BaseSettings):
     # We store it as a plain string to avoid startup failures when operators use comma-separated values.
     ALLOWED_ORIGINS: str = "http://localhost:3000,http://localhost:5173"
     DATABASE_URL: str | None = None
+    # 异步引擎（AsyncSession，供高频只读接口使用）；为空时由 DATABASE_URL 推导：
+    # mysql+pymysql -> mysql+aiomysql，sqlite -> sqlite+aiosqlite
+    ASYNC_DATABASE_URL: str | None = None
+    # 连接池（同步、异步引擎各自一个池，参数相同）
+    DB_POOL_SIZE: int = 10
+    DB_MAX_OVERFLOW: int = 20
+    DB_POOL_TIMEOUT_SECONDS: int = 30
+    DB_POOL_RECYCLE_SECONDS: int = 3600
+    # 慢查询日志阈值（毫秒，0 关闭）；连接池指标见 GET /health/db-pool
+    DB_SLOW_QUERY_MS: int = 500
 
     # JWT
     JWT_SECRET: str = "change-me"
     JWT_ALGORITHM: str = "HS256"
     JWT_EXPIRE_SECONDS: int = 60 * 60 * 24  # 1 day
+    # 登录用户身份缓存（app/core/user_cache.py）：TTL 秒数，0 关闭
+    USER_CACHE_TTL_SECONDS: int = 30
+    USER_CACHE_MAX_ENTRIES: int = 10000
+    # 密码哈希（pbkdf2_sha256）：轮数用 scripts/calibrate_password_hash.py 按目标耗时标定，0 = passlib 默认；
+    # 轮数变化后，旧哈希在下次登录成功时自动重算。哈希在独立线程池中执行（WORKERS <= 0 表示在事件循环内直接计算）
+    PASSWORD_PBKDF2_ROUNDS: int = 0
+    PASSWORD_HASH_WORKERS: int = 4
+    # 旧版本遗留的明文密码：允许登录一次并立即改写为哈希；关闭后此类账号需重置密码
+    PASSWORD_ALLOW_LEGACY_PLAINTEXT: bool = True
 
     # File storage
     MEDIA_ROOT: str = str(BASE_DIR / "uploads")
+    # 上传音频大小上限（MB），同时下发给前端 UploadPolicy.max_size_mb；上传按块落盘，超限即返回 413
+    UPLOAD_MAX_SIZE_MB: int = 25
+    UPLOAD_CHUNK_SIZE_BYTES: int = 1024 * 1024
 
     # LLM / OpenAI-compatible provider
     # IMPORTANT: do NOT hardcode real API keys in code or git.
@@ -42,9 +64,49 @@ class Settings(BaseSettings):
     OPENAI_MODEL: str = "qwen/Qwen2.5-7B-Instruct"
     # 用于专辑封面生成的图片模型（Qwen-image）
     IMAGE_MODEL: str = "Qwen/Qwen2-XL-Image"
+    # 进程内共享的 LLM 客户端（app.services.llm_client）：keep-alive 连接池、并发上限、重试与分调用类型超时
+    LLM_MAX_CONNECTIONS: int = 20
+    LLM_KEEPALIVE_SECONDS: float = 60.0
+    LLM_MAX_CONCURRENCY: int = 8          # 每个事件循环 / 同步调用方各自的并发上限
+    LLM_MAX_RETRIES: int = 2              # 仅重试超时、连接错误、429 与 5xx
+    LLM_RETRY_BACKOFF_SECONDS: float = 0.5  # 指数退避基数，实际等待为 [0, base * 2^n] 的随机值
+    LLM_TIMEOUT_SECONDS: float = 30.0     # 未单独配置的调用
+    LLM_TITLE_TIMEOUT_SECONDS: float = 10.0
+    LLM_COVER_PROMPT_TIMEOUT_SECONDS: float = 15.0
+    LLM_SUMMARY_TIMEOUT_SECONDS: float = 30.0
+    IMAGE_TIMEOUT_SECONDS: float = 120.0
+    # 生成前的合并规划调用（app.services.generation_planner）：标题 + 封面 prompt + SongGen 描述/歌词一次完成
+    LLM_PLANNER_ENABLED: bool = True
+    LLM_PLANNER_TIMEOUT_SECONDS: float = 40.0
+    # LLM 响应缓存（app.services.llm_cache）：标题 / 封面 prompt / SongGen 增强，内存 LRU + 数据库持久层
+    LLM_CACHE_ENABLED: bool = True
+    LLM_CACHE_TTL_SECONDS: int = 7 * 24 * 3600
+    LLM_CACHE_MEMORY_ENTRIES: int = 2000
+    LLM_CACHE_PERSIST: bool = True          # 写入 llm_response_cache 表，跨进程 / 重启共享
+    LLM_CACHE_PURGE_SECONDS: int = 3600     # 清理过期行的周期（<=0 关闭进程内任务）
 
     # Static assets (for generated audio)
     STATIC_ROOT: str = "static"
+    # 本地静态媒体（/static、/media）的缓存策略：
+    # - 文件名带 uuid / sha256 的文件内容不可变，按此秒数下发 Cache-Control immutable（0 表示关闭）
+    # - 其他文件下发 no-cache，依赖 ETag 协商缓存
+    MEDIA_IMMUTABLE_MAX_AGE_SECONDS: int = 365 * 24 * 3600
+    # ASGI 服务器支持 http.response.pathsend（granian/hypercorn）时，整文件响应走零拷贝 sendfile
+    MEDIA_SENDFILE_ENABLED: bool = False
+    # 封面 / 头像图片处理（app.services.image_renditions）：内容寻址存储、WebP 多尺寸缩略图、感知哈希去重
+    IMAGE_RENDITION_SIZES: str = "128,256,512"   # 缩略图最长边（像素，逗号分隔）
+    IMAGE_RENDITION_QUALITY: int = 80
+    IMAGE_AVIF_ENABLED: bool = False             # 需 Pillow 支持 AVIF 编码；开启后额外生成 .avif
+    IMAGE_WORKERS: int = 2                       # 解码 / 缩放 / 编码线程池大小
+    # 列表接口（热门、搜索、作品列表等）cover_thumb_url 使用的缩略图边长
+    COVER_LIST_SIZE: int = 256
+    # 用户列表（搜索、关注、推荐创作者）头像使用的缩略图边长
+    AVATAR_LIST_SIZE: int = 128
+    # 头像 / 封面上传：按块落盘并在超限时返回 413；解码后纠正方向、缩放到最长边上限并重新压缩为 WebP（去除 EXIF）
+    IMAGE_UPLOAD_MAX_SIZE_MB: int = 10
+    IMAGE_UPLOAD_MAX_PIXELS: int = 40_000_000    # 解码前按头信息拒绝超大分辨率（防解压炸弹）
+    IMAGE_UPLOAD_MAX_DIMENSION: int = 1600
+    IMAGE_UPLOAD_QUALITY: int = 85
 
     # OSS / Object storage
     OSS_ENABLED: bool = False
@@ -54,6 +116,9 @@ class Settings(BaseSettings):
     OSS_ACCESS_KEY_SECRET: str | None = None
     OSS_PUBLIC_BASE_URL: str | None = None  # 公共读桶可配置，直接拼公开 URL
     OSS_SIGN_EXPIRES: int = 3600  # 私有桶签名有效期，公共桶可忽略
+    # 服务端处理（重新分析/预览/转码）用到 OSS 音频时的本地 LRU 磁盘缓存（oss_storage.get_local_path）
+    OSS_CACHE_DIR: str = str(BASE_DIR / "cache" / "oss")
+    OSS_CACHE_MAX_MB: int = 2048
 
     # 可选：当生成音频已成功上传 OSS 后，是否删除本地 static/audio 缓存文件
     # 说明：仍会先落盘到 static/audio 再上传（需要本地文件进行 put_file）。
@@ -91,8 +156,50 @@ class Settings(BaseSettings):
     MUSICGEN_USE_CUDA_IF_AVAILABLE: bool = True
     MUSICGEN_PREFERRED_DEVICE: str | None = None
 
+    # MusicGen 中文 prompt 翻译（app.services.translation_service）：并发请求合批、结果缓存（复用 llm_cache 的内存 + 数据库两级）
+    TRANSLATION_MODEL_ID: str = "Helsinki-NLP/opus-mt-zh-en"
+    TRANSLATION_BACKEND: str = "transformers"     # transformers | ctranslate2
+    TRANSLATION_QUANTIZE_INT8: bool = False       # transformers 后端：对 Linear 层做动态 int8 量化（CPU）
+    # ctranslate2 后端：ct2-transformers-converter 转换后的模型目录（如 --quantization int8）
+    TRANSLATION_CT2_MODEL_DIR: str | None = None
+    TRANSLATION_PRELOAD: bool = False             # 等价于在 MODEL_PRELOAD 中加入 translation
+    TRANSLATION_MAX_BATCH: int = 16
+    TRANSLATION_BATCH_WAIT_MS: int = 10           # 收到首个请求后最多等待该毫秒数以合并并发请求
+    TRANSLATION_MAX_LENGTH: int = 256
+    TRANSLATION_CACHE_TTL_SECONDS: int = 60 * 60 * 24 * 30  # 0 关闭缓存
+
     # Local model weights
     MODEL_WEIGHTS_DIR: str = "model_weights"
+    # 启动时并发预加载并预热的模型（逗号分隔：musicgen,emotion,translation；空 = 全部按需加载）
+    # 预热完成前 GET /health/ready 返回 503
+    MODEL_PRELOAD: str = ""
+
+    # 首页榜单预计算（work_popularity_snapshots）
+    # 后台每隔 N 秒刷新一次（0 表示不在进程内刷新，改用 scripts/refresh_popularity.py 定时任务）
+    POPULARITY_REFRESH_SECONDS: int = 300
+    # 需要预先刷新的时间窗口（天，逗号分隔）；其他窗口在首次请求时按需生成
+    POPULARITY_WINDOWS: str = "3"
+    # 每个窗口保存的排名条数
+    POPULARITY_SNAPSHOT_SIZE: int = 200
+    # /ui/hot-songs 进程内响应缓存秒数
+    HOT_SONGS_CACHE_SECONDS: int = 30
+    # 播放计数写合并（/works/{id}/play）：本地追加日志 + 定时批量入库
+    PLAY_BUFFER_ENABLED: bool = True
+    PLAY_BUFFER_DIR: str = str(BASE_DIR / "cache" / "plays")
+    PLAY_FLUSH_INTERVAL_MS: int = 300
+    PLAY_FLUSH_MAX_BATCH: int = 5000
+    # 同一用户（未登录按 IP）对同一作品在该秒数内的重复播放只计一次
+    PLAY_DEDUPE_SECONDS: int = 30
+    # 信任其 X-Forwarded-For 的反向代理（逗号分隔的 IP / CIDR，"*" 为全部），同 uvicorn --forwarded-allow-ips
+    FORWARDED_ALLOW_IPS: str = "127.0.0.1"
+    # 单条播放在数据库正常时仍写入失败的重试次数上限，超过后转入 dead-letter 文件
+    PLAY_MAX_ATTEMPTS: int = 5
+    # 推荐创作者预计算（creator_recommendations），刷新间隔与保存条数
+    CREATOR_RECO_REFRESH_SECONDS: int = 900
+    CREATOR_RECO_SNAPSHOT_SIZE: int = 200
+    # 调试：记录每个请求的 SQL 条数与耗时（响应头 X-Query-Count / X-Query-Time-Ms），超过阈值标记疑似 N+1
+    QUERY_DEBUG_ENABLED: bool = False
+    QUERY_DEBUG_WARN_COUNT: int = 30
 
     # Email configuration (QQ邮箱)
     QQ_EMAIL: str | None = None  # QQ邮箱地址（通过环境变量配置）
@@ -114,6 +221,31 @@ class Settings(BaseSettings):
             return ",".join(str(item).strip() for item in v if str(item).strip())
         return v
 
+    @property
+    def popularity_windows_list(self) -> list[int]:
+        windows: list[int] = []
+        for item in (self.POPULARITY_WINDOWS or "").split(","):
+            item = item.strip()
+            if item.isdigit() and int(item) > 0:
+                windows.append(int(item))
+        return windows
+
+    @property
+    def model_preload_list(self) -> list[str]:
+        names = [item.strip().lower() for item in (self.MODEL_PRELOAD or "").split(",") if item.strip()]
+        if self.TRANSLATION_PRELOAD:
+            names.append("translation")
+        return list(dict.fromkeys(names))
+
+    @property
+    def forwarded_allow_ips_list(self) -> list[str]:
+        return [item.strip() for item in (self.FORWARDED_ALLOW_IPS or "").split(",") if item.strip()]
+
+    @property
+    def image_rendition_sizes_list(self) -> list[int]:
+        sizes = {int(item) for item in (self.IMAGE_RENDITION_SIZES or "").split(",") if item.strip().isdigit()}
+        return sorted(size for size in sizes if size > 0)
+
     @property
     def allowed_origins_list(self) -> list[str]:
         raw = (self.ALLOWED_ORIGINS or "").strip()
@@ -1,12 +1,16 @@
-from typing import Generator
+from dataclasses import dataclass, field
+from typing import AsyncGenerator, Generator
 
 from fastapi import Depends, Header, HTTPException, status
 from jose import JWTError
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
 from app.core.config import Settings, settings
+from app.core import user_cache
 from app.core.security import decode_access_token
-from app.db.session import SessionLocal
+from app.db.session import AsyncSessionLocal, SessionLocal
 from app.models.user import User
 
 
@@ -24,10 +28,26 @@ def get_db() -> Generator[Session, None, None]:
     db.close()
 
 
-def get_current_user(
-    db: Session = Depends(get_db),
-    authorization: str | None = Header(default=None),
-) -> User:
+async def get_async_db() -> AsyncGenerator[AsyncSession, None]:
+  """AsyncSession dependency for endpoints that must not block the event loop."""
+  if AsyncSessionLocal is None:
+    raise RuntimeError(
+        "Async database is not configured. Set DATABASE_URL (or ASYNC_DATABASE_URL) and install aiomysql/aiosqlite."
+    )
+  async with AsyncSessionLocal() as db:
+    yield db
+
+
+@dataclass(frozen=True)
+class Principal:
+  """Authenticated caller without an ORM row, for endpoints that only need the user id."""
+  id: int
+  username: str
+  claims: dict = field(default_factory=dict, compare=False)
+
+
+def _token_claims(authorization: str | None) -> dict:
+  """JWT claims from a `Bearer <jwt>` header (with a `sub`); raises 401 like the original dependency."""
   if not authorization or not authorization.lower().startswith("bearer "):
     raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="请先进行注册/登录")
 
@@ -40,10 +60,59 @@ def get_current_user(
   user_id = payload.get("sub")
   if not user_id:
     raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="无效令牌")
+  try:
+    int(user_id)
+  except (TypeError, ValueError) as exc:
+    raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="无效令牌") from exc
+  return payload
+
+
+def _optional_token_claims(authorization: str | None) -> dict | None:
+  try:
+    return _token_claims(authorization)
+  except Exception:
+    return None
+
+
+def _user_not_found() -> HTTPException:
+  return HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="用户不存在或已删除")
+
+
+def _load_user(db: Session, user_id: int) -> User | None:
+  """The token's user attached to `db`: identity columns from app.core.user_cache when cached."""
+  cached = user_cache.get(user_id)
+  if cached is not None:
+    return db.merge(user_cache.detached_user(cached), load=False)
+  return _fetch_user(db, user_id)
+
+
+def _fetch_user(db: Session, user_id: int) -> User | None:
+  seen = user_cache.generation()
+  user = db.query(User).filter(User.id == user_id).first()
+  if user is not None:
+    user_cache.put(user, seen)
+  return user
+
+
+async def _fetch_user_async(db: AsyncSession, user_id: int) -> User | None:
+  seen = user_cache.generation()
+  user = (await db.execute(select(User).where(User.id == user_id))).scalar_one_or_none()
+  if user is not None:
+    user_cache.put(user, seen)
+  return user
 
-  user = db.query(User).filter(User.id == int(user_id)).first()
+
+def _principal(claims: dict, username: str) -> Principal:
+  return Principal(id=int(claims["sub"]), username=username, claims=claims)
+
+
+def get_current_user(
+    db: Session = Depends(get_db),
+    authorization: str | None = Header(default=None),
+) -> User:
+  user = _load_user(db, int(_token_claims(authorization)["sub"]))
   if not user:
-    raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="用户不存在或已删除")
+    raise _user_not_found()
 
   return user
 
@@ -58,15 +127,58 @@ def get_current_user_optional(
   - returns User when token is valid
   It should NEVER raise, so anonymous搜索/详情接口可以安全复用。
   """
-  if not authorization or not authorization.lower().startswith("bearer "):
+  claims = _optional_token_claims(authorization)
+  if claims is None:
+    return None
+  try:
+    return _load_user(db, int(claims["sub"]))
+  except Exception:
     return None
 
-  token = authorization.split(" ", 1)[1]
+
+def get_current_principal(
+    db: Session = Depends(get_db),
+    authorization: str | None = Header(default=None),
+) -> Principal:
+  """Like get_current_user, but no ORM row: no query at all while the user is cached."""
+  claims = _token_claims(authorization)
+  cached = user_cache.get(int(claims["sub"]))
+  if cached is not None:
+    return _principal(claims, cached["username"])
+  user = _fetch_user(db, int(claims["sub"]))
+  if not user:
+    raise _user_not_found()
+  return _principal(claims, user.username)
+
+
+async def get_current_principal_async(
+    db: AsyncSession = Depends(get_async_db),
+    authorization: str | None = Header(default=None),
+) -> Principal:
+  """Async counterpart of get_current_principal (same errors)."""
+  claims = _token_claims(authorization)
+  cached = user_cache.get(int(claims["sub"]))
+  if cached is not None:
+    return _principal(claims, cached["username"])
+  user = await _fetch_user_async(db, int(claims["sub"]))
+  if not user:
+    raise _user_not_found()
+  return _principal(claims, user.username)
+
+
+async def get_current_principal_optional_async(
+    db: AsyncSession = Depends(get_async_db),
+    authorization: str | None = Header(default=None),
+) -> Principal | None:
+  """Optional Principal (never raises), for anonymous-friendly endpoints."""
+  claims = _optional_token_claims(authorization)
+  if claims is None:
+    return None
   try:
-    payload = decode_access_token(token)
-    user_id = payload.get("sub")
-    if not user_id:
-      return None
-    return db.query(User).filter(User.id == int(user_id)).first()
+    cached = user_cache.get(int(claims["sub"]))
+    if cached is not None:
+      return _principal(claims, cached["username"])
+    user = await _fetch_user_async(db, int(claims["sub"]))
   except Exception:
     return None
+  return _principal(claims, user.username) if user else None
@@ -0,0 +1,97 @@
+"""
+Static media serving for locally stored audio / covers / uploads.
+
+Starlette's `StaticFiles` already answers Range (206) and conditional GET
+(If-None-Match / If-Modified-Since -> 304) with a strong mtime+size ETag,
+but it sends no `Cache-Control`, so browsers revalidate (or re-download)
+whole WAVs on every replay. `MediaFiles` keeps that behaviour and adds:
+
+- `Cache-Control: public, max-age=..., immutable` for UUID / content-hash named
+  files (they are never rewritten in place; a new upload gets a new name)
+- `Cache-Control: no-cache` for everything else (still revalidated via ETag)
+- optional zero-copy full-file responses via the ASGI `http.response.pathsend`
+  extension (granian / hypercorn); servers without it fall back transparently
+"""
+from __future__ import annotations
+
+import os
+import re
+import typing
+
+from starlette.datastructures import Headers
+from starlette.responses import FileResponse, Response
+from starlette.staticfiles import NotModifiedResponse, StaticFiles
+from starlette.types import Receive, Scope, Send
+
+# 生成/上传文件名均带 uuid4（有/无连字符）或 sha256，内容写入后不会再变
+_IMMUTABLE_NAME_RE = re.compile(
+    r"([0-9a-f]{8}-?[0-9a-f]{4}-?[0-9a-f]{4}-?[0-9a-f]{4}-?[0-9a-f]{12}|[0-9a-f]{64})",
+    re.IGNORECASE,
+)
+
+
+def is_immutable_media_name(path: str | os.PathLike[str]) -> bool:
+    """True if the file name carries a UUID / content hash, i.e. it is never overwritten."""
+    return bool(_IMMUTABLE_NAME_RE.search(os.path.basename(os.fspath(path))))
+
+
+class PathSendFileResponse(FileResponse):
+    """
+    FileResponse that hands full-file bodies to the server for zero-copy sendfile
+    when the ASGI server advertises `http.response.pathsend`.
+    Range / HEAD requests and servers without the extension use the normal path.
+    """
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        extensions = scope.get("extensions") or {}
+        headers = Headers(scope=scope)
+        if (
+            "http.response.pathsend" in extensions
+            and self.stat_result is not None
+            and scope["method"].upper() == "GET"
+            and headers.get("range") is None
+        ):
+            await send({"type": "http.response.start", "status": self.status_code, "headers": self.raw_headers})
+            await send({"type": "http.response.pathsend", "path": os.fspath(self.path)})
+            if self.background is not None:
+                await self.background()
+            return
+        await super().__call__(scope, receive, send)
+
+
+class MediaFiles(StaticFiles):
+    """StaticFiles with cache-control policy and optional sendfile (see module docstring)."""
+
+    def __init__(
+        self,
+        *,
+        directory: str | os.PathLike[str],
+        immutable_max_age: int = 31536000,
+        mutable_cache_control: str = "no-cache",
+        sendfile: bool = False,
+        **kwargs: typing.Any,
+    ) -> None:
+        super().__init__(directory=directory, **kwargs)
+        self.immutable_max_age = int(immutable_max_age)
+        self.mutable_cache_control = mutable_cache_control
+        self.sendfile = bool(sendfile)
+
+    def cache_control_for(self, full_path: str | os.PathLike[str]) -> str:
+        if self.immutable_max_age > 0 and is_immutable_media_name(full_path):
+            return f"public, max-age={self.immutable_max_age}, immutable"
+        return self.mutable_cache_control
+
+    def file_response(
+        self,
+        full_path: str | os.PathLike[str],
+        stat_result: os.stat_result,
+        scope: Scope,
+        status_code: int = 200,
+    ) -> Response:
+        request_headers = Headers(scope=scope)
+        response_cls = PathSendFileResponse if self.sendfile else FileResponse
+        response = response_cls(full_path, status_code=status_code, stat_result=stat_result)
+        response.headers["cache-control"] = self.cache_control_for(full_path)
+        if self.is_not_modified(response.headers, request_headers):
+            return NotModifiedResponse(response.headers)
+        return response
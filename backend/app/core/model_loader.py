@@ -0,0 +1,52 @@
+"""
+Thread-safe single-flight holder for expensive model singletons.
+
+MusicGen, the MERT emotion classifier and the translation backend used to be module
+globals filled on first use without a lock: two concurrent first requests each
+loaded the model. `LazyModel.get()` loads under a per-model lock; callers that
+arrive during a load block on it and share its result. A failed load is not
+cached (the next get() retries). State and load time are kept for readiness
+reporting (app.services.model_lifecycle).
+"""
+from __future__ import annotations
+
+import threading
+import time
+from typing import Callable, Generic, TypeVar
+
+T = TypeVar("T")
+
+
+class LazyModel(Generic[T]):
+    def __init__(self, name: str, loader: Callable[[], T]) -> None:
+        self.name = name
+        self._loader = loader
+        self._lock = threading.Lock()
+        self._value: T | None = None
+        self.state = "idle"  # idle | loading | loaded | failed
+        self.error: str | None = None
+        self.load_seconds: float | None = None
+
+    @property
+    def loaded(self) -> bool:
+        return self._value is not None
+
+    def get(self) -> T:
+        value = self._value
+        if value is not None:
+            return value
+        with self._lock:
+            if self._value is None:
+                self.state = "loading"
+                started = time.perf_counter()
+                try:
+                    self._value = self._loader()
+                except BaseException as exc:
+                    self.state = "failed"
+                    self.error = f"{type(exc).__name__}: {exc}"
+                    raise
+                self.load_seconds = time.perf_counter() - started
+                self.state = "loaded"
+                self.error = None
+                print(f"[model_loader] {self.name} loaded in {self.load_seconds:.1f}s")
+            return self._value
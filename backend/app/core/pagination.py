@@ -0,0 +1,119 @@
+"""
+Opaque keyset cursors.
+
+A cursor is the sort key of the last row of a page (e.g. `(updated_at, id)`), encoded as
+url-safe base64 JSON. The next page continues strictly after that key, so the database
+seeks through an index instead of scanning and discarding OFFSET rows, and every page
+costs the same. List endpoints return the cursor of the next page in the
+X-Next-Cursor header (or a `next_cursor` field); no cursor means the last page.
+"""
+import base64
+import binascii
+import json
+from datetime import datetime
+from typing import Any, Callable, Optional, Sequence
+
+from fastapi import HTTPException, Response
+from sqlalchemy import and_, or_
+
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+DEFAULT_PAGE_SIZE = 20
+MAX_PAGE_SIZE = 100
+
+
+def encode_cursor(*values: Any) -> str:
+  payload = [v.isoformat() if isinstance(v, datetime) else v for v in values]
+  raw = json.dumps(payload, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+  return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: Optional[str], types: Sequence[type]) -> Optional[tuple]:
+  """Decode a cursor into values of `types`; None passes through, malformed cursors are a 400."""
+  if not cursor:
+    return None
+  try:
+    raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+    payload = json.loads(raw.decode("utf-8"))
+    if not isinstance(payload, list) or len(payload) != len(types):
+      raise ValueError("cursor arity")
+    values = []
+    for value, typ in zip(payload, types):
+      if typ is datetime:
+        values.append(datetime.fromisoformat(value))
+      elif typ is int:
+        if isinstance(value, bool) or not isinstance(value, int):
+          raise ValueError("cursor int")
+        values.append(value)
+      else:
+        values.append(typ(value))
+    return tuple(values)
+  except (binascii.Error, UnicodeDecodeError, ValueError, TypeError):
+    raise HTTPException(status_code=400, detail="cursor 无效")
+
+
+def set_next_cursor(response: Response, cursor: Optional[str]) -> None:
+  if cursor:
+    response.headers[NEXT_CURSOR_HEADER] = cursor
+
+
+def keyset_page(
+    query,
+    sort_col,
+    id_col,
+    *,
+    cursor: Optional[str],
+    limit: int,
+    key: Callable[[Any], tuple],
+    offset: int = 0,
+    sort_type: type = datetime,
+    id_type: type = int,
+) -> tuple[list, Optional[str]]:
+  """
+  One page of `query` ordered by (sort_col, id_col) descending.
+  `key(row)` returns the (sort, id) values of a result row; returns (rows, next_cursor).
+  The query should be backed by an index ending in (sort_col, id_col).
+  `offset` is only honoured without a cursor (legacy clients of endpoints that used OFFSET).
+  """
+  query = _keyset_query(query, sort_col, id_col, cursor, sort_type, id_type, limit, offset)
+  return _page(query.all(), limit, key)
+
+
+async def keyset_page_async(
+    db,
+    stmt,
+    sort_col,
+    id_col,
+    *,
+    cursor: Optional[str],
+    limit: int,
+    key: Callable[[Any], tuple],
+    offset: int = 0,
+    sort_type: type = datetime,
+    id_type: type = int,
+    scalars: bool = True,
+) -> tuple[list, Optional[str]]:
+  """keyset_page for a 2.0 `select()` on an AsyncSession (`scalars=False` keeps whole rows)."""
+  stmt = _keyset_query(stmt, sort_col, id_col, cursor, sort_type, id_type, limit, offset)
+  result = await db.execute(stmt)
+  return _page((result.scalars() if scalars else result).all(), limit, key)
+
+
+def _keyset_query(query, sort_col, id_col, cursor, sort_type, id_type, limit, offset):
+  # Query.filter 与 Select.where 同义，两种写法共用
+  after = decode_cursor(cursor, (sort_type, id_type))
+  if after is not None:
+    after_sort, after_id = after
+    query = query.filter(or_(sort_col < after_sort, and_(sort_col == after_sort, id_col < after_id)))
+  query = query.order_by(sort_col.desc(), id_col.desc())
+  if after is None and offset > 0:
+    query = query.offset(offset)
+  return query.limit(limit + 1)
+
+
+def _page(rows, limit: int, key: Callable[[Any], tuple]) -> tuple[list, Optional[str]]:
+  rows = list(rows)
+  next_cursor = None
+  if len(rows) > limit:
+    rows = rows[:limit]
+    next_cursor = encode_cursor(*key(rows[-1]))
+  return rows, next_cursor
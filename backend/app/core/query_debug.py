@@ -0,0 +1,54 @@
+"""
+Debug middleware: per-request SQL statement count and time.
+
+Enabled with QUERY_DEBUG_ENABLED. Each HTTP request gets its own
+app.db.query_stats.track() scope; the totals are sent back as
+X-Query-Count / X-Query-Time-Ms response headers and logged, and requests above
+QUERY_DEBUG_WARN_COUNT statements are flagged as likely N+1 loads.
+"""
+from __future__ import annotations
+
+import time
+
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.db import query_stats
+
+QUERY_COUNT_HEADER = "X-Query-Count"
+QUERY_TIME_HEADER = "X-Query-Time-Ms"
+
+
+class QueryDebugMiddleware:
+    def __init__(self, app: ASGIApp, *, warn_count: int = 30) -> None:
+        self.app = app
+        self.warn_count = int(warn_count)
+        query_stats.install()
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        status_code = 500
+        with query_stats.track() as stats:
+
+            async def send_with_stats(message: Message) -> None:
+                nonlocal status_code
+                if message["type"] == "http.response.start":
+                    status_code = message["status"]
+                    headers = list(message.get("headers", []))
+                    headers.append((QUERY_COUNT_HEADER.lower().encode(), str(stats.count).encode()))
+                    headers.append((QUERY_TIME_HEADER.lower().encode(), f"{stats.seconds * 1000:.1f}".encode()))
+                    message = {**message, "headers": headers}
+                await send(message)
+
+            try:
+                await self.app(scope, receive, send_with_stats)
+            finally:
+                total_ms = (time.perf_counter() - started) * 1000
+                flag = " N+1?" if stats.count > self.warn_count else ""
+                print(
+                    f"[query_debug] {scope.get('method')} {scope.get('path')} {status_code} "
+                    f"queries={stats.count} db_ms={stats.seconds * 1000:.1f} total_ms={total_ms:.1f}{flag}"
+                )
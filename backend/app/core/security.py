@@ -1,5 +1,9 @@
+import asyncio
+import hmac
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
-from typing import Any, Dict
+from typing import Any, Dict, Optional, Tuple
 
 from jose import JWTError, jwt
 from passlib.context import CryptContext
@@ -8,12 +12,48 @@ from app.core.config import settings
 
 # 密码哈希方案：
 # - 默认使用 pbkdf2_sha256，避免部分平台下 passlib+bcrypt 的 72 字节限制探测报错。
-# - 保留 bcrypt 以兼容历史数据。
-pwd_context = CryptContext(
-    schemes=["pbkdf2_sha256", "bcrypt"],
-    default="pbkdf2_sha256",
-    deprecated="auto",
-)
+# - 保留 bcrypt 以兼容历史数据（deprecated，登录成功后改写为 pbkdf2_sha256）。
+# - 轮数来自 PASSWORD_PBKDF2_ROUNDS；轮数不同的存量哈希 needs_update，登录成功时重算。
+def _build_context(rounds: int) -> CryptContext:
+  options: Dict[str, Any] = {}
+  if rounds > 0:
+    options = {
+        "pbkdf2_sha256__default_rounds": rounds,
+        "pbkdf2_sha256__min_rounds": rounds,
+        "pbkdf2_sha256__max_rounds": rounds,
+    }
+  return CryptContext(
+      schemes=["pbkdf2_sha256", "bcrypt"],
+      default="pbkdf2_sha256",
+      deprecated="auto",
+      **options,
+  )
+
+
+pwd_context = _build_context(int(settings.PASSWORD_PBKDF2_ROUNDS))
+
+_hash_executor: ThreadPoolExecutor | None = None
+_hash_executor_lock = threading.Lock()
+
+
+def _executor() -> ThreadPoolExecutor | None:
+  """Bounded pool for KDF work (hashlib.pbkdf2_hmac releases the GIL, so threads run in parallel)."""
+  global _hash_executor
+  workers = int(settings.PASSWORD_HASH_WORKERS)
+  if workers <= 0:
+    return None
+  if _hash_executor is None:
+    with _hash_executor_lock:
+      if _hash_executor is None:
+        _hash_executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="password-hash")
+  return _hash_executor
+
+
+async def _offload(fn, *args):
+  executor = _executor()
+  if executor is None:
+    return fn(*args)
+  return await asyncio.get_running_loop().run_in_executor(executor, fn, *args)
 
 
 def hash_password(password: str) -> str:
@@ -21,16 +61,50 @@ def hash_password(password: str) -> str:
   return pwd_context.hash(password)
 
 
-def verify_password(password: str, password_hash: str) -> bool:
+def verify_and_update_password(password: str, password_hash: str | None) -> Tuple[bool, Optional[str]]:
   """
-  校验密码。
-  - 优先使用 bcrypt 验证。
-  - 若存量数据仍是明文（旧版本遗留），则退回到明文对比，避免老账号无法登录。
+  校验密码，返回 (是否通过, 新哈希)。新哈希非空时调用方应写回：
+  - 哈希方案或轮数已变化（bcrypt / 旧轮数 -> 当前 pbkdf2_sha256 参数）
+  - 存量明文密码（旧版本遗留，PASSWORD_ALLOW_LEGACY_PLAINTEXT）：常量时间比较，通过后改写为哈希
   """
+  if not password_hash:
+    pwd_context.dummy_verify()
+    return False, None
+  if pwd_context.identify(password_hash) is None:
+    if settings.PASSWORD_ALLOW_LEGACY_PLAINTEXT and hmac.compare_digest(
+        password.encode("utf-8"), password_hash.encode("utf-8")
+    ):
+      return True, pwd_context.hash(password)
+    pwd_context.dummy_verify()
+    return False, None
   try:
-    return pwd_context.verify(password, password_hash)
+    return pwd_context.verify_and_update(password, password_hash)
   except Exception:
-    return password == password_hash
+    # 哈希格式损坏 / bcrypt 后端不可用
+    return False, None
+
+
+def verify_password(password: str, password_hash: str | None) -> bool:
+  """校验密码（不关心是否需要重算哈希）。"""
+  return verify_and_update_password(password, password_hash)[0]
+
+
+def dummy_verify() -> None:
+  """用户不存在时也消耗一次校验的耗时，避免按响应时间枚举用户名。"""
+  pwd_context.dummy_verify()
+
+
+async def hash_password_async(password: str) -> str:
+  """hash_password in the password-hash pool (keeps the event loop free)."""
+  return await _offload(hash_password, password)
+
+
+async def verify_and_update_password_async(password: str, password_hash: str | None) -> Tuple[bool, Optional[str]]:
+  return await _offload(verify_and_update_password, password, password_hash)
+
+
+async def dummy_verify_async() -> None:
+  await _offload(dummy_verify)
 
 
 def create_access_token(subject: str | int) -> str:
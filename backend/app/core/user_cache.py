@@ -0,0 +1,101 @@
+"""
+Short-TTL cache of authenticated users (identity columns only).
+
+The auth dependencies used to SELECT the whole users row on every authenticated
+request, including list / history polling the frontend repeats every few seconds.
+app.core.dependencies now looks the token's user id up here first:
+
+- hit: IDENTITY_COLUMNS come from memory and the User is attached to the request
+  session without a query. Counters, password_hash and last_login stay unloaded and
+  are fetched fresh (one SELECT) only if the endpoint touches them, so `+= 1`
+  updates never start from a cached value.
+- miss: the row is loaded as before and its identity columns are kept for
+  USER_CACHE_TTL_SECONDS (USER_CACHE_MAX_ENTRIES users, least recently used evicted).
+
+routes/auth.py invalidates an entry after profile, password and account changes;
+other worker processes pick such changes up within one TTL. A TTL of 0 disables
+the cache.
+"""
+from __future__ import annotations
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Any
+
+from sqlalchemy.orm import make_transient_to_detached
+
+from app.core.config import settings
+from app.models.user import User
+
+IDENTITY_COLUMNS = ("id", "username", "email", "avatar", "personal_profile", "created_at")
+
+_lock = threading.Lock()
+_entries: OrderedDict[int, tuple[float, dict[str, Any]]] = OrderedDict()  # user_id -> (expires_at, columns)
+_generation = 0
+_counters = {"hits": 0, "misses": 0, "invalidations": 0}
+
+
+def enabled() -> bool:
+    return int(settings.USER_CACHE_TTL_SECONDS) > 0
+
+
+def generation() -> int:
+    """Read before loading a row on a miss and pass to put(): a put racing an invalidate is dropped."""
+    return _generation
+
+
+def get(user_id: int) -> dict[str, Any] | None:
+    if not enabled():
+        return None
+    now = time.monotonic()
+    with _lock:
+        entry = _entries.get(int(user_id))
+        if entry is None or entry[0] <= now:
+            if entry is not None:
+                del _entries[int(user_id)]
+            _counters["misses"] += 1
+            return None
+        _entries.move_to_end(int(user_id))
+        _counters["hits"] += 1
+        return entry[1]
+
+
+def put(user: User, seen_generation: int) -> None:
+    if not enabled():
+        return
+    columns = {name: getattr(user, name) for name in IDENTITY_COLUMNS}
+    with _lock:
+        if seen_generation != _generation:
+            return
+        _entries[int(user.id)] = (time.monotonic() + int(settings.USER_CACHE_TTL_SECONDS), columns)
+        _entries.move_to_end(int(user.id))
+        while len(_entries) > max(1, int(settings.USER_CACHE_MAX_ENTRIES)):
+            _entries.popitem(last=False)
+
+
+def invalidate(user_id: int) -> None:
+    global _generation
+    with _lock:
+        _generation += 1
+        _entries.pop(int(user_id), None)
+        _counters["invalidations"] += 1
+
+
+def clear() -> None:
+    global _generation
+    with _lock:
+        _generation += 1
+        _entries.clear()
+
+
+def detached_user(columns: dict[str, Any]) -> User:
+    """A detached User carrying only the cached columns (the rest load lazily once attached)."""
+    user = User(**columns)
+    make_transient_to_detached(user)
+    return user
+
+
+def stats() -> dict[str, int]:
+    with _lock:
+        return {"entries": len(_entries), **_counters}
@@ -14,3 +14,6 @@ from app.models.user_follower import UserFollower  # noqa: E402,F401
 from app.models.work_play_log import WorkPlayLog  # noqa: E402,F401
 from app.models.work_popularity_snapshot import WorkPopularitySnapshot  # noqa: E402,F401
 from app.models.creator_recommendation import CreatorRecommendation  # noqa: E402,F401
+from app.models.audio_blob import AudioBlob  # noqa: E402,F401
+from app.models.llm_response_cache import LlmResponseCache  # noqa: E402,F401
+from app.models.image_asset import ImageAsset  # noqa: E402,F401
@@ -0,0 +1,153 @@
+"""
+Connection-pool and slow-query instrumentation.
+
+`instrument(engine, name)` keeps, per engine:
+  - a checked-out gauge (current / peak) from the pool checkout / checkin events,
+  - a checkout wait-time histogram, recorded by the Timed* pool classes that
+    app.db.session uses for MySQL / PostgreSQL (waits only happen in QueuePool),
+    plus the number of checkouts that hit DB_POOL_TIMEOUT_SECONDS,
+  - a slow-query log: statements slower than DB_SLOW_QUERY_MS are printed.
+
+`snapshot()` returns everything for GET /health/db-pool. When requests stall, a
+gauge stuck at pool_size + max_overflow with a growing wait tail means the pool
+is exhausted; long waits with a low gauge point at the database instead.
+"""
+from __future__ import annotations
+
+import bisect
+import threading
+import time
+import weakref
+from dataclasses import dataclass, field
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+
+from app.core.config import settings
+
+# 等待时间直方图上界（毫秒），最后一个桶为 +Inf
+WAIT_BUCKETS_MS = (1, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+
+@dataclass
+class PoolStats:
+    name: str
+    checked_out: int = 0
+    peak_checked_out: int = 0
+    checkouts: int = 0
+    timeouts: int = 0
+    wait_count: int = 0
+    wait_seconds_total: float = 0.0
+    wait_seconds_max: float = 0.0
+    wait_buckets: list[int] = field(default_factory=lambda: [0] * (len(WAIT_BUCKETS_MS) + 1))
+    slow_queries: int = 0
+    lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
+
+    def observe_wait(self, seconds: float, *, timed_out: bool = False) -> None:
+        with self.lock:
+            self.wait_count += 1
+            self.wait_seconds_total += seconds
+            self.wait_seconds_max = max(self.wait_seconds_max, seconds)
+            self.wait_buckets[bisect.bisect_left(WAIT_BUCKETS_MS, seconds * 1000)] += 1
+            if timed_out:
+                self.timeouts += 1
+
+
+_stats: dict[str, PoolStats] = {}
+_stats_guard = threading.Lock()
+_instrumented: "weakref.WeakSet[Engine]" = weakref.WeakSet()
+
+
+def get_stats(name: str) -> PoolStats:
+    with _stats_guard:
+        return _stats.setdefault(name, PoolStats(name=name))
+
+
+class _TimedCheckout:
+    """Pool mixin timing how long a checkout waits for a free connection."""
+
+    stats_name = "sync"
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            conn = super()._do_get()
+        except PoolTimeoutError:
+            get_stats(self.stats_name).observe_wait(time.perf_counter() - started, timed_out=True)
+            raise
+        get_stats(self.stats_name).observe_wait(time.perf_counter() - started)
+        return conn
+
+
+class TimedQueuePool(_TimedCheckout, QueuePool):
+    stats_name = "sync"
+
+
+class TimedAsyncAdaptedQueuePool(_TimedCheckout, AsyncAdaptedQueuePool):
+    stats_name = "async"
+
+
+def instrument(engine: Engine, name: str) -> None:
+    """Attach the gauge / slow-query listeners to `engine` (the sync_engine of an AsyncEngine)."""
+    stats = get_stats(name)
+    if engine in _instrumented:
+        return
+    _instrumented.add(engine)
+
+    @event.listens_for(engine, "checkout")
+    def _on_checkout(dbapi_conn, record, proxy) -> None:
+        with stats.lock:
+            stats.checkouts += 1
+            stats.checked_out += 1
+            stats.peak_checked_out = max(stats.peak_checked_out, stats.checked_out)
+
+    @event.listens_for(engine, "checkin")
+    def _on_checkin(dbapi_conn, record) -> None:
+        with stats.lock:
+            stats.checked_out = max(0, stats.checked_out - 1)
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before(conn, cursor, statement, parameters, context, executemany) -> None:
+        conn.info.setdefault("pool_stats_started", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after(conn, cursor, statement, parameters, context, executemany) -> None:
+        started = conn.info.get("pool_stats_started")
+        if not started:
+            return
+        elapsed_ms = (time.perf_counter() - started.pop()) * 1000
+        threshold = int(settings.DB_SLOW_QUERY_MS)
+        if threshold > 0 and elapsed_ms >= threshold:
+            with stats.lock:
+                stats.slow_queries += 1
+            sql = " ".join(statement.split())
+            print(f"[db] slow query engine={name} {elapsed_ms:.0f}ms: {sql[:300]}")
+
+
+def snapshot() -> list[dict]:
+    """Current numbers of every instrumented engine (JSON-friendly)."""
+    with _stats_guard:
+        items = list(_stats.values())
+    result = []
+    for stats in items:
+        with stats.lock:
+            result.append(
+                {
+                    "name": stats.name,
+                    "checked_out": stats.checked_out,
+                    "peak_checked_out": stats.peak_checked_out,
+                    "checkouts": stats.checkouts,
+                    "timeouts": stats.timeouts,
+                    "wait_count": stats.wait_count,
+                    "wait_ms_avg": round(stats.wait_seconds_total * 1000 / stats.wait_count, 3) if stats.wait_count else 0.0,
+                    "wait_ms_max": round(stats.wait_seconds_max * 1000, 3),
+                    "wait_buckets_ms": {
+                        **{str(bound): count for bound, count in zip(WAIT_BUCKETS_MS, stats.wait_buckets)},
+                        "+Inf": stats.wait_buckets[-1],
+                    },
+                    "slow_queries": stats.slow_queries,
+                }
+            )
+    return result
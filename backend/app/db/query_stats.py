@@ -0,0 +1,84 @@
+"""
+Per-request SQL statement accounting.
+
+`install()` hooks every SQLAlchemy Engine once; statements executed while a
+`track()` block is active (in this context, including threadpool calls started
+from it) are counted and timed into its `QueryStats`.
+
+Used by the debug middleware (app.core.query_debug) and by
+scripts/check_query_budget.py, which asserts a maximum number of statements per
+endpoint so N+1 lazy loads show up as budget failures.
+"""
+from __future__ import annotations
+
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Iterator
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+_current: ContextVar["QueryStats | None"] = ContextVar("query_stats", default=None)
+_installed = False
+
+
+@dataclass
+class QueryStats:
+    count: int = 0
+    seconds: float = 0.0
+    capture: bool = False
+    statements: list[str] = field(default_factory=list)
+
+
+class QueryBudgetExceeded(AssertionError):
+    pass
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany) -> None:
+    if _current.get() is not None:
+        conn.info.setdefault("query_stats_started", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany) -> None:
+    stats = _current.get()
+    if stats is None:
+        return
+    started = conn.info.get("query_stats_started")
+    if started:
+        stats.seconds += time.perf_counter() - started.pop()
+    stats.count += 1
+    if stats.capture:
+        stats.statements.append(statement)
+
+
+def install() -> None:
+    """Register the Engine-wide listeners (idempotent)."""
+    global _installed
+    if _installed:
+        return
+    event.listen(Engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(Engine, "after_cursor_execute", _after_cursor_execute)
+    _installed = True
+
+
+@contextmanager
+def track(*, capture: bool = False) -> Iterator[QueryStats]:
+    install()
+    stats = QueryStats(capture=capture)
+    token = _current.set(stats)
+    try:
+        yield stats
+    finally:
+        _current.reset(token)
+
+
+@contextmanager
+def query_budget(max_queries: int, label: str = "") -> Iterator[QueryStats]:
+    """Fail with QueryBudgetExceeded when the block runs more than `max_queries` statements."""
+    with track(capture=True) as stats:
+        yield stats
+    if stats.count > max_queries:
+        listing = "\n".join(f"  {i + 1}. {sql.strip().splitlines()[0]}" for i, sql in enumerate(stats.statements))
+        raise QueryBudgetExceeded(f"{label or 'block'} ran {stats.count} queries (budget {max_queries}):\n{listing}")
@@ -1,12 +1,96 @@
+from contextlib import contextmanager
+from typing import Iterator
+
 from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.orm import Session, sessionmaker
 
 from app.core.config import settings
+from app.db import pool_stats
+
+# 同步驱动 -> 异步驱动
+_ASYNC_DRIVERS = {
+    "mysql": "mysql+aiomysql",
+    "sqlite": "sqlite+aiosqlite",
+    "postgresql": "postgresql+asyncpg",
+}
+
+
+def async_database_url(url: str) -> str:
+    """Async-driver URL for a sync DATABASE_URL (mysql+pymysql://... -> mysql+aiomysql://...)."""
+    parsed = make_url(url)
+    async_driver = _ASYNC_DRIVERS.get(parsed.get_backend_name())
+    if async_driver is None:
+        raise ValueError(f"no async driver known for {parsed.drivername}")
+    return parsed.set(drivername=async_driver).render_as_string(hide_password=False)
+
+
+def engine_options(url: str, *, asyncio: bool = False) -> dict:
+    """
+    Pool options shared by the sync and async engines (SQLite keeps SQLAlchemy's defaults).
+    MySQL / PostgreSQL pools time their checkouts for app.db.pool_stats.
+    """
+    options = {"pool_pre_ping": True}
+    if make_url(url).get_backend_name() != "sqlite":
+        options.update(
+            poolclass=pool_stats.TimedAsyncAdaptedQueuePool if asyncio else pool_stats.TimedQueuePool,
+            pool_size=settings.DB_POOL_SIZE,
+            max_overflow=settings.DB_MAX_OVERFLOW,
+            pool_timeout=settings.DB_POOL_TIMEOUT_SECONDS,
+            pool_recycle=settings.DB_POOL_RECYCLE_SECONDS,
+        )
+    return options
+
 
 engine = create_engine(
     settings.DATABASE_URL,
-    pool_pre_ping=True,
-    pool_recycle=3600,
+    **engine_options(settings.DATABASE_URL),
 ) if settings.DATABASE_URL else None
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine) if engine else None
+
+if engine is not None:
+    pool_stats.instrument(engine, "sync")
+
+
+@contextmanager
+def session_scope() -> Iterator[Session]:
+    """
+    Short-lived session for background jobs: commit on success, roll back on error, always
+    close. Open one around each DB phase instead of holding a session (and its pooled
+    connection) across minutes of generation / inference.
+    """
+    if SessionLocal is None:
+        raise RuntimeError("Database is not configured. Set DATABASE_URL in environment variables.")
+    db = SessionLocal()
+    try:
+        yield db
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+
+def _create_async_engine():
+    url = settings.ASYNC_DATABASE_URL or (async_database_url(settings.DATABASE_URL) if settings.DATABASE_URL else None)
+    if not url:
+        return None
+    try:
+        return create_async_engine(url, **engine_options(url, asyncio=True))
+    except (ImportError, ValueError) as exc:
+        # 未安装异步驱动（aiomysql / aiosqlite）时仅依赖 AsyncSession 的接口不可用
+        print(f"[db] async engine disabled: {exc}")
+        return None
+
+
+async_engine = _create_async_engine()
+if async_engine is not None:
+    pool_stats.instrument(async_engine.sync_engine, "async")
+
+# expire_on_commit=False：提交后仍可读取已加载属性，避免异步上下文中的隐式懒加载
+AsyncSessionLocal = (
+    async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False) if async_engine else None
+)
@@ -1,12 +1,58 @@
+from contextlib import asynccontextmanager
 from pathlib import Path
 
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.staticfiles import StaticFiles
 
 from app.api.router import api_router
 from app.core.config import settings
 from app.core.logging import configure_logging
+from app.core.pagination import NEXT_CURSOR_HEADER
+from app.core.query_debug import QueryDebugMiddleware
+from app.core.media_files import MediaFiles
+from app.services import (
+    creator_recommendations,
+    llm_cache,
+    llm_client,
+    model_lifecycle,
+    play_buffer,
+    popularity,
+    scheduler,
+)
+
+
+def _media_files(directory: Path) -> MediaFiles:
+    return MediaFiles(
+        directory=directory,
+        immutable_max_age=settings.MEDIA_IMMUTABLE_MAX_AGE_SECONDS,
+        sendfile=settings.MEDIA_SENDFILE_ENABLED,
+    )
+
+
+def _periodic_jobs() -> list:
+    """Background refreshers (interval <= 0 disables the in-process loop)."""
+    return [
+        ("popularity", settings.POPULARITY_REFRESH_SECONDS, popularity.refresh_all),
+        ("creator_recommendations", settings.CREATOR_RECO_REFRESH_SECONDS, creator_recommendations.refresh_all),
+        ("llm_cache_purge", settings.LLM_CACHE_PURGE_SECONDS, llm_cache.purge_expired),
+    ]
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    jobs = scheduler.start_jobs(_periodic_jobs())
+    plays = play_buffer.start()
+    # 后台并发预加载 + 预热模型（MODEL_PRELOAD），完成前 /health/ready 返回 503
+    preload = model_lifecycle.start()
+    try:
+        yield
+    finally:
+        # 先停播放缓冲（最后一次 flush），再停周期任务
+        await play_buffer.stop(plays)
+        await scheduler.stop_jobs(jobs)
+        await llm_client.aclose()
+        if preload is not None and not preload.done():
+            preload.cancel()
 
 
 def create_app() -> FastAPI:
@@ -20,6 +66,7 @@ def create_app() -> FastAPI:
         docs_url=f"{settings.API_PREFIX}/docs",
         redoc_url=f"{settings.API_PREFIX}/redoc",
         openapi_url=f"{settings.API_PREFIX}/openapi.json",
+        lifespan=lifespan,
     )
 
     # Allow frontend (e.g., localhost:3000/5173) to call APIs during development.
@@ -29,19 +76,23 @@ def create_app() -> FastAPI:
         allow_credentials=True,
         allow_methods=["*"],
         allow_headers=["*"],
+        expose_headers=[NEXT_CURSOR_HEADER],
     )
 
+    if settings.QUERY_DEBUG_ENABLED:
+        app.add_middleware(QueryDebugMiddleware, warn_count=settings.QUERY_DEBUG_WARN_COUNT)
+
     app.include_router(api_router, prefix=settings.API_PREFIX)
 
-    # Serve uploaded files for quick dev access
+    # Serve uploaded files (Range/ETag/Cache-Control aware, see app.core.media_files)
     media_dir = Path(settings.MEDIA_ROOT)
     media_dir.mkdir(parents=True, exist_ok=True)
-    app.mount("/media", StaticFiles(directory=media_dir), name="media")
-    app.mount("/uploads", StaticFiles(directory=media_dir), name="uploads")  # 兼容旧路径
+    app.mount("/media", _media_files(media_dir), name="media")
+    app.mount("/uploads", _media_files(media_dir), name="uploads")  # 兼容旧路径
 
     static_dir = Path(settings.STATIC_ROOT)
     static_dir.mkdir(parents=True, exist_ok=True)
-    app.mount("/static", StaticFiles(directory=static_dir), name="static")
+    app.mount("/static", _media_files(static_dir), name="static")
 
     return app
 
@@ -14,6 +14,9 @@ from app.models.user_follower import UserFollower
 from app.models.work_play_log import WorkPlayLog
 from app.models.work_popularity_snapshot import WorkPopularitySnapshot
 from app.models.creator_recommendation import CreatorRecommendation
+from app.models.audio_blob import AudioBlob
+from app.models.llm_response_cache import LlmResponseCache
+from app.models.image_asset import ImageAsset
 
 __all__ = [
     "TaskRecord",
@@ -30,4 +33,7 @@ __all__ = [
     "WorkPlayLog",
     "WorkPopularitySnapshot",
     "CreatorRecommendation",
+    "AudioBlob",
+    "LlmResponseCache",
+    "ImageAsset",
 ]
@@ -0,0 +1,20 @@
+from datetime import datetime
+
+from sqlalchemy import Column, DateTime, Integer, String
+
+from app.db.base_class import Base
+
+
+class AudioBlob(Base):
+  """Content-addressed stored file (sha256); music_files rows reference it with a ref count."""
+
+  __tablename__ = "audio_blobs"
+
+  id = Column(Integer, primary_key=True, autoincrement=True)
+  sha256 = Column(String(64), nullable=False, unique=True, index=True)
+  size_bytes = Column(Integer, nullable=True)
+  content_type = Column(String(100), nullable=True)
+  # oss://blobs/sha256/ab/cd/<sha256><ext>，未启用 OSS 时为本地路径
+  storage_path = Column(String(500), nullable=False)
+  ref_count = Column(Integer, nullable=False, default=0)
+  created_at = Column(DateTime, nullable=False, default=datetime.utcnow)
@@ -1,6 +1,6 @@
 from datetime import datetime
 
-from sqlalchemy import Boolean, Column, DateTime, ForeignKey, Integer, String
+from sqlalchemy import Boolean, Column, DateTime, ForeignKey, Index, Integer, String
 from sqlalchemy.orm import relationship
 
 from app.db.base_class import Base
@@ -8,6 +8,10 @@ from app.db.base_class import Base
 
 class Dialogue(Base):
   __tablename__ = "dialogues"
+  __table_args__ = (
+      # 历史列表按 updated_at 倒序 keyset 分页
+      Index("ix_dialogues_user_updated", "user_id", "updated_at", "id"),
+  )
 
   id = Column(Integer, primary_key=True, autoincrement=True)
   user_id = Column(ForeignKey("users.id"), nullable=False, index=True)
@@ -1,13 +1,16 @@
 from datetime import datetime
 
-from sqlalchemy import Column, DateTime, ForeignKey, Integer, JSON, Numeric, String, Text
-from sqlalchemy.orm import relationship
+from sqlalchemy import Column, DateTime, ForeignKey, Index, Integer, JSON, Numeric, String, Text
+from sqlalchemy.orm import deferred, relationship
 
 from app.db.base_class import Base
 
 
 class EmotionAnalysis(Base):
   __tablename__ = "emotion_analysis"
+  __table_args__ = (
+      Index("ix_emotion_analysis_user_created", "user_id", "created_at", "id"),
+  )
 
   id = Column(Integer, primary_key=True, autoincrement=True)
   music_file_id = Column(ForeignKey("music_files.id"), nullable=False, index=True)
@@ -15,7 +18,8 @@ class EmotionAnalysis(Base):
   main_emotion = Column(String(50), nullable=True)
   emotion_intensity = Column(Numeric(5, 2), nullable=True)
   arousal_level = Column(Numeric(5, 2), nullable=True)
-  raw_result = Column(JSON, nullable=True)
+  # 完整分析结果体积较大，列表查询不加载；需要时访问属性或 undefer()
+  raw_result = deferred(Column(JSON, nullable=True))
   report_path = Column(String(500), nullable=True)
   created_at = Column(DateTime, nullable=False, default=datetime.utcnow)
 
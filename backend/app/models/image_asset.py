@@ -0,0 +1,23 @@
+from datetime import datetime
+
+from sqlalchemy import Column, DateTime, Integer, String
+
+from app.db.base_class import Base
+
+
+class ImageAsset(Base):
+  """Content-addressed cover / avatar image with WebP renditions (see app.services.image_renditions)."""
+
+  __tablename__ = "image_assets"
+
+  id = Column(Integer, primary_key=True, autoincrement=True)
+  sha256 = Column(String(64), nullable=False, unique=True, index=True)
+  # 64 位差值哈希（dHash，16 位十六进制），相同画面的重复封面据此复用已有文件
+  phash = Column(String(16), nullable=False, index=True)
+  # 解码后像素（含尺寸与模式）的 sha256：dHash 命中后据此确认确实是同一张图
+  pixel_sha256 = Column(String(64), nullable=True)
+  width = Column(Integer, nullable=True)
+  height = Column(Integer, nullable=True)
+  # 原图：oss://images/sha256/ab/cd/<sha256><ext>，未启用 OSS 时为 /static/images/...
+  storage_path = Column(String(500), nullable=False)
+  created_at = Column(DateTime, nullable=False, default=datetime.utcnow)
@@ -1,6 +1,6 @@
 from datetime import datetime
 
-from sqlalchemy import Column, DateTime, ForeignKey, Integer, UniqueConstraint
+from sqlalchemy import Column, DateTime, ForeignKey, Index, Integer, UniqueConstraint
 from sqlalchemy.orm import relationship
 
 from app.db.base_class import Base
@@ -10,6 +10,7 @@ class LikeRecord(Base):
   __tablename__ = "like_records"
   __table_args__ = (
       UniqueConstraint("user_id", "work_id", name="uq_user_work_like"),
+      Index("ix_like_records_user_created", "user_id", "created_at", "id"),
   )
 
   id = Column(Integer, primary_key=True, autoincrement=True)
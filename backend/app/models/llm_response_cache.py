@@ -0,0 +1,21 @@
+from datetime import datetime
+
+from sqlalchemy import Column, DateTime, Integer, String, Text
+
+from app.db.base_class import Base
+
+
+class LlmResponseCache(Base):
+  """Persistent tier of app.services.llm_cache: one successful LLM response per cache key."""
+
+  __tablename__ = "llm_response_cache"
+
+  id = Column(Integer, primary_key=True, autoincrement=True)
+  # sha256(函数名 + 模型 + 参数 + 归一化后的 messages)
+  cache_key = Column(String(64), nullable=False, unique=True, index=True)
+  function = Column(String(64), nullable=False)
+  model = Column(String(128), nullable=False)
+  response = Column(Text, nullable=False)
+  hits = Column(Integer, nullable=False, default=0)
+  created_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+  expires_at = Column(DateTime, nullable=False, index=True)
@@ -12,6 +12,8 @@ class MusicFile(Base):
   id = Column(Integer, primary_key=True, autoincrement=True)
   user_id = Column(ForeignKey("users.id"), nullable=False, index=True)
   dialogue_id = Column(ForeignKey("dialogues.id"), nullable=True, index=True)
+  # 上传音频按内容去重：指向共享的 audio_blobs 记录（旧数据/生成音频为空）
+  blob_id = Column(ForeignKey("audio_blobs.id"), nullable=True, index=True)
   file_name = Column(String(255), nullable=False)
   storage_path = Column(String(500), nullable=False)
   # 相对路径形式的专辑封面图片（如 "/static/covers/xxx.png"）
@@ -24,6 +26,7 @@ class MusicFile(Base):
 
   user = relationship("User", back_populates="music_files")
   dialogue = relationship("Dialogue", back_populates="music_files")
+  blob = relationship("AudioBlob")
   analysis = relationship("EmotionAnalysis", back_populates="music_file", uselist=False)
   messages = relationship("DialogueMessage", back_populates="music_file")
   work = relationship("Work", back_populates="music_file", uselist=False)
@@ -1,6 +1,6 @@
 from datetime import datetime
 
-from sqlalchemy import Column, DateTime, Enum, ForeignKey, JSON, String, Text
+from sqlalchemy import Column, DateTime, Enum, ForeignKey, Index, JSON, String, Text
 from sqlalchemy.orm import relationship
 
 from app.db.base_class import Base
@@ -9,6 +9,9 @@ from app.schemas.tasks import TaskStatus, TaskType
 
 class TaskRecord(Base):
   __tablename__ = "tasks"
+  __table_args__ = (
+      Index("ix_tasks_user_created", "user_id", "created_at", "id"),
+  )
 
   id = Column(String(36), primary_key=True)  # UUID str
   user_id = Column(ForeignKey("users.id"), nullable=True, index=True)
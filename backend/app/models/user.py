@@ -1,6 +1,6 @@
 from datetime import datetime
 
-from sqlalchemy import Column, DateTime, Integer, String, Text
+from sqlalchemy import Column, DateTime, Index, Integer, String, Text
 from sqlalchemy.orm import relationship
 
 from app.db.base_class import Base
@@ -35,3 +35,13 @@ class User(Base):
   likes = relationship("LikeRecord", back_populates="user")
   following = relationship("UserFollower", foreign_keys="UserFollower.follower_id", back_populates="follower")
   followers = relationship("UserFollower", foreign_keys="UserFollower.following_id", back_populates="following")
+
+
+# 搜索用全文索引（MySQL InnoDB + ngram 分词，支持中文），见 routes/search.py
+Index(
+    "ft_users_search",
+    User.username,
+    User.personal_profile,
+    mysql_prefix="FULLTEXT",
+    mysql_with_parser="ngram",
+)
@@ -1,6 +1,6 @@
 from datetime import datetime
 
-from sqlalchemy import Column, DateTime, ForeignKey, Integer, UniqueConstraint
+from sqlalchemy import Column, DateTime, ForeignKey, Index, Integer, UniqueConstraint
 from sqlalchemy.orm import relationship
 
 from app.db.base_class import Base
@@ -10,6 +10,8 @@ class UserFollower(Base):
   __tablename__ = "user_followers"
   __table_args__ = (
       UniqueConstraint("follower_id", "following_id", name="uq_follow_pair"),
+      Index("ix_user_followers_following_created", "following_id", "created_at", "id"),
+      Index("ix_user_followers_follower_created", "follower_id", "created_at", "id"),
   )
 
   id = Column(Integer, primary_key=True, autoincrement=True)
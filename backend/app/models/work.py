@@ -1,7 +1,7 @@
 from datetime import datetime
 from enum import Enum
 
-from sqlalchemy import Column, DateTime, Enum as SAEnum, ForeignKey, Integer, String, Text
+from sqlalchemy import Column, DateTime, Enum as SAEnum, ForeignKey, Index, Integer, String, Text
 from sqlalchemy.orm import relationship
 
 from app.db.base_class import Base
@@ -20,6 +20,11 @@ class WorkVisibility(str, Enum):
 
 class Work(Base):
   __tablename__ = "works"
+  __table_args__ = (
+      # 列表 keyset 分页：我的作品 / 某用户的公开作品
+      Index("ix_works_user_created", "user_id", "created_at", "id"),
+      Index("ix_works_user_public_created", "user_id", "status", "visibility", "created_at", "id"),
+  )
 
   id = Column(Integer, primary_key=True, autoincrement=True)
   user_id = Column(ForeignKey("users.id"), nullable=False, index=True)
@@ -40,3 +45,14 @@ class Work(Base):
   user = relationship("User", back_populates="works")
   music_file = relationship("MusicFile", back_populates="work")
   likes = relationship("LikeRecord", back_populates="work", cascade="all, delete-orphan")
+
+
+# 搜索用全文索引（MySQL InnoDB + ngram 分词，支持中文），见 routes/search.py
+Index(
+    "ft_works_search",
+    Work.title,
+    Work.tags,
+    Work.description,
+    mysql_prefix="FULLTEXT",
+    mysql_with_parser="ngram",
+)
@@ -6,4 +6,51 @@ class HealthCheckResponse(BaseModel):
     remote_inference_url: str | None = None
     songgen_remote_url: str | None = None
     oss_enabled: bool | None = None
+    # 预加载模型（MODEL_PRELOAD）是否已全部预热完成；未配置时为 true
+    ready: bool | None = None
 
+
+class ModelReadiness(BaseModel):
+    name: str
+    state: str
+    seconds: float | None = None
+    error: str | None = None
+
+
+class ReadinessResponse(BaseModel):
+    ready: bool
+    models: list[ModelReadiness]
+
+
+class OssCacheStats(BaseModel):
+    directory: str
+    entries: int
+    bytes: int
+    max_bytes: int
+    hits: int
+    misses: int
+    evictions: int
+    fill_errors: int
+    hit_ratio: float
+
+
+class DbPoolEngineStats(BaseModel):
+    name: str
+    checked_out: int
+    peak_checked_out: int
+    checkouts: int
+    timeouts: int
+    wait_count: int
+    wait_ms_avg: float
+    wait_ms_max: float
+    # 非累积计数：键为桶上界（毫秒），"+Inf" 为超过最大桶
+    wait_buckets_ms: dict[str, int]
+    slow_queries: int
+
+
+class DbPoolStats(BaseModel):
+    pool_size: int
+    max_overflow: int
+    pool_timeout_seconds: int
+    slow_query_ms: int
+    engines: list[DbPoolEngineStats]
@@ -21,6 +21,7 @@ class HistoryItem(BaseModel):
 class HistoryListResponse(BaseModel):
   total: int
   items: List[HistoryItem]
+  next_cursor: Optional[str] = None  # 传给下一次请求的 cursor；为空表示没有更多
 
 
 class DialogueMessageItem(BaseModel):
@@ -35,6 +36,7 @@ class DialogueMessageItem(BaseModel):
   duration_seconds: Optional[int] = None
   file_name: Optional[str] = None
   cover_url: Optional[str] = None
+  cover_thumb_url: Optional[str] = None
 
 
 class DialogueHistoryResponse(BaseModel):
@@ -7,6 +7,7 @@ class SongSearchResult(BaseModel):
   id: int
   title: str
   cover_url: Optional[str] = None
+  cover_thumb_url: Optional[str] = None
   # 用于前端直接播放（/static/... 或 OSS/直链）
   audio_url: Optional[str] = None
   like_count: int = 0
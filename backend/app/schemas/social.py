@@ -1,6 +1,6 @@
 from typing import Optional
 
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 
 
 class ToggleResponse(BaseModel):
@@ -10,3 +10,26 @@ class ToggleResponse(BaseModel):
 
 class SimpleMessage(BaseModel):
   message: str
+
+
+class BulkLikeRequest(BaseModel):
+  work_ids: list[int] = Field(..., min_length=1, max_length=100, description="作品 ID 列表，最多 100 个")
+  liked: bool = Field(True, description="true 点赞，false 取消点赞")
+
+
+class BulkFollowRequest(BaseModel):
+  user_ids: list[int] = Field(..., min_length=1, max_length=100, description="用户 ID 列表，最多 100 个")
+  followed: bool = Field(True, description="true 关注，false 取消关注")
+
+
+class BulkToggleItem(BaseModel):
+  id: int
+  liked: Optional[bool] = None
+  followed: Optional[bool] = None
+  changed: bool = False
+  error: Optional[str] = None
+
+
+class BulkToggleResponse(BaseModel):
+  items: list[BulkToggleItem]
+  changed: int = 0
@@ -14,6 +14,9 @@ class UploadPolicy(BaseModel):
     max_size_mb: int
     accepted_types: List[str]
     max_duration_seconds: Optional[int] = None
+    # 头像 / 封面图片上传
+    max_image_size_mb: Optional[int] = None
+    accepted_image_types: List[str] = Field(default_factory=list)
 
 
 class ClientConfig(BaseModel):
@@ -28,6 +31,7 @@ class HotSongItem(BaseModel):
     title: str
     author_name: Optional[str] = None
     cover_url: Optional[str] = None
+    cover_thumb_url: Optional[str] = None
     audio_url: Optional[str] = None
     like_count: int = 0
     play_count: int = 0
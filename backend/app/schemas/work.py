@@ -38,6 +38,8 @@ class WorkResponse(BaseModel):
   visibility: str
   mood: Optional[str] = None
   cover_url: Optional[str] = None
+  # 列表用 WebP 缩略图（COVER_LIST_SIZE），旧封面为原图
+  cover_thumb_url: Optional[str] = None
   like_count: int
   play_count: int
   audio_url: Optional[str] = None
@@ -0,0 +1,205 @@
+"""
+Content-addressed storage for uploaded audio.
+
+Identical uploads share one stored object keyed by the sha256 of their bytes:
+  local: {MEDIA_ROOT}/blobs/sha256/ab/cd/<sha256><ext>
+  OSS:   blobs/sha256/ab/cd/<sha256><ext>
+`audio_blobs.ref_count` tracks how many music_files rows point at a blob; the stored
+objects are removed only once the last reference is released.
+
+Releasing the last reference leaves the row at ref_count 0. delete_blob_objects then
+removes the stored objects and the row in one transaction: it deletes the row only if
+ref_count is still 0, and the files before that delete commits. If acquire_blob
+re-references the same sha256 concurrently, it either commits its increment first (the
+delete matches nothing and the files stay) or waits on the deleted row's lock and then
+stores the upload as a new blob. A crash in between leaves a ref_count 0 row with its
+files, which the next upload of those bytes simply reuses.
+"""
+from __future__ import annotations
+
+import os
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Optional
+
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.db.session import SessionLocal
+from app.models.audio_blob import AudioBlob
+from app.services.file_cleanup import delete_file_best_effort
+from app.services.oss_storage import OSSStorage, decode_oss_path, encode_oss_path
+
+BLOB_PREFIX = "blobs/sha256"
+# 不经 audio_blobs 引用计数的上传（如情绪分析输入），与 blobs/ 分开存放，不会被 release_blob 删除
+UNTRACKED_PREFIX = "analyze/sha256"
+
+
+@dataclass
+class BlobDeletion:
+    """Storage objects to remove (after commit) once a blob has no references left."""
+
+    blob_id: int
+    oss_key: Optional[str]
+    local_path: Optional[Path]
+
+
+def blob_relpath(digest: str, ext: str | None = None, *, prefix: str = BLOB_PREFIX) -> str:
+    """blobs/sha256/ab/cd/<sha256><ext> — shared by the local layout and the OSS key."""
+    suffix = (ext or "").lower()
+    return f"{prefix}/{digest[:2]}/{digest[2:4]}/{digest}{suffix}"
+
+
+def local_blob_path(digest: str, ext: str | None = None) -> Path:
+    return Path(settings.MEDIA_ROOT) / blob_relpath(digest, ext)
+
+
+def blob_local_path(blob: AudioBlob) -> Path:
+    """Local copy of a blob (same relative layout as its OSS key)."""
+    key = decode_oss_path(blob.storage_path)
+    if key:
+        return Path(settings.MEDIA_ROOT) / key
+    return Path(blob.storage_path)
+
+
+def _move_into_place(src_path: Path, dest: Path) -> Path:
+    """Rename a fully written temp file to its content-addressed path (drop it if already present)."""
+    if dest.is_file():
+        delete_file_best_effort(src_path)
+        return dest
+    dest.parent.mkdir(parents=True, exist_ok=True)
+    os.replace(src_path, dest)
+    return dest
+
+
+def _place_local_blob(src_path: Path, digest: str, ext: str | None = None) -> Path:
+    return _move_into_place(src_path, local_blob_path(digest, ext))
+
+
+def place_untracked_upload(src_path: Path, digest: str, ext: str | None = None) -> Path:
+    """
+    Move an ingested upload to {MEDIA_ROOT}/analyze/sha256/.. (deduplicated by content, no
+    audio_blobs row). Files under blobs/ may be deleted once their row is released, so
+    uploads that do not take a reference must not live there.
+    """
+    return _move_into_place(src_path, Path(settings.MEDIA_ROOT) / blob_relpath(digest, ext, prefix=UNTRACKED_PREFIX))
+
+
+def _increment_ref(db: Session, blob_id: int) -> bool:
+    updated = (
+        db.query(AudioBlob)
+        .filter(AudioBlob.id == blob_id)
+        .update({AudioBlob.ref_count: AudioBlob.ref_count + 1}, synchronize_session=False)
+    )
+    return bool(updated)
+
+
+def acquire_blob(
+    db: Session,
+    *,
+    src_path: Path,
+    digest: str,
+    size_bytes: int,
+    ext: str | None,
+    content_type: str | None,
+) -> tuple[AudioBlob, Path]:
+    """
+    Store an ingested upload (temp file + sha256, see upload_ingest) once and take a
+    reference on its blob. The temp file is consumed either way.
+
+    Returns (blob, local_path). The local copy is always present so the caller can run
+    analysis on it; the blob's storage_path is the OSS key when OSS is enabled.
+    The caller commits; the ref_count update is atomic in SQL so concurrent uploads of
+    the same bytes do not lose increments.
+    """
+    existing = db.query(AudioBlob).filter(AudioBlob.sha256 == digest).first()
+    if existing and _increment_ref(db, existing.id):
+        db.refresh(existing)
+        local_path = _move_into_place(src_path, blob_local_path(existing))
+        print(f"[blob_store] dedup hit sha256={digest} ref_count={existing.ref_count}")
+        return existing, local_path
+
+    local_path = _place_local_blob(src_path, digest, ext)
+    storage_path = str(local_path)
+    if settings.OSS_ENABLED:
+        # 内容寻址：同一 key 重复上传内容一致，天然幂等
+        key = blob_relpath(digest, ext)
+        try:
+            OSSStorage().put_file(key, str(local_path), content_type=content_type)
+            storage_path = encode_oss_path(key)
+        except Exception as exc:
+            print(f"[blob_store] Upload to OSS failed, keep local path: {exc}")
+
+    blob = AudioBlob(
+        sha256=digest,
+        size_bytes=size_bytes,
+        content_type=content_type,
+        storage_path=storage_path,
+        ref_count=1,
+    )
+    try:
+        with db.begin_nested():
+            db.add(blob)
+    except IntegrityError:
+        # 并发上传了同一内容：改为引用对方插入的记录
+        blob = db.query(AudioBlob).filter(AudioBlob.sha256 == digest).one()
+        _increment_ref(db, blob.id)
+        db.refresh(blob)
+        shared_path = blob_local_path(blob)
+        return blob, shared_path if shared_path.is_file() else local_path
+    return blob, local_path
+
+
+def release_blob(db: Session, blob_id: int) -> BlobDeletion | None:
+    """
+    Drop one reference. When it was the last one, return what delete_blob_objects
+    should remove once the caller has committed (the row itself stays until then).
+    """
+    (
+        db.query(AudioBlob)
+        .filter(AudioBlob.id == blob_id, AudioBlob.ref_count > 0)
+        .update({AudioBlob.ref_count: AudioBlob.ref_count - 1}, synchronize_session=False)
+    )
+    blob = db.query(AudioBlob).filter(AudioBlob.id == blob_id).populate_existing().first()
+    if not blob or (blob.ref_count or 0) > 0:
+        return None
+    return BlobDeletion(blob_id=blob.id, oss_key=decode_oss_path(blob.storage_path), local_path=blob_local_path(blob))
+
+
+def delete_blob_objects(target: BlobDeletion | None) -> None:
+    """
+    Remove an unreferenced blob's row, OSS object and local copy (best effort; call
+    after the transaction that released the last reference has committed).
+    """
+    if not target or SessionLocal is None:
+        return
+    db = SessionLocal()
+    try:
+        # 条件删除并持有行锁直到提交：期间并发的 acquire_blob 要么已让 ref_count > 0（此处删 0 行，保留文件），
+        # 要么等待本事务提交后作为新内容重新写入
+        deleted = (
+            db.query(AudioBlob)
+            .filter(AudioBlob.id == target.blob_id, AudioBlob.ref_count <= 0)
+            .delete(synchronize_session=False)
+        )
+        if not deleted:
+            db.rollback()
+            return
+        if target.oss_key and settings.OSS_ENABLED:
+            try:
+                OSSStorage().delete(target.oss_key)
+            except Exception as exc:
+                print(f"[blob_store] Failed to delete blob from OSS: {exc}")
+        if target.local_path:
+            try:
+                if target.local_path.is_file():
+                    os.remove(target.local_path)
+            except Exception as exc:
+                print(f"[blob_store] Failed to delete local blob: {exc}")
+        db.commit()
+    except Exception as exc:
+        db.rollback()
+        print(f"[blob_store] Failed to delete blob {target.blob_id}: {exc}")
+    finally:
+        db.close()
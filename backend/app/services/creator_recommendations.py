@@ -0,0 +1,162 @@
+"""
+Precomputed creator ranking for `/ui/recommended-creators` (table creator_recommendations).
+
+`refresh` scores every creator with an activity signal in one vectorized pass:
+log1p + min-max normalization of total_generations / total_works / total_likes,
+weighted 0.1 / 0.2 / 0.6 (re-normalized to sum to 1), ties broken by the raw counts
+and followers. The top CREATOR_RECO_SNAPSHOT_SIZE rows are written with a short reason
+(the signal that contributed most), so the endpoint only reads `limit` rows.
+
+Signals are all-time counters, so snapshots are stored with window_days = 0.
+A missing or stale snapshot is rebuilt from the request path in a worker thread with its
+own session (`latest_snapshot_at`); other requests keep serving the previous snapshot.
+"""
+from __future__ import annotations
+
+import threading
+from datetime import datetime, timedelta
+
+import numpy as np
+from sqlalchemy import func, insert, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+
+from app.core.config import settings
+from app.db.session import SessionLocal
+from app.models.creator_recommendation import CreatorRecommendation
+from app.models.user import User
+
+ALL_TIME_WINDOW = 0
+WEIGHTS = np.array([0.1, 0.2, 0.6])  # generations, works, likes
+WEIGHTS = WEIGHTS / WEIGHTS.sum()
+
+_refresh_lock = threading.Lock()
+
+
+def _minmax(values: np.ndarray) -> np.ndarray:
+    vmin, vmax = values.min(), values.max()
+    if np.isclose(vmin, vmax):
+        return np.zeros_like(values)
+    return (values - vmin) / (vmax - vmin)
+
+
+def _compact(n: int) -> str:
+    if n >= 1000000:
+        return f"{n / 1000000:.1f}M"
+    if n >= 1000:
+        return f"{n / 1000:.1f}K"
+    return str(n)
+
+
+def _reason(signal: int, count: int) -> str:
+    if signal == 2:
+        return f"获赞 {_compact(count)}"
+    if signal == 1:
+        return f"发布作品 {_compact(count)} 首"
+    return f"创作 {_compact(count)} 次"
+
+
+def refresh(db: Session, *, now: datetime | None = None) -> int:
+    """Replace the creator ranking snapshot; returns the number of rows written."""
+    snapshot_at = (now or datetime.utcnow()).replace(microsecond=0)
+    rows = (
+        db.query(
+            User.id,
+            User.total_generations,
+            User.total_works,
+            User.total_likes,
+            User.followers_count,
+        )
+        .filter((User.total_generations > 0) | (User.total_works > 0) | (User.total_likes > 0))
+        .all()
+    )
+
+    records: list[dict] = []
+    if rows:
+        data = np.array([[int(v or 0) for v in row] for row in rows], dtype=np.int64)
+        user_ids, counts, followers = data[:, 0], data[:, 1:4], data[:, 4]
+        normalized = np.column_stack([_minmax(np.log1p(counts[:, i])) for i in range(3)])
+        contributions = normalized * WEIGHTS
+        scores = contributions.sum(axis=1)
+
+        # 排序键（优先级从高到低）：score, likes, works, generations, followers；np.lexsort 以最后一个键为主键
+        order = np.lexsort((followers, counts[:, 0], counts[:, 1], counts[:, 2], scores))[::-1]
+        order = order[: max(1, int(settings.CREATOR_RECO_SNAPSHOT_SIZE))]
+
+        top_signal = contributions.argmax(axis=1)
+        for idx in order:
+            signal = int(top_signal[idx]) if scores[idx] > 0 else 2
+            records.append(
+                {
+                    "user_id": int(user_ids[idx]),
+                    "window_days": ALL_TIME_WINDOW,
+                    "score": float(scores[idx]),
+                    "reason": _reason(signal, int(counts[idx, signal])),
+                    "snapshot_at": snapshot_at,
+                }
+            )
+
+    if records:
+        db.execute(insert(CreatorRecommendation), records)
+    (
+        db.query(CreatorRecommendation)
+        .filter(CreatorRecommendation.window_days == ALL_TIME_WINDOW, CreatorRecommendation.snapshot_at < snapshot_at)
+        .delete(synchronize_session=False)
+    )
+    db.commit()
+    return len(records)
+
+
+def refresh_all() -> None:
+    """Scheduler / script entry point."""
+    if SessionLocal is None:
+        return
+    db = SessionLocal()
+    try:
+        with _refresh_lock:
+            count = refresh(db)
+        print(f"[creator_recommendations] ranked={count}")
+    finally:
+        db.close()
+
+
+def _max_age() -> timedelta:
+    interval = int(settings.CREATOR_RECO_REFRESH_SECONDS)
+    return timedelta(seconds=interval * 2 if interval > 0 else 3600)
+
+
+def _latest_snapshot_stmt():
+    return select(func.max(CreatorRecommendation.snapshot_at)).where(
+        CreatorRecommendation.window_days == ALL_TIME_WINDOW
+    )
+
+
+def _rebuild_stale(latest: datetime | None) -> datetime | None:
+    """
+    Rebuild a missing / stale snapshot in a short-lived sync session, one caller at a time;
+    returns the snapshot time to serve. While one caller (or the scheduler) rebuilds, others
+    keep serving the previous snapshot (they only wait when there is none yet).
+    """
+    if SessionLocal is None:
+        return latest
+    if not _refresh_lock.acquire(blocking=latest is None):
+        return latest
+    db = SessionLocal()
+    try:
+        # 等锁期间其他请求可能已刷新
+        if db.scalar(_latest_snapshot_stmt()) == latest:
+            refresh(db)
+        return db.scalar(_latest_snapshot_stmt())
+    finally:
+        db.close()
+        _refresh_lock.release()
+
+
+async def latest_snapshot_at(db: AsyncSession) -> datetime | None:
+    """Latest snapshot time to serve; a missing or stale snapshot is rebuilt off the event loop."""
+    latest = await db.scalar(_latest_snapshot_stmt())
+    if latest is None or latest < datetime.utcnow() - _max_age():
+        # 重算是全表读取 + numpy 打分 + 同步写库，放到线程池，不阻塞事件循环
+        latest = await run_in_threadpool(_rebuild_stale, latest)
+    return latest
@@ -13,6 +13,7 @@ import numpy as np
 import torch
 
 from app.core.config import settings
+from app.core.model_loader import LazyModel
 from model_weights.mert_finetune import MERTForEmotionClassification
 
 # ================== 基本配置 ==================
@@ -84,25 +85,34 @@ CONFLICT_PAIRS = [
 
 # ================== 模型加载 ==================
 
-_model: MERTForEmotionClassification | None = None
+def _load_model() -> MERTForEmotionClassification:
+  if not MODEL_CHECKPOINT.exists():
+    raise FileNotFoundError(
+        f"Model checkpoint not found: {MODEL_CHECKPOINT}. "
+        "Please place the .pth file under the configured MODEL_WEIGHTS_DIR."
+    )
+  model = MERTForEmotionClassification(num_classes=NUM_CLASSES)
+  state_dict = torch.load(MODEL_CHECKPOINT, map_location=DEVICE)
+  model.load_state_dict(state_dict)
+  model.to(DEVICE)
+  model.eval()
+  print(f"[emotion_service] Model loaded from {MODEL_CHECKPOINT} on {DEVICE}")
+  return model
+
+
+# 进程内单例：并发的首次调用只加载一次（见 app.core.model_loader）
+emotion_model: LazyModel[MERTForEmotionClassification] = LazyModel("emotion", _load_model)
 
 
 def get_model() -> MERTForEmotionClassification:
-  global _model
-  if _model is None:
-    if not MODEL_CHECKPOINT.exists():
-      raise FileNotFoundError(
-          f"Model checkpoint not found: {MODEL_CHECKPOINT}. "
-          "Please place the .pth file under the configured MODEL_WEIGHTS_DIR."
-      )
-    model = MERTForEmotionClassification(num_classes=NUM_CLASSES)
-    state_dict = torch.load(MODEL_CHECKPOINT, map_location=DEVICE)
-    model.load_state_dict(state_dict)
-    model.to(DEVICE)
-    model.eval()
-    _model = model
-    print(f"[emotion_service] Model loaded from {MODEL_CHECKPOINT} on {DEVICE}")
-  return _model
+  return emotion_model.get()
+
+
+def warm_up() -> None:
+  """Load the classifier and run it once on 1 s of silence."""
+  model = get_model()
+  with torch.no_grad():
+    model(torch.zeros(1, SAMPLE_RATE, device=DEVICE))
 
 
 # ================== 工具函数 ==================
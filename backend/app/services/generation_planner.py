@@ -0,0 +1,193 @@
+"""
+Generation planner: one LLM round trip for everything a generation needs up front.
+
+The generation flows used to call the model three times in sequence with the same
+user context: build_music_title, enhance_for_songgen (descriptions / lyrics /
+rewritten prompt) and build_album_cover_prompt. `plan_generation` asks for all of
+them in a single strict-JSON completion (same rules as the individual calls), then
+validates every field on its own and falls back per field to the deterministic
+helpers when it is missing or malformed:
+
+- title        -> llm.clean_title / llm.fallback_title (truncated prompt)
+- cover_prompt -> llm.COVER_PROMPT_FALLBACK
+- descriptions -> fallback_descriptions() (suggest_songgen_style_tags + merge_style_tags)
+- lyrics       -> None (generation_service lets the SongGen runner handle it)
+
+SongGen fields are only requested with SONGGEN_LLM_ENABLED on the SongGen path, and
+lyrics only for vocal requests without user lyrics. The response goes through
+llm_cache like the single-purpose calls, and the planned cover prompt is also stored
+under the build_album_cover_prompt key so /generate-cover reuses it.
+LLM_PLANNER_ENABLED=false restores the separate calls.
+"""
+from __future__ import annotations
+
+import json
+import re
+from dataclasses import dataclass, field
+
+from app.core.config import settings
+from app.services import llm, llm_client
+from app.services.songgen_llm_enhancer import SONGGEN_FIELD_RULES, _safe_trim, sanitize_user_lyrics
+from app.services.songgen_style_tags import merge_style_tags, suggest_songgen_style_tags
+
+_CODE_FENCE_RE = re.compile(r"^```(?:json)?\s*|\s*```$", re.IGNORECASE)
+
+
+@dataclass(frozen=True)
+class GenerationPlan:
+    title: str
+    cover_prompt: str
+    descriptions: str
+    lyrics: str | None = None
+    rewritten_prompt: str | None = None
+    # 由模型给出（而非兜底）的字段，用于日志 / 排查
+    llm_fields: frozenset[str] = field(default_factory=frozenset)
+
+
+def enabled() -> bool:
+    return bool(settings.LLM_PLANNER_ENABLED)
+
+
+def fallback_descriptions(prompt_zh: str, style: str | None) -> str:
+    """Keyword-based SongGen tags merged into the user's style (no LLM)."""
+    extra_tags = suggest_songgen_style_tags(prompt_zh or "").tags
+    # Guard negative tags: they can backfire on some models (interpreted as presence).
+    if not getattr(settings, "SONGGEN_ALLOW_NEGATIVE_TAGS", False):
+        extra_tags = [t for t in extra_tags if not (t or "").strip().lower().startswith("no ")]
+    return merge_style_tags(base_style=style, extra_tags=extra_tags)
+
+
+def _system_prompt(*, want_cover: bool, want_songgen: bool, want_lyrics: bool) -> str:
+    schema = ['  "title": "short Chinese song title"']
+    rules = [
+        "- title: a short, vivid Chinese song title, 4-12 Chinese characters, single line,\n"
+        "  no quotes, no prefix like '标题：'\n"
+    ]
+    if want_cover:
+        schema.append('  "cover_prompt": "single English prompt for an image generation model"')
+        rules.append("- cover_prompt: an album cover image prompt in English:\n" + _indent(llm.COVER_PROMPT_RULES))
+    if want_songgen:
+        schema.append('  "descriptions": "comma-separated English tags"')
+        schema.append('  "lyrics": ' + ('"structured lyric string"' if want_lyrics else "null"))
+        schema.append('  "rewritten_prompt": "optional improved Chinese prompt or null"')
+        rules.append(SONGGEN_FIELD_RULES)
+    return (
+        "You plan a music generation request for Tencent SongGeneration (LeVo) and an album cover.\n"
+        "Return STRICT JSON only. No markdown, no extra text.\n\n"
+        "Output JSON schema:\n{\n" + ",\n".join(schema) + "\n}\n\n"
+        "Rules:\n" + "".join(rules)
+    )
+
+
+def _indent(text: str) -> str:
+    return "".join(f"  {line}\n" for line in text.splitlines())
+
+
+def _parse(content: str) -> dict:
+    try:
+        data = json.loads(_CODE_FENCE_RE.sub("", (content or "").strip()))
+    except Exception:
+        return {}
+    return data if isinstance(data, dict) else {}
+
+
+def _text(data: dict, key: str) -> str | None:
+    value = data.get(key)
+    return value.strip() or None if isinstance(value, str) else None
+
+
+async def plan_generation(
+    prompt_zh: str,
+    *,
+    instrumental: bool,
+    duration_sec: int,
+    style: str | None = None,
+    lyrics: str | None = None,
+    songgen: bool = False,
+    want_cover: bool = True,
+    use_cache: bool = True,
+) -> GenerationPlan:
+    """
+    Title, cover prompt and (on the SongGen path) descriptions / lyrics in one completion.
+
+    Never raises: without a configured provider, on errors or for missing fields the
+    deterministic fallbacks are used.
+    """
+    prompt_zh = (prompt_zh or "").strip()
+    style = (style or "").strip() or None
+    want_songgen = songgen and bool(getattr(settings, "SONGGEN_LLM_ENABLED", False))
+    want_lyrics = want_songgen and not instrumental and not (lyrics or "").strip()
+
+    data: dict = {}
+    if prompt_zh and llm_client.configured():
+        user_payload = {
+            "user_request_zh": _safe_trim(prompt_zh, max_chars=int(getattr(settings, "SONGGEN_LLM_MAX_PROMPT_CHARS", 800))),
+            "instrumental": bool(instrumental),
+            "duration_sec": int(duration_sec),
+            "user_style": style,
+            "need_lyrics": want_lyrics,
+        }
+        try:
+            content = await llm_client.chat_completion(
+                "plan_generation",
+                messages=[
+                    {
+                        "role": "system",
+                        "content": _system_prompt(want_cover=want_cover, want_songgen=want_songgen, want_lyrics=want_lyrics),
+                    },
+                    {"role": "user", "content": json.dumps(user_payload, ensure_ascii=False)},
+                ],
+                temperature=0.6,
+                max_tokens=(1000 if want_lyrics else 500) if want_songgen else 360,
+                cache_ttl=settings.LLM_CACHE_TTL_SECONDS if use_cache else 0,
+                # 只缓存能解析出 JSON 对象的回复，否则同一请求在 TTL 内都会拿到坏结果
+                validate=lambda text: bool(_parse(text)),
+            )
+            data = _parse(content)
+            if not data:
+                print(f"[generation_planner] unparsable plan, using fallbacks: {content[:200]!r}")
+        except Exception as exc:
+            print(f"[generation_planner] plan call failed, using fallbacks: {exc}")
+
+    llm_fields: set[str] = set()
+
+    raw_title = _text(data, "title")
+    title = llm.clean_title(raw_title or "", prompt_zh)
+    if raw_title:
+        llm_fields.add("title")
+
+    cover_prompt = _text(data, "cover_prompt") if want_cover else None
+    if cover_prompt:
+        llm_fields.add("cover_prompt")
+        if use_cache:
+            await llm.remember_album_cover_prompt(prompt_zh, cover_prompt)
+    else:
+        cover_prompt = llm.COVER_PROMPT_FALLBACK
+
+    descriptions = _safe_trim(_text(data, "descriptions"), max_chars=600) if want_songgen else None
+    if descriptions:
+        llm_fields.add("descriptions")
+    else:
+        descriptions = fallback_descriptions(prompt_zh, style)
+
+    plan_lyrics: str | None = None
+    if want_lyrics and _text(data, "lyrics"):
+        plan_lyrics = sanitize_user_lyrics(
+            _text(data, "lyrics") or "",
+            max_chars=int(getattr(settings, "SONGGEN_LLM_MAX_LYRIC_CHARS", 1200)),
+        ) or None
+        if plan_lyrics:
+            llm_fields.add("lyrics")
+
+    rewritten_prompt = _safe_trim(_text(data, "rewritten_prompt"), max_chars=600) if want_songgen else None
+    if rewritten_prompt:
+        llm_fields.add("rewritten_prompt")
+
+    return GenerationPlan(
+        title=title,
+        cover_prompt=cover_prompt,
+        descriptions=descriptions,
+        lyrics=plan_lyrics,
+        rewritten_prompt=rewritten_prompt,
+        llm_fields=frozenset(llm_fields),
+    )
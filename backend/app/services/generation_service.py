@@ -7,16 +7,14 @@ import numpy as np
 
 from app.core.config import settings
 from app.core.device import DeviceConfig
+from app.core.model_loader import LazyModel
 from app.musicgen.base import GenerateConfig, ModelName
 from app.musicgen.musicgen_pretrained import MusicGenPretrained, MusicGenPretrainedConfig
 from app.musicgen.musicgen_remote import MusicGenRemote
 from app.services.storage_service import save_audio_bytes, save_audio_waveform
 from app.songgen.songgen_remote import get_songgen_client
-from app.services.songgen_style_tags import (
-    merge_style_tags,
-    normalize_songgen_descriptions,
-    suggest_songgen_style_tags,
-)
+from app.services.generation_planner import GenerationPlan, fallback_descriptions
+from app.services.songgen_style_tags import normalize_songgen_descriptions
 from app.services.songgen_llm_enhancer import enhance_for_songgen, ensure_structured_lyrics, sanitize_user_lyrics
 
 import wave
@@ -32,31 +30,38 @@ class GenerateResult:
     model_name: ModelName
 
 
-# 简单单例缓存
-_musicgen_pretrained: MusicGenPretrained | None = None
+def _build_musicgen() -> MusicGenPretrained:
+    mg_cfg = MusicGenPretrainedConfig(
+        model_id=settings.MUSICGEN_MODEL_ID,
+        max_single_clip_sec=settings.MUSICGEN_MAX_SINGLE_CLIP_SEC,
+        tokens_per_second=settings.MUSICGEN_TOKENS_PER_SECOND,
+    )
+
+    if settings.REMOTE_INFERENCE_URL:
+        print(f"[generation_service] Using Remote Generator at {settings.REMOTE_INFERENCE_URL}")
+        return MusicGenRemote(cfg=mg_cfg)
+    print(f"[generation_service] Using Local Generator (Model: {settings.MUSICGEN_MODEL_ID})")
+    dev_cfg = DeviceConfig(
+        use_cuda_if_available=settings.MUSICGEN_USE_CUDA_IF_AVAILABLE,
+        preferred_device=settings.MUSICGEN_PREFERRED_DEVICE,
+    )
+    return MusicGenPretrained(cfg=mg_cfg, device_cfg=dev_cfg)
+
+
+# 进程内单例：并发的首次调用只加载一次（见 app.core.model_loader）
+musicgen_model: LazyModel[MusicGenPretrained] = LazyModel("musicgen", _build_musicgen)
 
 
 def get_musicgen_pretrained() -> MusicGenPretrained:
-    global _musicgen_pretrained
-    if _musicgen_pretrained is None:
-        mg_cfg = MusicGenPretrainedConfig(
-            model_id=settings.MUSICGEN_MODEL_ID,
-            max_single_clip_sec=settings.MUSICGEN_MAX_SINGLE_CLIP_SEC,
-            tokens_per_second=settings.MUSICGEN_TOKENS_PER_SECOND,
-        )
-        
-        if settings.REMOTE_INFERENCE_URL:
-            print(f"[generation_service] Using Remote Generator at {settings.REMOTE_INFERENCE_URL}")
-            _musicgen_pretrained = MusicGenRemote(cfg=mg_cfg)
-        else:
-            print(f"[generation_service] Using Local Generator (Model: {settings.MUSICGEN_MODEL_ID})")
-            dev_cfg = DeviceConfig(
-                use_cuda_if_available=settings.MUSICGEN_USE_CUDA_IF_AVAILABLE,
-                preferred_device=settings.MUSICGEN_PREFERRED_DEVICE,
-            )
-            _musicgen_pretrained = MusicGenPretrained(cfg=mg_cfg, device_cfg=dev_cfg)
-            
-    return _musicgen_pretrained
+    return musicgen_model.get()
+
+
+def warm_up_musicgen() -> None:
+    """Load MusicGen and generate a 0.5 s clip (remote generators are only instantiated)."""
+    generator = get_musicgen_pretrained()
+    if isinstance(generator, MusicGenRemote):
+        return
+    generator.generate_clip_en("warm up, soft piano", duration_sec=0.5)
 
 
 def get_generator(model_name: ModelName) -> MusicGenPretrained:
@@ -74,12 +79,14 @@ def generate_music_file(
     instrumental: bool = True,
     lyrics: str | None = None,
     style: str | None = None,
+    plan: GenerationPlan | None = None,
 ) -> GenerateResult:
     """
     对外提供的统一生成接口：
     - 输入：中文描述 + 目标时长 + 模型名
     - 过程：调用模型层生成长音频 -> 保存为 wav 文件
     - 输出：包含文件路径、实际时长等信息的 GenerateResult
+    - plan：调用方已用 generation_planner 一次算好的描述/歌词，此时不再单独调用 enhancer
     """
     # 优先走 SongGeneration(full-new) 远程推理（4090）
     if settings.SONGGEN_REMOTE_URL or model_name == "songgen_full_new":
@@ -88,7 +95,10 @@ def generate_music_file(
         # --- LLM enhancer (optional): better descriptions + auto lyric writing for vocal mode ---
         llm_descriptions: str | None = None
         llm_lyrics: str | None = None
-        if getattr(settings, "SONGGEN_LLM_ENABLED", False):
+        if plan is not None:
+            llm_descriptions = plan.descriptions
+            llm_lyrics = plan.lyrics
+        elif getattr(settings, "SONGGEN_LLM_ENABLED", False):
             r = enhance_for_songgen(
                 prompt_zh=prompt_zh or "",
                 instrumental=bool(instrumental),
@@ -120,12 +130,7 @@ def generate_music_file(
         if (llm_descriptions or "").strip():
             style_to_send = llm_descriptions or ""
         else:
-            suggestion = suggest_songgen_style_tags(prompt_zh or "")
-            extra_tags = suggestion.tags
-            # Guard negative tags: they can backfire on some models (interpreted as presence).
-            if not getattr(settings, "SONGGEN_ALLOW_NEGATIVE_TAGS", False):
-                extra_tags = [t for t in extra_tags if not (t or "").strip().lower().startswith("no ")]
-            style_to_send = merge_style_tags(base_style=style, extra_tags=extra_tags)
+            style_to_send = fallback_descriptions(prompt_zh or "", style)
 
         if not (style_to_send or "").strip():
             style_to_send = "instrumental" if instrumental else "vocal"
@@ -0,0 +1,327 @@
+"""
+Cover / avatar image pipeline: content-addressed originals, WebP renditions, dedup.
+
+List views used to serve the full 1024x1024 PNG cover as a thumbnail. `ingest_image`
+now stores every processed image as
+
+  original:   images/sha256/ab/cd/<sha256><ext>
+  renditions: images/sha256/ab/cd/<sha256>_<size>.webp   (IMAGE_RENDITION_SIZES, longest edge)
+              images/sha256/ab/cd/<sha256>_<size>.avif   (IMAGE_AVIF_ENABLED and encoder available)
+
+on OSS (key as above, long-lived immutable Cache-Control) or under STATIC_ROOT
+(served by MediaFiles, which already marks sha256 names immutable). Because the
+rendition name is derived from the original's path, `rendition_path()` /
+`url_resolver.resolve_cover_url(path, size=...)` map a stored cover to its thumbnail
+without a query; paths outside this layout (older covers, external URLs) resolve to
+the original. scripts/backfill_image_renditions.py moves existing covers over.
+
+Dedup: an image whose sha256 matches an image_assets row reuses that row's files
+instead of storing new ones. Generated covers additionally dedup perceptually
+(regenerated covers frequently come back pixel-identical but re-encoded): a row with
+the same 64-bit dHash is only a candidate, and is reused only when its dimensions
+and decoded-pixel hash (pixel_sha256) match as well.
+
+User uploads (avatars, work covers) go through `ingest_upload_image`: the body is
+streamed to a temp file under the IMAGE_UPLOAD_MAX_SIZE_MB limit (upload_ingest),
+oversized resolutions are rejected from the header, and the image is decoded (JPEG
+at reduced scale via draft()), orientation-fixed, bounded to IMAGE_UPLOAD_MAX_DIMENSION
+and recompressed to WebP without metadata before entering the pipeline above. Uploads
+only dedup by sha256 (of the uploaded file or of the processed image), never by dHash:
+a user's picture must not be swapped for someone else's similar-looking one.
+
+Decoding / resizing / encoding runs in a bounded thread pool (IMAGE_WORKERS); Pillow
+releases the GIL for most of that work.
+"""
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import io
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from fastapi import HTTPException, UploadFile, status
+from PIL import Image, ImageOps, UnidentifiedImageError
+from sqlalchemy.exc import IntegrityError
+
+from app.core.config import settings
+from app.db.session import SessionLocal, session_scope
+from app.models.image_asset import ImageAsset
+from app.services.oss_storage import OSSStorage, encode_oss_path
+from app.services.upload_ingest import ingest_upload
+
+IMAGE_PREFIX = "images/sha256"
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+_RENDITION_RE = re.compile(r"(images/sha256/[0-9a-f]{2}/[0-9a-f]{2}/[0-9a-f]{64})\.[A-Za-z0-9]+(?=$|[?#])")
+_FORMATS = {
+    "webp": ("WEBP", "image/webp"),
+    "avif": ("AVIF", "image/avif"),
+}
+# 纯色 / 单向渐变图的 dHash 全 0 或全 1，不能据此判定为同一张图
+_UNINFORMATIVE_HASHES = {"0" * 16, "f" * 16}
+_ORIGINAL_FORMATS = {"PNG": ".png", "JPEG": ".jpg", "WEBP": ".webp", "GIF": ".gif"}
+# 允许上传的解码格式（MPO 为手机相机的多帧 JPEG）
+_UPLOAD_FORMATS = {"JPEG", "MPO", "PNG", "WEBP", "GIF", "BMP"}
+
+_image_executor: ThreadPoolExecutor | None = None
+_image_executor_lock = threading.Lock()
+_counters = {"stored": 0, "dedup_sha256": 0, "dedup_phash": 0}
+_counters_lock = threading.Lock()
+
+
+def _executor() -> ThreadPoolExecutor:
+    global _image_executor
+    if _image_executor is None:
+        with _image_executor_lock:
+            if _image_executor is None:
+                _image_executor = ThreadPoolExecutor(
+                    max_workers=max(1, int(settings.IMAGE_WORKERS)), thread_name_prefix="image-renditions"
+                )
+    return _image_executor
+
+
+def avif_enabled() -> bool:
+    if not settings.IMAGE_AVIF_ENABLED:
+        return False
+    try:  # Pillow < 11.2 需要 pillow-avif-plugin
+        import pillow_avif  # noqa: F401
+    except ImportError:
+        pass
+    return "AVIF" in Image.SAVE
+
+
+def rendition_formats() -> list[str]:
+    return ["webp", "avif"] if avif_enabled() else ["webp"]
+
+
+def image_relpath(digest: str, ext: str) -> str:
+    return f"{IMAGE_PREFIX}/{digest[:2]}/{digest[2:4]}/{digest}{ext}"
+
+
+def is_managed(path: str | None) -> bool:
+    """Whether `path` points into the content-addressed images/sha256 layout."""
+    return bool(path) and _RENDITION_RE.search(path) is not None
+
+
+def rendition_path(path: str | None, size: int | None, fmt: str = "webp") -> str | None:
+    """
+    Storage path / URL of the rendition closest to `size` (the smallest one that is at
+    least that big, else the largest). Paths outside the images/sha256 layout are
+    returned unchanged.
+    """
+    sizes = settings.image_rendition_sizes_list
+    if not path or not size or not sizes:
+        return path
+    match = _RENDITION_RE.search(path)
+    if match is None:
+        return path
+    chosen = next((s for s in sizes if s >= int(size)), sizes[-1])
+    return path[: match.start()] + f"{match.group(1)}_{chosen}.{fmt}" + path[match.end():]
+
+
+def dhash(image: Image.Image) -> str:
+    """64-bit difference hash (hex): equal for the same picture regardless of encoding / scale."""
+    gray = image.convert("L").resize((9, 8), Image.Resampling.LANCZOS)
+    pixels = list(gray.getdata())
+    bits = 0
+    for row in range(8):
+        for col in range(8):
+            bits = (bits << 1) | (pixels[row * 9 + col] > pixels[row * 9 + col + 1])
+    return f"{bits:016x}"
+
+
+def pixel_digest(image: Image.Image) -> str:
+    """sha256 of the decoded pixels (normalised to RGBA) and dimensions, independent of the encoding."""
+    digest = hashlib.sha256(f"{image.width}x{image.height}:".encode())
+    digest.update(image.convert("RGBA").tobytes())
+    return digest.hexdigest()
+
+
+def _encode(image: Image.Image, size: int, fmt: str) -> bytes:
+    rendition = image.copy()
+    rendition.thumbnail((size, size), Image.Resampling.LANCZOS)  # 只缩小，不放大
+    buffer = io.BytesIO()
+    rendition.save(buffer, format=_FORMATS[fmt][0], quality=int(settings.IMAGE_RENDITION_QUALITY))
+    return buffer.getvalue()
+
+
+def _find_existing(
+    *,
+    digest: str | None = None,
+    phash: str | None = None,
+    pixels: str | None = None,
+    size: tuple[int, int] | None = None,
+) -> str | None:
+    """
+    storage_path of an image_assets row for the same image: by sha256, or by dHash
+    confirmed against the dimensions (`size`) and decoded-pixel hash (`pixels`).
+    """
+    if SessionLocal is None:
+        return None
+    lookups = []
+    if digest:
+        lookups.append(((ImageAsset.sha256 == digest,), "dedup_sha256"))
+    if phash and pixels and size and phash not in _UNINFORMATIVE_HASHES:
+        # dHash 只用于缩小范围（已建索引）；尺寸与像素哈希都一致才算同一张图
+        lookups.append(
+            (
+                (
+                    ImageAsset.phash == phash,
+                    ImageAsset.width == size[0],
+                    ImageAsset.height == size[1],
+                    ImageAsset.pixel_sha256 == pixels,
+                ),
+                "dedup_phash",
+            )
+        )
+    try:
+        with session_scope() as db:
+            for conditions, counter in lookups:
+                row = db.query(ImageAsset.storage_path).filter(*conditions).first()
+                if row is not None:
+                    with _counters_lock:
+                        _counters[counter] += 1
+                    return row[0]
+    except Exception as exc:
+        # 去重只是优化：查询失败按未命中处理
+        print(f"[image_renditions] dedup lookup failed: {exc}")
+    return None
+
+
+def _store(relpath: str, data: bytes, content_type: str) -> str:
+    if settings.OSS_ENABLED:
+        try:
+            OSSStorage().put_bytes(relpath, data, content_type=content_type, cache_control=IMMUTABLE_CACHE_CONTROL)
+            return encode_oss_path(relpath)
+        except Exception as exc:
+            print(f"[image_renditions] 上传 OSS 失败，降级本地: {exc}")
+    dest = Path(settings.STATIC_ROOT) / relpath
+    dest.parent.mkdir(parents=True, exist_ok=True)
+    tmp = dest.with_name(dest.name + ".tmp")
+    tmp.write_bytes(data)
+    tmp.replace(dest)
+    return f"/{settings.STATIC_ROOT}/{relpath}"
+
+
+def open_image(data: bytes) -> tuple[Image.Image, str]:
+    """(decoded image with EXIF orientation applied, source format); raises on undecodable input."""
+    image = Image.open(io.BytesIO(data))
+    image.load()
+    # exif_transpose 返回副本，副本不带 format
+    return ImageOps.exif_transpose(image), image.format or ""
+
+
+def ingest_image(data: bytes, *, sha256: str | None = None, perceptual: bool = True) -> str:
+    """
+    Store an image with its renditions and return the original's storage path.
+
+    `data` is decoded and stored as the original. `sha256` overrides its content hash,
+    for uploads that were re-encoded from a source whose hash is already known.
+    `perceptual=False` restricts dedup to sha256 (images that may be user uploads).
+    Blocking; use ingest_image_async from the event loop.
+    """
+    digest = sha256 or hashlib.sha256(data).hexdigest()
+    return _find_existing(digest=digest) or _store_new(data, digest, perceptual=perceptual)
+
+
+def _store_new(data: bytes, digest: str, *, perceptual: bool = True) -> str:
+    image, source_format = open_image(data)
+    phash = dhash(image)
+    pixels = pixel_digest(image)
+    if perceptual:
+        existing = _find_existing(phash=phash, pixels=pixels, size=image.size)
+        if existing:
+            return existing
+
+    ext = _ORIGINAL_FORMATS.get(source_format, ".png")
+    content_type = Image.MIME.get(source_format, "image/png")
+    # 先写缩略图，最后写原图与数据库行：中途失败不会留下指向缺失缩略图的记录
+    for fmt in rendition_formats():
+        for size in settings.image_rendition_sizes_list:
+            _store(image_relpath(digest, f"_{size}.{fmt}"), _encode(image, size, fmt), _FORMATS[fmt][1])
+    storage_path = _store(image_relpath(digest, ext), data, content_type)
+
+    if SessionLocal is not None:
+        try:
+            with session_scope() as db:
+                db.add(
+                    ImageAsset(
+                        sha256=digest,
+                        phash=phash,
+                        pixel_sha256=pixels,
+                        width=image.width,
+                        height=image.height,
+                        storage_path=storage_path,
+                    )
+                )
+        except IntegrityError:
+            # 并发写入了同一张图：文件路径相同，沿用已有记录即可
+            pass
+        except Exception as exc:
+            print(f"[image_renditions] image_assets insert failed: {exc}")
+    with _counters_lock:
+        _counters["stored"] += 1
+    return storage_path
+
+
+async def ingest_image_async(data: bytes, *, sha256: str | None = None) -> str:
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_executor(), lambda: ingest_image(data, sha256=sha256))
+
+
+def prepare_upload(path: str | Path, *, max_dimension: int | None = None) -> bytes:
+    """
+    Decode an uploaded image file, fix its orientation, bound it to `max_dimension`
+    (default IMAGE_UPLOAD_MAX_DIMENSION) and recompress it to WebP. EXIF / ICC and other
+    metadata are not carried over. Raises ValueError for unsupported or oversized images.
+    """
+    limit = int(max_dimension or settings.IMAGE_UPLOAD_MAX_DIMENSION)
+    try:
+        with Image.open(path) as source:
+            if source.format not in _UPLOAD_FORMATS:
+                raise ValueError(f"unsupported image format: {source.format}")
+            if source.width * source.height > int(settings.IMAGE_UPLOAD_MAX_PIXELS):
+                raise ValueError(f"image too large: {source.width}x{source.height}")
+            # JPEG 可在解码时直接按 1/2、1/4、1/8 缩小，大幅减少手机照片的解码开销
+            source.draft("RGB", (limit, limit))
+            image = ImageOps.exif_transpose(source)
+    except (UnidentifiedImageError, Image.DecompressionBombError, OSError) as exc:
+        raise ValueError(f"cannot decode image: {exc}") from exc
+    image.thumbnail((limit, limit), Image.Resampling.LANCZOS)
+    if image.mode not in ("RGB", "RGBA"):
+        image = image.convert("RGBA" if image.has_transparency_data else "RGB")
+    buffer = io.BytesIO()
+    image.save(buffer, format="WEBP", quality=int(settings.IMAGE_UPLOAD_QUALITY))
+    return buffer.getvalue()
+
+
+def _ingest_upload_file(path: Path, sha256: str) -> str:
+    # 同一文件重复上传：按源文件哈希直接命中，无需解码；用户上传不做 dHash 去重
+    return _find_existing(digest=sha256) or _store_new(prepare_upload(path), sha256, perceptual=False)
+
+
+async def ingest_upload_image(file: UploadFile) -> str:
+    """
+    Avatar / cover upload: stream to a temp file under IMAGE_UPLOAD_MAX_SIZE_MB (413 when
+    exceeded), then process and store it in the image pool. Returns the storage path;
+    400 for files that are not a supported image.
+    """
+    if not file.content_type or not file.content_type.startswith("image/"):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="请上传图片文件")
+    upload = await ingest_upload(file, max_bytes=int(settings.IMAGE_UPLOAD_MAX_SIZE_MB) * 1024 * 1024)
+    loop = asyncio.get_running_loop()
+    try:
+        return await loop.run_in_executor(_executor(), _ingest_upload_file, upload.path, upload.sha256)
+    except ValueError as exc:
+        print(f"[image_renditions] rejected upload {file.filename!r}: {exc}")
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="无法识别的图片文件或分辨率过大") from exc
+    finally:
+        upload.discard()
+
+
+def stats() -> dict[str, int]:
+    with _counters_lock:
+        return dict(_counters)
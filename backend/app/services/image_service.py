@@ -1,14 +1,15 @@
 from __future__ import annotations
 
+import asyncio
 import base64
 from pathlib import Path
 from typing import Optional
 from uuid import uuid4
 
-from openai import AsyncOpenAI
 import httpx
 
 from app.core.config import settings
+from app.services import image_renditions, llm_client
 from app.services.oss_storage import (
     OSSStorage,
     build_oss_key,
@@ -18,21 +19,15 @@ from app.services.oss_storage import (
 )
 
 
-def _get_client() -> Optional[AsyncOpenAI]:
-    if not settings.OPENAI_API_KEY:
-        return None
-    return AsyncOpenAI(api_key=settings.OPENAI_API_KEY, base_url=settings.OPENAI_API_BASE)
-
-
 async def generate_album_cover_image(prompt: str, user_id: int | None = None) -> Optional[str]:
     """
     使用 Qwen-image (通过硅基流动 OpenAI 兼容接口) 生成专辑封面。
 
-    返回值为相对路径，例如："/static/covers/cover_xxx.png"
+    返回值为存储路径，例如："/static/images/sha256/ab/cd/<sha256>.png" 或 oss://...
+    （同目录下附带 WebP 缩略图，见 image_renditions）
     若调用失败则返回 None。
     """
-    client = _get_client()
-    if client is None:
+    if not llm_client.configured():
         return None
 
     covers_root = Path(settings.STATIC_ROOT) / "covers"
@@ -41,7 +36,8 @@ async def generate_album_cover_image(prompt: str, user_id: int | None = None) ->
     # Some providers (e.g. certain OpenAI-compatible gateways) may not support response_format="b64_json".
     # We try b64_json first, then fallback to provider default (often URL).
     try:
-        resp = await client.images.generate(  # type: ignore[call-arg]
+        resp = await llm_client.generate_image(
+            "generate_album_cover_image",
             model=getattr(settings, "IMAGE_MODEL", "Qwen/Qwen-Image"),
             prompt=prompt,
             size="1024x1024",
@@ -51,7 +47,8 @@ async def generate_album_cover_image(prompt: str, user_id: int | None = None) ->
     except Exception as exc_first:
         print(f"[image_service] 图片生成（b64_json）失败，尝试降级为 url: {exc_first}")
         try:
-            resp = await client.images.generate(  # type: ignore[call-arg]
+            resp = await llm_client.generate_image(
+                "generate_album_cover_image",
                 model=getattr(settings, "IMAGE_MODEL", "Qwen/Qwen-Image"),
                 prompt=prompt,
                 size="1024x1024",
@@ -88,12 +85,21 @@ async def generate_album_cover_image(prompt: str, user_id: int | None = None) ->
         filepath.write_bytes(image_bytes)
         return f"/{settings.STATIC_ROOT}/covers/{filename}"
 
+    async def _store_image(image_bytes: bytes) -> Optional[str]:
+        # 内容寻址存储 + WebP 缩略图 + 去重；解码失败等异常时退回原有的整图上传
+        try:
+            return await image_renditions.ingest_image_async(image_bytes)
+        except Exception as exc:
+            print(f"[image_service] 生成缩略图失败，按原图上传: {exc}")
+        return await asyncio.to_thread(_upload_bytes, image_bytes)
+
     # 1) 优先使用 b64_json
     image_b64 = getattr(first, "b64_json", None)
     if image_b64:
         try:
             image_bytes = base64.b64decode(image_b64)
-            return _upload_bytes(image_bytes)
+            # 解码 / 编码 / OSS 上传都是阻塞操作，放到线程池里，避免卡住同一事件循环上并发的标题、生成等任务
+            return await _store_image(image_bytes)
         except Exception as exc:
             print(f"[image_service] 解码 b64 图片失败: {exc}")
 
@@ -106,7 +112,7 @@ async def generate_album_cover_image(prompt: str, user_id: int | None = None) ->
                 r = await client_http.get(image_url)
                 r.raise_for_status()
                 image_bytes = r.content
-            return _upload_bytes(image_bytes)
+            return await _store_image(image_bytes)
         except Exception as exc:
             print(f"[image_service] 下载图片失败: {exc}")
             # 退一步：至少返回远程 URL，前端仍然可以展示
@@ -1,15 +1,34 @@
-from typing import Any, Dict, Optional
-
-from openai import AsyncOpenAI
+from typing import Any, Dict
 
 from app.core.config import settings
-
-
-def _get_client() -> Optional[AsyncOpenAI]:
-  """Initialize OpenAI-compatible async client; return None if not configured."""
-  if not settings.OPENAI_API_KEY:
-    return None
-  return AsyncOpenAI(api_key=settings.OPENAI_API_KEY, base_url=settings.OPENAI_API_BASE)
+from app.services import llm_client
+
+# 封面 prompt 规则，generation_planner 的合并调用复用同一套约束
+COVER_PROMPT_RULES = (
+    "- DO NOT mention musical instruments\n"
+    "- DO NOT mention sound, music, or audio\n"
+    "- Focus only on visual scene, atmosphere, emotions, season, and color\n"
+    "- The style must be consistent: modern, artistic, cinematic album cover\n"
+    "- Minimalist composition, no text, no logo, no watermark\n"
+    "- The image should look like a professional music album cover\n"
+)
+COVER_PROMPT_FALLBACK = (
+    "A modern cinematic album cover, soft dreamy colors, abstract landscape, "
+    "warm and hopeful atmosphere, high quality digital art, no text, no logo"
+)
+
+
+def fallback_title(user_music_prompt: str) -> str:
+  return (user_music_prompt or "").strip()[:12] or "AI 生成作品"
+
+
+def clean_title(raw: str, user_music_prompt: str) -> str:
+  """Strip quotes / "标题：" prefixes from a model title; fall back to the truncated prompt."""
+  title = (raw or "").strip().strip('"').strip("“”").strip()
+  for prefix in ("标题：", "歌名：", "Title:", "title:"):
+    if title.lower().startswith(prefix.lower()):
+      title = title[len(prefix):].strip()
+  return title[:24] or fallback_title(user_music_prompt)
 
 
 async def summarize_emotion(analysis: Dict[str, Any]) -> str:
@@ -17,8 +36,7 @@ async def summarize_emotion(analysis: Dict[str, Any]) -> str:
   Generate a short Chinese summary for emotion analysis results using an LLM.
   Falls back to a placeholder when LLM is not configured or call fails.
   """
-  client = _get_client()
-  if client is None:
+  if not llm_client.configured():
     return "（占位）整体上，这段音乐以积极情绪为主，情绪起伏平稳，适合做背景音乐。"
 
   prompt = (
@@ -28,8 +46,8 @@ async def summarize_emotion(analysis: Dict[str, Any]) -> str:
   )
 
   try:
-    resp = await client.chat.completions.create(  # type: ignore[call-arg]
-        model=settings.OPENAI_MODEL,
+    return await llm_client.chat_completion(
+        "summarize_emotion",
         messages=[
             {"role": "system", "content": "你是一个专业的音乐情绪分析助手。"},
             {"role": "user", "content": prompt},
@@ -39,62 +57,72 @@ async def summarize_emotion(analysis: Dict[str, Any]) -> str:
     )
   except Exception:
     return "（占位）整体上，这段音乐以积极情绪为主"
-  return resp.choices[0].message.content.strip() if resp and resp.choices else ""
 
 
-async def build_album_cover_prompt(user_music_prompt: str) -> str:
+_COVER_PROMPT_PARAMS = {"temperature": 0.6, "max_tokens": 280}
+
+
+def _cover_prompt_messages(user_music_prompt: str) -> list[dict[str, str]]:
+  system_prompt = (
+      "You are an assistant that converts music descriptions into album cover image prompts.\n\n"
+      "Rules:\n"
+      f"{COVER_PROMPT_RULES}\n"
+      "Output a single English prompt suitable for an image generation model."
+  )
+  return [
+      {"role": "system", "content": system_prompt},
+      {"role": "user", "content": user_music_prompt},
+  ]
+
+
+async def remember_album_cover_prompt(user_music_prompt: str, cover_prompt: str) -> None:
+  """
+  Store a cover prompt computed elsewhere (generation_planner) under the
+  build_album_cover_prompt cache key, so /generate-cover for the same description reuses it.
+  """
+  await llm_client.seed_cache(
+      "build_album_cover_prompt",
+      messages=_cover_prompt_messages(user_music_prompt),
+      content=cover_prompt,
+      cache_ttl=settings.LLM_CACHE_TTL_SECONDS,
+      **_COVER_PROMPT_PARAMS,
+  )
+
+
+async def build_album_cover_prompt(user_music_prompt: str, *, use_cache: bool = True) -> str:
   """
   将“音乐描述”转换为适合图片生成模型（Qwen-image）的英文封面描述 Prompt。
   - 不提及乐器/音乐/声音
   - 只关注画面、氛围、季节、颜色
   - 统一为现代、电影感的专辑封面风格
+  - 相同（归一化后）描述命中 llm_cache，/generate-cover 复用生成流程已算好的结果；use_cache=False 强制重新生成
   """
-  client = _get_client()
-  base_fallback = (
-      "A modern cinematic album cover, soft dreamy colors, abstract landscape, "
-      "warm and hopeful atmosphere, high quality digital art, no text, no logo"
-  )
-  if client is None:
+  base_fallback = COVER_PROMPT_FALLBACK
+  if not llm_client.configured():
     return base_fallback
 
-  system_prompt = (
-      "You are an assistant that converts music descriptions into album cover image prompts.\n\n"
-      "Rules:\n"
-      "- DO NOT mention musical instruments\n"
-      "- DO NOT mention sound, music, or audio\n"
-      "- Focus only on visual scene, atmosphere, emotions, season, and color\n"
-      "- The style must be consistent: modern, artistic, cinematic album cover\n"
-      "- Minimalist composition, no text, no logo, no watermark\n"
-      "- The image should look like a professional music album cover\n\n"
-      "Output a single English prompt suitable for an image generation model."
-  )
-
   try:
-    resp = await client.chat.completions.create(  # type: ignore[call-arg]
-        model=settings.OPENAI_MODEL,
-        messages=[
-            {"role": "system", "content": system_prompt},
-            {"role": "user", "content": user_music_prompt},
-        ],
-        temperature=0.6,
-        max_tokens=280,
+    content = await llm_client.chat_completion(
+        "build_album_cover_prompt",
+        messages=_cover_prompt_messages(user_music_prompt),
+        cache_ttl=settings.LLM_CACHE_TTL_SECONDS if use_cache else 0,
+        **_COVER_PROMPT_PARAMS,
     )
   except Exception:
     return base_fallback
 
-  content = resp.choices[0].message.content.strip() if resp and resp.choices else ""
   return content or base_fallback
 
 
-async def build_music_title(user_music_prompt: str) -> str:
+async def build_music_title(user_music_prompt: str, *, use_cache: bool = True) -> str:
   """
   根据用户输入生成一个更像 Suno 的“歌曲标题”（简短中文）。
   - 输出单行标题，不要引号，不要“标题：”
   - 尽量 4~12 个汉字，避免过长
+  - 结果经 llm_cache 缓存；use_cache=False 强制重新生成
   """
-  client = _get_client()
-  if client is None:
-    return (user_music_prompt or "").strip()[:12] or "AI 生成作品"
+  if not llm_client.configured():
+    return fallback_title(user_music_prompt)
 
   system_prompt = (
       "你是音乐标题生成助手。\n"
@@ -106,22 +134,18 @@ async def build_music_title(user_music_prompt: str) -> str:
   )
 
   try:
-    resp = await client.chat.completions.create(  # type: ignore[call-arg]
-        model=settings.OPENAI_MODEL,
+    title = await llm_client.chat_completion(
+        "build_music_title",
         messages=[
             {"role": "system", "content": system_prompt},
             {"role": "user", "content": (user_music_prompt or "").strip()},
         ],
         temperature=0.7,
         max_tokens=40,
+        cache_ttl=settings.LLM_CACHE_TTL_SECONDS if use_cache else 0,
     )
   except Exception:
-    return (user_music_prompt or "").strip()[:12] or "AI 生成作品"
+    return fallback_title(user_music_prompt)
 
-  title = resp.choices[0].message.content.strip() if resp and resp.choices else ""
   # Post-process: remove wrapping quotes and common prefixes
-  title = title.strip().strip('"').strip("“”").strip()
-  for prefix in ("标题：", "歌名：", "Title:", "title:"):
-    if title.lower().startswith(prefix.lower()):
-      title = title[len(prefix):].strip()
-  return title[:24] or (user_music_prompt or "").strip()[:12] or "AI 生成作品"
+  return clean_title(title, user_music_prompt)
@@ -0,0 +1,205 @@
+"""
+Two-tier cache of LLM prompt transforms (title, cover prompt, SongGen enhancer).
+
+Regenerating with the same prompt, or asking /generate-cover for a cover the
+generation flow already described, used to repeat a 1-3 s LLM round trip with the
+same input. llm_client.chat_completion(..., cache_ttl=N) now looks here first:
+
+- key: sha256 of the call type, model, sampling parameters and the messages, with
+  message text normalised (NFKC, collapsed whitespace) so trivially different
+  prompts share an entry,
+- tier 1: in-process LRU (LLM_CACHE_MEMORY_ENTRIES entries),
+- tier 2: the llm_response_cache table (LLM_CACHE_PERSIST), shared by workers and
+  surviving restarts; a tier-2 hit is copied into tier 1,
+- only successful responses are stored, never the placeholder fallbacks,
+- every entry expires after its TTL; purge_expired() (scheduler job) deletes old rows.
+
+Callers opt out per call with use_cache=False (cache_ttl=0), or globally with
+LLM_CACHE_ENABLED=false. The database tier is best effort: errors are logged and
+treated as a miss.
+"""
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import json
+import re
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Any
+
+from sqlalchemy import delete, update
+from sqlalchemy.exc import IntegrityError
+
+from app.core.config import settings
+from app.db.session import SessionLocal, session_scope
+from app.models.llm_response_cache import LlmResponseCache
+
+_WHITESPACE_RE = re.compile(r"\s+")
+
+_lock = threading.Lock()
+_entries: OrderedDict[str, tuple[float, str]] = OrderedDict()  # key -> (expires_at monotonic, response)
+_counters = {"memory_hits": 0, "db_hits": 0, "misses": 0, "stores": 0, "db_errors": 0}
+
+
+def enabled() -> bool:
+    return bool(settings.LLM_CACHE_ENABLED)
+
+
+def _persistent() -> bool:
+    return bool(settings.LLM_CACHE_PERSIST) and SessionLocal is not None
+
+
+def normalize_text(text: str) -> str:
+    return _WHITESPACE_RE.sub(" ", unicodedata.normalize("NFKC", text or "")).strip()
+
+
+def make_key(function: str, model: str, messages: list[dict[str, str]], params: dict[str, Any]) -> str:
+    payload = {
+        "function": function,
+        "model": model,
+        "messages": [{**m, "content": normalize_text(m.get("content", ""))} for m in messages],
+        "params": params,
+    }
+    raw = json.dumps(payload, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+def _memory_get(key: str) -> str | None:
+    now = time.monotonic()
+    with _lock:
+        entry = _entries.get(key)
+        if entry is None:
+            return None
+        if entry[0] <= now:
+            del _entries[key]
+            return None
+        _entries.move_to_end(key)
+        _counters["memory_hits"] += 1
+        return entry[1]
+
+
+def _memory_put(key: str, response: str, ttl_seconds: float) -> None:
+    with _lock:
+        _entries[key] = (time.monotonic() + ttl_seconds, response)
+        _entries.move_to_end(key)
+        while len(_entries) > max(1, int(settings.LLM_CACHE_MEMORY_ENTRIES)):
+            _entries.popitem(last=False)
+
+
+def _db_get(key: str) -> tuple[str, float] | None:
+    """(response, remaining ttl seconds) of a live row."""
+    try:
+        with session_scope() as db:
+            row = db.query(LlmResponseCache).filter(LlmResponseCache.cache_key == key).one_or_none()
+            now = datetime.utcnow()
+            if row is None or row.expires_at <= now:
+                return None
+            db.execute(
+                update(LlmResponseCache).where(LlmResponseCache.id == row.id).values(hits=LlmResponseCache.hits + 1)
+            )
+            return row.response, (row.expires_at - now).total_seconds()
+    except Exception as exc:
+        with _lock:
+            _counters["db_errors"] += 1
+        print(f"[llm_cache] db lookup failed: {exc}")
+        return None
+
+
+def _db_put(key: str, function: str, model: str, response: str, ttl_seconds: float) -> None:
+    expires_at = datetime.utcnow() + timedelta(seconds=ttl_seconds)
+    try:
+        try:
+            with session_scope() as db:
+                db.add(
+                    LlmResponseCache(
+                        cache_key=key, function=function, model=model, response=response, hits=0, expires_at=expires_at
+                    )
+                )
+        except IntegrityError:
+            # 行已存在（过期行或其他 worker 刚写入）：覆盖内容并续期
+            with session_scope() as db:
+                db.execute(
+                    update(LlmResponseCache)
+                    .where(LlmResponseCache.cache_key == key)
+                    .values(response=response, expires_at=expires_at, created_at=datetime.utcnow())
+                )
+    except Exception as exc:
+        with _lock:
+            _counters["db_errors"] += 1
+        print(f"[llm_cache] db store failed: {exc}")
+
+
+def get(key: str) -> tuple[str | None, str]:
+    """(response or None, tier) with tier in memory / db / miss. Blocking on the db tier."""
+    value = _memory_get(key)
+    if value is not None:
+        return value, "memory"
+    if _persistent():
+        found = _db_get(key)
+        if found is not None:
+            response, remaining = found
+            _memory_put(key, response, remaining)
+            with _lock:
+                _counters["db_hits"] += 1
+            return response, "db"
+    with _lock:
+        _counters["misses"] += 1
+    return None, "miss"
+
+
+def put(key: str, function: str, model: str, response: str, ttl_seconds: float) -> None:
+    if ttl_seconds <= 0:
+        return
+    _memory_put(key, response, ttl_seconds)
+    with _lock:
+        _counters["stores"] += 1
+    if _persistent():
+        _db_put(key, function, model, response, ttl_seconds)
+
+
+async def aget(key: str) -> tuple[str | None, str]:
+    """get() for event-loop callers: the memory tier inline, the db tier in a thread."""
+    value = _memory_get(key)
+    if value is not None:
+        return value, "memory"
+    if not _persistent():
+        with _lock:
+            _counters["misses"] += 1
+        return None, "miss"
+    return await asyncio.to_thread(get, key)
+
+
+async def aput(key: str, function: str, model: str, response: str, ttl_seconds: float) -> None:
+    if ttl_seconds <= 0:
+        return
+    if _persistent():
+        await asyncio.to_thread(put, key, function, model, response, ttl_seconds)
+    else:
+        put(key, function, model, response, ttl_seconds)
+
+
+def purge_expired() -> None:
+    """Scheduler / script entry point: drop expired rows and memory entries."""
+    now = time.monotonic()
+    with _lock:
+        for key in [k for k, (expires_at, _) in _entries.items() if expires_at <= now]:
+            del _entries[key]
+    if not _persistent():
+        return
+    with session_scope() as db:
+        result = db.execute(delete(LlmResponseCache).where(LlmResponseCache.expires_at <= datetime.utcnow()))
+        print(f"[llm_cache] purged {result.rowcount} expired rows")
+
+
+def clear_memory() -> None:
+    with _lock:
+        _entries.clear()
+
+
+def stats() -> dict[str, int]:
+    with _lock:
+        return {"entries": len(_entries), **_counters}
@@ -0,0 +1,455 @@
+"""
+Process-wide OpenAI-compatible client shared by llm.py, image_service.py and
+songgen_llm_enhancer.py.
+
+Previously every call built a fresh AsyncOpenAI / OpenAI client, i.e. a new
+httpx pool and a new TLS handshake per title, cover prompt, summary or enhancer
+call. Here:
+
+- clients are created once and reuse keep-alive connections (LLM_MAX_CONNECTIONS,
+  LLM_KEEPALIVE_SECONDS). httpx async pools are bound to the event loop they were
+  created on, so there is one AsyncOpenAI per loop: the server loop and the
+  long-lived runner loop behind `run_sync()` (background threads use that instead
+  of asyncio.run(), which would create and tear down a loop per call). The sync
+  client for the enhancer is one per process.
+- every call names its call type; the timeout comes from CALL_TIMEOUTS.
+- at most LLM_MAX_CONCURRENCY calls are in flight per loop (and across sync callers);
+  the rest wait for a slot instead of piling onto the provider.
+- timeouts, connection errors, 429 and 5xx are retried up to LLM_MAX_RETRIES times
+  with full-jitter exponential backoff (the SDK's own retries are disabled).
+- identical concurrent async requests (same call type and payload) share one
+  upstream call.
+- chat completions passed cache_ttl > 0 are served from / stored in
+  app.services.llm_cache (memory LRU + llm_response_cache table).
+- latency / outcome / retry / cache counters per call type, rendered by `metrics_text()`
+  in the Prometheus text format for GET /health/llm-metrics.
+"""
+from __future__ import annotations
+
+import asyncio
+import bisect
+import json
+import random
+import threading
+import time
+import weakref
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, TypeVar
+
+import httpx
+from openai import (
+    APIConnectionError,
+    APIStatusError,
+    APITimeoutError,
+    AsyncOpenAI,
+    DefaultAsyncHttpxClient,
+    DefaultHttpxClient,
+    OpenAI,
+    RateLimitError,
+)
+
+from app.core.config import settings
+from app.services import llm_cache
+
+T = TypeVar("T")
+
+# 调用类型 -> 超时配置项；未列出的使用 LLM_TIMEOUT_SECONDS
+CALL_TIMEOUTS = {
+    "build_music_title": "LLM_TITLE_TIMEOUT_SECONDS",
+    "build_album_cover_prompt": "LLM_COVER_PROMPT_TIMEOUT_SECONDS",
+    "summarize_emotion": "LLM_SUMMARY_TIMEOUT_SECONDS",
+    "enhance_for_songgen": "SONGGEN_LLM_TIMEOUT_SECONDS",
+    "generate_album_cover_image": "IMAGE_TIMEOUT_SECONDS",
+    "plan_generation": "LLM_PLANNER_TIMEOUT_SECONDS",
+}
+
+# 延迟直方图上界（秒），最后一个桶为 +Inf
+LATENCY_BUCKETS_SECONDS = (0.25, 0.5, 1, 2, 5, 10, 20, 30, 60, 120)
+
+
+def configured() -> bool:
+    return bool(settings.OPENAI_API_KEY and settings.OPENAI_API_BASE)
+
+
+def timeout_for(call: str) -> float:
+    return float(getattr(settings, CALL_TIMEOUTS.get(call, "LLM_TIMEOUT_SECONDS"), settings.LLM_TIMEOUT_SECONDS))
+
+
+# ---------------------------------------------------------------------------
+# Metrics
+# ---------------------------------------------------------------------------
+
+
+@dataclass
+class CallStats:
+    outcomes: dict[str, int] = field(default_factory=dict)  # ok / error / timeout
+    retries: int = 0
+    coalesced: int = 0
+    cache: dict[str, int] = field(default_factory=dict)  # memory / db / miss
+    in_flight: int = 0
+    latency_buckets: list[int] = field(default_factory=lambda: [0] * (len(LATENCY_BUCKETS_SECONDS) + 1))
+    latency_sum: float = 0.0
+    latency_count: int = 0
+
+
+_stats: dict[str, CallStats] = {}
+_stats_lock = threading.Lock()
+
+
+def _record(call: str, **changes: Any) -> None:
+    with _stats_lock:
+        stats = _stats.setdefault(call, CallStats())
+        if "outcome" in changes:
+            outcome = changes["outcome"]
+            stats.outcomes[outcome] = stats.outcomes.get(outcome, 0) + 1
+        if "seconds" in changes:
+            seconds = changes["seconds"]
+            stats.latency_sum += seconds
+            stats.latency_count += 1
+            stats.latency_buckets[bisect.bisect_left(LATENCY_BUCKETS_SECONDS, seconds)] += 1
+        if "cache" in changes:
+            stats.cache[changes["cache"]] = stats.cache.get(changes["cache"], 0) + 1
+        stats.retries += changes.get("retries", 0)
+        stats.coalesced += changes.get("coalesced", 0)
+        stats.in_flight += changes.get("in_flight", 0)
+
+
+def _outcome(exc: BaseException | None) -> str:
+    if exc is None:
+        return "ok"
+    if isinstance(exc, (APITimeoutError, asyncio.TimeoutError, httpx.TimeoutException)):
+        return "timeout"
+    return "error"
+
+
+def metrics_text() -> str:
+    """All call-type metrics in the Prometheus text exposition format."""
+    with _stats_lock:
+        items = sorted((call, stats) for call, stats in _stats.items())
+        lines = [
+            "# HELP llm_requests_total LLM calls by call type and outcome (after retries).",
+            "# TYPE llm_requests_total counter",
+        ]
+        for call, stats in items:
+            for outcome, count in sorted(stats.outcomes.items()):
+                lines.append(f'llm_requests_total{{function="{call}",outcome="{outcome}"}} {count}')
+        lines += ["# HELP llm_retries_total Retried upstream attempts.", "# TYPE llm_retries_total counter"]
+        lines += [f'llm_retries_total{{function="{call}"}} {stats.retries}' for call, stats in items]
+        lines += [
+            "# HELP llm_coalesced_total Requests served by an identical in-flight call.",
+            "# TYPE llm_coalesced_total counter",
+        ]
+        lines += [f'llm_coalesced_total{{function="{call}"}} {stats.coalesced}' for call, stats in items]
+        lines += [
+            "# HELP llm_cache_lookups_total Response cache lookups by tier that answered (miss = upstream call).",
+            "# TYPE llm_cache_lookups_total counter",
+        ]
+        for call, stats in items:
+            for result, count in sorted(stats.cache.items()):
+                lines.append(f'llm_cache_lookups_total{{function="{call}",result="{result}"}} {count}')
+        lines += ["# HELP llm_in_flight Calls currently running.", "# TYPE llm_in_flight gauge"]
+        lines += [f'llm_in_flight{{function="{call}"}} {stats.in_flight}' for call, stats in items]
+        lines += [
+            "# HELP llm_request_duration_seconds Call latency including retries and waiting for a slot.",
+            "# TYPE llm_request_duration_seconds histogram",
+        ]
+        for call, stats in items:
+            cumulative = 0
+            for bound, count in zip(LATENCY_BUCKETS_SECONDS, stats.latency_buckets):
+                cumulative += count
+                lines.append(f'llm_request_duration_seconds_bucket{{function="{call}",le="{bound}"}} {cumulative}')
+            lines.append(
+                f'llm_request_duration_seconds_bucket{{function="{call}",le="+Inf"}} {stats.latency_count}'
+            )
+            lines.append(f'llm_request_duration_seconds_sum{{function="{call}"}} {stats.latency_sum:.6f}')
+            lines.append(f'llm_request_duration_seconds_count{{function="{call}"}} {stats.latency_count}')
+    return "\n".join(lines) + "\n"
+
+
+def reset_metrics() -> None:
+    with _stats_lock:
+        _stats.clear()
+
+
+# ---------------------------------------------------------------------------
+# Clients
+# ---------------------------------------------------------------------------
+
+
+def _limits() -> httpx.Limits:
+    connections = max(1, int(settings.LLM_MAX_CONNECTIONS))
+    return httpx.Limits(
+        max_connections=connections,
+        max_keepalive_connections=connections,
+        keepalive_expiry=float(settings.LLM_KEEPALIVE_SECONDS),
+    )
+
+
+@dataclass
+class _LoopState:
+    client: AsyncOpenAI
+    slots: asyncio.Semaphore
+    inflight: dict[str, asyncio.Task] = field(default_factory=dict)
+
+
+_loop_states: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, _LoopState]" = weakref.WeakKeyDictionary()
+_sync_client: OpenAI | None = None
+_sync_slots: threading.BoundedSemaphore | None = None
+_clients_lock = threading.Lock()
+
+
+def _loop_state() -> _LoopState:
+    loop = asyncio.get_running_loop()
+    state = _loop_states.get(loop)
+    if state is None:
+        with _clients_lock:
+            state = _loop_states.get(loop)
+            if state is None:
+                client = AsyncOpenAI(
+                    api_key=settings.OPENAI_API_KEY,
+                    base_url=settings.OPENAI_API_BASE,
+                    max_retries=0,
+                    timeout=float(settings.LLM_TIMEOUT_SECONDS),
+                    http_client=DefaultAsyncHttpxClient(limits=_limits()),
+                )
+                state = _LoopState(client=client, slots=asyncio.Semaphore(max(1, int(settings.LLM_MAX_CONCURRENCY))))
+                _loop_states[loop] = state
+    return state
+
+
+def get_async_client() -> AsyncOpenAI | None:
+    """The AsyncOpenAI of the running loop, or None when no provider is configured."""
+    if not configured():
+        return None
+    return _loop_state().client
+
+
+def get_sync_client() -> OpenAI | None:
+    global _sync_client, _sync_slots
+    if not configured():
+        return None
+    if _sync_client is None:
+        with _clients_lock:
+            if _sync_client is None:
+                _sync_slots = threading.BoundedSemaphore(max(1, int(settings.LLM_MAX_CONCURRENCY)))
+                _sync_client = OpenAI(
+                    api_key=settings.OPENAI_API_KEY,
+                    base_url=settings.OPENAI_API_BASE,
+                    max_retries=0,
+                    timeout=float(settings.LLM_TIMEOUT_SECONDS),
+                    http_client=DefaultHttpxClient(limits=_limits()),
+                )
+    return _sync_client
+
+
+async def aclose() -> None:
+    """Close the running loop's client (app shutdown)."""
+    state = _loop_states.pop(asyncio.get_running_loop(), None)
+    if state is not None:
+        await state.client.close()
+
+
+# ---------------------------------------------------------------------------
+# Runner loop for synchronous callers
+# ---------------------------------------------------------------------------
+
+_runner_loop: asyncio.AbstractEventLoop | None = None
+
+
+def _runner() -> asyncio.AbstractEventLoop:
+    global _runner_loop
+    if _runner_loop is None:
+        with _clients_lock:
+            if _runner_loop is None:
+                loop = asyncio.new_event_loop()
+                threading.Thread(target=loop.run_forever, name="llm-runner", daemon=True).start()
+                _runner_loop = loop
+    return _runner_loop
+
+
+def run_sync(coro: Awaitable[T]) -> T:
+    """
+    Run an llm / image_service coroutine from a worker thread (background jobs).
+
+    Replaces asyncio.run(): the coroutine runs on one long-lived loop, so its client
+    and keep-alive connections survive between calls. Must not be called from
+    inside an event loop.
+    """
+    return asyncio.run_coroutine_threadsafe(coro, _runner()).result()
+
+
+# ---------------------------------------------------------------------------
+# Calls
+# ---------------------------------------------------------------------------
+
+
+def _retryable(exc: BaseException) -> bool:
+    if isinstance(exc, (APIConnectionError, RateLimitError)):  # APITimeoutError 是 APIConnectionError 的子类
+        return True
+    if isinstance(exc, APIStatusError):
+        return exc.status_code in (408, 409) or exc.status_code >= 500
+    return False
+
+
+def _backoff(attempt: int) -> float:
+    return random.uniform(0, float(settings.LLM_RETRY_BACKOFF_SECONDS) * (2 ** attempt))
+
+
+def _coalesce_key(call: str, payload: dict[str, Any]) -> str:
+    return call + ":" + json.dumps(payload, sort_keys=True, ensure_ascii=False, default=str)
+
+
+async def _attempts(call: str, send: Callable[[], Awaitable[T]]) -> T:
+    state = _loop_state()
+    retries = max(0, int(settings.LLM_MAX_RETRIES))
+    async with state.slots:
+        for attempt in range(retries + 1):
+            try:
+                return await send()
+            except Exception as exc:
+                if attempt >= retries or not _retryable(exc):
+                    raise
+                _record(call, retries=1)
+                delay = _backoff(attempt)
+                print(f"[llm] {call} attempt {attempt + 1} failed ({type(exc).__name__}), retrying in {delay:.2f}s")
+                await asyncio.sleep(delay)
+    raise AssertionError("unreachable")
+
+
+async def _call(call: str, payload: dict[str, Any], send: Callable[[AsyncOpenAI, float], Awaitable[T]]) -> T:
+    state = _loop_state()
+    key = _coalesce_key(call, payload)
+    task = state.inflight.get(key)
+    if task is not None:
+        _record(call, coalesced=1)
+        return await asyncio.shield(task)
+
+    async def run() -> T:
+        started = time.perf_counter()
+        _record(call, in_flight=1)
+        error: BaseException | None = None
+        try:
+            return await _attempts(call, lambda: send(state.client, timeout_for(call)))
+        except BaseException as exc:
+            error = exc
+            raise
+        finally:
+            _record(call, in_flight=-1, outcome=_outcome(error), seconds=time.perf_counter() - started)
+
+    task = asyncio.get_running_loop().create_task(run())
+    state.inflight[key] = task
+    task.add_done_callback(lambda _: state.inflight.pop(key, None))
+    # shield：某个等待方被取消时不取消共享的上游调用
+    return await asyncio.shield(task)
+
+
+def _cache_key(call: str, cache_ttl: float, messages: list[dict[str, str]], params: dict[str, Any]) -> str | None:
+    if cache_ttl <= 0 or not llm_cache.enabled():
+        return None
+    return llm_cache.make_key(call, settings.OPENAI_MODEL, messages, params)
+
+
+def _cacheable(content: str, validate: Callable[[str], bool] | None) -> bool:
+    return bool(content) and (validate is None or validate(content))
+
+
+async def chat_completion(
+    call: str,
+    *,
+    messages: list[dict[str, str]],
+    cache_ttl: float = 0,
+    validate: Callable[[str], bool] | None = None,
+    **params: Any,
+) -> str:
+    """
+    Chat completion content (stripped); raises after the last failed attempt.
+
+    cache_ttl > 0 serves repeated requests from llm_cache and stores non-empty
+    responses for that many seconds. `validate` (e.g. "parses as the expected JSON")
+    must accept a response before it is cached; cached entries it rejects are ignored.
+    """
+    key = _cache_key(call, cache_ttl, messages, params)
+    if key is not None:
+        cached, tier = await llm_cache.aget(key)
+        if cached is not None and _cacheable(cached, validate):
+            _record(call, cache=tier)
+            return cached
+        _record(call, cache="miss")
+
+    payload = {"model": settings.OPENAI_MODEL, "messages": messages, **params}
+
+    async def send(client: AsyncOpenAI, timeout: float):
+        return await client.chat.completions.create(**payload, timeout=timeout)  # type: ignore[call-overload]
+
+    resp = await _call(call, payload, send)
+    content = (resp.choices[0].message.content or "").strip() if resp and resp.choices else ""
+    if key is not None and _cacheable(content, validate):
+        await llm_cache.aput(key, call, settings.OPENAI_MODEL, content, cache_ttl)
+    return content
+
+
+async def generate_image(call: str, **params: Any):
+    """images.generate response; raises after the last failed attempt."""
+
+    async def send(client: AsyncOpenAI, timeout: float):
+        return await client.images.generate(**params, timeout=timeout)  # type: ignore[call-overload]
+
+    return await _call(call, params, send)
+
+
+async def seed_cache(
+    call: str, *, messages: list[dict[str, str]], content: str, cache_ttl: float, **params: Any
+) -> None:
+    """Store `content` as the cached answer to chat_completion(call, messages, **params)."""
+    key = _cache_key(call, cache_ttl, messages, params)
+    if key is not None and content:
+        await llm_cache.aput(key, call, settings.OPENAI_MODEL, content, cache_ttl)
+
+
+def chat_completion_sync(
+    call: str,
+    *,
+    messages: list[dict[str, str]],
+    cache_ttl: float = 0,
+    validate: Callable[[str], bool] | None = None,
+    **params: Any,
+) -> str:
+    """Blocking chat_completion for synchronous callers (worker threads)."""
+    client = get_sync_client()
+    if client is None:
+        raise RuntimeError("LLM provider is not configured")
+    key = _cache_key(call, cache_ttl, messages, params)
+    if key is not None:
+        cached, tier = llm_cache.get(key)
+        if cached is not None and _cacheable(cached, validate):
+            _record(call, cache=tier)
+            return cached
+        _record(call, cache="miss")
+    retries = max(0, int(settings.LLM_MAX_RETRIES))
+    started = time.perf_counter()
+    _record(call, in_flight=1)
+    error: BaseException | None = None
+    try:
+        with _sync_slots:  # type: ignore[union-attr]
+            for attempt in range(retries + 1):
+                try:
+                    resp = client.chat.completions.create(  # type: ignore[call-overload]
+                        model=settings.OPENAI_MODEL, messages=messages, timeout=timeout_for(call), **params
+                    )
+                    break
+                except Exception as exc:
+                    if attempt >= retries or not _retryable(exc):
+                        raise
+                    _record(call, retries=1)
+                    delay = _backoff(attempt)
+                    print(f"[llm] {call} attempt {attempt + 1} failed ({type(exc).__name__}), retrying in {delay:.2f}s")
+                    time.sleep(delay)
+        content = (resp.choices[0].message.content or "").strip() if resp and resp.choices else ""
+    except BaseException as exc:
+        error = exc
+        raise
+    finally:
+        _record(call, in_flight=-1, outcome=_outcome(error), seconds=time.perf_counter() - started)
+    if key is not None and _cacheable(content, validate):
+        llm_cache.put(key, call, settings.OPENAI_MODEL, content, cache_ttl)
+    return content
@@ -0,0 +1,179 @@
+"""
+Bounded on-disk LRU cache for OSS objects used by server-side processing.
+
+With DELETE_LOCAL_AUDIO_AFTER_OSS_UPLOAD on, re-analysis / preview / transcoding jobs
+would otherwise download the same track from OSS every time. `DiskLRUCache.get_path`
+returns a local file for an OSS key:
+- hit: the cached file (recency bumped in memory and via mtime, so it survives restarts)
+- miss: downloaded to a temp file in the cache dir, then atomically renamed into place
+- concurrent misses for the same key share one download (single-flight)
+- after each fill the least recently used entries are evicted until the cache is
+  back under its byte budget
+
+Entry names are sha256(key) + original extension, so arbitrary OSS keys map to flat,
+safe file names.
+"""
+from __future__ import annotations
+
+import hashlib
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from pathlib import Path
+from typing import Callable
+
+from app.core.config import settings
+
+_TMP_SUFFIX = ".fill"
+
+
+class DiskLRUCache:
+    def __init__(self, directory: str | os.PathLike[str], max_bytes: int) -> None:
+        self.directory = Path(directory)
+        self.max_bytes = int(max_bytes)
+        self._lock = threading.Lock()
+        self._entries: OrderedDict[str, int] = OrderedDict()  # name -> size, oldest first
+        self._inflight: dict[str, threading.Event] = {}
+        self._total_bytes = 0
+        self._loaded = False
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.fill_errors = 0
+
+    # ---------- public API ----------
+    def get_path(self, key: str, fetch: Callable[[str, Path], None]) -> Path:
+        """
+        Return a local path for `key`, calling `fetch(key, tmp_path)` on a miss.
+        `fetch` must write the complete object to `tmp_path`.
+        """
+        name = self._entry_name(key)
+        path = self.directory / name
+        while True:
+            with self._lock:
+                self._ensure_loaded()
+                if name in self._entries and path.is_file():
+                    self._entries.move_to_end(name)
+                    self.hits += 1
+                    self._touch(path)
+                    return path
+                if name in self._entries:
+                    # 文件被外部删除：丢弃记录后重新拉取
+                    self._total_bytes -= self._entries.pop(name)
+                waiter = self._inflight.get(name)
+                if waiter is None:
+                    self._inflight[name] = threading.Event()
+                    self.misses += 1
+                    break
+            # 同一 key 已有线程在下载：等待其完成后按命中处理
+            waiter.wait()
+
+        try:
+            self._fill(key, path, fetch)
+        finally:
+            with self._lock:
+                self._inflight.pop(name).set()
+        return path
+
+    def stats(self) -> dict[str, int | float | str]:
+        with self._lock:
+            self._ensure_loaded()
+            lookups = self.hits + self.misses
+            return {
+                "directory": str(self.directory),
+                "entries": len(self._entries),
+                "bytes": self._total_bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "fill_errors": self.fill_errors,
+                "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+            }
+
+    # ---------- internals ----------
+    @staticmethod
+    def _entry_name(key: str) -> str:
+        suffix = Path(key).suffix.lower()
+        if len(suffix) > 16 or not suffix[1:].isalnum():
+            suffix = ""
+        return hashlib.sha256(key.encode("utf-8")).hexdigest() + suffix
+
+    @staticmethod
+    def _touch(path: Path) -> None:
+        try:
+            os.utime(path, None)
+        except OSError:
+            pass
+
+    def _ensure_loaded(self) -> None:
+        """Rebuild the LRU order from disk (mtime) the first time the cache is used."""
+        if self._loaded:
+            return
+        self.directory.mkdir(parents=True, exist_ok=True)
+        found: list[tuple[float, str, int]] = []
+        for entry in os.scandir(self.directory):
+            if not entry.is_file():
+                continue
+            if entry.name.endswith(_TMP_SUFFIX):
+                # 上次进程中断留下的半成品
+                try:
+                    os.remove(entry.path)
+                except OSError:
+                    pass
+                continue
+            st = entry.stat()
+            found.append((st.st_mtime, entry.name, st.st_size))
+        for _, name, size in sorted(found):
+            self._entries[name] = size
+            self._total_bytes += size
+        self._loaded = True
+
+    def _fill(self, key: str, path: Path, fetch: Callable[[str, Path], None]) -> None:
+        tmp_path = path.with_name(f"{path.name}.{uuid.uuid4().hex}{_TMP_SUFFIX}")
+        started = time.perf_counter()
+        try:
+            fetch(key, tmp_path)
+            size = tmp_path.stat().st_size
+            os.replace(tmp_path, path)
+        except Exception:
+            with self._lock:
+                self.fill_errors += 1
+            try:
+                tmp_path.unlink()
+            except OSError:
+                pass
+            raise
+        with self._lock:
+            self._entries[path.name] = size
+            self._total_bytes += size
+            self._evict(keep=path.name)
+        print(f"[oss_cache] filled key={key} bytes={size} in {time.perf_counter() - started:.2f}s")
+
+    def _evict(self, *, keep: str) -> None:
+        while self._total_bytes > self.max_bytes and len(self._entries) > 1:
+            name, size = next(iter(self._entries.items()))
+            if name == keep:
+                break
+            self._entries.pop(name)
+            self._total_bytes -= size
+            self.evictions += 1
+            try:
+                os.remove(self.directory / name)
+            except OSError:
+                pass
+
+
+_cache: DiskLRUCache | None = None
+_cache_lock = threading.Lock()
+
+
+def get_cache() -> DiskLRUCache:
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = DiskLRUCache(settings.OSS_CACHE_DIR, int(settings.OSS_CACHE_MAX_MB) * 1024 * 1024)
+    return _cache
@@ -8,6 +8,7 @@ from typing import Optional
 import oss2
 
 from app.core.config import settings
+from app.services.oss_cache import get_cache
 
 
 def build_oss_key(
@@ -43,10 +44,15 @@ class OSSStorage:
         self.public_base_url = (settings.OSS_PUBLIC_BASE_URL or "").rstrip("/")
         self.sign_expires = int(settings.OSS_SIGN_EXPIRES)
 
-    def put_bytes(self, key: str, data: bytes, content_type: Optional[str] = None) -> None:
+    def put_bytes(
+        self, key: str, data: bytes, content_type: Optional[str] = None, cache_control: Optional[str] = None
+    ) -> None:
         headers = {}
         if content_type:
             headers["Content-Type"] = content_type
+        if cache_control:
+            # 内容寻址 / 不可变对象：OSS 与 CDN 按此下发长缓存
+            headers["Cache-Control"] = cache_control
         self.bucket.put_object(key, data, headers=headers)
 
     def put_file(self, key: str, local_path: str, content_type: Optional[str] = None) -> None:
@@ -61,6 +67,9 @@ class OSSStorage:
             return f"{self.public_base_url}/{key}"
         return self.bucket.sign_url("GET", key, self.sign_expires)
 
+    def download_to_file(self, key: str, local_path: str) -> None:
+        self.bucket.get_object_to_file(key, local_path)
+
     def delete(self, key: str) -> None:
         self.bucket.delete_object(key)
 
@@ -96,6 +105,27 @@ def resolve_storage_path_to_url(storage_path: str | None) -> str | None:
     return None
 
 
+def get_local_path(storage_path: str | None) -> Path | None:
+    """
+    本地可读文件路径，供服务端处理（重新分析 / 预览 / 转码）使用：
+    - oss://key -> 若 MEDIA_ROOT 下有同 key 的本地副本直接用，否则经 LRU 磁盘缓存拉取（见 oss_cache）
+    - 本地路径 -> 存在则返回
+    - 其他（http(s) 外链等）返回 None
+    """
+    if not storage_path:
+        return None
+    key = decode_oss_path(storage_path)
+    if key:
+        mirror = Path(settings.MEDIA_ROOT) / key
+        if mirror.is_file():
+            return mirror
+        return get_cache().get_path(key, lambda k, tmp: OSSStorage().download_to_file(k, str(tmp)))
+    if storage_path.startswith("http://") or storage_path.startswith("https://"):
+        return None
+    path = Path(storage_path)
+    return path if path.is_file() else None
+
+
 def normalize_oss_like_url(value: str | None) -> str | None:
     """
     将指向当前桶的公开 URL 转成 oss://key。
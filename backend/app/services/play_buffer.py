@@ -0,0 +1,465 @@
+"""
+Write-coalescing ingest for `/works/{id}/play`.
+
+Instead of one transaction per play (insert log + read-modify-write of works.play_count
+and users.plays_received), plays are:
+1. de-duplicated per (work, user-or-IP) within PLAY_DEDUPE_SECONDS (replays are dropped),
+2. appended to a local segment file (JSON lines) so an acknowledged play survives a
+   crash / restart, and queued in memory,
+3. flushed every PLAY_FLUSH_INTERVAL_MS (or once PLAY_FLUSH_MAX_BATCH is queued) in a
+   single transaction: one batched INSERT into work_play_logs plus aggregated
+   `UPDATE ... SET col = col + :n` deltas per work / author.
+
+A segment file is deleted only after the transaction that contains its plays commits, and
+leftover segments are replayed at startup: delivery is at-least-once. On shutdown the
+lifespan flushes whatever is still queued.
+
+When a batch fails, one bad play must not block the rest forever. The flush then:
+- drops plays whose work has been deleted,
+- clears user / author ids that no longer exist,
+- retries the cleaned batch, and if that fails, commits the plays one at a time.
+A play that still fails counts an attempt. After PLAY_MAX_ATTEMPTS it is moved to
+dead-letter.log in the buffer directory. If the database cannot be reached at all,
+the whole batch is requeued and no attempts are counted.
+Each worker process writes its own segments and holds an exclusive lock on them
+(POSIX only), so a restarting worker never replays segments another live worker owns.
+"""
+from __future__ import annotations
+
+import asyncio
+import json
+import os
+import threading
+import time
+import uuid
+from collections import defaultdict
+from dataclasses import asdict, dataclass
+from datetime import datetime
+from pathlib import Path
+from typing import IO, Optional
+
+from sqlalchemy import bindparam, insert, select, update
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+
+from app.core.config import settings
+from app.db.session import SessionLocal
+from app.models.user import User
+from app.models.work import Work
+from app.models.work_play_log import WorkPlayLog
+
+try:  # POSIX advisory locks; Windows deployments run a single worker
+    import fcntl
+except ImportError:  # pragma: no cover - platform dependent
+    fcntl = None  # type: ignore[assignment]
+
+
+@dataclass
+class PlayEvent:
+    work_id: int
+    author_id: Optional[int]
+    user_id: Optional[int]
+    source: Optional[str]
+    played_at: str  # ISO-8601 (UTC)
+    attempts: int = 0  # 数据库可用时写入失败的次数
+
+
+def apply_plays(db: Session, events: list[PlayEvent]) -> None:
+    """Insert play logs and apply aggregated counter deltas (caller commits)."""
+    if not events:
+        return
+    db.execute(
+        insert(WorkPlayLog),
+        [
+            {
+                "work_id": e.work_id,
+                "user_id": e.user_id,
+                "source": e.source,
+                "played_at": datetime.fromisoformat(e.played_at),
+            }
+            for e in events
+        ],
+    )
+    work_deltas: dict[int, int] = defaultdict(int)
+    author_deltas: dict[int, int] = defaultdict(int)
+    for e in events:
+        work_deltas[e.work_id] += 1
+        if e.author_id:
+            author_deltas[e.author_id] += 1
+
+    works = Work.__table__
+    db.execute(
+        update(works)
+        .where(works.c.id == bindparam("b_id"))
+        .values(play_count=works.c.play_count + bindparam("b_n")),
+        [{"b_id": k, "b_n": n} for k, n in sorted(work_deltas.items())],
+    )
+    if author_deltas:
+        users = User.__table__
+        db.execute(
+            update(users)
+            .where(users.c.id == bindparam("b_id"))
+            .values(plays_received=users.c.plays_received + bindparam("b_n")),
+            [{"b_id": k, "b_n": n} for k, n in sorted(author_deltas.items())],
+        )
+
+
+class _Segment:
+    """One append-only JSON-lines file holding queued plays (locked while owned)."""
+
+    def __init__(self, path: Path, handle: IO[str]) -> None:
+        self.path = path
+        self.handle = handle
+
+    @classmethod
+    def create(cls, directory: Path) -> "_Segment":
+        path = directory / f"plays-{os.getpid()}-{uuid.uuid4().hex}.log"
+        handle = open(path, "a+", encoding="utf-8")
+        if fcntl is not None:
+            fcntl.flock(handle.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        return cls(path, handle)
+
+    @classmethod
+    def claim(cls, path: Path) -> "_Segment | None":
+        """Take over a leftover segment unless a live process still holds its lock."""
+        try:
+            handle = open(path, "a+", encoding="utf-8")
+        except OSError:
+            return None
+        if fcntl is not None:
+            try:
+                fcntl.flock(handle.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except OSError:
+                handle.close()
+                return None
+        return cls(path, handle)
+
+    def append(self, event: PlayEvent) -> None:
+        self.handle.write(json.dumps(asdict(event), ensure_ascii=False) + "\n")
+        self.handle.flush()
+
+    def read_events(self) -> list[PlayEvent]:
+        self.handle.seek(0)
+        events: list[PlayEvent] = []
+        for line in self.handle:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                events.append(PlayEvent(**json.loads(line)))
+            except (ValueError, TypeError):
+                # 进程崩溃时可能留下半行
+                continue
+        return events
+
+    def discard(self) -> None:
+        try:
+            os.remove(self.path)
+        except OSError:
+            pass
+        self.handle.close()
+
+
+class PlayBuffer:
+    def __init__(
+        self,
+        *,
+        directory: str | os.PathLike[str] | None = None,
+        dedupe_seconds: float | None = None,
+        max_batch: int | None = None,
+        max_attempts: int | None = None,
+        session_factory=None,
+    ) -> None:
+        self.session_factory = session_factory or SessionLocal
+        self.directory = Path(directory or settings.PLAY_BUFFER_DIR)
+        self.dedupe_seconds = float(settings.PLAY_DEDUPE_SECONDS if dedupe_seconds is None else dedupe_seconds)
+        self.max_batch = int(max_batch or settings.PLAY_FLUSH_MAX_BATCH)
+        self.max_attempts = max(1, int(max_attempts or settings.PLAY_MAX_ATTEMPTS))
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._pending: list[PlayEvent] = []
+        self._pending_by_work: dict[int, int] = defaultdict(int)
+        self._segments: list[_Segment] = []  # sealed segments whose plays are not committed yet
+        self._active: _Segment | None = None
+        self._recent: dict[tuple[int, str], float] = {}
+        self._wakeup: asyncio.Event | None = None
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self.running = False
+        self.accepted = 0
+        self.deduped = 0
+        self.flushed = 0
+        self.flush_errors = 0
+        self.dropped = 0
+        self.dead_lettered = 0
+
+    # ---------- ingest ----------
+    def record(
+        self,
+        *,
+        work_id: int,
+        author_id: int | None,
+        user_id: int | None,
+        client_key: str,
+        source: str | None,
+    ) -> bool:
+        """Queue one play; returns False when it is a replay inside the dedupe window."""
+        now = time.monotonic()
+        key = (int(work_id), client_key)
+        event = PlayEvent(
+            work_id=int(work_id),
+            author_id=author_id,
+            user_id=user_id,
+            source=source,
+            played_at=datetime.utcnow().isoformat(),
+        )
+        with self._lock:
+            last = self._recent.get(key)
+            if last is not None and now - last < self.dedupe_seconds:
+                self.deduped += 1
+                return False
+            self._recent[key] = now
+            if self._active is None:
+                self.directory.mkdir(parents=True, exist_ok=True)
+                self._active = _Segment.create(self.directory)
+            self._active.append(event)
+            self._pending.append(event)
+            self._pending_by_work[event.work_id] += 1
+            self.accepted += 1
+            full = len(self._pending) >= self.max_batch
+        if full:
+            self._wake()
+        return True
+
+    def pending_for(self, work_id: int) -> int:
+        """Plays of a work accepted but not flushed yet (added to the count we return)."""
+        with self._lock:
+            return self._pending_by_work.get(int(work_id), 0)
+
+    # ---------- flushing ----------
+    def recover(self) -> int:
+        """Queue plays from segments left behind by a previous (crashed / killed) process."""
+        if not self.directory.is_dir():
+            return 0
+        recovered = 0
+        for path in sorted(self.directory.glob("plays-*.log")):
+            if self._active is not None and path == self._active.path:
+                continue
+            segment = _Segment.claim(path)
+            if segment is None:
+                continue
+            events = segment.read_events()
+            with self._lock:
+                self._segments.append(segment)
+                self._pending.extend(events)
+                for e in events:
+                    self._pending_by_work[e.work_id] += 1
+            recovered += len(events)
+        if recovered:
+            print(f"[play_buffer] recovered {recovered} plays from previous run")
+        return recovered
+
+    def flush(self) -> int:
+        """Commit everything queued so far in one transaction; returns the number of plays written."""
+        if self.session_factory is None:
+            return 0
+        with self._flush_lock:
+            with self._lock:
+                if not self._pending:
+                    self._prune_recent()
+                    return 0
+                events, self._pending = self._pending, []
+                self._pending_by_work = defaultdict(int)
+                if self._active is not None:
+                    self._segments.append(self._active)
+                    self._active = None
+                segments, self._segments = self._segments, []
+
+            db = self.session_factory()
+            try:
+                apply_plays(db, events)
+                db.commit()
+                written, dropped, failed = len(events), 0, []
+            except Exception as exc:
+                db.rollback()
+                print(f"[play_buffer] flush of {len(events)} plays failed: {exc}")
+                try:
+                    written, dropped, failed = self._salvage(db, events)
+                except Exception as salvage_exc:
+                    db.rollback()
+                    with self._lock:
+                        # 数据库不可用：事件与段文件放回队首，下次重试（段文件保留，崩溃后也能恢复）
+                        self._requeue(events)
+                        self._segments = segments + self._segments
+                        self.flush_errors += 1
+                    print(f"[play_buffer] database unavailable, requeued {len(events)} plays: {salvage_exc}")
+                    return 0
+            finally:
+                db.close()
+
+            retry = [e for e in failed if e.attempts < self.max_attempts]
+            dead = [e for e in failed if e.attempts >= self.max_attempts]
+            if dead:
+                self._dead_letter(dead)
+            if retry and not self._rewrite_segment(retry, segments):
+                # 新段文件写不了：保留旧段文件（崩溃重放时已写入的播放会重复，仍是至少一次）
+                segments = []
+            for segment in segments:
+                segment.discard()
+            with self._lock:
+                self.flushed += written
+                self.dropped += dropped
+                self.dead_lettered += len(dead)
+                if failed:
+                    self.flush_errors += 1
+                self._prune_recent()
+            return written
+
+    def _salvage(self, db: Session, events: list[PlayEvent]) -> tuple[int, int, list[PlayEvent]]:
+        """
+        Retry a failed batch after removing what can never be written: plays of deleted
+        works are dropped and ids of deleted users cleared. Falls back to one transaction
+        per play when the cleaned batch fails as well. Raises when the database itself is
+        unreachable; returns (written, dropped, failed plays with attempts incremented).
+        """
+        work_ids = {e.work_id for e in events}
+        user_ids = {uid for e in events for uid in (e.user_id, e.author_id) if uid}
+        live_works = set(db.execute(select(Work.id).where(Work.id.in_(work_ids))).scalars())
+        live_users = (
+            set(db.execute(select(User.id).where(User.id.in_(user_ids))).scalars()) if user_ids else set()
+        )
+        db.rollback()
+
+        kept: list[PlayEvent] = []
+        for e in events:
+            if e.work_id not in live_works:
+                continue
+            if e.user_id and e.user_id not in live_users:
+                e.user_id = None
+            if e.author_id and e.author_id not in live_users:
+                e.author_id = None
+            kept.append(e)
+        dropped = len(events) - len(kept)
+        if dropped:
+            print(f"[play_buffer] dropped {dropped} plays of deleted works")
+        if not kept:
+            return 0, dropped, []
+
+        try:
+            apply_plays(db, kept)
+            db.commit()
+            return len(kept), dropped, []
+        except Exception:
+            db.rollback()
+
+        written = 0
+        failed: list[PlayEvent] = []
+        for e in kept:
+            try:
+                apply_plays(db, [e])
+                db.commit()
+                written += 1
+            except Exception as exc:
+                db.rollback()
+                e.attempts += 1
+                failed.append(e)
+                print(f"[play_buffer] play of work {e.work_id} failed (attempt {e.attempts}): {exc}")
+        return written, dropped, failed
+
+    def _requeue(self, events: list[PlayEvent]) -> None:
+        # 调用方持有 self._lock
+        self._pending = events + self._pending
+        for e in events:
+            self._pending_by_work[e.work_id] += 1
+
+    def _rewrite_segment(self, events: list[PlayEvent], segments: list[_Segment]) -> bool:
+        """Requeue `events` backed by a fresh segment so the old (partly committed) ones can go."""
+        try:
+            segment = _Segment.create(self.directory)
+            for e in events:
+                segment.append(e)
+        except OSError as exc:
+            print(f"[play_buffer] cannot write retry segment: {exc}")
+            with self._lock:
+                self._requeue(events)
+                self._segments = segments + self._segments
+            return False
+        with self._lock:
+            self._requeue(events)
+            self._segments.insert(0, segment)
+        return True
+
+    def _dead_letter(self, events: list[PlayEvent]) -> None:
+        path = self.directory / "dead-letter.log"
+        try:
+            with open(path, "a", encoding="utf-8") as handle:
+                for e in events:
+                    handle.write(json.dumps(asdict(e), ensure_ascii=False) + "\n")
+        except OSError as exc:
+            print(f"[play_buffer] cannot write dead-letter file: {exc}")
+        print(f"[play_buffer] gave up on {len(events)} plays after {self.max_attempts} attempts (see {path})")
+
+    def _prune_recent(self) -> None:
+        cutoff = time.monotonic() - self.dedupe_seconds
+        if self._recent:
+            self._recent = {k: ts for k, ts in self._recent.items() if ts >= cutoff}
+
+    def stats(self) -> dict[str, int]:
+        with self._lock:
+            return {
+                "pending": len(self._pending),
+                "accepted": self.accepted,
+                "deduped": self.deduped,
+                "flushed": self.flushed,
+                "flush_errors": self.flush_errors,
+                "dropped": self.dropped,
+                "dead_lettered": self.dead_lettered,
+            }
+
+    # ---------- lifecycle (app lifespan) ----------
+    def _wake(self) -> None:
+        if self._loop is not None and self._wakeup is not None:
+            self._loop.call_soon_threadsafe(self._wakeup.set)
+
+    async def run(self, interval_ms: int) -> None:
+        self._loop = asyncio.get_running_loop()
+        self._wakeup = asyncio.Event()
+        await run_in_threadpool(self.recover)
+        self.running = True
+        try:
+            while True:
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=max(interval_ms, 10) / 1000)
+                except asyncio.TimeoutError:
+                    pass
+                self._wakeup.clear()
+                await run_in_threadpool(self.flush)
+        finally:
+            self.running = False
+            # 关闭时把剩余事件写入数据库（失败则保留段文件，下次启动恢复）
+            await run_in_threadpool(self.flush)
+
+
+_buffer: PlayBuffer | None = None
+_buffer_guard = threading.Lock()
+
+
+def get_buffer() -> PlayBuffer:
+    global _buffer
+    if _buffer is None:
+        with _buffer_guard:
+            if _buffer is None:
+                _buffer = PlayBuffer()
+    return _buffer
+
+
+def start() -> asyncio.Task | None:
+    if not settings.PLAY_BUFFER_ENABLED:
+        return None
+    return asyncio.create_task(get_buffer().run(settings.PLAY_FLUSH_INTERVAL_MS), name="play_buffer")
+
+
+async def stop(task: asyncio.Task | None) -> None:
+    if task is None:
+        return
+    task.cancel()
+    await asyncio.gather(task, return_exceptions=True)
@@ -0,0 +1,216 @@
+"""
+Materialized trending scores for `/ui/hot-songs` (table work_popularity_snapshots).
+
+`refresh_window` aggregates likes / plays inside the window once, scores them the same
+way the endpoint used to (log1p, normalized to the window maximum, 0.7 likes + 0.3 plays)
+and replaces that window's snapshot with the top POPULARITY_SNAPSHOT_SIZE ranks.
+The endpoint then only reads `rank <= limit` rows of the latest snapshot, so its cost no
+longer depends on like / play-log volume.
+
+Refreshes run from the in-process scheduler (POPULARITY_REFRESH_SECONDS), from
+scripts/refresh_popularity.py, or lazily (in the threadpool) when a window has no
+fresh snapshot. `top_works` reads through the request's AsyncSession.
+"""
+from __future__ import annotations
+
+import math
+import threading
+from datetime import datetime, timedelta
+
+from sqlalchemy import func, insert, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, joinedload
+from starlette.concurrency import run_in_threadpool
+
+from app.core.config import settings
+from app.db.session import SessionLocal
+from app.models.like_record import LikeRecord
+from app.models.work import Work, WorkStatus, WorkVisibility
+from app.models.work_play_log import WorkPlayLog
+from app.models.work_popularity_snapshot import WorkPopularitySnapshot
+
+LIKES_WEIGHT = 0.7
+PLAYS_WEIGHT = 0.3
+
+_refresh_locks: dict[int, threading.Lock] = {}
+_refresh_locks_guard = threading.Lock()
+
+
+def _window_lock(window_days: int) -> threading.Lock:
+    with _refresh_locks_guard:
+        return _refresh_locks.setdefault(int(window_days), threading.Lock())
+
+
+def _public_filter():
+    return (Work.status == WorkStatus.published, Work.visibility == WorkVisibility.public)
+
+
+def compute_window_scores(db: Session, window_days: int, *, now: datetime | None = None) -> list[tuple[int, int, int, float]]:
+    """[(work_id, likes, plays, score)] for public works with activity in the window, best first."""
+    since = (now or datetime.utcnow()) - timedelta(days=window_days)
+    likes_sub = (
+        db.query(LikeRecord.work_id, func.count(LikeRecord.id).label("recent_likes"))
+        .filter(LikeRecord.created_at >= since)
+        .group_by(LikeRecord.work_id)
+        .subquery()
+    )
+    plays_sub = (
+        db.query(WorkPlayLog.work_id, func.count(WorkPlayLog.id).label("recent_plays"))
+        .filter(WorkPlayLog.played_at >= since)
+        .group_by(WorkPlayLog.work_id)
+        .subquery()
+    )
+    rows = (
+        db.query(
+            Work.id,
+            func.coalesce(likes_sub.c.recent_likes, 0),
+            func.coalesce(plays_sub.c.recent_plays, 0),
+        )
+        .outerjoin(likes_sub, likes_sub.c.work_id == Work.id)
+        .outerjoin(plays_sub, plays_sub.c.work_id == Work.id)
+        .filter(*_public_filter())
+        .filter((likes_sub.c.recent_likes > 0) | (plays_sub.c.recent_plays > 0))
+        .all()
+    )
+    if not rows:
+        return []
+
+    max_likes_log = math.log1p(max(int(r[1] or 0) for r in rows))
+    max_plays_log = math.log1p(max(int(r[2] or 0) for r in rows))
+    scored: list[tuple[int, int, int, float]] = []
+    for work_id, likes, plays in rows:
+        likes, plays = int(likes or 0), int(plays or 0)
+        likes_n = math.log1p(likes) / max_likes_log if max_likes_log > 0 else 0.0
+        plays_n = math.log1p(plays) / max_plays_log if max_plays_log > 0 else 0.0
+        scored.append((int(work_id), likes, plays, LIKES_WEIGHT * likes_n + PLAYS_WEIGHT * plays_n))
+    scored.sort(key=lambda it: (it[3], it[1], it[2], it[0]), reverse=True)
+    return scored
+
+
+def refresh_window(db: Session, window_days: int, *, now: datetime | None = None) -> int:
+    """Replace the snapshot of one window; returns the number of ranked works written."""
+    now = now or datetime.utcnow()
+    snapshot_at = now.replace(microsecond=0)
+    size = max(1, int(settings.POPULARITY_SNAPSHOT_SIZE))
+    scored = compute_window_scores(db, window_days, now=now)[:size]
+
+    # 窗口内活跃作品不足时，用累计热度补齐（与旧接口的候选池行为一致，首页不至于空）
+    if len(scored) < size:
+        taken = {work_id for work_id, _, _, _ in scored}
+        filler = db.query(Work.id).filter(*_public_filter())
+        if taken:
+            filler = filler.filter(Work.id.notin_(taken))
+        filler_ids = (
+            filler.order_by(Work.like_count.desc(), Work.play_count.desc(), Work.created_at.desc())
+            .limit(size - len(scored))
+            .all()
+        )
+        scored.extend((int(row[0]), 0, 0, 0.0) for row in filler_ids)
+
+    start_time = now - timedelta(days=window_days)
+    rows = [
+        {
+            "work_id": work_id,
+            "window_days": int(window_days),
+            "start_time": start_time,
+            "end_time": now,
+            "plays": plays,
+            "likes": likes,
+            "score": score,
+            "rank": rank,
+            "snapshot_at": snapshot_at,
+        }
+        for rank, (work_id, likes, plays, score) in enumerate(scored, start=1)
+    ]
+    if rows:
+        db.execute(insert(WorkPopularitySnapshot), rows)
+    (
+        db.query(WorkPopularitySnapshot)
+        .filter(WorkPopularitySnapshot.window_days == int(window_days), WorkPopularitySnapshot.snapshot_at < snapshot_at)
+        .delete(synchronize_session=False)
+    )
+    db.commit()
+    return len(rows)
+
+
+def refresh_all() -> None:
+    """Scheduler / script entry point: refresh every configured window."""
+    if SessionLocal is None:
+        return
+    db = SessionLocal()
+    try:
+        for window_days in settings.popularity_windows_list:
+            with _window_lock(window_days):
+                count = refresh_window(db, window_days)
+            print(f"[popularity] window={window_days}d ranked={count}")
+    finally:
+        db.close()
+
+
+def _max_age() -> timedelta:
+    interval = int(settings.POPULARITY_REFRESH_SECONDS)
+    return timedelta(seconds=interval * 2 if interval > 0 else 600)
+
+
+def _latest_snapshot_at(db: Session, window_days: int) -> datetime | None:
+    return db.scalar(_latest_snapshot_stmt(window_days))
+
+
+def _latest_snapshot_stmt(window_days: int):
+    return select(func.max(WorkPopularitySnapshot.snapshot_at)).where(
+        WorkPopularitySnapshot.window_days == int(window_days)
+    )
+
+
+def _rebuild_stale(window_days: int, latest: datetime | None) -> datetime | None:
+    """
+    Rebuild a missing / stale snapshot in a short-lived sync session, one caller at a time;
+    returns the snapshot time to serve. While one request rebuilds, concurrent requests keep
+    serving the previous snapshot (they only wait when there is none yet).
+    """
+    if SessionLocal is None:
+        return latest
+    lock = _window_lock(window_days)
+    if not lock.acquire(blocking=latest is None):
+        return latest
+    db = SessionLocal()
+    try:
+        # 等锁期间其他请求可能已刷新
+        if _latest_snapshot_at(db, window_days) == latest:
+            refresh_window(db, window_days)
+        return _latest_snapshot_at(db, window_days)
+    finally:
+        db.close()
+        lock.release()
+
+
+async def top_works(db: AsyncSession, window_days: int, limit: int) -> list[Work]:
+    """Top `limit` public works of the latest snapshot (eager-loads user / music_file)."""
+    latest = await db.scalar(_latest_snapshot_stmt(window_days))
+    if latest is None or latest < datetime.utcnow() - _max_age():
+        # 重算是 CPU + 同步写库，放到线程池，不阻塞事件循环
+        latest = await run_in_threadpool(_rebuild_stale, window_days, latest)
+    if latest is None:
+        return []
+
+    rows = await db.scalars(
+        select(Work)
+        .join(WorkPopularitySnapshot, WorkPopularitySnapshot.work_id == Work.id)
+        .options(joinedload(Work.music_file), joinedload(Work.user))
+        .where(
+            WorkPopularitySnapshot.window_days == int(window_days),
+            WorkPopularitySnapshot.snapshot_at == latest,
+            *_public_filter(),
+        )
+        .order_by(WorkPopularitySnapshot.rank.asc())
+        .limit(int(limit) * 2)
+    )
+    # 多进程同一秒内并发刷新可能写出重复行，按 work 去重
+    seen: set[int] = set()
+    works: list[Work] = []
+    for work in rows:
+        if work.id in seen:
+            continue
+        seen.add(work.id)
+        works.append(work)
+    return works[: int(limit)]
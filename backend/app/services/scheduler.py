@@ -0,0 +1,44 @@
+"""
+In-process periodic jobs (started from the app lifespan in app.main).
+
+Jobs are plain sync callables executed in the threadpool so they can use the sync
+SQLAlchemy session like the rest of the code base. With several uvicorn workers each
+worker runs its own loop; jobs must therefore be idempotent (the snapshot refreshers are).
+For single-run deployments use the matching script under scripts/ from cron instead and
+set the interval to 0.
+"""
+from __future__ import annotations
+
+import asyncio
+import time
+from typing import Callable
+
+from starlette.concurrency import run_in_threadpool
+
+
+async def run_periodically(name: str, interval_seconds: float, fn: Callable[[], None]) -> None:
+    while True:
+        started = time.perf_counter()
+        try:
+            await run_in_threadpool(fn)
+            print(f"[scheduler] {name} done in {time.perf_counter() - started:.2f}s")
+        except asyncio.CancelledError:
+            raise
+        except Exception as exc:
+            print(f"[scheduler] {name} failed: {exc}")
+        await asyncio.sleep(max(1.0, float(interval_seconds)))
+
+
+def start_jobs(jobs: list[tuple[str, float, Callable[[], None]]]) -> list[asyncio.Task]:
+    """Start every job whose interval is > 0; returns the tasks so the caller can cancel them."""
+    return [
+        asyncio.create_task(run_periodically(name, interval, fn), name=f"job:{name}")
+        for name, interval, fn in jobs
+        if interval and interval > 0
+    ]
+
+
+async def stop_jobs(tasks: list[asyncio.Task]) -> None:
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
@@ -0,0 +1,167 @@
+"""
+Idempotent like / follow writes with SQL-side counter maintenance.
+
+Each toggle is one conditional write on the link table:
+- like / follow: INSERT that ignores the (user, target) unique key
+  (MySQL `INSERT IGNORE`, SQLite / PostgreSQL `ON CONFLICT DO NOTHING`)
+- unlike / unfollow: DELETE of the link row
+and its affected-row count says whether anything changed. Only then are the
+denormalized counters moved, with `SET col = col + :delta` so concurrent requests
+never overwrite each other (decrements are clamped at 0).
+
+User rows are always updated in ascending id order, one statement per row covering
+every counter of that row, so two users liking / following each other at the same
+time cannot deadlock. Callers commit.
+"""
+from __future__ import annotations
+
+from collections import defaultdict
+from datetime import datetime
+from typing import Iterable
+
+from sqlalchemy import bindparam, case, delete, insert, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app.models.like_record import LikeRecord
+from app.models.user import User
+from app.models.user_follower import UserFollower
+from app.models.work import Work
+
+
+def _insert_ignore(db: Session, table, values: dict) -> bool:
+    """Insert one row unless it collides with a unique key; True when a row was inserted."""
+    dialect = db.get_bind().dialect.name
+    if dialect == "mysql":
+        from sqlalchemy.dialects.mysql import insert as mysql_insert
+
+        # ON DUPLICATE KEY UPDATE 在 CLIENT_FOUND_ROWS（pymysql 默认开启）下重复行也返回 1，无法区分是否新插入
+        stmt = mysql_insert(table).prefix_with("IGNORE").values(**values)
+    elif dialect == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+
+        stmt = sqlite_insert(table).values(**values).on_conflict_do_nothing()
+    elif dialect == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert as pg_insert
+
+        stmt = pg_insert(table).values(**values).on_conflict_do_nothing()
+    else:
+        try:
+            with db.begin_nested():
+                db.execute(insert(table).values(**values))
+        except IntegrityError:
+            return False
+        return True
+    return db.execute(stmt).rowcount > 0
+
+
+def _bump(column, delta):
+    """`column + delta`, never below 0."""
+    return case((column + delta > 0, column + delta), else_=0)
+
+
+def _apply_work_likes(db: Session, deltas: dict[int, int]) -> None:
+    if not deltas:
+        return
+    works = Work.__table__
+    db.execute(
+        update(works)
+        .where(works.c.id == bindparam("b_id"))
+        .values(like_count=_bump(works.c.like_count, bindparam("b_n"))),
+        [{"b_id": k, "b_n": n} for k, n in sorted(deltas.items())],
+    )
+
+
+def _apply_user_counters(db: Session, deltas: dict[int, dict[str, int]], columns: tuple[str, ...]) -> None:
+    """One UPDATE per user row (ascending id), moving every column in `columns` by its delta."""
+    if not deltas:
+        return
+    users = User.__table__
+    db.execute(
+        update(users)
+        .where(users.c.id == bindparam("b_id"))
+        .values({name: _bump(users.c[name], bindparam(f"b_{name}")) for name in columns}),
+        [
+            {"b_id": user_id, **{f"b_{name}": row.get(name, 0) for name in columns}}
+            for user_id, row in sorted(deltas.items())
+        ],
+    )
+
+
+# ---------- likes ----------
+def like_works(db: Session, user_id: int, works: Iterable[tuple[int, int]]) -> set[int]:
+    """Like (work_id, author_id) pairs; returns the work ids that were not liked before."""
+    now = datetime.utcnow()
+    liked: set[int] = set()
+    work_deltas: dict[int, int] = defaultdict(int)
+    user_deltas: dict[int, dict[str, int]] = defaultdict(lambda: defaultdict(int))
+    for work_id, author_id in works:
+        if work_id in liked:
+            continue
+        if not _insert_ignore(db, LikeRecord.__table__, {"user_id": user_id, "work_id": work_id, "created_at": now}):
+            continue
+        liked.add(work_id)
+        work_deltas[work_id] += 1
+        user_deltas[author_id]["total_likes"] += 1
+        user_deltas[user_id]["liked_works_count"] += 1
+    _apply_work_likes(db, work_deltas)
+    _apply_user_counters(db, user_deltas, ("total_likes", "liked_works_count"))
+    return liked
+
+
+def unlike_works(db: Session, user_id: int, work_ids: Iterable[int]) -> set[int]:
+    """Remove likes; returns the work ids that were actually liked before."""
+    table = LikeRecord.__table__
+    removed: set[int] = set()
+    for work_id in dict.fromkeys(work_ids):
+        result = db.execute(delete(table).where(table.c.user_id == user_id, table.c.work_id == work_id))
+        if result.rowcount > 0:
+            removed.add(work_id)
+    if not removed:
+        return removed
+
+    work_deltas = {work_id: -1 for work_id in removed}
+    user_deltas: dict[int, dict[str, int]] = defaultdict(lambda: defaultdict(int))
+    user_deltas[user_id]["liked_works_count"] -= len(removed)
+    for _, author_id in db.query(Work.id, Work.user_id).filter(Work.id.in_(removed)).all():
+        user_deltas[author_id]["total_likes"] -= 1
+    _apply_work_likes(db, work_deltas)
+    _apply_user_counters(db, user_deltas, ("total_likes", "liked_works_count"))
+    return removed
+
+
+# ---------- follows ----------
+def follow_users(db: Session, follower_id: int, user_ids: Iterable[int]) -> set[int]:
+    """Follow users (caller excludes self / missing ids); returns the ids newly followed."""
+    now = datetime.utcnow()
+    followed: set[int] = set()
+    for user_id in dict.fromkeys(user_ids):
+        values = {"follower_id": follower_id, "following_id": user_id, "created_at": now}
+        if _insert_ignore(db, UserFollower.__table__, values):
+            followed.add(user_id)
+    _apply_follow_deltas(db, follower_id, followed, 1)
+    return followed
+
+
+def unfollow_users(db: Session, follower_id: int, user_ids: Iterable[int]) -> set[int]:
+    """Unfollow users; returns the ids that were actually followed before."""
+    table = UserFollower.__table__
+    removed: set[int] = set()
+    for user_id in dict.fromkeys(user_ids):
+        result = db.execute(
+            delete(table).where(table.c.follower_id == follower_id, table.c.following_id == user_id)
+        )
+        if result.rowcount > 0:
+            removed.add(user_id)
+    _apply_follow_deltas(db, follower_id, removed, -1)
+    return removed
+
+
+def _apply_follow_deltas(db: Session, follower_id: int, changed: set[int], sign: int) -> None:
+    if not changed:
+        return
+    deltas: dict[int, dict[str, int]] = defaultdict(lambda: defaultdict(int))
+    deltas[follower_id]["following_count"] += sign * len(changed)
+    for user_id in changed:
+        deltas[user_id]["followers_count"] += sign
+    _apply_user_counters(db, deltas, ("following_count", "followers_count"))
@@ -4,12 +4,27 @@ import json
 import re
 from dataclasses import dataclass
 
-from openai import OpenAI
-
 from app.core.config import settings
+from app.services import llm_client
 
 _STRUCTURE_TAG_RE = re.compile(r"\[(intro|outro|verse|chorus|bridge)[^\]]*\]", re.IGNORECASE)
 
+# descriptions / lyrics 字段规则，generation_planner 的合并调用复用
+SONGGEN_FIELD_RULES = (
+    "- descriptions: STRICT 6-dimension English tags, comma-separated, in this order:\n"
+    "  Gender, Timbre, Genre, Emotion, Instrument, the bpm is N.\n"
+    "  Use 1-2 short tokens per dimension. If unknown, omit that dimension.\n"
+    "- Avoid negation like 'no drums/no vocals'. Prefer positive instructions.\n"
+    "- If user references a famous song/anime style: DO NOT copy lyrics, DO NOT mention artist names.\n"
+    "  Translate into generic tags like 'western pop, acoustic guitar, duet, nostalgic, 2010s' etc.\n"
+    "- If lyrics is requested: generate ORIGINAL lyrics and follow SongGeneration format:\n"
+    "  - use [intro-medium], [verse], [chorus], [bridge], [outro-medium]\n"
+    "  - sections separated by ' ; '\n"
+    "  - within lyrical sections, sentences separated by '.'\n"
+    "  - ensure the lyric ends with an outro segment\n"
+    "  - choose structure length to fit duration: 60s=verse+chorus, 90s=verse+chorus+verse+chorus, 120s+=2verse+3chorus+bridge\n"
+)
+
 
 @dataclass(frozen=True)
 class SongGenLLMEnhanceResult:
@@ -24,12 +39,6 @@ class SongGenLLMEnhanceResult:
     rewritten_prompt: str | None
 
 
-def _get_client() -> OpenAI | None:
-    if not (settings.OPENAI_API_KEY and settings.OPENAI_API_BASE):
-        return None
-    return OpenAI(api_key=settings.OPENAI_API_KEY, base_url=settings.OPENAI_API_BASE)
-
-
 def _strip_control_chars(s: str) -> str:
     # remove control chars but keep common punctuation
     return re.sub(r"[\x00-\x08\x0b\x0c\x0e-\x1f]", " ", s)
@@ -169,6 +178,14 @@ def _safe_trim(s: str | None, *, max_chars: int) -> str | None:
     return t or None
 
 
+def _is_json_object(content: str) -> bool:
+    # 只缓存能解析出 JSON 对象的回复
+    try:
+        return isinstance(json.loads(content), dict)
+    except Exception:
+        return False
+
+
 def enhance_for_songgen(
     *,
     prompt_zh: str,
@@ -176,6 +193,7 @@ def enhance_for_songgen(
     duration_sec: int,
     user_style: str | None,
     user_lyrics: str | None,
+    use_cache: bool = True,
 ) -> SongGenLLMEnhanceResult:
     """
     Use Qwen2.5-7B-Instruct (OpenAI-compatible chat completions) to:
@@ -186,9 +204,11 @@ def enhance_for_songgen(
     - Return STRICT JSON only
     - Do NOT copy lyrics or claim artist names when user references famous songs/anime
     - Avoid negation like "no drums/no vocals" since some music models mis-handle it
+
+    Responses are cached in llm_cache (same request -> same tags / lyrics); use_cache=False
+    asks the model again.
     """
-    client = _get_client()
-    if client is None:
+    if not llm_client.configured():
         return SongGenLLMEnhanceResult(descriptions=None, lyrics=None, rewritten_prompt=None)
 
     prompt_zh = (prompt_zh or "").strip()
@@ -213,18 +233,7 @@ def enhance_for_songgen(
         '  \"rewritten_prompt\": \"optional improved Chinese prompt or null\"\n'
         "}\n\n"
         "Rules:\n"
-        "- descriptions: STRICT 6-dimension English tags, comma-separated, in this order:\n"
-        "  Gender, Timbre, Genre, Emotion, Instrument, the bpm is N.\n"
-        "  Use 1-2 short tokens per dimension. If unknown, omit that dimension.\n"
-        "- Avoid negation like 'no drums/no vocals'. Prefer positive instructions.\n"
-        "- If user references a famous song/anime style: DO NOT copy lyrics, DO NOT mention artist names.\n"
-        "  Translate into generic tags like 'western pop, acoustic guitar, duet, nostalgic, 2010s' etc.\n"
-        "- If lyrics is requested: generate ORIGINAL lyrics and follow SongGeneration format:\n"
-        "  - use [intro-medium], [verse], [chorus], [bridge], [outro-medium]\n"
-        "  - sections separated by ' ; '\n"
-        "  - within lyrical sections, sentences separated by '.'\n"
-        "  - ensure the lyric ends with an outro segment\n"
-        "  - choose structure length to fit duration: 60s=verse+chorus, 90s=verse+chorus+verse+chorus, 120s+=2verse+3chorus+bridge\n"
+        f"{SONGGEN_FIELD_RULES}"
     )
 
     user_payload = {
@@ -236,20 +245,20 @@ def enhance_for_songgen(
     }
 
     try:
-        resp = client.chat.completions.create(
-            model=settings.OPENAI_MODEL,
+        content = llm_client.chat_completion_sync(
+            "enhance_for_songgen",
             messages=[
                 {"role": "system", "content": system},
                 {"role": "user", "content": json.dumps(user_payload, ensure_ascii=False)},
             ],
             temperature=0.6,
             max_tokens=700 if want_lyrics else 240,
-            timeout=float(getattr(settings, "SONGGEN_LLM_TIMEOUT_SECONDS", 40)),
+            cache_ttl=settings.LLM_CACHE_TTL_SECONDS if use_cache else 0,
+            validate=_is_json_object,
         )
     except Exception:
         return SongGenLLMEnhanceResult(descriptions=None, lyrics=None, rewritten_prompt=None)
 
-    content = (resp.choices[0].message.content or "").strip() if resp and resp.choices else ""
     try:
         data = json.loads(content)
     except Exception:
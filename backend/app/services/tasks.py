@@ -1,9 +1,10 @@
 from datetime import datetime
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, List, Optional, Tuple
 from uuid import uuid4
 
 from sqlalchemy.orm import Session
 
+from app.core.pagination import DEFAULT_PAGE_SIZE, keyset_page
 from app.models.task import TaskRecord
 from app.schemas.tasks import TaskDetail, TaskStatus, TaskType
 
@@ -57,13 +58,29 @@ def get_task(db: Session, task_id: str, expected_type: TaskType | None = None) -
   return record
 
 
-def list_tasks(db: Session, *, user_id: int | None = None, status: TaskStatus | None = None) -> List[TaskRecord]:
+def list_tasks(
+    db: Session,
+    *,
+    user_id: int | None = None,
+    status: TaskStatus | None = None,
+    limit: int = DEFAULT_PAGE_SIZE,
+    cursor: Optional[str] = None,
+) -> Tuple[List[TaskRecord], Optional[str]]:
+  """One page of tasks, newest first; returns (records, next_cursor)."""
   query = db.query(TaskRecord)
   if user_id is not None:
     query = query.filter(TaskRecord.user_id == user_id)
   if status:
     query = query.filter(TaskRecord.status == status)
-  return query.order_by(TaskRecord.created_at.desc()).all()
+  return keyset_page(
+      query,
+      TaskRecord.created_at,
+      TaskRecord.id,
+      cursor=cursor,
+      limit=limit,
+      key=lambda r: (r.created_at, r.id),
+      id_type=str,
+  )
 
 
 def complete_task(db: Session, task_id: str, result: Dict[str, Any], message: Optional[str] = None) -> Optional[TaskRecord]:
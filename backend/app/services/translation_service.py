@@ -0,0 +1,206 @@
+"""
+zh -> en prompt translation for MusicGen (app.utils.translation.zh2en).
+
+The opus-mt pipeline used to be built on the first generation request (a multi-second
+cold start inside that request), translated one prompt per call and cached nothing.
+Now:
+
+- the backend is a single-flight LazyModel (concurrent first callers wait for the
+  same load); app.services.model_lifecycle preloads and warms it at startup,
+- results go through llm_cache (in-process LRU + llm_response_cache table) for
+  TRANSLATION_CACHE_TTL_SECONDS, so a repeated prompt never reaches the model,
+- concurrent misses are micro-batched: a worker thread collects requests for up to
+  TRANSLATION_BATCH_WAIT_MS (at most TRANSLATION_MAX_BATCH, duplicates merged) and
+  translates them in one model call,
+- backends (TRANSLATION_BACKEND):
+    transformers  HF pipeline on CPU, optionally with dynamic int8 quantisation of the
+                  Linear layers (TRANSLATION_QUANTIZE_INT8)
+    ctranslate2   CTranslate2 int8 model converted with
+                  `ct2-transformers-converter --model Helsinki-NLP/opus-mt-zh-en
+                  --output_dir <dir> --quantization int8` (TRANSLATION_CT2_MODEL_DIR)
+- every call logs its latency and whether it came from the cache or the model.
+"""
+from __future__ import annotations
+
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from dataclasses import dataclass, field
+
+from app.core.config import settings
+from app.core.model_loader import LazyModel
+from app.services import llm_cache
+
+_CACHE_FUNCTION = "translate_zh_en"
+_WARMUP_TEXT = "轻快的钢琴曲"
+
+
+class TranslationNotAvailable(RuntimeError):
+    """在缺少 transformers 或模型时调用翻译会抛出该异常。"""
+
+
+class _TransformersBackend:
+    def __init__(self) -> None:
+        try:
+            from transformers import pipeline
+        except ImportError as exc:  # transformers 未安装时（本地开发）
+            raise TranslationNotAvailable(
+                "transformers 未安装，无法构建翻译模型；"
+                "请在部署环境安装 requirements.txt 中的依赖后再调用。"
+            ) from exc
+        self._pipe = pipeline(
+            task="translation",
+            model=settings.TRANSLATION_MODEL_ID,
+            device=-1,  # 翻译用 CPU 即可
+        )
+        if settings.TRANSLATION_QUANTIZE_INT8:
+            import torch
+
+            self._pipe.model = torch.ao.quantization.quantize_dynamic(
+                self._pipe.model, {torch.nn.Linear}, dtype=torch.qint8
+            )
+
+    def translate(self, texts: list[str]) -> list[str]:
+        outputs = self._pipe(texts, max_length=int(settings.TRANSLATION_MAX_LENGTH), batch_size=len(texts))
+        return [item["translation_text"] for item in outputs]
+
+
+class _CTranslate2Backend:
+    def __init__(self) -> None:
+        try:
+            import ctranslate2
+            from transformers import AutoTokenizer
+        except ImportError as exc:
+            raise TranslationNotAvailable("ctranslate2 / transformers 未安装，无法使用 ctranslate2 翻译后端") from exc
+        if not settings.TRANSLATION_CT2_MODEL_DIR:
+            raise TranslationNotAvailable("TRANSLATION_CT2_MODEL_DIR 未配置")
+        self._translator = ctranslate2.Translator(settings.TRANSLATION_CT2_MODEL_DIR, device="cpu", compute_type="int8")
+        self._tokenizer = AutoTokenizer.from_pretrained(settings.TRANSLATION_MODEL_ID)
+
+    def translate(self, texts: list[str]) -> list[str]:
+        tokenizer = self._tokenizer
+        source = [tokenizer.convert_ids_to_tokens(tokenizer.encode(text)) for text in texts]
+        results = self._translator.translate_batch(
+            source, max_batch_size=len(texts), max_decoding_length=int(settings.TRANSLATION_MAX_LENGTH)
+        )
+        return [
+            tokenizer.decode(tokenizer.convert_tokens_to_ids(result.hypotheses[0]), skip_special_tokens=True)
+            for result in results
+        ]
+
+
+_BACKENDS = {"transformers": _TransformersBackend, "ctranslate2": _CTranslate2Backend}
+
+def _load_backend() -> _TransformersBackend | _CTranslate2Backend:
+    name = (settings.TRANSLATION_BACKEND or "transformers").strip().lower()
+    if name not in _BACKENDS:
+        raise TranslationNotAvailable(f"unknown TRANSLATION_BACKEND: {name}")
+    print(f"[translation] loading {name} backend ({settings.TRANSLATION_MODEL_ID})")
+    return _BACKENDS[name]()
+
+
+translation_model: LazyModel[_TransformersBackend | _CTranslate2Backend] = LazyModel("translation", _load_backend)
+
+
+# ---------- micro-batching ----------
+@dataclass
+class _Request:
+    text: str
+    future: Future = field(default_factory=Future)
+
+
+_requests: queue.SimpleQueue[_Request] = queue.SimpleQueue()
+_worker: threading.Thread | None = None
+_worker_lock = threading.Lock()
+
+
+def _collect_batch() -> list[_Request]:
+    batch = [_requests.get()]
+    deadline = time.monotonic() + max(0, int(settings.TRANSLATION_BATCH_WAIT_MS)) / 1000
+    while len(batch) < max(1, int(settings.TRANSLATION_MAX_BATCH)):
+        remaining = deadline - time.monotonic()
+        try:
+            batch.append(_requests.get(timeout=remaining) if remaining > 0 else _requests.get_nowait())
+        except queue.Empty:
+            break
+    return batch
+
+
+def _translate_batch(batch: list[_Request]) -> None:
+    texts = list(dict.fromkeys(request.text for request in batch))
+    try:
+        backend = translation_model.get()
+        started = time.perf_counter()
+        by_text = dict(zip(texts, backend.translate(texts), strict=True))
+    except Exception as exc:
+        # 异常交给等待的调用方；批处理线程本身继续运行
+        for request in batch:
+            request.future.set_exception(exc)
+        return
+    print(
+        f"[translation] model batch: {len(texts)} texts / {len(batch)} requests "
+        f"in {(time.perf_counter() - started) * 1000:.0f} ms"
+    )
+    for request in batch:
+        request.future.set_result(by_text[request.text])
+
+
+def _run_worker() -> None:
+    while True:
+        _translate_batch(_collect_batch())
+
+
+def _submit(text: str) -> Future:
+    global _worker
+    if _worker is None:
+        with _worker_lock:
+            if _worker is None:
+                _worker = threading.Thread(target=_run_worker, name="translation-batcher", daemon=True)
+                _worker.start()
+    request = _Request(text)
+    _requests.put(request)
+    return request.future
+
+
+# ---------- public API ----------
+def _cache_key(text: str) -> str | None:
+    ttl = int(settings.TRANSLATION_CACHE_TTL_SECONDS)
+    if ttl <= 0 or not llm_cache.enabled():
+        return None
+    return llm_cache.make_key(
+        _CACHE_FUNCTION,
+        settings.TRANSLATION_MODEL_ID,
+        [{"role": "user", "content": text}],
+        {"max_length": int(settings.TRANSLATION_MAX_LENGTH)},
+    )
+
+
+def translate(text: str) -> str:
+    """
+    Translate a Chinese prompt to English (blocking; call from worker threads).
+    Raises TranslationNotAvailable when no backend can be loaded.
+    """
+    if not text.strip():
+        return text
+    started = time.perf_counter()
+    key = _cache_key(text)
+    if key is not None:
+        cached, tier = llm_cache.get(key)
+        if cached is not None:
+            print(f"[translation] zh2en {len(text)} chars in {(time.perf_counter() - started) * 1000:.0f} ms (cache:{tier})")
+            return cached
+
+    result = _submit(text).result()
+    if key is not None:
+        llm_cache.put(
+            key, _CACHE_FUNCTION, settings.TRANSLATION_MODEL_ID, result, float(settings.TRANSLATION_CACHE_TTL_SECONDS)
+        )
+    print(f"[translation] zh2en {len(text)} chars in {(time.perf_counter() - started) * 1000:.0f} ms (model)")
+    return result
+
+
+def warm_up() -> None:
+    """Load the backend and run one warm-up translation (bypassing the cache)."""
+    translation_model.get()
+    _submit(_WARMUP_TEXT).result()
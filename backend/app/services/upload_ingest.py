@@ -0,0 +1,94 @@
+"""
+Streaming ingest for uploaded audio.
+
+Instead of `await file.read()` (whole body in RAM), uploads are copied to a temp file
+under MEDIA_ROOT/tmp in fixed-size chunks while the sha256 is computed and the
+size limit (settings.UPLOAD_MAX_SIZE_MB, same value as UploadPolicy.max_size_mb)
+is enforced. Memory per concurrent upload stays at one chunk.
+The temp file lives on the same filesystem as MEDIA_ROOT/blobs so it can be renamed
+into its content-addressed location (see blob_store.acquire_blob).
+"""
+from __future__ import annotations
+
+import hashlib
+import uuid
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Optional
+
+from fastapi import HTTPException, UploadFile, status
+from starlette.concurrency import run_in_threadpool
+
+from app.core.config import settings
+from app.services.file_cleanup import delete_file_best_effort
+
+
+@dataclass
+class IngestedUpload:
+    path: Path
+    sha256: str
+    size_bytes: int
+    filename: Optional[str]
+    content_type: Optional[str]
+
+    @property
+    def ext(self) -> str:
+        return Path(self.filename or "").suffix
+
+    def discard(self) -> None:
+        """Remove the temp file (no-op once it has been moved into blob storage)."""
+        delete_file_best_effort(self.path)
+
+
+def upload_tmp_dir() -> Path:
+    path = Path(settings.MEDIA_ROOT) / "tmp"
+    path.mkdir(parents=True, exist_ok=True)
+    return path
+
+
+async def ingest_upload(
+    file: UploadFile,
+    *,
+    max_bytes: int | None = None,
+    chunk_size: int | None = None,
+) -> IngestedUpload:
+    """
+    Copy an UploadFile to a temp file chunk by chunk, hashing as it goes.
+
+    Raises 413 once more than `max_bytes` (default UPLOAD_MAX_SIZE_MB) have been read;
+    the partial temp file is removed.
+    """
+    limit = int(max_bytes if max_bytes is not None else settings.UPLOAD_MAX_SIZE_MB * 1024 * 1024)
+    size = int(chunk_size or settings.UPLOAD_CHUNK_SIZE_BYTES)
+    suffix = Path(file.filename or "").suffix
+    tmp_path = upload_tmp_dir() / f"{uuid.uuid4().hex}{suffix}.part"
+
+    digest = hashlib.sha256()
+    total = 0
+    out = await run_in_threadpool(open, tmp_path, "wb")
+    try:
+        while True:
+            chunk = await file.read(size)
+            if not chunk:
+                break
+            total += len(chunk)
+            if limit > 0 and total > limit:
+                raise HTTPException(
+                    status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                    detail=f"文件过大，最大 {limit // (1024 * 1024)} MB",
+                )
+            digest.update(chunk)
+            await run_in_threadpool(out.write, chunk)
+    except BaseException:
+        out.close()
+        delete_file_best_effort(tmp_path)
+        raise
+    out.close()
+
+    return IngestedUpload(
+        path=tmp_path,
+        sha256=digest.hexdigest(),
+        size_bytes=total,
+        filename=file.filename,
+        content_type=file.content_type,
+    )
@@ -1,8 +1,12 @@
 from __future__ import annotations
 
+import os
 from pathlib import Path
 
+from app.core.config import settings
+
 from app.models.music_file import MusicFile
+from app.services.image_renditions import rendition_path
 from app.services.oss_storage import resolve_storage_path_to_url
 
 
@@ -24,13 +28,23 @@ def resolve_music_url(music_file: MusicFile | None) -> str | None:
         return f"/static/audio/{Path(music_file.file_name).name}"
 
     if music_file.storage_path:
+        # 内容寻址的上传位于 MEDIA_ROOT/blobs/sha256/.. 子目录，保留相对路径
+        media_root = os.path.abspath(settings.MEDIA_ROOT)
+        stored = os.path.abspath(music_file.storage_path)
+        if stored.startswith(media_root + os.sep):
+            return "/media/" + Path(os.path.relpath(stored, media_root)).as_posix()
         return f"/media/{Path(music_file.storage_path).name}"
 
     return None
 
 
-def resolve_cover_url(path: str | None) -> str | None:
-    """解析封面路径（oss:// | http(s) | /static/...）。"""
+def resolve_cover_url(path: str | None, size: int | None = None) -> str | None:
+    """
+    解析封面路径（oss:// | http(s) | /static/...）。
+    传入 size 时返回不小于该边长的 WebP 缩略图（仅 images/sha256 布局的封面有，其余返回原图）。
+    """
+    if size:
+        path = rendition_path(path, size)
     url = resolve_storage_path_to_url(path)
     return url or path
 
@@ -1,6 +1,9 @@
 from __future__ import annotations
 
+import io
+import os
 import time
+import uuid
 from dataclasses import dataclass
 from typing import Optional
 
@@ -17,6 +20,60 @@ class SongGenJobResult:
     error: Optional[str] = None
 
 
+class _MultipartFileBody:
+    """
+    multipart/form-data body that streams one file from disk.
+
+    `requests` builds `files=` bodies fully in memory; this file-like object (read + __len__)
+    lets it send a Content-Length request and pull the file part chunk by chunk.
+    """
+
+    def __init__(
+        self,
+        *,
+        fields: dict[str, str],
+        file_field: str,
+        file_name: str,
+        file_path: str,
+        file_content_type: str,
+    ) -> None:
+        self.boundary = uuid.uuid4().hex
+        self.content_type = f"multipart/form-data; boundary={self.boundary}"
+        head = b"".join(
+            f'--{self.boundary}\r\nContent-Disposition: form-data; name="{name}"\r\n\r\n'.encode("utf-8")
+            + str(value).encode("utf-8")
+            + b"\r\n"
+            for name, value in fields.items()
+        )
+        safe_name = file_name.replace('"', "%22")
+        head += (
+            f'--{self.boundary}\r\nContent-Disposition: form-data; name="{file_field}"; filename="{safe_name}"\r\n'
+            f"Content-Type: {file_content_type}\r\n\r\n"
+        ).encode("utf-8")
+        tail = f"\r\n--{self.boundary}--\r\n".encode("utf-8")
+        self._file = open(file_path, "rb")
+        self._length = len(head) + os.fstat(self._file.fileno()).st_size + len(tail)
+        self._parts = [io.BytesIO(head), self._file, io.BytesIO(tail)]
+
+    def __len__(self) -> int:
+        return self._length
+
+    def read(self, size: int = -1) -> bytes:
+        if size is None or size < 0:
+            return b"".join(part.read() for part in self._parts)
+        out = bytearray()
+        while self._parts and len(out) < size:
+            chunk = self._parts[0].read(size - len(out))
+            if chunk:
+                out += chunk
+            else:
+                self._parts.pop(0)
+        return bytes(out)
+
+    def close(self) -> None:
+        self._file.close()
+
+
 class SongGenRemoteClient:
     """
     Client for the 4090-side `songgen_infer_service`.
@@ -120,13 +177,14 @@ class SongGenRemoteClient:
         vocal_only: bool = False,
         lyrics: Optional[str],
         prompt_audio_filename: str,
-        prompt_audio_bytes: bytes,
+        prompt_audio_path: str,
         prompt_audio_content_type: Optional[str],
         auto_prompt_audio_type: Optional[str],
         timeout_seconds: int,
     ) -> str:
         """
         Upload prompt audio (reference) via multipart/form-data.
+        The file is streamed from disk in chunks (never read fully into memory).
 
         4090-side endpoint: POST /v1/generate-with-audio
         """
@@ -147,20 +205,23 @@ class SongGenRemoteClient:
         if auto_prompt_audio_type is not None:
             data["auto_prompt_audio_type"] = str(auto_prompt_audio_type)
 
-        files = {
-            "prompt_audio": (
-                prompt_audio_filename or "prompt_audio.wav",
-                prompt_audio_bytes,
-                prompt_audio_content_type or "application/octet-stream",
-            )
-        }
-        resp = requests.post(
-            f"{self.base_url}/v1/generate-with-audio",
-            data=data,
-            files=files,
-            timeout=timeout_seconds,
-            proxies={"http": None, "https": None},
+        body = _MultipartFileBody(
+            fields=data,
+            file_field="prompt_audio",
+            file_name=prompt_audio_filename or "prompt_audio.wav",
+            file_path=prompt_audio_path,
+            file_content_type=prompt_audio_content_type or "application/octet-stream",
         )
+        try:
+            resp = requests.post(
+                f"{self.base_url}/v1/generate-with-audio",
+                data=body,
+                headers={"Content-Type": body.content_type, "Content-Length": str(len(body))},
+                timeout=timeout_seconds,
+                proxies={"http": None, "https": None},
+            )
+        finally:
+            body.close()
         resp.raise_for_status()
         payload = resp.json() or {}
         job_id = payload.get("job_id")
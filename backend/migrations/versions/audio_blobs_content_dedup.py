@@ -0,0 +1,81 @@
+"""content-addressed audio_blobs table and music_files.blob_id
+
+Revision ID: audio_blobs_content_dedup
+Revises: beta_search_social_tables
+Create Date: 2026-10-19 00:00:00.000000
+"""
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy import text
+
+# revision identifiers, used by Alembic.
+revision = "audio_blobs_content_dedup"
+down_revision = "beta_search_social_tables"
+branch_labels = None
+depends_on = None
+
+
+def column_exists(conn, table: str, column: str) -> bool:
+    sql = text(
+        """
+        SELECT COUNT(*)
+        FROM INFORMATION_SCHEMA.COLUMNS
+        WHERE TABLE_SCHEMA = DATABASE()
+          AND TABLE_NAME = :table
+          AND COLUMN_NAME = :column
+        """
+    )
+    return conn.execute(sql, {"table": table, "column": column}).scalar() > 0
+
+
+def table_exists(conn, table: str) -> bool:
+    sql = text(
+        """
+        SELECT COUNT(*)
+        FROM INFORMATION_SCHEMA.TABLES
+        WHERE TABLE_SCHEMA = DATABASE()
+          AND TABLE_NAME = :table
+        """
+    )
+    return conn.execute(sql, {"table": table}).scalar() > 0
+
+
+def upgrade() -> None:
+    conn = op.get_bind()
+
+    # 上传音频按 sha256 去重，多条 music_files 共享同一个存储对象
+    if not table_exists(conn, "audio_blobs"):
+        op.create_table(
+            "audio_blobs",
+            sa.Column("id", sa.Integer(), primary_key=True, autoincrement=True),
+            sa.Column("sha256", sa.String(length=64), nullable=False),
+            sa.Column("size_bytes", sa.Integer(), nullable=True),
+            sa.Column("content_type", sa.String(length=100), nullable=True),
+            sa.Column("storage_path", sa.String(length=500), nullable=False),
+            sa.Column("ref_count", sa.Integer(), nullable=False, server_default="0"),
+            sa.Column("created_at", sa.DateTime(), nullable=False, server_default=sa.text("CURRENT_TIMESTAMP")),
+        )
+        op.alter_column("audio_blobs", "ref_count", server_default=None)
+        op.create_index("ix_audio_blobs_sha256", "audio_blobs", ["sha256"], unique=True)
+
+    if not column_exists(conn, "music_files", "blob_id"):
+        op.add_column(
+            "music_files",
+            sa.Column("blob_id", sa.Integer(), nullable=True),
+        )
+        op.create_index("ix_music_files_blob_id", "music_files", ["blob_id"])
+        op.create_foreign_key("fk_music_files_blob_id", "music_files", "audio_blobs", ["blob_id"], ["id"])
+
+
+def downgrade() -> None:
+    conn = op.get_bind()
+
+    if column_exists(conn, "music_files", "blob_id"):
+        op.drop_constraint("fk_music_files_blob_id", "music_files", type_="foreignkey")
+        op.drop_index("ix_music_files_blob_id", table_name="music_files")
+        op.drop_column("music_files", "blob_id")
+
+    if table_exists(conn, "audio_blobs"):
+        op.drop_index("ix_audio_blobs_sha256", table_name="audio_blobs")
+        op.drop_table("audio_blobs")
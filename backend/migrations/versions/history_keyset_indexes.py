@@ -0,0 +1,47 @@
+"""composite indexes for keyset-paginated /history
+
+Revision ID: history_keyset_indexes
+Revises: search_fulltext_ngram
+Create Date: 2026-10-19 00:00:00.000000
+"""
+
+from alembic import op
+from sqlalchemy import text
+
+# revision identifiers, used by Alembic.
+revision = "history_keyset_indexes"
+down_revision = "search_fulltext_ngram"
+branch_labels = None
+depends_on = None
+
+
+def index_exists(conn, table: str, index: str) -> bool:
+    sql = text(
+        """
+        SELECT COUNT(*)
+        FROM INFORMATION_SCHEMA.STATISTICS
+        WHERE TABLE_SCHEMA = DATABASE()
+          AND TABLE_NAME = :table
+          AND INDEX_NAME = :index
+        """
+    )
+    return conn.execute(sql, {"table": table, "index": index}).scalar() > 0
+
+
+def upgrade() -> None:
+    conn = op.get_bind()
+
+    # (user_id, 排序时间, id)：每个分支按索引顺序读取 limit 行即可停止，无需回表排序
+    if not index_exists(conn, "dialogues", "ix_dialogues_user_updated"):
+        op.create_index("ix_dialogues_user_updated", "dialogues", ["user_id", "updated_at", "id"])
+    if not index_exists(conn, "emotion_analysis", "ix_emotion_analysis_user_created"):
+        op.create_index("ix_emotion_analysis_user_created", "emotion_analysis", ["user_id", "created_at", "id"])
+
+
+def downgrade() -> None:
+    conn = op.get_bind()
+
+    if index_exists(conn, "emotion_analysis", "ix_emotion_analysis_user_created"):
+        op.drop_index("ix_emotion_analysis_user_created", table_name="emotion_analysis")
+    if index_exists(conn, "dialogues", "ix_dialogues_user_updated"):
+        op.drop_index("ix_dialogues_user_updated", table_name="dialogues")
@@ -0,0 +1,56 @@
+"""image_assets table (content-addressed covers / avatars with renditions)
+
+Revision ID: image_assets
+Revises: llm_response_cache
+Create Date: 2026-10-19 00:00:00.000000
+"""
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy import text
+
+# revision identifiers, used by Alembic.
+revision = "image_assets"
+down_revision = "llm_response_cache"
+branch_labels = None
+depends_on = None
+
+
+def table_exists(conn, table: str) -> bool:
+    sql = text(
+        """
+        SELECT COUNT(*)
+        FROM INFORMATION_SCHEMA.TABLES
+        WHERE TABLE_SCHEMA = DATABASE()
+          AND TABLE_NAME = :table
+        """
+    )
+    return conn.execute(sql, {"table": table}).scalar() > 0
+
+
+def upgrade() -> None:
+    conn = op.get_bind()
+
+    # 封面按 sha256 内容寻址，phash 用于识别画面相同的重复封面
+    if not table_exists(conn, "image_assets"):
+        op.create_table(
+            "image_assets",
+            sa.Column("id", sa.Integer(), primary_key=True, autoincrement=True),
+            sa.Column("sha256", sa.String(length=64), nullable=False),
+            sa.Column("phash", sa.String(length=16), nullable=False),
+            sa.Column("width", sa.Integer(), nullable=True),
+            sa.Column("height", sa.Integer(), nullable=True),
+            sa.Column("storage_path", sa.String(length=500), nullable=False),
+            sa.Column("created_at", sa.DateTime(), nullable=False, server_default=sa.text("CURRENT_TIMESTAMP")),
+        )
+        op.create_index("ix_image_assets_sha256", "image_assets", ["sha256"], unique=True)
+        op.create_index("ix_image_assets_phash", "image_assets", ["phash"])
+
+
+def downgrade() -> None:
+    conn = op.get_bind()
+
+    if table_exists(conn, "image_assets"):
+        op.drop_index("ix_image_assets_phash", table_name="image_assets")
+        op.drop_index("ix_image_assets_sha256", table_name="image_assets")
+        op.drop_table("image_assets")
@@ -0,0 +1,45 @@
+"""image_assets.pixel_sha256 (confirm dHash matches before reusing an image's files)
+
+Revision ID: image_assets_pixel_sha256
+Revises: image_assets
+Create Date: 2026-10-19 00:00:00.000000
+"""
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy import text
+
+# revision identifiers, used by Alembic.
+revision = "image_assets_pixel_sha256"
+down_revision = "image_assets"
+branch_labels = None
+depends_on = None
+
+
+def column_exists(conn, table: str, column: str) -> bool:
+    sql = text(
+        """
+        SELECT COUNT(*)
+        FROM INFORMATION_SCHEMA.COLUMNS
+        WHERE TABLE_SCHEMA = DATABASE()
+          AND TABLE_NAME = :table
+          AND COLUMN_NAME = :column
+        """
+    )
+    return conn.execute(sql, {"table": table, "column": column}).scalar() > 0
+
+
+def upgrade() -> None:
+    conn = op.get_bind()
+
+    # 解码后像素的 sha256：dHash 相同只是候选，像素一致才复用已有文件；
+    # 已有行为 NULL，不参与 dHash 去重（sha256 去重不受影响）
+    if not column_exists(conn, "image_assets", "pixel_sha256"):
+        op.add_column("image_assets", sa.Column("pixel_sha256", sa.String(length=64), nullable=True))
+
+
+def downgrade() -> None:
+    conn = op.get_bind()
+
+    if column_exists(conn, "image_assets", "pixel_sha256"):
+        op.drop_column("image_assets", "pixel_sha256")
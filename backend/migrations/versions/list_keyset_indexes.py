@@ -0,0 +1,54 @@
+"""composite indexes for keyset-paginated list endpoints
+
+Revision ID: list_keyset_indexes
+Revises: history_keyset_indexes
+Create Date: 2026-10-19 00:00:00.000000
+"""
+
+from alembic import op
+from sqlalchemy import text
+
+# revision identifiers, used by Alembic.
+revision = "list_keyset_indexes"
+down_revision = "history_keyset_indexes"
+branch_labels = None
+depends_on = None
+
+# (table, index, columns)：等值过滤列在前，(排序列, id) 在后，与 keyset 条件一致
+INDEXES = [
+    ("works", "ix_works_user_created", ["user_id", "created_at", "id"]),
+    ("works", "ix_works_user_public_created", ["user_id", "status", "visibility", "created_at", "id"]),
+    ("like_records", "ix_like_records_user_created", ["user_id", "created_at", "id"]),
+    ("user_followers", "ix_user_followers_following_created", ["following_id", "created_at", "id"]),
+    ("user_followers", "ix_user_followers_follower_created", ["follower_id", "created_at", "id"]),
+    ("tasks", "ix_tasks_user_created", ["user_id", "created_at", "id"]),
+]
+
+
+def index_exists(conn, table: str, index: str) -> bool:
+    sql = text(
+        """
+        SELECT COUNT(*)
+        FROM INFORMATION_SCHEMA.STATISTICS
+        WHERE TABLE_SCHEMA = DATABASE()
+          AND TABLE_NAME = :table
+          AND INDEX_NAME = :index
+        """
+    )
+    return conn.execute(sql, {"table": table, "index": index}).scalar() > 0
+
+
+def upgrade() -> None:
+    conn = op.get_bind()
+
+    for table, index, columns in INDEXES:
+        if not index_exists(conn, table, index):
+            op.create_index(index, table, columns)
+
+
+def downgrade() -> None:
+    conn = op.get_bind()
+
+    for table, index, _ in reversed(INDEXES):
+        if index_exists(conn, table, index):
+            op.drop_index(index, table_name=table)
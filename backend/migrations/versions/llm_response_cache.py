@@ -0,0 +1,58 @@
+"""llm_response_cache table (persistent tier of the LLM response cache)
+
+Revision ID: llm_response_cache
+Revises: list_keyset_indexes
+Create Date: 2026-10-19 00:00:00.000000
+"""
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy import text
+
+# revision identifiers, used by Alembic.
+revision = "llm_response_cache"
+down_revision = "list_keyset_indexes"
+branch_labels = None
+depends_on = None
+
+
+def table_exists(conn, table: str) -> bool:
+    sql = text(
+        """
+        SELECT COUNT(*)
+        FROM INFORMATION_SCHEMA.TABLES
+        WHERE TABLE_SCHEMA = DATABASE()
+          AND TABLE_NAME = :table
+        """
+    )
+    return conn.execute(sql, {"table": table}).scalar() > 0
+
+
+def upgrade() -> None:
+    conn = op.get_bind()
+
+    # 标题 / 封面 prompt / SongGen 增强结果按 (函数, 模型, 参数, 归一化 prompt) 缓存
+    if not table_exists(conn, "llm_response_cache"):
+        op.create_table(
+            "llm_response_cache",
+            sa.Column("id", sa.Integer(), primary_key=True, autoincrement=True),
+            sa.Column("cache_key", sa.String(length=64), nullable=False),
+            sa.Column("function", sa.String(length=64), nullable=False),
+            sa.Column("model", sa.String(length=128), nullable=False),
+            sa.Column("response", sa.Text(), nullable=False),
+            sa.Column("hits", sa.Integer(), nullable=False, server_default="0"),
+            sa.Column("created_at", sa.DateTime(), nullable=False, server_default=sa.text("CURRENT_TIMESTAMP")),
+            sa.Column("expires_at", sa.DateTime(), nullable=False),
+        )
+        op.alter_column("llm_response_cache", "hits", server_default=None)
+        op.create_index("ix_llm_response_cache_cache_key", "llm_response_cache", ["cache_key"], unique=True)
+        op.create_index("ix_llm_response_cache_expires_at", "llm_response_cache", ["expires_at"])
+
+
+def downgrade() -> None:
+    conn = op.get_bind()
+
+    if table_exists(conn, "llm_response_cache"):
+        op.drop_index("ix_llm_response_cache_expires_at", table_name="llm_response_cache")
+        op.drop_index("ix_llm_response_cache_cache_key", table_name="llm_response_cache")
+        op.drop_table("llm_response_cache")
@@ -0,0 +1,47 @@
+"""ngram FULLTEXT indexes for works/users search
+
+Revision ID: search_fulltext_ngram
+Revises: audio_blobs_content_dedup
+Create Date: 2026-10-19 00:00:00.000000
+"""
+
+from alembic import op
+from sqlalchemy import text
+
+# revision identifiers, used by Alembic.
+revision = "search_fulltext_ngram"
+down_revision = "audio_blobs_content_dedup"
+branch_labels = None
+depends_on = None
+
+
+def index_exists(conn, table: str, index: str) -> bool:
+    sql = text(
+        """
+        SELECT COUNT(*)
+        FROM INFORMATION_SCHEMA.STATISTICS
+        WHERE TABLE_SCHEMA = DATABASE()
+          AND TABLE_NAME = :table
+          AND INDEX_NAME = :index
+        """
+    )
+    return conn.execute(sql, {"table": table, "index": index}).scalar() > 0
+
+
+def upgrade() -> None:
+    conn = op.get_bind()
+
+    # ngram parser（默认 ngram_token_size=2）对中文按二元组切词；索引随行写入自动增量维护
+    if not index_exists(conn, "works", "ft_works_search"):
+        op.execute("CREATE FULLTEXT INDEX ft_works_search ON works (title, tags, description) WITH PARSER ngram")
+    if not index_exists(conn, "users", "ft_users_search"):
+        op.execute("CREATE FULLTEXT INDEX ft_users_search ON users (username, personal_profile) WITH PARSER ngram")
+
+
+def downgrade() -> None:
+    conn = op.get_bind()
+
+    if index_exists(conn, "users", "ft_users_search"):
+        op.drop_index("ft_users_search", table_name="users")
+    if index_exists(conn, "works", "ft_works_search"):
+        op.drop_index("ft_works_search", table_name="works")
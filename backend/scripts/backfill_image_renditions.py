@@ -0,0 +1,190 @@
+"""Backfill: move existing covers into the content-addressed image layout with WebP renditions.
+
+Covers stored before image_renditions existed (/static/covers/cover_x.png, oss://picture/...)
+have no thumbnails, so list endpoints keep serving the full image for them. This script
+runs every such works.cover_url / music_files.cover_image_path through
+image_renditions.ingest_image and points the row at the new path:
+
+- rows are read with keyset pagination (id > last_id) and written back with batched UPDATEs
+- images are processed concurrently in a worker pool; identical covers are ingested once
+  (ingest_image also dedups against image_assets by sha256; not by dHash, since
+  existing covers include user uploads)
+- old files are left in place (other rows or external links may still use them)
+- external http(s) covers and unreadable files are skipped and counted
+- --dry-run only counts the rows that would be converted
+
+Usage (from backend/):
+  python scripts/backfill_image_renditions.py
+  python scripts/backfill_image_renditions.py --workers 4 --batch-size 200
+  python scripts/backfill_image_renditions.py --dry-run
+"""
+
+from __future__ import annotations
+
+import argparse
+import sys
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Optional
+
+from sqlalchemy import select, update
+
+# Ensure project root on path
+BASE_DIR = Path(__file__).resolve().parent.parent
+if str(BASE_DIR) not in sys.path:
+    sys.path.append(str(BASE_DIR))
+
+from app.core.config import settings
+from app.db.session import SessionLocal
+from app.models.music_file import MusicFile
+from app.models.work import Work
+from app.services import image_renditions
+from app.services.oss_storage import OSSStorage, decode_oss_path, normalize_oss_like_url
+
+
+@dataclass
+class Stats:
+    rows: int = 0
+    converted: int = 0
+    skipped: int = 0
+    failures: int = 0
+
+    def report(self, label: str) -> str:
+        return (
+            f"[{label}] rows={self.rows} converted={self.converted} "
+            f"skipped={self.skipped} failures={self.failures}"
+        )
+
+
+def read_cover(value: str) -> Optional[bytes]:
+    """Bytes of a stored cover, or None when it is not ours to read (external URL / missing)."""
+    key = decode_oss_path(value)
+    if key:
+        with tempfile.TemporaryDirectory() as tmp:
+            target = Path(tmp) / "cover"
+            OSSStorage().download_to_file(key, str(target))
+            return target.read_bytes()
+    if value.startswith(("http://", "https://")):
+        return None
+    if value.lstrip("/").startswith("static/covers/"):
+        candidate = Path(settings.STATIC_ROOT) / "covers" / Path(value).name
+    else:
+        candidate = Path(value)
+    return candidate.read_bytes() if candidate.is_file() else None
+
+
+class Converter:
+    """old value -> new storage path, each distinct value ingested once per run."""
+
+    def __init__(self, stats: Stats) -> None:
+        self.stats = stats
+        self._lock = threading.Lock()
+        self._done: dict[str, Optional[str]] = {}
+
+    def convert(self, value: str) -> Optional[str]:
+        with self._lock:
+            if value in self._done:
+                return self._done[value]
+        data = read_cover(value)
+        new_value = image_renditions.ingest_image(data, perceptual=False) if data is not None else None
+        with self._lock:
+            self._done[value] = new_value
+        return new_value
+
+
+def run_batches(
+    *,
+    label: str,
+    model,
+    column: str,
+    converter: Converter,
+    pool: ThreadPoolExecutor,
+    batch_size: int,
+    dry_run: bool,
+) -> None:
+    stats = Stats()
+    converter.stats = stats
+    attr = getattr(model, column)
+    last_id = 0
+    while True:
+        session = SessionLocal()
+        try:
+            rows = session.execute(
+                select(model.id, attr)
+                .where(model.id > last_id, attr.is_not(None), attr != "")
+                .order_by(model.id.asc())
+                .limit(batch_size)
+            ).all()
+        finally:
+            # release the connection while images are processed
+            session.close()
+        if not rows:
+            break
+        last_id = rows[-1][0]
+        stats.rows += len(rows)
+
+        pending = []
+        for row_id, value in rows:
+            value = normalize_oss_like_url(value) or value
+            if image_renditions.is_managed(value):
+                continue
+            if dry_run:
+                stats.converted += 1
+                continue
+            pending.append((row_id, pool.submit(converter.convert, value)))
+
+        updates = []
+        for row_id, future in pending:
+            try:
+                new_value = future.result()
+            except Exception as exc:
+                stats.failures += 1
+                print(f"[{label} id={row_id}] {column}: ingest failed: {exc}")
+                continue
+            if new_value is None:
+                stats.skipped += 1
+                continue
+            updates.append({"id": row_id, column: new_value})
+            stats.converted += 1
+
+        if updates:
+            session = SessionLocal()
+            try:
+                session.execute(update(model), updates)
+                session.commit()
+            finally:
+                session.close()
+        print(stats.report(label))
+
+
+def main(*, workers: int, batch_size: int, dry_run: bool) -> None:
+    if SessionLocal is None:
+        raise SystemExit("DATABASE_URL is not configured")
+    converter = Converter(Stats())
+    with ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="backfill-images") as pool:
+        for label, model, column in (
+            ("works", Work, "cover_url"),
+            ("music_files", MusicFile, "cover_image_path"),
+        ):
+            run_batches(
+                label=label,
+                model=model,
+                column=column,
+                converter=converter,
+                pool=pool,
+                batch_size=batch_size,
+                dry_run=dry_run,
+            )
+    print(f"[done] {image_renditions.stats()} dry_run={dry_run}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Convert existing covers to content-addressed images with renditions.")
+    parser.add_argument("--workers", type=int, default=4, help="Concurrent image workers (default: 4)")
+    parser.add_argument("--batch-size", type=int, default=200, help="Rows per DB page / UPDATE batch (default: 200)")
+    parser.add_argument("--dry-run", action="store_true", help="Only count rows that would be converted.")
+    args = parser.parse_args()
+    main(workers=args.workers, batch_size=args.batch_size, dry_run=args.dry_run)
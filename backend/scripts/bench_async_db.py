@@ -0,0 +1,219 @@
+"""Load test: blocking sync Session in `async def` vs the AsyncSession path.
+
+Every route used to be `async def` while calling the blocking sync Session, so each DB
+round trip stalled the event loop and a worker served one query at a time. This bench
+runs the same page query (public works + author + music file, like /works/public) under
+concurrent clients through three in-process endpoints:
+  blocking   async def + sync Session            (old pattern, event loop blocked)
+  threadpool def + sync Session                  (FastAPI threadpool, capped at 40)
+  async      async def + AsyncSession            (get_async_db path)
+and reports requests/s and latency percentiles.
+
+Round-trip latency is simulated inside the statement itself (MySQL SLEEP(), or a
+registered SQLite function) so that it is spent in the driver, as real network / server
+time would be, not in Python.
+
+Usage (from backend/):
+  python scripts/bench_async_db.py                          # temp SQLite file + aiosqlite
+  python scripts/bench_async_db.py --clients 64 --requests 20 --latency-ms 10
+  python scripts/bench_async_db.py --database-url mysql+pymysql://user:pw@host/scratch_db
+  (seeds its own rows; use a scratch database. MySQL needs aiomysql installed)
+
+Live server mode (no simulation, any GET endpoints):
+  python scripts/bench_async_db.py --base-url http://127.0.0.1:8000 \\
+      --path "/api/search?query=love" --path "/api/ui/hot-songs" --path "/api/history"
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import httpx
+from fastapi import Depends, FastAPI
+from sqlalchemy import create_engine, event, func, select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.orm import Session, joinedload, sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+
+# Ensure project root on path
+BASE_DIR = Path(__file__).resolve().parent.parent
+if str(BASE_DIR) not in sys.path:
+    sys.path.append(str(BASE_DIR))
+
+from app.db.base import Base
+from app.db.session import async_database_url, engine_options
+from app.models.music_file import MusicFile
+from app.models.user import User
+from app.models.work import Work, WorkStatus, WorkVisibility
+
+PAGE = 20
+
+
+def _sqlite_sleep(ms) -> int:
+    time.sleep(float(ms) / 1000)
+    return 0
+
+
+def seed(SessionLocal, n_works: int) -> None:
+    db = SessionLocal()
+    try:
+        if db.query(Work.id).filter(Work.title.like("bench async %")).first() is not None:
+            return
+        author = User(username="bench_async_author", password_hash="x")
+        db.add(author)
+        db.flush()
+        for i in range(n_works):
+            mf = MusicFile(user_id=author.id, file_name=f"async_{i}.wav", storage_path=f"async_{i}.wav")
+            db.add(mf)
+            db.flush()
+            db.add(
+                Work(
+                    user_id=author.id,
+                    music_file_id=mf.id,
+                    title=f"bench async {i}",
+                    status=WorkStatus.published,
+                    visibility=WorkVisibility.public,
+                )
+            )
+        db.commit()
+    finally:
+        db.close()
+
+
+def page_stmt(dialect: str, latency_ms: float):
+    # 延迟放在 SQL 中执行：时间花在驱动 / 数据库里，而不是 Python 里；
+    # 不相关标量子查询每条语句只求值一次（直接放在 select 列里会每行 sleep 一次）
+    delay = func.sleep(latency_ms / 1000) if dialect == "mysql" else func.bench_sleep(latency_ms)
+    return (
+        select(Work, select(delay).scalar_subquery())
+        .options(joinedload(Work.user), joinedload(Work.music_file))
+        .where(Work.status == WorkStatus.published, Work.visibility == WorkVisibility.public)
+        .order_by(Work.created_at.desc(), Work.id.desc())
+        .limit(PAGE)
+    )
+
+
+def build_app(SessionLocal, AsyncSessionLocal, dialect: str, latency_ms: float) -> FastAPI:
+    app = FastAPI()
+
+    def get_sync_db():
+        db = SessionLocal()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    async def get_async_db():
+        async with AsyncSessionLocal() as db:
+            yield db
+
+    @app.get("/blocking")
+    async def blocking(db: Session = Depends(get_sync_db)) -> int:
+        return len(db.execute(page_stmt(dialect, latency_ms)).all())
+
+    @app.get("/threadpool")
+    def threadpool(db: Session = Depends(get_sync_db)) -> int:
+        return len(db.execute(page_stmt(dialect, latency_ms)).all())
+
+    @app.get("/async")
+    async def async_path(db: AsyncSession = Depends(get_async_db)) -> int:
+        return len((await db.execute(page_stmt(dialect, latency_ms))).all())
+
+    return app
+
+
+async def run_load(client: httpx.AsyncClient, path: str, clients: int, requests: int) -> tuple[float, list[float], int]:
+    latencies: list[float] = []
+    errors = 0
+
+    async def worker() -> None:
+        nonlocal errors
+        for _ in range(requests):
+            started = time.perf_counter()
+            try:
+                response = await client.get(path)
+                if response.status_code != 200:
+                    errors += 1
+            except httpx.HTTPError:
+                errors += 1
+            latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(clients)))
+    return time.perf_counter() - started, latencies, errors
+
+
+def report(label: str, elapsed: float, latencies: list[float], errors: int) -> None:
+    ordered = sorted(latencies)
+    p95 = ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))]
+    print(
+        f"  {label:<40} {len(latencies) / elapsed:8.1f} req/s  "
+        f"p50={statistics.median(ordered) * 1000:7.1f}ms  p95={p95 * 1000:7.1f}ms  errors={errors}"
+    )
+
+
+async def bench_in_process(database_url: str | None, clients: int, requests: int, latency_ms: float, works: int) -> None:
+    with tempfile.TemporaryDirectory() as tmp:
+        url = database_url or f"sqlite:///{Path(tmp) / 'bench_async.db'}"
+        # 池要够大：否则阻塞模式下连接归还（在线程池里 close）排在被阻塞的事件循环后面，会卡死到 pool timeout
+        options = {**engine_options(url), "pool_size": clients, "max_overflow": clients}
+        async_options = {**engine_options(url, asyncio=True), "pool_size": clients, "max_overflow": clients}
+        if url.startswith("sqlite"):
+            options.update(poolclass=QueuePool, connect_args={"check_same_thread": False, "timeout": 60})
+            async_options.update(poolclass=AsyncAdaptedQueuePool, connect_args={"timeout": 60})
+        sync_engine = create_engine(url, **options)
+        async_engine = create_async_engine(async_database_url(url), **async_options)
+        dialect = sync_engine.dialect.name
+        if dialect == "sqlite":
+            for target in (sync_engine, async_engine.sync_engine):
+                event.listen(
+                    target,
+                    "connect",
+                    lambda dbapi_conn, _: dbapi_conn.create_function("bench_sleep", 1, _sqlite_sleep),
+                )
+        Base.metadata.create_all(sync_engine, tables=[User.__table__, MusicFile.__table__, Work.__table__])
+        SessionLocal = sessionmaker(bind=sync_engine, autocommit=False, autoflush=False)
+        seed(SessionLocal, works)
+        app = build_app(SessionLocal, async_sessionmaker(async_engine, expire_on_commit=False), dialect, latency_ms)
+
+        print(f"clients={clients} requests/client={requests} latency={latency_ms}ms page={PAGE} db={dialect}")
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=120) as client:
+            for path in ("/blocking", "/threadpool", "/async"):
+                await client.get(path)  # 预热连接池
+                report(path.lstrip("/"), *await run_load(client, path, clients, requests))
+        await async_engine.dispose()
+        sync_engine.dispose()
+
+
+async def bench_live(base_url: str, paths: list[str], clients: int, requests: int, token: str | None) -> None:
+    headers = {"Authorization": f"Bearer {token}"} if token else {}
+    print(f"clients={clients} requests/client={requests} base_url={base_url}")
+    limits = httpx.Limits(max_connections=clients, max_keepalive_connections=clients)
+    async with httpx.AsyncClient(base_url=base_url, headers=headers, timeout=120, limits=limits) as client:
+        for path in paths:
+            await client.get(path)
+            report(path, *await run_load(client, path, clients, requests))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare blocking sync DB access with the AsyncSession path.")
+    parser.add_argument("--database-url", default=None, help="Scratch sync database URL (default: temp SQLite file)")
+    parser.add_argument("--clients", type=int, default=32, help="Concurrent clients (default: 32)")
+    parser.add_argument("--requests", type=int, default=10, help="Requests per client (default: 10)")
+    parser.add_argument("--latency-ms", type=float, default=20.0, help="Simulated DB round trip (default: 20)")
+    parser.add_argument("--works", type=int, default=100, help="Seeded works (default: 100)")
+    parser.add_argument("--base-url", default=None, help="Benchmark a running server instead")
+    parser.add_argument("--path", action="append", default=[], help="GET path for --base-url (repeatable)")
+    parser.add_argument("--token", default=None, help="Bearer token for authenticated paths (--base-url)")
+    args = parser.parse_args()
+    if args.base_url:
+        asyncio.run(bench_live(args.base_url, args.path or ["/api/health"], args.clients, args.requests, args.token))
+    else:
+        asyncio.run(bench_in_process(args.database_url, args.clients, args.requests, args.latency_ms, args.works))
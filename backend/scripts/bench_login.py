@@ -0,0 +1,158 @@
+"""Login throughput benchmark: KDF on the event loop vs the password-hash pool.
+
+Runs the real POST /login route in-process against a scratch database with
+concurrent clients, once with PASSWORD_HASH_WORKERS=0 (verify on the event loop,
+the old behaviour) and once per --workers value. While logins run, a ticker sleeps
+5 ms at a time and records how late it wakes up: that lag is what every other
+request on the worker waits while a KDF runs on the event loop.
+
+Throughput only scales with the pool when the machine has free cores; the lag
+improves regardless.
+
+Usage (from backend/):
+  python scripts/bench_login.py
+  python scripts/bench_login.py --clients 32 --logins 10 --workers 2 --workers 4 --rounds 100000
+  python scripts/bench_login.py --database-url mysql+pymysql://user:pw@host/scratch_db
+  (creates tables and users; use a scratch database)
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import httpx
+from fastapi import FastAPI
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+# Ensure project root on path
+BASE_DIR = Path(__file__).resolve().parent.parent
+if str(BASE_DIR) not in sys.path:
+    sys.path.append(str(BASE_DIR))
+
+from app.api.router import api_router
+from app.core import security
+from app.core.config import settings
+from app.core.dependencies import get_db
+from app.db.base import Base
+from app.models.user import User
+
+PASSWORD = "bench-login-password"
+
+
+def seed(Session, users: int) -> list[str]:
+    db = Session()
+    try:
+        password_hash = security.hash_password(PASSWORD)
+        names = [f"bench_login_{i}" for i in range(users)]
+        db.add_all(User(username=name, password_hash=password_hash) for name in names)
+        db.commit()
+        return names
+    finally:
+        db.close()
+
+
+def build_app(Session) -> FastAPI:
+    app = FastAPI()
+    app.include_router(api_router, prefix=settings.API_PREFIX)
+
+    def override_db():
+        db = Session()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    app.dependency_overrides[get_db] = override_db
+    return app
+
+
+def percentile(values: list[float], q: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * q))]
+
+
+async def run(client: httpx.AsyncClient, names: list[str], clients: int, logins: int) -> dict[str, float]:
+    login_latencies: list[float] = []
+    lags: list[float] = []
+    done = asyncio.Event()
+
+    async def login_worker(index: int) -> None:
+        for n in range(logins):
+            username = names[(index * logins + n) % len(names)]
+            started = time.perf_counter()
+            response = await client.post(
+                f"{settings.API_PREFIX}/login", json={"username": username, "password": PASSWORD}
+            )
+            if response.status_code != 200:
+                raise SystemExit(f"login -> {response.status_code}: {response.text[:200]}")
+            login_latencies.append(time.perf_counter() - started)
+
+    async def ticker() -> None:
+        while not done.is_set():
+            started = time.perf_counter()
+            await asyncio.sleep(0.005)
+            lags.append(time.perf_counter() - started - 0.005)
+
+    ticker_task = asyncio.create_task(ticker())
+    started = time.perf_counter()
+    await asyncio.gather(*(login_worker(i) for i in range(clients)))
+    elapsed = time.perf_counter() - started
+    done.set()
+    await ticker_task
+    return {
+        "logins_per_s": len(login_latencies) / elapsed,
+        "login_p50": statistics.median(login_latencies) * 1000,
+        "login_p95": percentile(login_latencies, 0.95) * 1000,
+        "lag_p50": statistics.median(lags) * 1000,
+        "lag_max": max(lags) * 1000,
+    }
+
+
+async def main(database_url: str | None, clients: int, logins: int, workers: list[int], rounds: int) -> None:
+    if rounds > 0:
+        settings.PASSWORD_PBKDF2_ROUNDS = rounds
+        security.pwd_context = security._build_context(rounds)
+    with tempfile.TemporaryDirectory() as tmp:
+        url = database_url or f"sqlite:///{Path(tmp) / 'bench_login.db'}"
+        connect_args = {"check_same_thread": False} if url.startswith("sqlite") else {}
+        engine = create_engine(url, connect_args=connect_args)
+        Base.metadata.create_all(engine, tables=[User.__table__])
+        Session = sessionmaker(bind=engine, autocommit=False, autoflush=False)
+        names = seed(Session, clients)
+        app = build_app(Session)
+
+        started = time.perf_counter()
+        security.verify_password(PASSWORD, security.hash_password(PASSWORD))
+        single_ms = (time.perf_counter() - started) * 1000 / 2
+        print(f"clients={clients} logins/client={logins} kdf≈{single_ms:.0f}ms db={engine.dialect.name}")
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=300) as client:
+            for count in [0, *workers]:
+                settings.PASSWORD_HASH_WORKERS = count
+                security._hash_executor = None
+                result = await run(client, names, clients, logins)
+                label = "event loop (old)" if count <= 0 else f"pool workers={count}"
+                print(
+                    f"  {label:<20} {result['logins_per_s']:7.1f} logins/s  "
+                    f"login p50={result['login_p50']:7.1f}ms p95={result['login_p95']:7.1f}ms  "
+                    f"event-loop lag p50={result['lag_p50']:6.1f}ms max={result['lag_max']:7.1f}ms"
+                )
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark login throughput and event-loop blocking.")
+    parser.add_argument("--database-url", default=None, help="Scratch database URL (default: temp SQLite file)")
+    parser.add_argument("--clients", type=int, default=16, help="Concurrent login clients (default: 16)")
+    parser.add_argument("--logins", type=int, default=5, help="Logins per client (default: 5)")
+    parser.add_argument("--workers", type=int, action="append", default=None, help="Pool sizes to try (default: 4)")
+    parser.add_argument("--rounds", type=int, default=0, help="PBKDF2 rounds override (default: configured)")
+    args = parser.parse_args()
+    asyncio.run(main(args.database_url, args.clients, args.logins, args.workers or [4], args.rounds))
@@ -0,0 +1,95 @@
+"""Benchmark: plain StaticFiles mount vs app.core.media_files.MediaFiles.
+
+Runs both ASGI apps in-process (httpx ASGITransport, no network) against a
+temporary UUID-named WAV and reports throughput for:
+  - full GET (first play)
+  - Range GET (seeking, 256 KiB windows)
+  - replay revalidation (If-None-Match -> 304)
+plus the Cache-Control each mount sends (immutable => the browser skips the
+replay request entirely).
+
+Usage (from backend/):
+  python scripts/bench_media_serving.py
+  python scripts/bench_media_serving.py --size-mb 40 --requests 200
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+import uuid
+from pathlib import Path
+
+import httpx
+from starlette.applications import Starlette
+from starlette.routing import Mount
+from starlette.staticfiles import StaticFiles
+
+# Ensure project root on path
+BASE_DIR = Path(__file__).resolve().parent.parent
+if str(BASE_DIR) not in sys.path:
+    sys.path.append(str(BASE_DIR))
+
+from app.core.media_files import MediaFiles
+
+
+def build_app(static: StaticFiles) -> Starlette:
+    return Starlette(routes=[Mount("/static", app=static)])
+
+
+async def run_case(client: httpx.AsyncClient, url: str, n: int, headers_fn) -> tuple[float, int, dict[int, int]]:
+    statuses: dict[int, int] = {}
+    total_bytes = 0
+    start = time.perf_counter()
+    for i in range(n):
+        resp = await client.get(url, headers=headers_fn(i))
+        statuses[resp.status_code] = statuses.get(resp.status_code, 0) + 1
+        total_bytes += len(resp.content)
+    return time.perf_counter() - start, total_bytes, statuses
+
+
+async def bench(label: str, app: Starlette, filename: str, size: int, n: int) -> None:
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        url = f"/static/{filename}"
+        first = await client.get(url)
+        etag = first.headers.get("etag", "")
+        window = 256 * 1024
+
+        def seek(i: int) -> dict[str, str]:
+            start = (i * window) % max(size - window, 1)
+            return {"range": f"bytes={start}-{start + window - 1}"}
+
+        cases = {
+            "full GET": lambda i: {},
+            "range GET": seek,
+            "replay 304": lambda i: {"if-none-match": etag},
+        }
+        print(f"\n[{label}] cache-control={first.headers.get('cache-control')!r} etag={etag}")
+        for name, headers_fn in cases.items():
+            elapsed, nbytes, statuses = await run_case(client, url, n, headers_fn)
+            rps = n / elapsed if elapsed else float("inf")
+            mbps = nbytes / elapsed / (1024 * 1024) if elapsed else float("inf")
+            print(f"  {name:<11} {rps:9.1f} req/s  {mbps:9.1f} MiB/s  statuses={statuses}")
+
+
+def main(size_mb: int, requests_per_case: int) -> None:
+    with tempfile.TemporaryDirectory() as tmp:
+        filename = f"gen_{uuid.uuid4().hex}.wav"
+        size = size_mb * 1024 * 1024
+        Path(tmp, filename).write_bytes(os.urandom(size))
+
+        asyncio.run(bench("StaticFiles (current)", build_app(StaticFiles(directory=tmp)), filename, size, requests_per_case))
+        asyncio.run(bench("MediaFiles", build_app(MediaFiles(directory=tmp)), filename, size, requests_per_case))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare StaticFiles vs MediaFiles throughput.")
+    parser.add_argument("--size-mb", type=int, default=20, help="Size of the synthetic WAV (default: 20)")
+    parser.add_argument("--requests", type=int, default=100, help="Requests per case (default: 100)")
+    args = parser.parse_args()
+    main(size_mb=args.size_mb, requests_per_case=args.requests)
@@ -0,0 +1,185 @@
+"""Benchmark: per-play transactions vs app.services.play_buffer write coalescing.
+
+Seeds a few "viral" works and hammers them from concurrent client threads in three modes:
+  legacy    one transaction per play, read-modify-write of play_count (old endpoint)
+  atomic    one transaction per play, batched insert + `SET col = col + n` (buffer disabled)
+  buffered  PlayBuffer.record() per play, background flush every --flush-ms
+and reports plays/s plus whether works.play_count / users.plays_received match the
+number of plays sent (legacy loses updates under concurrency).
+
+Usage (from backend/):
+  python scripts/bench_play_ingest.py                         # temp SQLite file
+  python scripts/bench_play_ingest.py --clients 32 --plays 200
+  python scripts/bench_play_ingest.py --database-url mysql+pymysql://user:pw@host/bench_db
+  (the bench creates/drops only its own tables' rows; use a scratch database)
+"""
+
+from __future__ import annotations
+
+import argparse
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+
+from sqlalchemy import create_engine, func
+from sqlalchemy.orm import sessionmaker
+
+# Ensure project root on path
+BASE_DIR = Path(__file__).resolve().parent.parent
+if str(BASE_DIR) not in sys.path:
+    sys.path.append(str(BASE_DIR))
+
+from app.db.base_class import Base
+from app.models.music_file import MusicFile
+from app.models.user import User
+from app.models.work import Work, WorkStatus, WorkVisibility
+from app.models.work_play_log import WorkPlayLog
+from app.services.play_buffer import PlayBuffer, PlayEvent, apply_plays
+
+TABLES = [User.__table__, MusicFile.__table__, Work.__table__, WorkPlayLog.__table__]
+
+
+def seed(Session, n_works: int) -> tuple[int, list[int]]:
+    db = Session()
+    try:
+        db.query(WorkPlayLog).delete()
+        db.query(Work).delete()
+        db.query(MusicFile).delete()
+        db.query(User).filter(User.username == "bench_author").delete()
+        author = User(username="bench_author", password_hash="x")
+        db.add(author)
+        db.flush()
+        work_ids = []
+        for i in range(n_works):
+            mf = MusicFile(user_id=author.id, file_name=f"bench_{i}.wav", storage_path=f"bench_{i}.wav")
+            db.add(mf)
+            db.flush()
+            work = Work(
+                user_id=author.id,
+                music_file_id=mf.id,
+                title=f"bench {i}",
+                status=WorkStatus.published,
+                visibility=WorkVisibility.public,
+            )
+            db.add(work)
+            db.flush()
+            work_ids.append(work.id)
+        db.commit()
+        return author.id, work_ids
+    finally:
+        db.close()
+
+
+def legacy_play(Session, work_id: int, author_id: int) -> None:
+    db = Session()
+    try:
+        db.add(WorkPlayLog(work_id=work_id, played_at=datetime.utcnow(), source="bench"))
+        work = db.query(Work).filter(Work.id == work_id).first()
+        work.play_count = (work.play_count or 0) + 1
+        author = db.query(User).filter(User.id == author_id).first()
+        author.plays_received = (author.plays_received or 0) + 1
+        db.commit()
+    finally:
+        db.close()
+
+
+def atomic_play(Session, work_id: int, author_id: int) -> None:
+    db = Session()
+    try:
+        apply_plays(
+            db,
+            [PlayEvent(work_id=work_id, author_id=author_id, user_id=None, source="bench", played_at=datetime.utcnow().isoformat())],
+        )
+        db.commit()
+    finally:
+        db.close()
+
+
+def run_clients(n_clients: int, plays_per_client: int, work_ids: list[int], play) -> tuple[float, int]:
+    errors = [0]
+    lock = threading.Lock()
+
+    def client(idx: int) -> None:
+        for i in range(plays_per_client):
+            try:
+                play(idx, work_ids[(idx + i) % len(work_ids)])
+            except Exception:
+                with lock:
+                    errors[0] += 1
+
+    threads = [threading.Thread(target=client, args=(i,)) for i in range(n_clients)]
+    started = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return time.perf_counter() - started, errors[0]
+
+
+def verify(Session, author_id: int, expected: int) -> str:
+    db = Session()
+    try:
+        plays = int(db.query(func.coalesce(func.sum(Work.play_count), 0)).scalar() or 0)
+        logs = int(db.query(func.count(WorkPlayLog.id)).scalar() or 0)
+        received = int(db.query(User.plays_received).filter(User.id == author_id).scalar() or 0)
+    finally:
+        db.close()
+    ok = plays == expected and logs == expected and received == expected
+    return f"play_count={plays} logs={logs} plays_received={received} expected={expected} {'OK' if ok else 'MISMATCH'}"
+
+
+def main(database_url: str | None, clients: int, plays: int, works: int, flush_ms: int) -> None:
+    with tempfile.TemporaryDirectory() as tmp:
+        url = database_url or f"sqlite:///{Path(tmp) / 'bench.db'}"
+        connect_args = {"check_same_thread": False, "timeout": 60} if url.startswith("sqlite") else {}
+        engine = create_engine(url, connect_args=connect_args, pool_size=max(5, clients), max_overflow=clients)
+        Base.metadata.create_all(engine, tables=TABLES)
+        Session = sessionmaker(bind=engine, autocommit=False, autoflush=False)
+        expected = clients * plays
+        print(f"clients={clients} plays/client={plays} works={works} total={expected} db={engine.dialect.name}")
+
+        for label, play_fn in (("legacy", legacy_play), ("atomic", atomic_play)):
+            author_id, work_ids = seed(Session, works)
+            elapsed, errors = run_clients(clients, plays, work_ids, lambda idx, wid: play_fn(Session, wid, author_id))
+            print(f"  {label:<9} {expected / elapsed:9.1f} plays/s  errors={errors}  {verify(Session, author_id, expected)}")
+
+        author_id, work_ids = seed(Session, works)
+        buffer = PlayBuffer(directory=Path(tmp) / "plays", dedupe_seconds=0, session_factory=Session)
+        stop = threading.Event()
+
+        def flusher() -> None:
+            while not stop.wait(flush_ms / 1000):
+                buffer.flush()
+
+        flush_thread = threading.Thread(target=flusher)
+        flush_thread.start()
+        elapsed, errors = run_clients(
+            clients,
+            plays,
+            work_ids,
+            lambda idx, wid: buffer.record(work_id=wid, author_id=author_id, user_id=None, client_key=f"c{idx}", source="bench"),
+        )
+        stop.set()
+        flush_thread.join()
+        drain_started = time.perf_counter()
+        buffer.flush()
+        drain = time.perf_counter() - drain_started
+        print(
+            f"  {'buffered':<9} {expected / elapsed:9.1f} plays/s  errors={errors}  "
+            f"(final drain {drain * 1000:.0f} ms, stats={buffer.stats()})  {verify(Session, author_id, expected)}"
+        )
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare per-play transactions with the buffered play ingest.")
+    parser.add_argument("--database-url", default=None, help="Scratch database URL (default: temp SQLite file)")
+    parser.add_argument("--clients", type=int, default=16, help="Concurrent client threads (default: 16)")
+    parser.add_argument("--plays", type=int, default=100, help="Plays per client (default: 100)")
+    parser.add_argument("--works", type=int, default=3, help="Number of hot works (default: 3)")
+    parser.add_argument("--flush-ms", type=int, default=300, help="Buffer flush interval (default: 300)")
+    args = parser.parse_args()
+    main(args.database_url, args.clients, args.plays, args.works, args.flush_ms)
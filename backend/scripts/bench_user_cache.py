@@ -0,0 +1,159 @@
+"""Benchmark: DB statements per polled request with and without the user cache.
+
+Simulates the frontend's polling traffic: USERS signed-in users, each repeatedly
+requesting the task list (/music/history, Principal), the history page (/history,
+async Principal) and their profile (/profile, full User with counters), with
+real JWTs going through the real auth dependencies. The same request mix is run
+with USER_CACHE_TTL_SECONDS=0 (every request SELECTs the user) and with the cache
+on, and the number of SQL statements / time spent in the database is compared
+(counted with app.db.query_stats).
+
+Usage (from backend/):
+  python scripts/bench_user_cache.py
+  python scripts/bench_user_cache.py --users 50 --rounds 20 --ttl 30
+  python scripts/bench_user_cache.py --database-url mysql+pymysql://user:pw@host/scratch_db
+  (creates tables and users; use a scratch database)
+"""
+
+from __future__ import annotations
+
+import argparse
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.orm import sessionmaker
+
+# Ensure project root on path
+BASE_DIR = Path(__file__).resolve().parent.parent
+if str(BASE_DIR) not in sys.path:
+    sys.path.append(str(BASE_DIR))
+
+from app.api.router import api_router
+from app.core import user_cache
+from app.core.config import settings
+from app.core.dependencies import get_async_db, get_db
+from app.core.security import create_access_token
+from app.db import query_stats
+from app.db.base import Base
+from app.db.session import async_database_url
+from app.models.user import User
+
+POLLED_PATHS = ("/music/history?limit=20", "/history?limit=20", "/profile")
+
+
+def seed(Session, users: int) -> list[int]:
+    db = Session()
+    try:
+        rows = [User(username=f"bench_cache_{i}", password_hash="x") for i in range(users)]
+        db.add_all(rows)
+        db.commit()
+        return [u.id for u in rows]
+    finally:
+        db.close()
+
+
+def build_app(Session, AsyncSession) -> FastAPI:
+    app = FastAPI()
+    app.include_router(api_router, prefix=settings.API_PREFIX)
+
+    def override_db():
+        db = Session()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    async def override_async_db():
+        async with AsyncSession() as db:
+            yield db
+
+    app.dependency_overrides[get_db] = override_db
+    app.dependency_overrides[get_async_db] = override_async_db
+    return app
+
+
+class _Recorder:
+    """ASGI wrapper keeping the QueryStats of the last request."""
+
+    def __init__(self, app) -> None:
+        self.app = app
+        self.last: query_stats.QueryStats | None = None
+
+    async def __call__(self, scope, receive, send) -> None:
+        with query_stats.track() as stats:
+            await self.app(scope, receive, send)
+        self.last = stats
+
+
+def run(client: TestClient, recorder: _Recorder, tokens: list[str], rounds: int) -> dict[str, float]:
+    per_path = {path: 0 for path in POLLED_PATHS}
+    requests = queries = 0
+    db_seconds = 0.0
+    started = time.perf_counter()
+    for _ in range(rounds):
+        for token in tokens:
+            headers = {"Authorization": f"Bearer {token}"}
+            for path in POLLED_PATHS:
+                response = client.get(settings.API_PREFIX + path, headers=headers)
+                if response.status_code != 200:
+                    raise SystemExit(f"{path} -> {response.status_code}: {response.text[:200]}")
+                per_path[path] += recorder.last.count
+                queries += recorder.last.count
+                db_seconds += recorder.last.seconds
+                requests += 1
+    return {
+        "requests": requests,
+        "elapsed": time.perf_counter() - started,
+        "queries": queries,
+        "db_ms": db_seconds * 1000,
+        **{path: per_path[path] / (requests / len(POLLED_PATHS)) for path in POLLED_PATHS},
+    }
+
+
+def main(database_url: str | None, users: int, rounds: int, ttl: int) -> None:
+    with tempfile.TemporaryDirectory() as tmp:
+        url = database_url or f"sqlite:///{Path(tmp) / 'bench_user_cache.db'}"
+        connect_args = {"check_same_thread": False} if url.startswith("sqlite") else {}
+        engine = create_engine(url, connect_args=connect_args)
+        Base.metadata.create_all(engine)
+        Session = sessionmaker(bind=engine, autocommit=False, autoflush=False)
+        async_engine = create_async_engine(async_database_url(url))
+        AsyncSession = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+        tokens = [create_access_token(user_id) for user_id in seed(Session, users)]
+        recorder = _Recorder(build_app(Session, AsyncSession))
+        client = TestClient(recorder)
+
+        print(f"users={users} rounds={rounds} paths={len(POLLED_PATHS)} db={engine.dialect.name}")
+        results = {}
+        for label, ttl_seconds in (("no cache", 0), (f"cache ttl={ttl}s", ttl)):
+            settings.USER_CACHE_TTL_SECONDS = ttl_seconds
+            user_cache.clear()
+            results[label] = result = run(client, recorder, tokens, rounds)
+            per_request = result["queries"] / result["requests"]
+            print(
+                f"  {label:<16} requests={result['requests']:<6} queries={result['queries']:<6} "
+                f"queries/request={per_request:.2f}  db_ms={result['db_ms']:.0f}  "
+                f"req/s={result['requests'] / result['elapsed']:.0f}"
+            )
+            for path in POLLED_PATHS:
+                print(f"      {path:<26} queries/request={result[path]:.2f}")
+
+        before, after = results["no cache"]["queries"], results[f"cache ttl={ttl}s"]["queries"]
+        print(f"statements saved: {before - after} ({(before - after) / before:.0%}); cache {user_cache.stats()}")
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Measure DB statements saved by the authenticated-user cache.")
+    parser.add_argument("--database-url", default=None, help="Scratch database URL (default: temp SQLite file)")
+    parser.add_argument("--users", type=int, default=20, help="Signed-in users polling (default: 20)")
+    parser.add_argument("--rounds", type=int, default=10, help="Polling rounds per user (default: 10)")
+    parser.add_argument("--ttl", type=int, default=30, help="USER_CACHE_TTL_SECONDS for the cached run (default: 30)")
+    args = parser.parse_args()
+    main(args.database_url, args.users, args.rounds, args.ttl)
@@ -0,0 +1,73 @@
+"""Pick PASSWORD_PBKDF2_ROUNDS for a target verify latency on this machine.
+
+pbkdf2_sha256 cost is linear in its rounds: the script times a probe hash,
+extrapolates to the target, then re-measures the candidate (median of --samples)
+and adjusts once. Run it on the production hardware; the printed setting goes into
+.env. Existing hashes with other rounds keep working and are re-hashed
+transparently on the user's next successful login.
+
+Capacity hint: one login costs ~target ms of CPU in the password-hash pool, so a
+worker sustains about PASSWORD_HASH_WORKERS * 1000 / target logins per second
+(bounded by its cores).
+
+Usage (from backend/):
+  python scripts/calibrate_password_hash.py                 # target 100 ms
+  python scripts/calibrate_password_hash.py --target-ms 250 --samples 7
+"""
+
+from __future__ import annotations
+
+import argparse
+import statistics
+import sys
+import time
+from pathlib import Path
+
+from passlib.hash import pbkdf2_sha256
+
+# Ensure project root on path
+BASE_DIR = Path(__file__).resolve().parent.parent
+if str(BASE_DIR) not in sys.path:
+    sys.path.append(str(BASE_DIR))
+
+from app.core.config import settings
+
+PROBE_ROUNDS = 20000
+MIN_ROUNDS = 10000  # 低于此值不建议用于生产
+
+
+def measure(rounds: int, samples: int) -> float:
+    """Median seconds of one verify at `rounds`."""
+    handler = pbkdf2_sha256.using(rounds=rounds)
+    stored = handler.hash("calibration-password")
+    timings = []
+    for _ in range(samples):
+        started = time.perf_counter()
+        handler.verify("calibration-password", stored)
+        timings.append(time.perf_counter() - started)
+    return statistics.median(timings)
+
+
+def calibrate(target_ms: float, samples: int) -> tuple[int, float]:
+    per_round = measure(PROBE_ROUNDS, samples) / PROBE_ROUNDS
+    rounds = max(MIN_ROUNDS, int(target_ms / 1000 / per_round))
+    seconds = measure(rounds, samples)
+    # 一次修正：消除探测时的固定开销误差
+    rounds = max(MIN_ROUNDS, int(rounds * (target_ms / 1000) / seconds))
+    rounds = max(MIN_ROUNDS, round(rounds, -3))
+    return rounds, measure(rounds, samples)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Calibrate pbkdf2_sha256 rounds for a target verify latency.")
+    parser.add_argument("--target-ms", type=float, default=100.0, help="Target verify time in ms (default: 100)")
+    parser.add_argument("--samples", type=int, default=5, help="Timings per measurement (default: 5)")
+    args = parser.parse_args()
+
+    current = int(settings.PASSWORD_PBKDF2_ROUNDS) or pbkdf2_sha256.default_rounds
+    print(f"current rounds={current} verify={measure(current, args.samples) * 1000:.1f}ms")
+    rounds, seconds = calibrate(args.target_ms, args.samples)
+    workers = max(1, int(settings.PASSWORD_HASH_WORKERS))
+    print(f"target={args.target_ms:.0f}ms -> rounds={rounds} verify={seconds * 1000:.1f}ms")
+    print(f"~{workers / seconds:.0f} logins/s with PASSWORD_HASH_WORKERS={workers} (if that many cores are free)")
+    print(f"PASSWORD_PBKDF2_ROUNDS={rounds}")
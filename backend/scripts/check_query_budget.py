@@ -0,0 +1,257 @@
+"""Query budget check: maximum SQL statements per list endpoint.
+
+Seeds a scratch database with one page worth of works from many different authors,
+likes, follows, dialogues, analyses and tasks, then calls each list / profile endpoint
+with a full page (limit=50) and compares the number of statements it ran (counted
+with app.db.query_stats, like the QUERY_DEBUG_ENABLED middleware) with BUDGETS.
+A lazy relationship load per row (N+1) blows the budget immediately, since each
+page holds ~50 rows.
+
+The current user (and Principal) is injected as a preloaded object, so auth
+lookups are not counted. Exits with status 1 when any endpoint is over budget; --verbose prints
+the statements of failing endpoints.
+
+Usage (from backend/):
+  python scripts/check_query_budget.py                      # temp SQLite file
+  python scripts/check_query_budget.py --verbose
+  python scripts/check_query_budget.py --database-url mysql+pymysql://user:pw@host/scratch_db
+  (the check creates and fills tables; use an empty scratch database)
+"""
+
+from __future__ import annotations
+
+import argparse
+import sys
+import tempfile
+import uuid
+from datetime import datetime, timedelta
+from pathlib import Path
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.orm import sessionmaker
+
+# Ensure project root on path
+BASE_DIR = Path(__file__).resolve().parent.parent
+if str(BASE_DIR) not in sys.path:
+    sys.path.append(str(BASE_DIR))
+
+from app.api.router import api_router
+from app.core.config import settings
+from app.core.dependencies import (
+    Principal,
+    get_async_db,
+    get_current_principal,
+    get_current_principal_async,
+    get_current_principal_optional_async,
+    get_current_user,
+    get_current_user_optional,
+    get_db,
+)
+from app.db import query_stats
+from app.db.base import Base
+from app.db.session import async_database_url
+from app.models import LikeRecord, MusicFile, User, UserFollower
+from app.models.dialogue import Dialogue
+from app.models.dialogue_message import DialogueMessage
+from app.models.emotion_analysis import EmotionAnalysis
+from app.models.task import TaskRecord
+from app.models.work import Work, WorkStatus, WorkVisibility
+from app.schemas.tasks import TaskStatus, TaskType
+
+PAGE = 50
+
+# (label, path template, max statements) — path placeholders: {me}, {author}, {dialogue}
+BUDGETS = [
+    ("my works", "/works?limit={page}", 1),
+    ("public works by user", "/works/public/by-user/{author}?limit={page}", 2),
+    ("liked works", "/social/likes/works?limit={page}", 1),
+    ("followers", "/social/users/{me}/followers?limit={page}", 2),
+    ("following", "/social/users/{me}/following?limit={page}", 2),
+    ("public profile", "/social/users/{author}", 4),
+    ("own profile", "/social/users/{me}", 5),
+    ("history", "/history?limit={page}", 3),
+    ("dialogue messages", "/history/dialogues/{dialogue}?limit={page}", 3),
+    ("music tasks", "/music/history?limit={page}", 1),
+    ("search", "/search?query=budget&limit={page}", 4),
+]
+
+
+def seed(Session) -> dict[str, int]:
+    db = Session()
+    try:
+        now = datetime.utcnow()
+        me = User(username="budget_me", password_hash="x")
+        authors = [User(username=f"budget_author_{i}", password_hash="x") for i in range(PAGE)]
+        db.add(me)
+        db.add_all(authors)
+        db.flush()
+
+        works: list[Work] = []
+        for i, author in enumerate(authors):
+            mf = MusicFile(user_id=author.id, file_name=f"budget_{i}.wav", storage_path=f"budget_{i}.wav")
+            db.add(mf)
+            db.flush()
+            work = Work(
+                user_id=author.id,
+                music_file_id=mf.id,
+                title=f"budget song {i}",
+                status=WorkStatus.published,
+                visibility=WorkVisibility.public,
+                created_at=now - timedelta(minutes=i),
+            )
+            db.add(work)
+            works.append(work)
+        # 作者 0 的作品页、以及“我的作品”页也要装满
+        for author in (authors[0], me):
+            for i in range(PAGE):
+                mf = MusicFile(user_id=author.id, file_name=f"own_{i}.wav", storage_path=f"own_{author.id}_{i}.wav")
+                db.add(mf)
+                db.flush()
+                db.add(
+                    Work(
+                        user_id=author.id,
+                        music_file_id=mf.id,
+                        title=f"budget own {i}",
+                        status=WorkStatus.published,
+                        visibility=WorkVisibility.public,
+                    )
+                )
+        db.flush()
+
+        for i, (author, work) in enumerate(zip(authors, works)):
+            db.add(LikeRecord(user_id=me.id, work_id=work.id, created_at=now - timedelta(seconds=i)))
+            db.add(UserFollower(follower_id=author.id, following_id=me.id))
+            db.add(UserFollower(follower_id=me.id, following_id=author.id))
+
+        dialogue = Dialogue(user_id=me.id, title="budget dialogue")
+        db.add(dialogue)
+        db.flush()
+        for i, work in enumerate(works):
+            db.add(
+                DialogueMessage(
+                    dialogue_id=dialogue.id,
+                    user_input_text=f"q{i}",
+                    system_reply_text=f"a{i}",
+                    message_order=i,
+                    music_file_id=work.music_file_id,
+                )
+            )
+            db.add(Dialogue(user_id=me.id, title=f"d{i}"))
+            db.add(
+                EmotionAnalysis(
+                    user_id=me.id,
+                    music_file_id=work.music_file_id,
+                    main_emotion="calm",
+                    raw_result={"payload": "x" * 2000},
+                )
+            )
+            db.add(
+                TaskRecord(
+                    id=str(uuid.uuid4()),
+                    user_id=me.id,
+                    type=TaskType.analyze_emotion,
+                    status=TaskStatus.completed,
+                )
+            )
+        db.commit()
+        return {"me": me.id, "author": authors[0].id, "dialogue": dialogue.id}
+    finally:
+        db.close()
+
+
+class _Recorder:
+    """ASGI wrapper keeping the QueryStats of the last request (statements captured)."""
+
+    def __init__(self, app) -> None:
+        self.app = app
+        self.last: query_stats.QueryStats | None = None
+
+    async def __call__(self, scope, receive, send) -> None:
+        with query_stats.track(capture=True) as stats:
+            await self.app(scope, receive, send)
+        self.last = stats
+
+
+def build_app(Session, AsyncSession, me_id: int) -> FastAPI:
+    app = FastAPI()
+    app.include_router(api_router, prefix=settings.API_PREFIX)
+
+    def override_db():
+        db = Session()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    async def override_async_db():
+        async with AsyncSession() as db:
+            yield db
+
+    db = Session()
+    try:
+        me = db.get(User, me_id)
+        db.expunge(me)
+    finally:
+        db.close()
+
+    principal = Principal(id=me.id, username=me.username)
+
+    def override_user():
+        return me
+
+    def override_principal():
+        return principal
+
+    app.dependency_overrides[get_db] = override_db
+    app.dependency_overrides[get_async_db] = override_async_db
+    for dependency in (get_current_user, get_current_user_optional):
+        app.dependency_overrides[dependency] = override_user
+    for dependency in (get_current_principal, get_current_principal_async, get_current_principal_optional_async):
+        app.dependency_overrides[dependency] = override_principal
+    return app
+
+
+def main(database_url: str | None, verbose: bool) -> int:
+    with tempfile.TemporaryDirectory() as tmp:
+        url = database_url or f"sqlite:///{Path(tmp) / 'budget.db'}"
+        connect_args = {"check_same_thread": False} if url.startswith("sqlite") else {}
+        engine = create_engine(url, connect_args=connect_args)
+        Base.metadata.create_all(engine)
+        Session = sessionmaker(bind=engine, autocommit=False, autoflush=False)
+        async_engine = create_async_engine(async_database_url(url))
+        AsyncSession = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+        ids = seed(Session)
+        recorder = _Recorder(build_app(Session, AsyncSession, ids["me"]))
+        client = TestClient(recorder)
+
+        failures = 0
+        print(f"page={PAGE} db={engine.dialect.name}")
+        for label, template, budget in BUDGETS:
+            path = settings.API_PREFIX + template.format(page=PAGE, **ids)
+            response = client.get(path)
+            stats = recorder.last
+            count = stats.count
+            ok = response.status_code == 200 and count <= budget
+            failures += 0 if ok else 1
+            print(f"  {'ok  ' if ok else 'FAIL'} {label:<22} queries={count:<3} budget={budget:<3} status={response.status_code}")
+            if not ok and verbose:
+                for sql in stats.statements:
+                    print(f"         {sql.strip().splitlines()[0]}")
+        engine.dispose()
+
+    if failures:
+        print(f"FAILED: {failures} endpoint(s) over budget")
+        return 1
+    print("OK: all endpoints within their query budget")
+    return 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Assert a maximum number of SQL statements per list endpoint.")
+    parser.add_argument("--database-url", default=None, help="Scratch database URL (default: temp SQLite file)")
+    parser.add_argument("--verbose", action="store_true", help="Print the statements of endpoints over budget")
+    args = parser.parse_args()
+    sys.exit(main(args.database_url, args.verbose))
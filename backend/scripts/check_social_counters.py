@@ -0,0 +1,205 @@
+"""Concurrency check: social counters stay exact under parallel like / follow toggles.
+
+Seeds users and works, then lets concurrent client threads randomly like / unlike works
+and follow / unfollow users through app.services.social_counters (single and bulk
+calls, many of them repeated so the idempotent paths are hit too). Afterwards every
+denormalized counter is recomputed from like_records / user_followers and compared:
+  works.like_count, users.total_likes, users.liked_works_count,
+  users.followers_count, users.following_count
+
+Exits with status 1 on any mismatch.
+
+Usage (from backend/):
+  python scripts/check_social_counters.py                      # temp SQLite file
+  python scripts/check_social_counters.py --clients 32 --ops 300
+  python scripts/check_social_counters.py --database-url mysql+pymysql://user:pw@host/scratch_db
+  (the check deletes and re-seeds rows of its own tables; use a scratch database)
+"""
+
+from __future__ import annotations
+
+import argparse
+import random
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+from pathlib import Path
+
+from sqlalchemy import create_engine
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import sessionmaker
+
+# Ensure project root on path
+BASE_DIR = Path(__file__).resolve().parent.parent
+if str(BASE_DIR) not in sys.path:
+    sys.path.append(str(BASE_DIR))
+
+from app.db.base_class import Base
+from app.models.like_record import LikeRecord
+from app.models.music_file import MusicFile
+from app.models.user import User
+from app.models.user_follower import UserFollower
+from app.models.work import Work, WorkStatus, WorkVisibility
+from app.services import social_counters
+
+TABLES = [User.__table__, MusicFile.__table__, Work.__table__, LikeRecord.__table__, UserFollower.__table__]
+
+
+def seed(Session, n_users: int, n_works: int) -> tuple[list[int], list[tuple[int, int]]]:
+    db = Session()
+    try:
+        db.query(LikeRecord).delete()
+        db.query(UserFollower).delete()
+        db.query(Work).delete()
+        db.query(MusicFile).delete()
+        db.query(User).filter(User.username.like("social_check_%")).delete(synchronize_session=False)
+        users = [User(username=f"social_check_{i}", password_hash="x") for i in range(n_users)]
+        db.add_all(users)
+        db.flush()
+        works: list[tuple[int, int]] = []
+        for i in range(n_works):
+            author = users[i % len(users)]
+            mf = MusicFile(user_id=author.id, file_name=f"social_{i}.wav", storage_path=f"social_{i}.wav")
+            db.add(mf)
+            db.flush()
+            work = Work(
+                user_id=author.id,
+                music_file_id=mf.id,
+                title=f"social {i}",
+                status=WorkStatus.published,
+                visibility=WorkVisibility.public,
+            )
+            db.add(work)
+            db.flush()
+            works.append((work.id, author.id))
+        db.commit()
+        return [u.id for u in users], works
+    finally:
+        db.close()
+
+
+def client_ops(Session, rng: random.Random, user_id: int, user_ids: list[int], works: list[tuple[int, int]]) -> None:
+    db = Session()
+    try:
+        op = rng.random()
+        if op < 0.3:
+            social_counters.like_works(db, user_id, rng.sample(works, k=min(len(works), rng.randint(1, 3))))
+        elif op < 0.5:
+            social_counters.unlike_works(db, user_id, [w for w, _ in rng.sample(works, k=min(len(works), rng.randint(1, 3)))])
+        elif op < 0.8:
+            others = [u for u in user_ids if u != user_id]
+            social_counters.follow_users(db, user_id, rng.sample(others, k=min(len(others), rng.randint(1, 3))))
+        else:
+            others = [u for u in user_ids if u != user_id]
+            social_counters.unfollow_users(db, user_id, rng.sample(others, k=min(len(others), rng.randint(1, 3))))
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+
+def run_clients(Session, clients: int, ops: int, user_ids: list[int], works: list[tuple[int, int]], seed_value: int):
+    errors: Counter[str] = Counter()
+    lock = threading.Lock()
+
+    def client(idx: int) -> None:
+        rng = random.Random(seed_value + idx)
+        # 多个线程共用少量账号，制造同一用户的并发重复点赞 / 关注
+        user_id = user_ids[idx % max(1, len(user_ids) // 2)]
+        for _ in range(ops):
+            for attempt in range(5):
+                try:
+                    client_ops(Session, rng, user_id, user_ids, works)
+                    break
+                except OperationalError as exc:
+                    # 死锁 / 锁等待超时：整笔事务回滚，重试不会重复计数
+                    with lock:
+                        errors[type(exc.orig).__name__ if exc.orig is not None else "OperationalError"] += 1
+                    time.sleep(0.01 * (attempt + 1))
+
+    threads = [threading.Thread(target=client, args=(i,)) for i in range(clients)]
+    started = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return time.perf_counter() - started, errors
+
+
+def verify(Session) -> list[str]:
+    db = Session()
+    try:
+        likes = db.query(LikeRecord.user_id, LikeRecord.work_id).all()
+        follows = db.query(UserFollower.follower_id, UserFollower.following_id).all()
+        work_author = dict(db.query(Work.id, Work.user_id).all())
+        works = dict(db.query(Work.id, Work.like_count).all())
+        users = {
+            row.id: row
+            for row in db.query(
+                User.id, User.total_likes, User.liked_works_count, User.followers_count, User.following_count
+            ).filter(User.username.like("social_check_%"))
+        }
+    finally:
+        db.close()
+
+    expected_work_likes = Counter(work_id for _, work_id in likes)
+    expected_total_likes = Counter(work_author[work_id] for _, work_id in likes)
+    expected_liked = Counter(user_id for user_id, _ in likes)
+    expected_followers = Counter(following for _, following in follows)
+    expected_following = Counter(follower for follower, _ in follows)
+
+    mismatches: list[str] = []
+    for work_id, like_count in works.items():
+        if like_count != expected_work_likes[work_id]:
+            mismatches.append(f"work {work_id}: like_count={like_count} expected={expected_work_likes[work_id]}")
+    for user_id, row in users.items():
+        for name, expected in (
+            ("total_likes", expected_total_likes[user_id]),
+            ("liked_works_count", expected_liked[user_id]),
+            ("followers_count", expected_followers[user_id]),
+            ("following_count", expected_following[user_id]),
+        ):
+            if getattr(row, name) != expected:
+                mismatches.append(f"user {user_id}: {name}={getattr(row, name)} expected={expected}")
+    print(f"  links: likes={len(likes)} follows={len(follows)}")
+    return mismatches
+
+
+def main(database_url: str | None, clients: int, ops: int, users: int, works: int, seed_value: int) -> int:
+    with tempfile.TemporaryDirectory() as tmp:
+        url = database_url or f"sqlite:///{Path(tmp) / 'social.db'}"
+        connect_args = {"check_same_thread": False, "timeout": 60} if url.startswith("sqlite") else {}
+        engine = create_engine(url, connect_args=connect_args, pool_size=max(5, clients), max_overflow=clients)
+        Base.metadata.create_all(engine, tables=TABLES)
+        Session = sessionmaker(bind=engine, autocommit=False, autoflush=False)
+
+        user_ids, work_pairs = seed(Session, users, works)
+        print(f"clients={clients} ops/client={ops} users={users} works={works} db={engine.dialect.name}")
+        elapsed, errors = run_clients(Session, clients, ops, user_ids, work_pairs, seed_value)
+        print(f"  {clients * ops / elapsed:.1f} ops/s  retried={dict(errors) or 0}")
+        mismatches = verify(Session)
+        engine.dispose()
+
+    if mismatches:
+        for line in mismatches[:20]:
+            print(f"  MISMATCH {line}")
+        print(f"FAILED: {len(mismatches)} counter(s) drifted")
+        return 1
+    print("OK: all counters match the link tables")
+    return 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Check that like / follow counters stay exact under concurrency.")
+    parser.add_argument("--database-url", default=None, help="Scratch database URL (default: temp SQLite file)")
+    parser.add_argument("--clients", type=int, default=16, help="Concurrent client threads (default: 16)")
+    parser.add_argument("--ops", type=int, default=100, help="Operations per client (default: 100)")
+    parser.add_argument("--users", type=int, default=8, help="Seeded users (default: 8)")
+    parser.add_argument("--works", type=int, default=6, help="Seeded works (default: 6)")
+    parser.add_argument("--seed", type=int, default=1234, help="Random seed (default: 1234)")
+    args = parser.parse_args()
+    sys.exit(main(args.database_url, args.clients, args.ops, args.users, args.works, args.seed))
@@ -1,18 +1,34 @@
-"""One-off migration: move local audio/images to OSS and update DB to oss://key.
+"""Bulk migration: move local audio/images to OSS and update DB to oss://key.
+
+- uploads run concurrently in a worker pool
+- rows are read with keyset pagination (id > last_id) and written back with batched UPDATEs
+- progress is checkpointed after every committed batch, so an interrupted run resumes
+- rows whose upload failed are recorded in the checkpoint and retried first on the next run
+- identical files (same sha256) are uploaded once and share the same OSS key
+- --dry-run only reports how many files / bytes would be uploaded (after dedup)
 
 Usage (from backend/):
   python scripts/migrate_local_to_oss.py
-  python scripts/migrate_local_to_oss.py --delete-local   # optional, delete after upload
+  python scripts/migrate_local_to_oss.py --workers 16 --batch-size 500
+  python scripts/migrate_local_to_oss.py --dry-run
+  python scripts/migrate_local_to_oss.py --delete-local   # optional, delete after commit
+  python scripts/migrate_local_to_oss.py --reset          # ignore an existing checkpoint
 """
 
 from __future__ import annotations
 
 import argparse
+import hashlib
+import json
 import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
 from pathlib import Path
-from typing import Iterable, Optional
+from typing import Callable, Iterable, Optional
 
-from sqlalchemy import select
+from sqlalchemy import select, update
 
 # Ensure project root on path
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -31,6 +47,9 @@ from app.services.oss_storage import (
     normalize_oss_like_url,
 )
 
+DEFAULT_CHECKPOINT = BASE_DIR / "scripts" / ".migrate_local_to_oss.checkpoint.json"
+HASH_CHUNK_SIZE = 1024 * 1024
+
 
 def guess_content_type(path: Path) -> Optional[str]:
     ext = path.suffix.lower()
@@ -54,148 +73,469 @@ def pick_first_existing(candidates: Iterable[Path]) -> Optional[Path]:
     return None
 
 
-def migrate_audio(
-    oss: OSSStorage,
-    mf: MusicFile,
-    delete_local: bool,
-) -> tuple[bool, str]:
-    """Migrate one MusicFile audio. Returns (changed, message)."""
-    if decode_oss_path(mf.storage_path):
-        return False, "already oss"
+def sha256_file(path: Path) -> tuple[str, int]:
+    h = hashlib.sha256()
+    size = 0
+    with open(path, "rb") as f:
+        while True:
+            chunk = f.read(HASH_CHUNK_SIZE)
+            if not chunk:
+                break
+            h.update(chunk)
+            size += len(chunk)
+    return h.hexdigest(), size
+
 
+def audio_candidates(mf: MusicFile) -> list[Path]:
     candidates = []
     if mf.storage_path:
         candidates.append(Path(mf.storage_path))
     if mf.file_name:
         candidates.append(Path(settings.STATIC_ROOT) / "audio" / Path(mf.file_name).name)
+    return candidates
+
+
+def cover_candidates(value: str) -> list[Path]:
+    if value.startswith("/static/covers/") or value.startswith("static/covers/"):
+        return [Path(settings.STATIC_ROOT) / "covers" / Path(value).name]
+    # try as absolute path
+    return [Path(value)]
+
+
+# ---------- checkpoint ----------
+@dataclass
+class Checkpoint:
+    path: Path
+    music_files_last_id: int = 0
+    works_last_id: int = 0
+    # rows behind *_last_id whose upload failed; retried at the start of the next run
+    music_files_failed_ids: list[int] = field(default_factory=list)
+    works_failed_ids: list[int] = field(default_factory=list)
+    # sha256 -> oss key, local path -> oss key (lets later rows reuse uploads even after --delete-local)
+    hash_to_key: dict[str, str] = field(default_factory=dict)
+    path_to_key: dict[str, str] = field(default_factory=dict)
+
+    @classmethod
+    def load(cls, path: Path, reset: bool) -> "Checkpoint":
+        if reset or not path.exists():
+            return cls(path=path)
+        data = json.loads(path.read_text(encoding="utf-8"))
+        return cls(
+            path=path,
+            music_files_last_id=int(data.get("music_files_last_id") or 0),
+            works_last_id=int(data.get("works_last_id") or 0),
+            music_files_failed_ids=[int(i) for i in data.get("music_files_failed_ids") or []],
+            works_failed_ids=[int(i) for i in data.get("works_failed_ids") or []],
+            hash_to_key=dict(data.get("hash_to_key") or {}),
+            path_to_key=dict(data.get("path_to_key") or {}),
+        )
+
+    def save(self) -> None:
+        tmp = self.path.with_suffix(self.path.suffix + ".tmp")
+        tmp.write_text(
+            json.dumps(
+                {
+                    "music_files_last_id": self.music_files_last_id,
+                    "works_last_id": self.works_last_id,
+                    "music_files_failed_ids": self.music_files_failed_ids,
+                    "works_failed_ids": self.works_failed_ids,
+                    "hash_to_key": self.hash_to_key,
+                    "path_to_key": self.path_to_key,
+                },
+                ensure_ascii=False,
+            ),
+            encoding="utf-8",
+        )
+        tmp.replace(self.path)
+
+
+# ---------- uploader ----------
+@dataclass
+class Stats:
+    rows: int = 0
+    files_seen: int = 0
+    files_uploaded: int = 0
+    files_deduped: int = 0
+    files_missing: int = 0
+    failures: int = 0
+    bytes_seen: int = 0
+    bytes_uploaded: int = 0
+    started_at: float = field(default_factory=time.perf_counter)
+
+    def report(self, label: str) -> str:
+        elapsed = max(time.perf_counter() - self.started_at, 1e-6)
+        mib = self.bytes_uploaded / (1024 * 1024)
+        return (
+            f"[{label}] rows={self.rows} files={self.files_seen} uploaded={self.files_uploaded} "
+            f"deduped={self.files_deduped} missing={self.files_missing} failed={self.failures} "
+            f"upload={mib:.1f}MiB ({mib / elapsed:.2f}MiB/s, {self.rows / elapsed:.1f} rows/s) "
+            f"elapsed={elapsed:.0f}s"
+        )
+
+
+class DedupUploader:
+    """Thread-safe uploader: one PUT per distinct sha256, concurrent duplicates wait for the first."""
+
+    def __init__(self, checkpoint: Checkpoint, stats: Stats, *, dry_run: bool) -> None:
+        self.checkpoint = checkpoint
+        self.stats = stats
+        self.dry_run = dry_run
+        self._lock = threading.Lock()
+        self._inflight: dict[str, threading.Event] = {}
+        self._local = threading.local()
+
+    def _oss(self) -> OSSStorage:
+        oss = getattr(self._local, "oss", None)
+        if oss is None:
+            oss = OSSStorage()
+            self._local.oss = oss
+        return oss
+
+    def upload(self, local_path: Path, build_key: Callable[[], str]) -> str:
+        path_key = str(local_path.resolve())
+        digest, size = sha256_file(local_path)
+        with self._lock:
+            self.stats.files_seen += 1
+            self.stats.bytes_seen += size
+            key = self.checkpoint.hash_to_key.get(digest)
+            if key:
+                self.stats.files_deduped += 1
+                self.checkpoint.path_to_key[path_key] = key
+                return key
+            event = self._inflight.get(digest)
+            owner = event is None
+            if owner:
+                event = threading.Event()
+                self._inflight[digest] = event
+
+        if not owner:
+            event.wait()
+            with self._lock:
+                key = self.checkpoint.hash_to_key.get(digest)
+                if key:
+                    self.stats.files_deduped += 1
+                    self.checkpoint.path_to_key[path_key] = key
+                    return key
+            # the first uploader failed; try ourselves
+            return self._put(local_path, build_key, digest, size, path_key)
+
+        try:
+            return self._put(local_path, build_key, digest, size, path_key)
+        finally:
+            with self._lock:
+                self._inflight.pop(digest, None)
+            event.set()
+
+    def _put(self, local_path: Path, build_key: Callable[[], str], digest: str, size: int, path_key: str) -> str:
+        key = build_key()
+        if not self.dry_run:
+            self._oss().put_file(key, str(local_path), content_type=guess_content_type(local_path))
+        with self._lock:
+            self.checkpoint.hash_to_key[digest] = key
+            self.checkpoint.path_to_key[path_key] = key
+            self.stats.files_uploaded += 1
+            self.stats.bytes_uploaded += size
+        return key
+
+
+# ---------- per-row planning ----------
+@dataclass
+class FileJob:
+    row_id: int
+    column: str
+    local_path: Path
+    build_key: Callable[[], str]
+
+
+def lookup_uploaded(candidates: Iterable[Path], checkpoint: Checkpoint) -> Optional[str]:
+    """A previous row (or run) already uploaded this exact local file."""
+    for candidate in candidates:
+        try:
+            key = checkpoint.path_to_key.get(str(candidate.resolve()))
+        except OSError:
+            key = None
+        if key:
+            return key
+    return None
+
 
+def plan_audio(mf: MusicFile, checkpoint: Checkpoint, stats: Stats) -> tuple[Optional[FileJob], Optional[str]]:
+    """Return (upload job, or an immediate new value when no upload is needed)."""
+    if decode_oss_path(mf.storage_path):
+        return None, None
+    candidates = audio_candidates(mf)
+    key = lookup_uploaded(candidates, checkpoint)
+    if key:
+        return None, encode_oss_path(key)
     local_path = pick_first_existing(candidates)
     if not local_path:
-        return False, "no local file found"
+        stats.files_missing += 1
+        return None, None
 
     source = "generated" if getattr(mf, "source_type", "") == "generated" else "upload"
-    key = build_oss_key(
-        category="music",
-        source=source,
-        user_id=mf.user_id or 0,
-        original_filename=local_path.name,
-        ext=local_path.suffix,
-    )
-    oss.put_file(key, str(local_path), content_type=guess_content_type(local_path))
-    mf.storage_path = encode_oss_path(key)
+    user_id = mf.user_id or 0
 
-    if delete_local:
-        try:
-            local_path.unlink(missing_ok=True)
-        except Exception as exc:  # pragma: no cover
-            return True, f"uploaded but delete failed: {exc}"
-    return True, "uploaded"
+    def build_key() -> str:
+        return build_oss_key(
+            category="music",
+            source=source,
+            user_id=user_id,
+            original_filename=local_path.name,
+            ext=local_path.suffix,
+        )
 
+    return FileJob(row_id=mf.id, column="storage_path", local_path=local_path, build_key=build_key), None
 
-def migrate_cover_value(
-    oss: OSSStorage,
+
+def plan_cover(
+    row_id: int,
+    column: str,
     value: Optional[str],
     user_id: int,
     source: str,
-    delete_local: bool,
-) -> tuple[Optional[str], str]:
-    """Migrate a cover path/string, return (new_value, message)."""
+    checkpoint: Checkpoint,
+    stats: Stats,
+) -> tuple[Optional[FileJob], Optional[str]]:
+    """Return (upload job, or an immediate new value when no upload is needed)."""
     if not value:
-        return value, "empty"
+        return None, None
 
     # Already OSS or same-bucket URL
     normalized = normalize_oss_like_url(value)
     if decode_oss_path(normalized):
-        return normalized, "already oss"
-
+        return None, normalized if normalized != value else None
     if normalized.startswith("http://") or normalized.startswith("https://"):
         # 外部链接，保持
-        return normalized, "external url"
+        return None, None
 
-    # Local candidates
-    candidates: list[Path] = []
-    if normalized.startswith("/static/covers/") or normalized.startswith("static/covers/"):
-        candidates.append(Path(settings.STATIC_ROOT) / "covers" / Path(normalized).name)
-    else:
-        # try as absolute path
-        candidates.append(Path(normalized))
+    candidates = cover_candidates(normalized)
+    key = lookup_uploaded(candidates, checkpoint)
+    if key:
+        return None, encode_oss_path(key)
 
     local_path = pick_first_existing(candidates)
     if not local_path:
-        return value, "no local cover"
-
-    key = build_oss_key(
-        category="picture",
-        source=source,
-        user_id=user_id or 0,
-        original_filename=local_path.name,
-        ext=local_path.suffix,
-    )
-    oss.put_file(key, str(local_path), content_type=guess_content_type(local_path))
-    if delete_local:
-        try:
-            local_path.unlink(missing_ok=True)
-        except Exception as exc:  # pragma: no cover
-            return encode_oss_path(key), f"uploaded cover delete failed: {exc}"
-    return encode_oss_path(key), "uploaded cover"
-
+        stats.files_missing += 1
+        return None, None
+
+    user_id = user_id or 0
+
+    def build_key() -> str:
+        return build_oss_key(
+            category="picture",
+            source=source,
+            user_id=user_id,
+            original_filename=local_path.name,
+            ext=local_path.suffix,
+        )
+
+    return FileJob(row_id=row_id, column=column, local_path=local_path, build_key=build_key), None
+
+
+# ---------- migration loop ----------
+def migrate_rows(
+    *,
+    label: str,
+    model,
+    stmt,
+    plan_row: Callable[[object], tuple[list[FileJob], dict[str, str]]],
+    uploader: DedupUploader,
+    pool: ThreadPoolExecutor,
+    dry_run: bool,
+) -> Optional[tuple[int, set[int], list[Path]]]:
+    """Upload and commit one batch of rows; (last row id, ids with failed uploads, uploaded paths) or None when empty."""
+    stats = uploader.stats
+    session = SessionLocal()
+    try:
+        rows = session.scalars(stmt).all()
+        if not rows:
+            return None
+
+        updates: dict[int, dict[str, str]] = {}
+        jobs: list[FileJob] = []
+        for row in rows:
+            row_jobs, immediate = plan_row(row)
+            jobs.extend(row_jobs)
+            if immediate:
+                updates.setdefault(row.id, {}).update(immediate)
+        stats.rows += len(rows)
+        batch_last_id = rows[-1].id
+    finally:
+        # release the connection while uploads run
+        session.close()
 
-def main(delete_local: bool) -> None:
-    if not settings.OSS_ENABLED:
+    futures = [(job, pool.submit(uploader.upload, job.local_path, job.build_key)) for job in jobs]
+    failed_ids: set[int] = set()
+    uploaded_paths: list[Path] = []
+    for job, future in futures:
+        try:
+            key = future.result()
+        except Exception as exc:
+            stats.failures += 1
+            failed_ids.add(job.row_id)
+            print(f"[{label} id={job.row_id}] {job.column}: upload failed: {exc}")
+            continue
+        updates.setdefault(job.row_id, {})[job.column] = encode_oss_path(key)
+        uploaded_paths.append(job.local_path)
+
+    if updates and not dry_run:
+        session = SessionLocal()
+        try:
+            session.execute(update(model), [{"id": row_id, **values} for row_id, values in updates.items()])
+            session.commit()
+        finally:
+            session.close()
+    return batch_last_id, failed_ids, uploaded_paths
+
+
+def run_batches(
+    *,
+    label: str,
+    model,
+    last_id_attr: str,
+    failed_ids_attr: str,
+    plan_row: Callable[[object], tuple[list[FileJob], dict[str, str]]],
+    checkpoint: Checkpoint,
+    uploader: DedupUploader,
+    pool: ThreadPoolExecutor,
+    batch_size: int,
+    dry_run: bool,
+    delete_local: bool,
+) -> None:
+    # The checkpoint moves past a batch even when some of its uploads failed; those row ids are
+    # kept in `failed_ids_attr` and retried first (rows already pointing at OSS are skipped by plan_row).
+    failed = set(getattr(checkpoint, failed_ids_attr))
+    retry_ids = sorted(failed)
+    if retry_ids:
+        print(f"[{label}] retrying {len(retry_ids)} rows that failed in a previous run")
+
+    def batches():
+        for start in range(0, len(retry_ids), batch_size):
+            chunk = retry_ids[start : start + batch_size]
+            yield chunk, select(model).where(model.id.in_(chunk)).order_by(model.id.asc())
+        while True:
+            last_id = getattr(checkpoint, last_id_attr)
+            yield None, select(model).where(model.id > last_id).order_by(model.id.asc()).limit(batch_size)
+
+    for chunk, stmt in batches():
+        result = migrate_rows(
+            label=label, model=model, stmt=stmt, plan_row=plan_row, uploader=uploader, pool=pool, dry_run=dry_run
+        )
+        if chunk is not None:
+            failed.difference_update(chunk)
+        if result is None:
+            if chunk is None:
+                break
+            continue
+        batch_last_id, failed_ids, uploaded_paths = result
+        failed.update(failed_ids)
+        setattr(checkpoint, failed_ids_attr, sorted(failed))
+        if chunk is None:
+            setattr(checkpoint, last_id_attr, batch_last_id)
+        if not dry_run:
+            checkpoint.save()
+            # Delete only after the DB points at OSS.
+            if delete_local:
+                for p in uploaded_paths:
+                    try:
+                        p.unlink(missing_ok=True)
+                    except Exception as exc:  # pragma: no cover
+                        print(f"[{label}] delete local failed: {p} ({exc})")
+
+        print(uploader.stats.report(label))
+
+    setattr(checkpoint, failed_ids_attr, sorted(failed))
+    if not dry_run:
+        checkpoint.save()
+    if failed:
+        print(f"[{label}] {len(failed)} rows still failing; rerun to retry them: {sorted(failed)[:20]}")
+
+
+def main(
+    *,
+    delete_local: bool,
+    workers: int,
+    batch_size: int,
+    checkpoint_path: Path,
+    dry_run: bool,
+    reset: bool,
+) -> None:
+    if not settings.OSS_ENABLED and not dry_run:
         print("ERROR: OSS_ENABLED is false; aborting.")
         return
     if SessionLocal is None:
         print("ERROR: DATABASE_URL is not configured; aborting.")
         return
 
-    oss = OSSStorage()
-    session = SessionLocal()
-
-    audio_total = audio_uploaded = 0
-    cover_total = cover_uploaded = 0
-
-    try:
-        for mf in session.scalars(select(MusicFile)).all():
-            audio_total += 1
-            changed, msg = migrate_audio(oss, mf, delete_local)
-            if changed:
-                audio_uploaded += 1
-            # Migrate generated cover images on music_file
-            new_cover, cmsg = migrate_cover_value(
-                oss,
-                mf.cover_image_path,
-                user_id=mf.user_id or 0,
-                source="generated",
-                delete_local=delete_local,
-            )
-            if new_cover != mf.cover_image_path:
-                mf.cover_image_path = new_cover
-                cover_uploaded += 1
-            print(f"[MusicFile id={mf.id}] audio: {msg}; cover: {cmsg}")
-            session.add(mf)
-
-        for work in session.scalars(select(Work)).all():
-            cover_total += 1
-            new_cover, msg = migrate_cover_value(
-                oss,
-                work.cover_url,
-                user_id=work.user_id or 0,
-                source="upload",
-                delete_local=delete_local,
-            )
-            if new_cover != work.cover_url:
-                work.cover_url = new_cover
-                cover_uploaded += 1
-                session.add(work)
-            print(f"[Work id={work.id}] cover: {msg}")
-
-        session.commit()
-    finally:
-        session.close()
-
+    # A dry run never persists progress, so it always starts from the stored position without mutating it.
+    checkpoint = Checkpoint.load(checkpoint_path, reset=reset)
+    if checkpoint.music_files_last_id or checkpoint.works_last_id:
+        print(
+            f"Resuming from checkpoint {checkpoint_path}: "
+            f"music_files>{checkpoint.music_files_last_id}, works>{checkpoint.works_last_id}"
+        )
+
+    stats = Stats()
+    uploader = DedupUploader(checkpoint, stats, dry_run=dry_run)
+
+    def plan_music_file(mf: MusicFile) -> tuple[list[FileJob], dict[str, str]]:
+        jobs: list[FileJob] = []
+        immediate: dict[str, str] = {}
+        audio_job, audio_value = plan_audio(mf, checkpoint, stats)
+        if audio_job:
+            jobs.append(audio_job)
+        elif audio_value:
+            immediate["storage_path"] = audio_value
+        # Migrate generated cover images on music_file
+        cover_job, cover_value = plan_cover(
+            mf.id, "cover_image_path", mf.cover_image_path, mf.user_id or 0, "generated", checkpoint, stats
+        )
+        if cover_job:
+            jobs.append(cover_job)
+        elif cover_value:
+            immediate["cover_image_path"] = cover_value
+        return jobs, immediate
+
+    def plan_work(work: Work) -> tuple[list[FileJob], dict[str, str]]:
+        cover_job, cover_value = plan_cover(
+            work.id, "cover_url", work.cover_url, work.user_id or 0, "upload", checkpoint, stats
+        )
+        if cover_job:
+            return [cover_job], {}
+        return [], ({"cover_url": cover_value} if cover_value else {})
+
+    with ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="oss-migrate") as pool:
+        common = dict(
+            checkpoint=checkpoint,
+            uploader=uploader,
+            pool=pool,
+            batch_size=max(1, batch_size),
+            dry_run=dry_run,
+            delete_local=delete_local,
+        )
+        run_batches(
+            label="MusicFile",
+            model=MusicFile,
+            last_id_attr="music_files_last_id",
+            failed_ids_attr="music_files_failed_ids",
+            plan_row=plan_music_file,
+            **common,
+        )
+        run_batches(
+            label="Work",
+            model=Work,
+            last_id_attr="works_last_id",
+            failed_ids_attr="works_failed_ids",
+            plan_row=plan_work,
+            **common,
+        )
+
+    mib_seen = stats.bytes_seen / (1024 * 1024)
+    mib_upload = stats.bytes_uploaded / (1024 * 1024)
     print(
-        f"Done. audio total={audio_total}, uploaded/updated={audio_uploaded}; "
-        f"cover total={cover_total}, uploaded/updated={cover_uploaded}; "
+        f"Done{' (dry run)' if dry_run else ''}. rows={stats.rows}, files={stats.files_seen} ({mib_seen:.1f}MiB), "
+        f"{'would upload' if dry_run else 'uploaded'}={stats.files_uploaded} ({mib_upload:.1f}MiB), "
+        f"deduped={stats.files_deduped}, missing={stats.files_missing}, failed={stats.failures}, "
         f"delete_local={delete_local}"
     )
 
@@ -205,10 +545,24 @@ if __name__ == "__main__":
     parser.add_argument(
         "--delete-local",
         action="store_true",
-        help="Delete local files after successful upload (default: keep).",
+        help="Delete local files after the batch referencing them is committed (default: keep).",
+    )
+    parser.add_argument("--workers", type=int, default=8, help="Concurrent upload workers (default: 8)")
+    parser.add_argument("--batch-size", type=int, default=200, help="Rows per DB page / UPDATE batch (default: 200)")
+    parser.add_argument(
+        "--checkpoint",
+        type=Path,
+        default=DEFAULT_CHECKPOINT,
+        help=f"Checkpoint file for resumption (default: {DEFAULT_CHECKPOINT.name})",
     )
+    parser.add_argument("--dry-run", action="store_true", help="Only report files/bytes that would be uploaded.")
+    parser.add_argument("--reset", action="store_true", help="Ignore an existing checkpoint and start over.")
     args = parser.parse_args()
-    main(delete_local=args.delete_local)
-
-
-
+    main(
+        delete_local=args.delete_local and not args.dry_run,
+        workers=args.workers,
+        batch_size=args.batch_size,
+        checkpoint_path=args.checkpoint,
+        dry_run=args.dry_run,
+        reset=args.reset,
+    )
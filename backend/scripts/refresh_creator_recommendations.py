@@ -0,0 +1,38 @@
+"""Rebuild creator_recommendations (the /ui/recommended-creators ranking) once.
+
+For cron-driven deployments (set CREATOR_RECO_REFRESH_SECONDS=0 to disable the
+in-process refresher).
+
+Usage (from backend/):
+  python scripts/refresh_creator_recommendations.py
+"""
+
+from __future__ import annotations
+
+import sys
+import time
+from pathlib import Path
+
+# Ensure project root on path
+BASE_DIR = Path(__file__).resolve().parent.parent
+if str(BASE_DIR) not in sys.path:
+    sys.path.append(str(BASE_DIR))
+
+from app.db.session import SessionLocal
+from app.services.creator_recommendations import refresh
+
+
+def main() -> None:
+    if SessionLocal is None:
+        raise SystemExit("DATABASE_URL is not configured")
+    db = SessionLocal()
+    try:
+        started = time.perf_counter()
+        count = refresh(db)
+        print(f"ranked={count} in {time.perf_counter() - started:.2f}s")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,45 @@
+"""Rebuild work_popularity_snapshots (the /ui/hot-songs ranking) once.
+
+For cron-driven deployments (set POPULARITY_REFRESH_SECONDS=0 to disable the
+in-process refresher).
+
+Usage (from backend/):
+  python scripts/refresh_popularity.py                 # windows from POPULARITY_WINDOWS
+  python scripts/refresh_popularity.py --window 1 --window 7
+"""
+
+from __future__ import annotations
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+# Ensure project root on path
+BASE_DIR = Path(__file__).resolve().parent.parent
+if str(BASE_DIR) not in sys.path:
+    sys.path.append(str(BASE_DIR))
+
+from app.core.config import settings
+from app.db.session import SessionLocal
+from app.services.popularity import refresh_window
+
+
+def main(windows: list[int]) -> None:
+    if SessionLocal is None:
+        raise SystemExit("DATABASE_URL is not configured")
+    db = SessionLocal()
+    try:
+        for window_days in windows:
+            started = time.perf_counter()
+            count = refresh_window(db, window_days)
+            print(f"window={window_days}d ranked={count} in {time.perf_counter() - started:.2f}s")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Refresh hot-songs popularity snapshots.")
+    parser.add_argument("--window", type=int, action="append", help="Window in days (repeatable)")
+    args = parser.parse_args()
+    main(args.window or settings.popularity_windows_list)
@@ -104,7 +104,7 @@ function formatFastApiDetail(detail) {
   return (detail || "").toString();
 }
 
-async function request(path, options = {}) {
+async function send(path, options = {}) {
   const token = getToken();
   const headers = {
     ...(token ? { Authorization: `Bearer ${token}` } : {}),
@@ -150,7 +150,10 @@ async function request(path, options = {}) {
     err.status = res.status;
     throw err;
   }
+  return res;
+}
 
+async function parseBody(res) {
   const text = await res.text();
   if (!text) {
     return null;
@@ -164,8 +167,35 @@ async function request(path, options = {}) {
   }
 }
 
+async function request(path, options = {}) {
+  return parseBody(await send(path, options));
+}
+
+// 分页列表接口只返回一页（默认 20 条），下一页游标在响应头 X-Next-Cursor；
+// 这里跟随游标直到取完，供需要完整列表的页面（作品、点赞、关注、总播放量统计）使用
+const NEXT_CURSOR_HEADER = "X-Next-Cursor";
+const MAX_PAGE_SIZE = 100;
+
+async function getAll(path) {
+  const items = [];
+  const seen = new Set();
+  let cursor = null;
+  do {
+    const params = new URLSearchParams({ limit: String(MAX_PAGE_SIZE) });
+    if (cursor) params.set("cursor", cursor);
+    const res = await send(`${path}${path.includes("?") ? "&" : "?"}${params.toString()}`);
+    const page = await parseBody(res);
+    if (!Array.isArray(page)) return page;
+    items.push(...page);
+    seen.add(cursor);
+    cursor = res.headers.get(NEXT_CURSOR_HEADER);
+  } while (cursor && !seen.has(cursor));
+  return items;
+}
+
 export const api = {
   get: path => request(path),
+  getAll,
   post: (path, body) => request(path, {
     method: "POST",
     body: body instanceof FormData ? body : JSON.stringify(body)
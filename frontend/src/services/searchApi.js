@@ -18,6 +18,7 @@ export const followUser = id => api.post(`/api/social/users/${id}/follow`, {});
 export const unfollowUser = id => api.delete(`/api/social/users/${id}/follow`);
 
 export const fetchPublicUser = id => api.get(`/api/social/users/${id}`);
-export const fetchFollowers = id => api.get(`/api/social/users/${id}/followers`);
-export const fetchFollowing = id => api.get(`/api/social/users/${id}/following`);
-export const fetchLikedWorks = () => api.get("/api/social/likes/works");
+// 以下列表接口分页返回，getAll 跟随 X-Next-Cursor 取完整列表
+export const fetchFollowers = id => api.getAll(`/api/social/users/${id}/followers`);
+export const fetchFollowing = id => api.getAll(`/api/social/users/${id}/following`);
+export const fetchLikedWorks = () => api.getAll("/api/social/likes/works");
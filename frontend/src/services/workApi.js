@@ -7,7 +7,8 @@ const buildQuery = params => {
 
 export const fetchWorks = async params => {
   try {
-    return await api.get(`/api/works${buildQuery(params)}`);
+    // 分页接口：跟随 X-Next-Cursor 取完整列表（总播放量等统计依赖全部作品）
+    return await api.getAll(`/api/works${buildQuery(params)}`);
   } catch (err) {
     if (err?.status === 404) return [];
     throw err;
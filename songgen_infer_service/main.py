@@ -107,9 +107,14 @@ async def generate_with_audio(
     original_name = (prompt_audio.filename or "").strip() or "prompt_audio"
     suffix = Path(original_name).suffix or ".wav"
     audio_path = Path(job.job_dir) / f"prompt_audio{suffix}"
+    # 分块写盘，避免整段参考音频驻留内存
     try:
-        content = await prompt_audio.read()
-        audio_path.write_bytes(content)
+        with audio_path.open("wb") as out:
+            while True:
+                chunk = await prompt_audio.read(1024 * 1024)
+                if not chunk:
+                    break
+                out.write(chunk)
     except Exception as exc:  # noqa: BLE001
         raise HTTPException(status_code=500, detail=f"保存参考音频失败: {exc}") from exc
 